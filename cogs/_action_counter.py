@@ -0,0 +1,84 @@
+"""Contadores de janela deslizante por executor, com expulsão de executores ociosos.
+
+Módulo auxiliar (prefixo ``_``: não é carregado como cog pelo ``bot.py``).
+
+Cada executor tem uma única deque ``(instante, índice da ação)`` e um contador
+por ação mantido incrementalmente (entrar soma, expirar subtrai), então contar
+é O(1) e o total combinado é uma soma sobre poucas ações. Os executores ficam
+num ``OrderedDict`` em ordem de última atividade: quem ficou uma janela inteira
+sem agir está sempre na frente e sai assim que alguém novo age.
+"""
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Hashable, Iterable, List, Tuple
+
+
+class _Executor:
+    __slots__ = ('events', 'counts', 'last')
+
+    def __init__(self, n_actions: int):
+        self.events: Deque[Tuple[float, int]] = deque()
+        self.counts: List[int] = [0] * n_actions
+        self.last = 0.0
+
+
+class ActionCounter:
+    def __init__(self, actions: Iterable[str], window_seconds: float, max_executors: int = 10000):
+        self.actions: Tuple[str, ...] = tuple(actions)
+        self._index: Dict[str, int] = {a: i for i, a in enumerate(self.actions)}
+        self.window = float(window_seconds)
+        self.max_executors = max(1, int(max_executors))
+        self._execs: 'OrderedDict[Hashable, _Executor]' = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._execs)
+
+    def clear(self):
+        self._execs.clear()
+
+    def _expire(self, ex: _Executor, now: float):
+        cutoff = now - self.window
+        events, counts = ex.events, ex.counts
+        while events and events[0][0] < cutoff:
+            counts[events.popleft()[1]] -= 1
+
+    def _evict(self, now: float):
+        cutoff = now - self.window
+        execs = self._execs
+        while execs:
+            key, ex = next(iter(execs.items()))
+            if ex.last >= cutoff and len(execs) <= self.max_executors:
+                break
+            del execs[key]
+
+    def add(self, key: Hashable, action: str, now: float) -> int:
+        """Registra a ação e devolve quantas ``action`` o executor fez na janela."""
+        idx = self._index[action]
+        ex = self._execs.get(key)
+        if ex is None:
+            ex = self._execs[key] = _Executor(len(self.actions))
+        else:
+            self._execs.move_to_end(key)
+        ex.events.append((now, idx))
+        ex.counts[idx] += 1
+        ex.last = now
+        self._expire(ex, now)
+        self._evict(now)
+        return ex.counts[idx]
+
+    def count(self, key: Hashable, action: str, now: float) -> int:
+        ex = self._execs.get(key)
+        if ex is None:
+            return 0
+        self._expire(ex, now)
+        return ex.counts[self._index[action]]
+
+    def combined(self, key: Hashable, now: float, actions: Iterable[str] = ()) -> int:
+        """Soma das ações na janela (só as de ``actions``, se informado)."""
+        ex = self._execs.get(key)
+        if ex is None:
+            return 0
+        self._expire(ex, now)
+        wanted = list(actions)
+        if not wanted:
+            return len(ex.events)
+        return sum(ex.counts[self._index[a]] for a in wanted if a in self._index)
@@ -0,0 +1,251 @@
+"""Arquivo local (SQLite + FTS5) dos eventos de auditoria, com gravação em lote.
+
+Módulo auxiliar (prefixo ``_``: não é carregado como cog pelo ``bot.py``).
+
+Os cogs de auditoria chamam :meth:`ArchiveWriter.record`, que só acrescenta a
+linha numa fila em memória (O(1), sem I/O no loop). Uma task drena a fila em
+lotes e grava cada lote numa única transação dentro de uma thread dedicada;
+buscas passam pela mesma thread, então a conexão SQLite nunca é usada por duas
+threads. Com a fila cheia, as linhas mais antigas são descartadas e contadas.
+
+A tabela ``events`` tem índices por (guild, tempo), (guild, usuário, tempo),
+(guild, alvo, tempo) e (guild, ação, tempo); ``events_fts`` é um índice FTS5
+de conteúdo externo sobre ``content``, mantido por triggers. A paginação é por
+cursor (``id`` decrescente), então a página 50 custa o mesmo que a primeira.
+"""
+import asyncio
+import sqlite3
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Deque, Iterable, List, NamedTuple, Optional, Tuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    guild_id INTEGER NOT NULL,
+    ts REAL NOT NULL,
+    source TEXT NOT NULL,
+    action TEXT NOT NULL,
+    user_id INTEGER,
+    target_id INTEGER,
+    channel_id INTEGER,
+    content TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS events_guild_ts ON events (guild_id, ts);
+CREATE INDEX IF NOT EXISTS events_guild_user ON events (guild_id, user_id, ts);
+CREATE INDEX IF NOT EXISTS events_guild_target ON events (guild_id, target_id, ts);
+CREATE INDEX IF NOT EXISTS events_guild_action ON events (guild_id, action, ts);
+CREATE VIRTUAL TABLE IF NOT EXISTS events_fts USING fts5 (content, content='events', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS events_ai AFTER INSERT ON events BEGIN
+    INSERT INTO events_fts (rowid, content) VALUES (new.id, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS events_ad AFTER DELETE ON events BEGIN
+    INSERT INTO events_fts (events_fts, rowid, content) VALUES ('delete', old.id, old.content);
+END;
+"""
+
+# (guild_id, ts, source, action, user_id, target_id, channel_id, content)
+Row = Tuple[int, float, str, str, Optional[int], Optional[int], Optional[int], str]
+
+
+class ArchivedEvent(NamedTuple):
+    id: int
+    ts: float
+    source: str
+    action: str
+    user_id: Optional[int]
+    target_id: Optional[int]
+    channel_id: Optional[int]
+    content: str
+
+
+class SearchQuery(NamedTuple):
+    guild_id: int
+    text: str = ''
+    user_id: Optional[int] = None  # executor ou alvo
+    action: str = ''
+    channel_id: Optional[int] = None
+    since: Optional[float] = None  # time.time()
+
+
+def fts_phrase(text: str) -> str:
+    """Converte texto livre em termos FTS5 entre aspas (sem operadores vindos do usuário)."""
+    terms = [t.replace('"', '') for t in text.split()]
+    return ' '.join(f'"{t}"' for t in terms if t)
+
+
+def archive_event(bot, guild, source: str, action: str, *, user=None, target=None, channel=None,
+                  content: Optional[str] = None, fields: Iterable[Tuple[str, str, bool]] = ()):
+    """Grava o evento no arquivo pesquisável (!auditsearch), independente do canal de log.
+
+    Sem ``content``, o texto pesquisável são os valores dos campos do embed. Não faz
+    nada sem ``action`` ou com a ``AuditArchiveCog`` descarregada.
+    """
+    archive = bot.get_cog('AuditArchiveCog')
+    if archive is None or not action:
+        return
+    if content is None:
+        content = '\n'.join(v for _, v, _ in fields)
+    archive.record(guild, source, action, user=user, target=target, channel=channel, content=content)
+
+
+class AuditArchive:
+    """Acesso síncrono ao banco; use sempre pela thread do :class:`ArchiveWriter`."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), isolation_level=None, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(_SCHEMA)
+
+    def close(self):
+        self._db.close()
+
+    def write_batch(self, rows: List[Row]) -> int:
+        if not rows:
+            return 0
+        db = self._db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            db.executemany('INSERT INTO events (guild_id, ts, source, action, user_id, target_id, channel_id, content) '
+                           'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+            db.execute('COMMIT')
+        except Exception:
+            db.execute('ROLLBACK')
+            raise
+        return len(rows)
+
+    def search(self, q: SearchQuery, before_id: Optional[int] = None, limit: int = 10) -> List[ArchivedEvent]:
+        """Eventos mais novos primeiro; ``before_id`` é o cursor da página seguinte."""
+        where = ['e.guild_id = ?']
+        args: list = [q.guild_id]
+        if q.user_id is not None:
+            where.append('(e.user_id = ? OR e.target_id = ?)')
+            args += [q.user_id, q.user_id]
+        if q.action:
+            where.append('e.action = ?')
+            args.append(q.action)
+        if q.channel_id is not None:
+            where.append('e.channel_id = ?')
+            args.append(q.channel_id)
+        if q.since is not None:
+            where.append('e.ts >= ?')
+            args.append(q.since)
+        if before_id is not None:
+            where.append('e.id < ?')
+            args.append(before_id)
+        sql = 'SELECT e.id, e.ts, e.source, e.action, e.user_id, e.target_id, e.channel_id, e.content FROM events e'
+        phrase = fts_phrase(q.text)
+        if phrase:
+            sql += ' JOIN events_fts f ON f.rowid = e.id'
+            where.append('events_fts MATCH ?')
+            args.append(phrase)
+        sql += ' WHERE ' + ' AND '.join(where) + ' ORDER BY e.id DESC LIMIT ?'
+        args.append(int(limit))
+        return [ArchivedEvent(*r) for r in self._db.execute(sql, args)]
+
+    def prune(self, older_than: float, chunk: int = 5000) -> int:
+        """Apaga eventos anteriores a ``older_than`` em blocos (não trava o banco por muito tempo)."""
+        total = 0
+        while True:
+            cur = self._db.execute('DELETE FROM events WHERE id IN (SELECT id FROM events WHERE ts < ? LIMIT ?)',
+                                   (older_than, chunk))
+            total += cur.rowcount
+            if cur.rowcount < chunk:
+                return total
+
+    def count(self, guild_id: Optional[int] = None) -> int:
+        if guild_id is None:
+            return self._db.execute('SELECT COUNT(*) FROM events').fetchone()[0]
+        return self._db.execute('SELECT COUNT(*) FROM events WHERE guild_id = ?', (guild_id,)).fetchone()[0]
+
+
+class ArchiveWriter:
+    def __init__(self, archive: AuditArchive, batch_size: int = 500, flush_interval: float = 2.0, max_queue: int = 50000):
+        self.archive = archive
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = max(0.0, float(flush_interval))
+        self.max_queue = max(self.batch_size, int(max_queue))
+        self._queue: Deque[Row] = deque()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='audit-archive')
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.written = 0
+        self.dropped = 0
+        self.last_error: Optional[str] = None
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._worker())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+        await self._run(self.archive.close)
+        self._executor.shutdown(wait=False)
+
+    def record(self, guild_id: int, source: str, action: str, user_id: Optional[int] = None,
+               target_id: Optional[int] = None, channel_id: Optional[int] = None, content: str = '',
+               ts: Optional[float] = None):
+        """Enfileira um evento; nunca faz I/O."""
+        if len(self._queue) >= self.max_queue:
+            self._queue.popleft()
+            self.dropped += 1
+        self._queue.append((guild_id, time.time() if ts is None else ts, source, action,
+                            user_id, target_id, channel_id, content or ''))
+        if self._wake is not None and len(self._queue) >= self.batch_size:
+            self._wake.set()
+
+    def _take(self) -> List[Row]:
+        q = self._queue
+        n = min(len(q), self.batch_size)
+        return [q.popleft() for _ in range(n)]
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def flush(self) -> int:
+        total = 0
+        while self._queue:
+            # shield: um lote já tirado da fila é gravado mesmo se esta task for cancelada
+            total += await asyncio.shield(self._run(self._write, self._take()))
+        return total
+
+    def _write(self, batch: List[Row]) -> int:
+        # Roda na thread do arquivo: a contagem fica certa mesmo se a task que esperava for cancelada
+        try:
+            n = self.archive.write_batch(batch)
+        except Exception as e:
+            self.last_error = str(e)[:200]
+            self.dropped += len(batch)
+            return 0
+        self.written += n
+        return n
+
+    async def _worker(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    async def search(self, q: SearchQuery, before_id: Optional[int] = None, limit: int = 10) -> List[ArchivedEvent]:
+        return await self._run(self.archive.search, q, before_id, limit)
+
+    async def prune(self, older_than: float) -> int:
+        return await self._run(self.archive.prune, older_than)
+
+    async def count(self, guild_id: Optional[int] = None) -> int:
+        return await self._run(self.archive.count, guild_id)
@@ -0,0 +1,136 @@
+"""Busca compartilhada no audit log: uma requisição por (guild, ação) para todos os listeners.
+
+Módulo auxiliar (prefixo ``_``: não é carregado como cog pelo ``bot.py``).
+
+Vários cogs reagem ao mesmo evento (uma mudança de call passa por
+``audit_movecall``, ``audit_user`` e ``mod_mutecall``) e cada um pedia
+``guild.audit_logs`` da mesma ação em poucos milissegundos. Aqui:
+
+- quem chega com uma busca da mesma ``(guild, ação)`` em andamento espera por
+  ela em vez de abrir outra (singleflight);
+- um resultado só é reaproveitado se a busca começou no máximo ``grace``
+  segundos antes da pergunta. ``grace`` cobre os listeners do mesmo evento,
+  que perguntam com poucos milissegundos de diferença; um evento posterior
+  sobre o mesmo alvo (outro executor 1s depois) sempre busca de novo, com
+  acerto ou não no resultado antigo, para não herdar o executor anterior.
+
+A janela de tempo e o filtro de cada cog continuam com o cog (``window`` e
+``predicate`` de :meth:`AuditLogCache.find`).
+"""
+import asyncio
+import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+import discord
+
+Key = Tuple[int, int]  # (guild_id, action.value)
+
+
+class _Slot:
+    __slots__ = ('started', 'limit', 'entries', 'by_target', 'task')
+
+    def __init__(self):
+        self.started = float('-inf')
+        self.limit = 0
+        self.entries: Optional[List[discord.AuditLogEntry]] = None
+        self.by_target: Dict[int, List[discord.AuditLogEntry]] = {}
+        self.task: Optional[asyncio.Task] = None
+
+
+class AuditLogCache:
+    def __init__(self, ttl: float = 10.0, limit: int = 10, grace: float = 0.5, max_slots: int = 512):
+        self.ttl = float(ttl)
+        self.grace = float(grace)
+        self.limit = int(limit)
+        self.max_slots = max(1, int(max_slots))
+        self._slots: Dict[Key, _Slot] = {}
+        self.requests = 0  # chamadas REST feitas
+        self.shared = 0  # pedidos atendidos sem REST (cache ou busca em andamento)
+
+    def clear(self):
+        self._slots.clear()
+
+    async def _fetch(self, guild: discord.Guild, action: discord.AuditLogAction, limit: int, slot: _Slot, started: float):
+        self.requests += 1
+        entries = [e async for e in guild.audit_logs(limit=limit, action=action)]
+        by_target: Dict[int, List[discord.AuditLogEntry]] = {}
+        for e in entries:
+            tid = getattr(e.target, 'id', None)
+            if tid is not None:
+                by_target.setdefault(tid, []).append(e)
+        # Uma busca mais nova já foi aberta: não sobrescreve o resultado dela
+        if slot.started == started:
+            slot.entries, slot.by_target, slot.limit = entries, by_target, limit
+        return slot
+
+    def _prune(self, now: float):
+        if len(self._slots) <= self.max_slots:
+            return
+        for key in [k for k, s in self._slots.items() if s.task is None and now - s.started > self.ttl]:
+            del self._slots[key]
+
+    async def _get(self, guild: discord.Guild, action: discord.AuditLogAction, limit: int,
+                   fresh_after: Optional[float] = None) -> _Slot:
+        now = asyncio.get_running_loop().time()
+        # Sem exigência de frescor, vale qualquer resultado dentro do ttl
+        min_started = now - self.ttl if fresh_after is None else fresh_after
+        key = (guild.id, action.value)
+        slot = self._slots.get(key)
+        if slot is None:
+            self._prune(now)
+            slot = self._slots[key] = _Slot()
+        if slot.task is not None and slot.started >= min_started:
+            self.shared += 1
+            await asyncio.shield(slot.task)
+            return slot
+        if slot.task is None and slot.entries is not None and slot.started >= min_started and slot.limit >= limit:
+            self.shared += 1
+            return slot
+        slot.started = now
+        task = slot.task = asyncio.create_task(self._fetch(guild, action, max(limit, self.limit), slot, now))
+
+        def _done(t: asyncio.Task):
+            if slot.task is t:
+                slot.task = None
+        task.add_done_callback(_done)
+        await asyncio.shield(task)
+        return slot
+
+    @staticmethod
+    def _match(slot: _Slot, target_id: int, window: float,
+               predicate: Optional[Callable[[discord.AuditLogEntry], bool]]) -> Optional[discord.AuditLogEntry]:
+        now = datetime.datetime.now(datetime.timezone.utc)
+        for entry in slot.by_target.get(target_id, ()):
+            created = entry.created_at
+            if created.tzinfo is None:
+                created = created.replace(tzinfo=datetime.timezone.utc)
+            if (now - created).total_seconds() > window:
+                continue
+            if predicate is None or predicate(entry):
+                return entry
+        return None
+
+    async def find(self, guild: discord.Guild, action: discord.AuditLogAction, target_id: int, window: float,
+                   limit: int = 6, predicate: Optional[Callable[[discord.AuditLogEntry], bool]] = None
+                   ) -> Optional[discord.AuditLogEntry]:
+        """Entrada mais recente de ``action`` sobre ``target_id`` criada nos últimos ``window`` segundos."""
+        # Resultado anterior ao evento (mais de ``grace`` antes) não serve nem com acerto: pode ser de outra ação
+        fresh_after = asyncio.get_running_loop().time() - self.grace
+        slot = await self._get(guild, action, limit, fresh_after=fresh_after)
+        return self._match(slot, target_id, window, predicate)
+
+    async def recent(self, guild: discord.Guild, action: discord.AuditLogAction, limit: int = 10
+                     ) -> List[discord.AuditLogEntry]:
+        """Últimas ``limit`` entradas de ``action`` (mais novas primeiro), numa única busca para vários alvos."""
+        fresh_after = asyncio.get_running_loop().time() - self.grace
+        slot = await self._get(guild, action, limit, fresh_after=fresh_after)
+        return list(slot.entries or ())[:limit]
+
+
+def get_audit_cache(bot) -> AuditLogCache:
+    """Instância única por bot (compartilhada entre cogs e preservada em reloads)."""
+    cache = getattr(bot, '_audit_log_cache', None)
+    if not isinstance(cache, AuditLogCache):
+        cache = AuditLogCache()
+        bot._audit_log_cache = cache
+    return cache
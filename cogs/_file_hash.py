@@ -0,0 +1,159 @@
+"""Hash SHA-256 de anexos em streaming e blocklist local de hashes.
+
+Módulo auxiliar (prefixo ``_``: não é carregado como cog pelo ``bot.py``).
+
+O cache de hashes é chaveado por ``(attachment_id, tamanho)``, como o do
+sniffer: o hash guardado é sempre o do conteúdo inteiro daquele anexo. Um
+arquivo repostado é outro anexo e é baixado de novo; chavear pelo início do
+arquivo deixaria um arquivo bloqueado passar com o hash de outro com o mesmo
+começo.
+"""
+import asyncio
+import datetime
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Dict, Hashable, Optional
+
+import aiohttp
+
+from cogs._lru import LRUCache
+
+
+class FileTooLarge(Exception):
+    pass
+
+
+async def stream_sha256(session: aiohttp.ClientSession, url: str, *, chunk_size: int = 256 * 1024,
+                        max_bytes: int = 25 * 1024 * 1024, timeout: float = 30.0) -> str:
+    """Baixa ``url`` em blocos e calcula o SHA-256 fora do event loop.
+
+    Os blocos da rede são agrupados até ``chunk_size`` antes de irem para o executor
+    (hashlib libera o GIL em buffers grandes). Aborta com ``FileTooLarge`` acima de ``max_bytes``.
+    """
+    loop = asyncio.get_running_loop()
+    hasher = hashlib.sha256()
+    total = 0
+    buf = bytearray()
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+    async with session.get(url, timeout=client_timeout) as resp:
+        resp.raise_for_status()
+        async for piece in resp.content.iter_chunked(chunk_size):
+            total += len(piece)
+            if total > max_bytes:
+                raise FileTooLarge(f'{total} > {max_bytes} bytes')
+            buf += piece
+            if len(buf) >= chunk_size:
+                block = bytes(buf)
+                buf.clear()
+                await loop.run_in_executor(None, hasher.update, block)
+    if buf:
+        await loop.run_in_executor(None, hasher.update, bytes(buf))
+    return hasher.hexdigest()
+
+
+class AttachmentHasher:
+    """Calcula hashes de anexos com cache por anexo e concorrência limitada."""
+
+    def __init__(self, chunk_size: int = 256 * 1024, max_bytes: int = 25 * 1024 * 1024, max_concurrency: int = 2,
+                 cache_size: int = 4096, timeout: float = 30.0):
+        self.chunk_size = max(4096, int(chunk_size))
+        self.max_bytes = int(max_bytes)
+        self.timeout = float(timeout)
+        self.cache = LRUCache(cache_size)
+        self._semaphore = asyncio.Semaphore(max(1, int(max_concurrency)))
+        self._session: aiohttp.ClientSession | None = None
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.downloads = 0  # downloads completos feitos
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession()
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def hash_attachment(self, attachment_id: int, size: int, url: str) -> str:
+        """SHA-256 do conteúdo do anexo. Exceções de rede são propagadas (não cacheadas)."""
+        key = (attachment_id, size)
+        if key in self.cache:
+            return self.cache.get(key)
+        pending = self._inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        try:
+            async with self._semaphore:
+                self.downloads += 1
+                digest = await stream_sha256(self._get_session(), url, chunk_size=self.chunk_size,
+                                             max_bytes=self.max_bytes, timeout=self.timeout)
+            self.cache.put(key, digest)
+            fut.set_result(digest)
+            return digest
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except Exception as e:
+            fut.set_exception(e)
+            fut.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+
+class HashBlocklist:
+    """Banco local (JSON) de hashes SHA-256 bloqueados, com lookup O(1) em memória."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = asyncio.Lock()
+        self.load()
+
+    def load(self):
+        self.entries = {}
+        if not self.path.exists():
+            return
+        try:
+            with self.path.open('r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception:
+            return
+        if isinstance(data, dict):
+            self.entries = {str(k).lower(): (v if isinstance(v, dict) else {}) for k, v in data.items()}
+
+    def __contains__(self, digest: str) -> bool:
+        return digest.lower() in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, digest: str) -> Optional[Dict[str, Any]]:
+        return self.entries.get(digest.lower())
+
+    async def add(self, digest: str, **meta: Any) -> bool:
+        digest = digest.lower()
+        if digest in self.entries:
+            return False
+        meta.setdefault('added_at', datetime.datetime.now(datetime.timezone.utc).isoformat())
+        self.entries[digest] = meta
+        await self.save()
+        return True
+
+    async def remove(self, digest: str) -> bool:
+        if self.entries.pop(digest.lower(), None) is None:
+            return False
+        await self.save()
+        return True
+
+    async def save(self):
+        async with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix('.tmp')
+            with tmp.open('w', encoding='utf-8') as f:
+                json.dump(self.entries, f, ensure_ascii=False, indent=2)
+            tmp.replace(self.path)
@@ -0,0 +1,169 @@
+"""Identificação de anexos pelo conteúdo (magic bytes) lendo apenas o início do arquivo.
+
+Módulo auxiliar (prefixo ``_``: não é carregado como cog pelo ``bot.py``).
+"""
+import asyncio
+from typing import Dict, Hashable, Optional, Tuple
+
+import aiohttp
+
+from cogs._lru import LRUCache
+
+# (offset, assinatura, categoria, extensão)
+# Categorias: image | gif | video | audio | executable | archive | document
+MAGIC_SIGNATURES: Tuple[Tuple[int, bytes, str, str], ...] = (
+    (0, b'\x89PNG\r\n\x1a\n', 'image', 'png'),
+    (0, b'\xff\xd8\xff', 'image', 'jpg'),
+    (0, b'GIF87a', 'gif', 'gif'),
+    (0, b'GIF89a', 'gif', 'gif'),
+    (0, b'BM', 'image', 'bmp'),
+    (0, b'II*\x00', 'image', 'tiff'),
+    (0, b'MM\x00*', 'image', 'tiff'),
+    (0, b'\x1aE\xdf\xa3', 'video', 'webm'),
+    (0, b'OggS', 'audio', 'ogg'),
+    (0, b'ID3', 'audio', 'mp3'),
+    (0, b'fLaC', 'audio', 'flac'),
+    (0, b'MZ', 'executable', 'exe'),
+    (0, b'\x7fELF', 'executable', 'elf'),
+    (0, b'\xcf\xfa\xed\xfe', 'executable', 'macho'),
+    (0, b'\xce\xfa\xed\xfe', 'executable', 'macho'),
+    (0, b'\xca\xfe\xba\xbe', 'executable', 'macho'),
+    (0, b'L\x00\x00\x00\x01\x14\x02\x00', 'executable', 'lnk'),
+    (0, b'PK\x03\x04', 'archive', 'zip'),
+    (0, b'PK\x05\x06', 'archive', 'zip'),
+    (0, b'Rar!\x1a\x07', 'archive', 'rar'),
+    (0, b"7z\xbc\xaf'\x1c", 'archive', '7z'),
+    (0, b'\x1f\x8b', 'archive', 'gz'),
+    (0, b'BZh', 'archive', 'bz2'),
+    (0, b'\xfd7zXZ\x00', 'archive', 'xz'),
+    (257, b'ustar', 'archive', 'tar'),
+    (0, b'%PDF-', 'document', 'pdf'),
+    (0, b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', 'document', 'ole'),
+)
+
+# Formatos que são um zip por dentro: declarados com essa extensão, o zip detectado é o próprio formato
+ZIP_CONTAINERS: Dict[str, str] = {
+    'docx': 'document', 'docm': 'document', 'dotx': 'document', 'xlsx': 'document', 'xlsm': 'document',
+    'pptx': 'document', 'ppsx': 'document', 'odt': 'document', 'ods': 'document', 'odp': 'document',
+    'odg': 'document', 'epub': 'document', 'jar': 'executable', 'apk': 'executable',
+}
+
+# Subtipos ISO-BMFF (bytes 8..12 após 'ftyp')
+_FTYP_BRANDS: Dict[bytes, Tuple[str, str]] = {
+    b'avif': ('image', 'avif'),
+    b'avis': ('image', 'avif'),
+    b'heic': ('image', 'heic'),
+    b'heix': ('image', 'heic'),
+    b'mif1': ('image', 'heic'),
+    b'qt  ': ('video', 'mov'),
+    b'M4A ': ('audio', 'm4a'),
+}
+
+
+def classify_head(head: bytes) -> Optional[Tuple[str, str]]:
+    """Retorna ``(categoria, extensão)`` detectada nos primeiros bytes, ou None se desconhecido."""
+    if not head:
+        return None
+    # Containers RIFF (WEBP / AVI / WAV)
+    if head[:4] == b'RIFF' and len(head) >= 12:
+        kind = head[8:12]
+        if kind == b'WEBP':
+            return 'image', 'webp'
+        if kind == b'AVI ':
+            return 'video', 'avi'
+        if kind == b'WAVE':
+            return 'audio', 'wav'
+    # ISO-BMFF (mp4/mov/heic/avif)
+    if len(head) >= 12 and head[4:8] == b'ftyp':
+        return _FTYP_BRANDS.get(head[8:12], ('video', 'mp4'))
+    for offset, sig, category, ext in MAGIC_SIGNATURES:
+        if head[offset:offset + len(sig)] == sig:
+            return category, ext
+    return None
+
+
+def refine_container(detected: Optional[Tuple[str, str]], declared_ext: str) -> Optional[Tuple[str, str]]:
+    """Zip com extensão de formato baseado em zip (docx, odt, jar…) vira ``(categoria do formato, extensão)``."""
+    if detected == ('archive', 'zip') and declared_ext in ZIP_CONTAINERS:
+        return ZIP_CONTAINERS[declared_ext], declared_ext
+    return detected
+
+
+def required_head_bytes(minimum: int) -> int:
+    """Garante que a leitura cubra ao menos a assinatura TAR (offset 257)."""
+    return max(int(minimum), 512)
+
+
+async def fetch_head(session: aiohttp.ClientSession, url: str, size: int, timeout: float = 5.0) -> bytes:
+    """Lê no máximo ``size`` bytes do início de ``url`` usando Range.
+
+    Se o servidor ignorar o cabeçalho Range (HTTP 200), lê apenas ``size`` bytes
+    do stream e fecha a conexão, sem baixar o restante do arquivo.
+    """
+    headers = {'Range': f'bytes=0-{size - 1}'}
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+    async with session.get(url, headers=headers, timeout=client_timeout) as resp:
+        if resp.status not in (200, 206):
+            raise aiohttp.ClientResponseError(resp.request_info, resp.history, status=resp.status, message=resp.reason or '')
+        # read(n) devolve o que já chegou (pode ser menos que n): junta até ``size`` ou o fim do arquivo
+        data = bytearray()
+        while len(data) < size:
+            piece = await resp.content.read(size - len(data))
+            if not piece:
+                break
+            data += piece
+        if resp.status == 200:
+            # Conexão não deve voltar ao pool com corpo pendente
+            resp.close()
+        return bytes(data)
+
+
+class AttachmentSniffer:
+    """Classifica anexos lendo só o cabeçalho, com cache e concorrência limitada."""
+
+    def __init__(self, head_bytes: int = 4096, max_concurrency: int = 4, cache_size: int = 2048, timeout: float = 5.0):
+        self.head_bytes = required_head_bytes(head_bytes)
+        self.timeout = float(timeout)
+        self.cache = LRUCache(cache_size)
+        self._semaphore = asyncio.Semaphore(max(1, int(max_concurrency)))
+        self._session: aiohttp.ClientSession | None = None
+        # Evita duas leituras simultâneas do mesmo anexo
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession()
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def sniff(self, attachment_id: int, size: int, url: str) -> Optional[Tuple[str, str]]:
+        """Retorna a classificação do anexo. Exceções de rede são propagadas (não cacheadas)."""
+        key = (attachment_id, size)
+        if key in self.cache:
+            return self.cache.get(key)
+        pending = self._inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        try:
+            async with self._semaphore:
+                head = await fetch_head(self._get_session(), url, self.head_bytes, self.timeout)
+            verdict = classify_head(head)
+            self.cache.put(key, verdict)
+            fut.set_result(verdict)
+            return verdict
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except Exception as e:
+            fut.set_exception(e)
+            # Marca a exceção como consumida caso ninguém esteja aguardando
+            fut.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
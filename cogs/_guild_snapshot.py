@@ -0,0 +1,285 @@
+"""Modelo compacto e incremental da estrutura de uma guild (canais, categorias, cargos, overwrites).
+
+Módulo auxiliar (prefixo ``_``: não é carregado como cog pelo ``bot.py``).
+
+Cada canal/cargo vira uma NamedTuple só com primitivos (ids, nomes, posições,
+``Permissions.value``), atualizada por evento em O(1). Itens apagados não somem:
+viram lápides (``Tombstone``) com o instante da deleção e o contexto necessário
+para recriá-los (overwrites que apontavam para o cargo, filhos da categoria).
+O checkpoint é JSON compacto gravado de forma atômica.
+"""
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import discord
+
+# (target_id, é_membro (0/1), allow, deny)
+Overwrite = Tuple[int, int, int, int]
+
+
+class ChannelSnap(NamedTuple):
+    id: int
+    type: int  # discord.ChannelType.value
+    name: str
+    category_id: int  # 0 = sem categoria
+    position: int
+    topic: str
+    nsfw: bool
+    slowmode: int
+    bitrate: int
+    user_limit: int
+    overwrites: Tuple[Overwrite, ...]
+
+
+class RoleSnap(NamedTuple):
+    id: int
+    name: str
+    permissions: int
+    color: int
+    hoist: bool
+    mentionable: bool
+    position: int
+    managed: bool
+
+
+class Tombstone(NamedTuple):
+    snap: Any  # ChannelSnap | RoleSnap
+    deleted_at: float  # time.time()
+    extra: Dict[str, Any]
+
+
+def channel_snap(channel) -> ChannelSnap:
+    overwrites = []
+    for target, ow in channel.overwrites.items():
+        allow, deny = ow.pair()
+        is_role = isinstance(target, discord.Role) or getattr(target, 'type', None) is discord.Role
+        is_member = 0 if is_role else 1
+        overwrites.append((target.id, is_member, allow.value, deny.value))
+    overwrites.sort()
+    return ChannelSnap(
+        channel.id,
+        channel.type.value,
+        channel.name,
+        getattr(channel, 'category_id', None) or 0,
+        channel.position,
+        getattr(channel, 'topic', None) or '',
+        bool(getattr(channel, 'nsfw', False)),
+        int(getattr(channel, 'slowmode_delay', 0) or 0),
+        int(getattr(channel, 'bitrate', 0) or 0),
+        int(getattr(channel, 'user_limit', 0) or 0),
+        tuple(overwrites),
+    )
+
+
+def role_snap(role) -> RoleSnap:
+    return RoleSnap(
+        role.id, role.name, role.permissions.value, role.colour.value,
+        bool(role.hoist), bool(role.mentionable), role.position, bool(role.managed),
+    )
+
+
+class SnapshotDiff:
+    """Diferenças de ``base`` (snapshot guardado) para ``current`` (estado atual)."""
+    __slots__ = ('channels_removed', 'channels_added', 'channels_changed', 'roles_removed', 'roles_added', 'roles_changed')
+
+    def __init__(self):
+        self.channels_removed: List[ChannelSnap] = []
+        self.channels_added: List[ChannelSnap] = []
+        self.channels_changed: List[Tuple[ChannelSnap, ChannelSnap, Tuple[str, ...]]] = []
+        self.roles_removed: List[RoleSnap] = []
+        self.roles_added: List[RoleSnap] = []
+        self.roles_changed: List[Tuple[RoleSnap, RoleSnap, Tuple[str, ...]]] = []
+
+    def __bool__(self) -> bool:
+        return any((self.channels_removed, self.channels_added, self.channels_changed,
+                    self.roles_removed, self.roles_added, self.roles_changed))
+
+    def summary_lines(self, limit: int = 10) -> List[str]:
+        lines: List[str] = []
+        for snap in self.channels_removed[:limit]:
+            lines.append(f'- canal #{snap.name} ({snap.id})')
+        for snap in self.channels_added[:limit]:
+            lines.append(f'+ canal #{snap.name} ({snap.id})')
+        for old, new, fields in self.channels_changed[:limit]:
+            lines.append(f'~ canal #{new.name}: {", ".join(fields)}')
+        for snap in self.roles_removed[:limit]:
+            lines.append(f'- cargo @{snap.name} ({snap.id})')
+        for snap in self.roles_added[:limit]:
+            lines.append(f'+ cargo @{snap.name} ({snap.id})')
+        for old, new, fields in self.roles_changed[:limit]:
+            lines.append(f'~ cargo @{new.name}: {", ".join(fields)}')
+        return lines
+
+
+def _changed_fields(old: NamedTuple, new: NamedTuple) -> Tuple[str, ...]:
+    return tuple(f for f, a, b in zip(old._fields, old, new) if a != b)
+
+
+def _diff_maps(base: Dict[int, NamedTuple], current: Dict[int, NamedTuple]):
+    removed = [s for i, s in base.items() if i not in current]
+    added = [s for i, s in current.items() if i not in base]
+    changed = []
+    for i, old in base.items():
+        new = current.get(i)
+        # Igualdade de tupla é rápida: só calcula os campos quando mudou
+        if new is not None and new != old:
+            changed.append((old, new, _changed_fields(old, new)))
+    return removed, added, changed
+
+
+class GuildSnapshot:
+    def __init__(self, guild_id: int):
+        self.guild_id = guild_id
+        self.channels: Dict[int, ChannelSnap] = {}
+        self.roles: Dict[int, RoleSnap] = {}
+        self.deleted_channels: Dict[int, Tombstone] = {}
+        self.deleted_roles: Dict[int, Tombstone] = {}
+        self.version = 0
+        self.updated_at = 0.0
+        self.dirty = False
+
+    @classmethod
+    def from_guild(cls, guild) -> 'GuildSnapshot':
+        snap = cls(guild.id)
+        snap.channels = {c.id: channel_snap(c) for c in guild.channels}
+        snap.roles = {r.id: role_snap(r) for r in guild.roles}
+        snap._touch()
+        return snap
+
+    def _touch(self):
+        self.version += 1
+        self.updated_at = time.time()
+        self.dirty = True
+
+    # ----------------- Atualização incremental -----------------
+    def upsert_channel(self, snap: ChannelSnap):
+        if self.channels.get(snap.id) != snap:
+            self.channels[snap.id] = snap
+            self.deleted_channels.pop(snap.id, None)
+            self._touch()
+
+    def delete_channel(self, channel_id: int, now: Optional[float] = None) -> Optional[Tombstone]:
+        snap = self.channels.pop(channel_id, None)
+        if snap is None:
+            return None
+        extra: Dict[str, Any] = {}
+        if snap.type == 4:  # categoria: guarda os filhos para recolocá-los depois
+            extra['children'] = [c.id for c in self.channels.values() if c.category_id == channel_id]
+        tomb = Tombstone(snap, now or time.time(), extra)
+        self.deleted_channels[channel_id] = tomb
+        self._touch()
+        return tomb
+
+    def upsert_role(self, snap: RoleSnap):
+        if self.roles.get(snap.id) != snap:
+            self.roles[snap.id] = snap
+            self.deleted_roles.pop(snap.id, None)
+            self._touch()
+
+    def delete_role(self, role_id: int, now: Optional[float] = None) -> Optional[Tombstone]:
+        snap = self.roles.pop(role_id, None)
+        if snap is None:
+            return None
+        # Overwrites que apontavam para o cargo: (canal, allow, deny)
+        overwrites = []
+        for ch in self.channels.values():
+            for target_id, is_member, allow, deny in ch.overwrites:
+                if target_id == role_id and not is_member:
+                    overwrites.append((ch.id, allow, deny))
+        tomb = Tombstone(snap, now or time.time(), {'overwrites': overwrites})
+        self.deleted_roles[role_id] = tomb
+        self._touch()
+        return tomb
+
+    def prune(self, retention_seconds: float, now: Optional[float] = None) -> int:
+        cutoff = (now or time.time()) - retention_seconds
+        removed = 0
+        for tombs in (self.deleted_channels, self.deleted_roles):
+            for key in [k for k, t in tombs.items() if t.deleted_at < cutoff]:
+                del tombs[key]
+                removed += 1
+        if removed:
+            self._touch()
+        return removed
+
+    def drop_tombstones(self, channel_ids: Iterable[int] = (), role_ids: Iterable[int] = ()):
+        """Esquece lápides já recriadas (para não restaurá-las de novo)."""
+        for cid in channel_ids:
+            self.deleted_channels.pop(cid, None)
+        for rid in role_ids:
+            self.deleted_roles.pop(rid, None)
+        self._touch()
+
+    def rebase(self, current: 'GuildSnapshot', now: Optional[float] = None) -> SnapshotDiff:
+        """Adota ``current`` como estado e transforma o que sumiu em lápides (ex.: deletado com o bot offline)."""
+        diff = self.diff(current)
+        now = now or time.time()
+        for snap in diff.roles_removed:
+            self.delete_role(snap.id, now)
+        for snap in diff.channels_removed:
+            self.delete_channel(snap.id, now)
+        self.channels = dict(current.channels)
+        self.roles = dict(current.roles)
+        self._touch()
+        return diff
+
+    def diff(self, current: 'GuildSnapshot') -> SnapshotDiff:
+        d = SnapshotDiff()
+        d.channels_removed, d.channels_added, d.channels_changed = _diff_maps(self.channels, current.channels)
+        d.roles_removed, d.roles_added, d.roles_changed = _diff_maps(self.roles, current.roles)
+        return d
+
+    # ----------------- Persistência -----------------
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'guild_id': self.guild_id,
+            'version': self.version,
+            'updated_at': self.updated_at,
+            'channels': [list(c) for c in self.channels.values()],
+            'roles': [list(r) for r in self.roles.values()],
+            'deleted_channels': [[list(t.snap), t.deleted_at, t.extra] for t in self.deleted_channels.values()],
+            'deleted_roles': [[list(t.snap), t.deleted_at, t.extra] for t in self.deleted_roles.values()],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'GuildSnapshot':
+        snap = cls(int(data['guild_id']))
+        snap.version = int(data.get('version', 0))
+        snap.updated_at = float(data.get('updated_at', 0.0))
+        snap.channels = {c.id: c for c in (_channel_from_list(x) for x in data.get('channels', []))}
+        snap.roles = {r.id: r for r in (RoleSnap(*x) for x in data.get('roles', []))}
+        for raw, ts, extra in data.get('deleted_channels', []):
+            c = _channel_from_list(raw)
+            snap.deleted_channels[c.id] = Tombstone(c, ts, extra)
+        for raw, ts, extra in data.get('deleted_roles', []):
+            r = RoleSnap(*raw)
+            extra['overwrites'] = [tuple(o) for o in extra.get('overwrites', [])]
+            snap.deleted_roles[r.id] = Tombstone(r, ts, extra)
+        return snap
+
+
+def _channel_from_list(raw: Iterable[Any]) -> ChannelSnap:
+    values = list(raw)
+    values[-1] = tuple(tuple(o) for o in values[-1])
+    return ChannelSnap(*values)
+
+
+def save_snapshot(path: Path, data: Dict[str, Any]):
+    """Grava o checkpoint de forma atômica (.tmp + replace). Bloqueante: rodar em executor."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + '.tmp')
+    with tmp.open('w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp, path)
+
+
+def load_snapshot(path: Path) -> Optional[GuildSnapshot]:
+    path = Path(path)
+    if not path.exists():
+        return None
+    with path.open('r', encoding='utf-8') as f:
+        return GuildSnapshot.from_dict(json.load(f))
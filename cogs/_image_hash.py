@@ -0,0 +1,139 @@
+"""Hash perceptual de imagens (aHash/dHash) e janela deslizante de hashes por guild.
+
+Módulo auxiliar (prefixo ``_``: não é carregado como cog pelo ``bot.py``).
+As funções de hash são de nível de módulo para poderem rodar num ProcessPoolExecutor.
+"""
+import io
+from collections import deque
+from typing import Deque, Dict, List, NamedTuple, Optional, Set, Tuple
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow é opcional; a cog se desativa sem ele
+    Image = None
+
+PILLOW_AVAILABLE = Image is not None
+
+
+def _load_gray(data: bytes, width: int, height: int):
+    img = Image.open(io.BytesIO(data))
+    # draft() permite ao decoder JPEG reduzir direto na decodificação (bem mais rápido)
+    img.draft('L', (width * 4, height * 4))
+    if getattr(img, 'is_animated', False):
+        img.seek(0)
+    return img.convert('L').resize((width, height), Image.BILINEAR)
+
+
+def ahash(data: bytes, hash_size: int = 8) -> int:
+    """Average hash: bit = pixel acima da média."""
+    pixels = _load_gray(data, hash_size, hash_size).tobytes()
+    avg = sum(pixels) / len(pixels)
+    value = 0
+    for p in pixels:
+        value = (value << 1) | (1 if p > avg else 0)
+    return value
+
+
+def dhash(data: bytes, hash_size: int = 8) -> int:
+    """Difference hash: bit = pixel mais claro que o vizinho da direita."""
+    width = hash_size + 1
+    pixels = _load_gray(data, width, hash_size).tobytes()
+    value = 0
+    for row in range(hash_size):
+        base = row * width
+        for col in range(hash_size):
+            value = (value << 1) | (1 if pixels[base + col] > pixels[base + col + 1] else 0)
+    return value
+
+
+def image_fingerprint(data: bytes, algorithm: str = 'dhash', hash_size: int = 8) -> Optional[int]:
+    """Ponto de entrada do process pool. Retorna None para dados não decodificáveis."""
+    try:
+        if algorithm == 'ahash':
+            return ahash(data, hash_size)
+        return dhash(data, hash_size)
+    except Exception:
+        return None
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class HashEntry(NamedTuple):
+    ts: float
+    value: int
+    author_id: int
+    channel_id: int
+    message_id: int
+
+
+class HashWindow:
+    """Janela deslizante limitada (tempo + quantidade) de hashes recentes de uma guild.
+
+    Busca de vizinhos usa multi-index hashing: o hash é dividido em ``bands`` faixas
+    e, pelo princípio da casa dos pombos, dois hashes com distância < bands
+    compartilham ao menos uma faixa idêntica. Assim só os candidatos dos buckets
+    são comparados, em vez da janela inteira.
+    """
+
+    def __init__(self, window_seconds: float = 120.0, max_entries: int = 2000, bits: int = 64, bands: int = 4):
+        self.window_seconds = float(window_seconds)
+        self.max_entries = max(1, int(max_entries))
+        self.bits = bits
+        self.bands = max(1, bands)
+        self._band_bits = max(1, bits // self.bands)
+        self._band_mask = (1 << self._band_bits) - 1
+        self._entries: Deque[Tuple[int, HashEntry]] = deque()
+        self._buckets: Dict[Tuple[int, int], Set[int]] = {}
+        self._by_seq: Dict[int, HashEntry] = {}
+        self._seq = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _band_keys(self, value: int):
+        for i in range(self.bands):
+            yield i, (value >> (i * self._band_bits)) & self._band_mask
+
+    def _evict_one(self):
+        seq, entry = self._entries.popleft()
+        self._by_seq.pop(seq, None)
+        for key in self._band_keys(entry.value):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(seq)
+                if not bucket:
+                    del self._buckets[key]
+
+    def expire(self, now: float):
+        while self._entries and (now - self._entries[0][1].ts) > self.window_seconds:
+            self._evict_one()
+
+    def add(self, entry: HashEntry):
+        self.expire(entry.ts)
+        while len(self._entries) >= self.max_entries:
+            self._evict_one()
+        self._seq += 1
+        seq = self._seq
+        self._entries.append((seq, entry))
+        self._by_seq[seq] = entry
+        for key in self._band_keys(entry.value):
+            self._buckets.setdefault(key, set()).add(seq)
+
+    def similar(self, value: int, max_distance: int, now: float) -> List[HashEntry]:
+        self.expire(now)
+        if max_distance >= self.bands:
+            # Garantia das faixas não vale: varredura linear
+            return [e for _, e in self._entries if hamming(e.value, value) <= max_distance]
+        seen: Set[int] = set()
+        found: List[HashEntry] = []
+        for key in self._band_keys(value):
+            for seq in self._buckets.get(key, ()):
+                if seq in seen:
+                    continue
+                seen.add(seq)
+                entry = self._by_seq[seq]
+                if hamming(entry.value, value) <= max_distance:
+                    found.append(entry)
+        return found
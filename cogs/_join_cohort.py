@@ -0,0 +1,149 @@
+"""Análise de coortes de entrada: contas parecidas entrando juntas indicam raid.
+
+Módulo auxiliar (prefixo ``_``: não é carregado como cog pelo ``bot.py``).
+
+Cada entrada vira um vetor compacto (criação da conta pelo snowflake, formato do
+nome, prefixo do nome, avatar padrão, sem flags) guardado em buffers circulares
+do módulo ``array``. A pontuação contra a coorte recente é vetorizada com NumPy
+(views sem cópia via ``frombuffer``) quando disponível, com fallback em Python puro.
+"""
+import re
+from array import array
+from typing import Dict, List, NamedTuple, Optional
+
+try:
+    import numpy as np
+except ImportError:  # NumPy é opcional; sem ele a pontuação usa laço simples
+    np = None
+
+NUMPY_AVAILABLE = np is not None
+
+DISCORD_EPOCH_MS = 1420070400000
+
+BIT_DEFAULT_AVATAR = 1
+BIT_NO_FLAGS = 2
+
+# Letras -> 'a', dígitos -> '0'; o resto fica como está. Depois colapsa repetições:
+# "raider_1234" -> "a_0", "xX_dark_Xx99" -> "a_a_a0"
+_SHAPE_TABLE = str.maketrans(
+    {**{c: 'a' for c in 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'},
+     **{c: '0' for c in '0123456789'}}
+)
+_RUNS = re.compile(r'(.)\1+')
+
+
+class JoinFeatures(NamedTuple):
+    created: float  # segundos desde a epoch unix
+    shape: int
+    prefix: int
+    bits: int
+
+
+def snowflake_created(user_id: int) -> float:
+    return ((user_id >> 22) + DISCORD_EPOCH_MS) / 1000.0
+
+
+def name_shape(name: str) -> str:
+    return _RUNS.sub(r'\1', name.translate(_SHAPE_TABLE))
+
+
+def extract_features(user_id: int, name: str, has_avatar: bool, flags_value: int) -> JoinFeatures:
+    bits = 0
+    if not has_avatar:
+        bits |= BIT_DEFAULT_AVATAR
+    if not flags_value:
+        bits |= BIT_NO_FLAGS
+    return JoinFeatures(
+        snowflake_created(user_id),
+        hash(name_shape(name)),
+        hash(name[:4].lower()),
+        bits,
+    )
+
+
+class CohortWindow:
+    """Buffer circular de capacidade fixa com as features das entradas recentes.
+
+    ``observe`` pontua a entrada contra a coorte viva (dentro de ``window_seconds``)
+    e devolve os ids parecidos (pontuação >= ``min_pair_score``) antes de registrá-la.
+    """
+
+    def __init__(self, capacity: int = 512, window_seconds: float = 300.0, created_tolerance_seconds: float = 86400.0,
+                 weights: Optional[Dict[str, float]] = None, min_pair_score: float = 4.0, use_numpy: bool = True):
+        self.capacity = max(1, int(capacity))
+        self.window_seconds = float(window_seconds)
+        self.created_tolerance = float(created_tolerance_seconds)
+        w = weights or {}
+        self.w_created = float(w.get('created', 3))
+        self.w_shape = float(w.get('name_shape', 1))
+        self.w_prefix = float(w.get('name_prefix', 1))
+        self.w_avatar = float(w.get('default_avatar', 1))
+        self.w_flags = float(w.get('no_flags', 0.5))
+        self.min_pair_score = float(min_pair_score)
+        self.use_numpy = use_numpy and NUMPY_AVAILABLE
+        # Tamanho fixo: os buffers nunca são redimensionados (frombuffer exige isso)
+        self._ts = array('d', [float('-inf')]) * self.capacity
+        self._created = array('d', [0.0]) * self.capacity
+        self._shape = array('q', [0]) * self.capacity
+        self._prefix = array('q', [0]) * self.capacity
+        self._bits = array('B', [0]) * self.capacity
+        self._ids = array('Q', [0]) * self.capacity
+        self._pos = 0
+
+    def add(self, member_id: int, feat: JoinFeatures, now: float):
+        i = self._pos
+        self._ts[i] = now
+        self._created[i] = feat.created
+        self._shape[i] = feat.shape
+        self._prefix[i] = feat.prefix
+        self._bits[i] = feat.bits
+        self._ids[i] = member_id
+        self._pos = (i + 1) % self.capacity
+
+    def similar(self, feat: JoinFeatures, now: float) -> List[int]:
+        if self.use_numpy:
+            return self._similar_numpy(feat, now)
+        return self._similar_python(feat, now)
+
+    def _similar_numpy(self, feat: JoinFeatures, now: float) -> List[int]:
+        ts = np.frombuffer(self._ts, dtype=np.float64)
+        created = np.frombuffer(self._created, dtype=np.float64)
+        bits = np.frombuffer(self._bits, dtype=np.uint8)
+        score = (np.abs(created - feat.created) <= self.created_tolerance) * self.w_created
+        score += (np.frombuffer(self._shape, dtype=np.int64) == feat.shape) * self.w_shape
+        score += (np.frombuffer(self._prefix, dtype=np.int64) == feat.prefix) * self.w_prefix
+        if feat.bits & BIT_DEFAULT_AVATAR:
+            score += (bits & BIT_DEFAULT_AVATAR).astype(bool) * self.w_avatar
+        if feat.bits & BIT_NO_FLAGS:
+            score += (bits & BIT_NO_FLAGS).astype(bool) * self.w_flags
+        hit = np.flatnonzero((ts >= now - self.window_seconds) & (score >= self.min_pair_score))
+        ids = self._ids
+        return [ids[i] for i in hit.tolist()]
+
+    def _similar_python(self, feat: JoinFeatures, now: float) -> List[int]:
+        cutoff = now - self.window_seconds
+        found: List[int] = []
+        ts, created, shape, prefix, bits = self._ts, self._created, self._shape, self._prefix, self._bits
+        tol, minimum = self.created_tolerance, self.min_pair_score
+        want_avatar = feat.bits & BIT_DEFAULT_AVATAR
+        want_flags = feat.bits & BIT_NO_FLAGS
+        for i in range(self.capacity):
+            if ts[i] < cutoff:
+                continue
+            score = self.w_created if abs(created[i] - feat.created) <= tol else 0.0
+            if shape[i] == feat.shape:
+                score += self.w_shape
+            if prefix[i] == feat.prefix:
+                score += self.w_prefix
+            if want_avatar and bits[i] & BIT_DEFAULT_AVATAR:
+                score += self.w_avatar
+            if want_flags and bits[i] & BIT_NO_FLAGS:
+                score += self.w_flags
+            if score >= minimum:
+                found.append(self._ids[i])
+        return found
+
+    def observe(self, member_id: int, feat: JoinFeatures, now: float) -> List[int]:
+        found = self.similar(feat, now)
+        self.add(member_id, feat, now)
+        return found
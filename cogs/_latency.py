@@ -0,0 +1,59 @@
+"""Histograma de latência com baldes fixos (memória constante, sem guardar amostras).
+
+Módulo auxiliar (prefixo ``_``: não é carregado como cog pelo ``bot.py``).
+"""
+from bisect import bisect_left
+from typing import List, Sequence
+
+DEFAULT_BOUNDS_MS = (25, 50, 100, 200, 300, 500, 1000, 2000, 5000)
+
+
+class LatencyHistogram:
+    __slots__ = ('bounds', 'counts', 'total', 'sum_ms', 'max_ms')
+
+    def __init__(self, bounds_ms: Sequence[float] = DEFAULT_BOUNDS_MS):
+        self.bounds = tuple(sorted(float(b) for b in bounds_ms))
+        # Último balde: acima do maior limite
+        self.counts: List[int] = [0] * (len(self.bounds) + 1)
+        self.total = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, seconds: float):
+        ms = max(0.0, seconds * 1000.0)
+        self.counts[bisect_left(self.bounds, ms)] += 1
+        self.total += 1
+        self.sum_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def percentile(self, p: float) -> float:
+        """Limite superior do balde que contém o percentil ``p`` (0-100); ``max_ms`` no último balde."""
+        if not self.total:
+            return 0.0
+        rank = p / 100.0 * self.total
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return self.bounds[i] if i < len(self.bounds) else self.max_ms
+        return self.max_ms
+
+    def share_under(self, ms: float) -> float:
+        """Fração das amostras em baldes com limite <= ``ms``."""
+        if not self.total:
+            return 0.0
+        i = bisect_left(self.bounds, float(ms))
+        if i < len(self.bounds) and self.bounds[i] == float(ms):
+            i += 1
+        return sum(self.counts[:i]) / self.total
+
+    def line(self) -> str:
+        if not self.total:
+            return 'sem amostras'
+        return (f'n={self.total} | média {self.sum_ms / self.total:.0f}ms | p50 <= {self.percentile(50):.0f}ms | '
+                f'p95 <= {self.percentile(95):.0f}ms | máx {self.max_ms:.0f}ms')
+
+    def buckets(self) -> str:
+        labels = [f'<={b:g}' for b in self.bounds] + [f'>{self.bounds[-1]:g}']
+        return ' '.join(f'{lbl}:{n}' for lbl, n in zip(labels, self.counts) if n)
@@ -0,0 +1,32 @@
+"""Cache LRU simples compartilhado pelos módulos auxiliares de anexos.
+
+Módulo auxiliar (prefixo ``_``: não é carregado como cog pelo ``bot.py``).
+"""
+from collections import OrderedDict
+from typing import Any, Hashable
+
+
+class LRUCache:
+    """LRU por número de itens (veredictos de conteúdo, hashes de arquivo)."""
+
+    def __init__(self, max_items: int = 2048):
+        self.max_items = max(1, int(max_items))
+        self._data: 'OrderedDict[Hashable, Any]' = OrderedDict()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Any:
+        value = self._data.get(key)
+        if key in self._data:
+            self._data.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value: Any):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_items:
+            self._data.popitem(last=False)
@@ -0,0 +1,164 @@
+"""Cache compacto das mensagens recentes por canal, com teto de memória.
+
+Módulo auxiliar (prefixo ``_``: não é carregado como cog pelo ``bot.py``).
+
+O cache interno do discord.py guarda objetos ``Message`` inteiros (pesados) e
+só ``max_messages`` no total; o que sai dele some dos logs de deleção. Aqui
+cada mensagem vira um blob de bytes (JSON compacto, comprimido com zlib acima
+de ``compress_min_bytes``) e fica em dois lugares:
+
+- um ``OrderedDict`` global ``message_id -> (channel_id, blob)`` em ordem de
+  chegada, que é o que o teto ``max_bytes`` expulsa (mais antigas primeiro;
+  cada mensagem conta o blob mais ``ENTRY_OVERHEAD``);
+- uma deque de ids por canal, que limita cada canal a ``per_channel``
+  mensagens para um canal movimentado não expulsar todos os outros.
+
+``pop`` remove e devolve a mensagem (a deleção consome a entrada).
+"""
+import json
+import zlib
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import discord
+
+_RAW = b'r'
+_ZLIB = b'z'
+# Custo fixo estimado por mensagem além do blob (entrada do dict, tupla, cabeçalho do bytes, slot da deque)
+ENTRY_OVERHEAD = 160
+
+
+def _cost(blob: bytes) -> int:
+    return len(blob) + ENTRY_OVERHEAD
+
+
+class CachedMessage(NamedTuple):
+    id: int
+    channel_id: int
+    guild_id: int
+    author_id: int
+    author_name: str
+    created: float  # timestamp
+    content: str
+    attachments: List[Tuple[str, int, str]]  # (nome, bytes, url)
+    bot: bool = False
+
+    @classmethod
+    def from_message(cls, message: discord.Message) -> 'CachedMessage':
+        return cls(
+            message.id, message.channel.id, message.guild.id if message.guild else 0, message.author.id,
+            str(message.author), message.created_at.timestamp(), message.content or '',
+            [(a.filename, a.size, a.url) for a in message.attachments], message.author.bot,
+        )
+
+
+class MessageCache:
+    def __init__(self, per_channel: int = 200, max_bytes: int = 32 * 1024 * 1024, compress: bool = True,
+                 compress_min_bytes: int = 64, level: int = 6):
+        self.configure(per_channel, max_bytes, compress, compress_min_bytes, level)
+        self._messages: 'OrderedDict[int, Tuple[int, bytes]]' = OrderedDict()
+        self._channels: Dict[int, Deque[int]] = {}
+        self._live: Dict[int, int] = {}  # channel_id -> mensagens ainda no cache
+        self.bytes = 0
+        self.evicted = 0  # expulsas pelo teto de memória ou pelo limite do canal
+        self.hits = 0
+        self.misses = 0
+
+    def configure(self, per_channel: int, max_bytes: int, compress: bool, compress_min_bytes: int, level: int = 6):
+        self.per_channel = max(1, int(per_channel))
+        self.max_bytes = max(1024, int(max_bytes))
+        self.compress = bool(compress)
+        self.compress_min_bytes = max(0, int(compress_min_bytes))
+        self.level = max(1, min(9, int(level)))
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def __contains__(self, message_id: int) -> bool:
+        return message_id in self._messages
+
+    # ----------------- Codificação -----------------
+    def _encode(self, m: CachedMessage) -> bytes:
+        raw = json.dumps([m.guild_id, m.author_id, m.author_name, m.created, m.content, m.attachments, m.bot],
+                         ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        if self.compress and len(raw) >= self.compress_min_bytes:
+            packed = zlib.compress(raw, self.level)
+            if len(packed) < len(raw):
+                return _ZLIB + packed
+        return _RAW + raw
+
+    @staticmethod
+    def _decode(message_id: int, channel_id: int, blob: bytes) -> CachedMessage:
+        raw = zlib.decompress(blob[1:]) if blob[:1] == _ZLIB else blob[1:]
+        guild_id, author_id, author_name, created, content, attachments, bot = json.loads(raw)
+        return CachedMessage(message_id, channel_id, guild_id, author_id, author_name, created, content,
+                             [tuple(a) for a in attachments], bot)
+
+    # ----------------- Escrita -----------------
+    def _drop(self, message_id: int) -> Optional[Tuple[int, bytes]]:
+        item = self._messages.pop(message_id, None)
+        if item is not None:
+            self.bytes -= _cost(item[1])
+            self._live[item[0]] -= 1
+        return item
+
+    def add(self, m: CachedMessage):
+        blob = self._encode(m)
+        old = self._drop(m.id)
+        self._messages[m.id] = (m.channel_id, blob)
+        self.bytes += _cost(blob)
+        self._live[m.channel_id] = self._live.get(m.channel_id, 0) + 1
+        if old is None:
+            ids = self._channels.get(m.channel_id)
+            if ids is None:
+                ids = self._channels[m.channel_id] = deque()
+            ids.append(m.id)
+            self._trim_channel(m.channel_id, ids)
+        while self.bytes > self.max_bytes and self._messages:
+            self._drop(next(iter(self._messages)))
+            self.evicted += 1
+
+    def _trim_channel(self, channel_id: int, ids: Deque[int]):
+        messages = self._messages
+        # Ids já consumidos/expulsos ficam na deque até chegarem na frente
+        while ids and (ids[0] not in messages or self._live[channel_id] > self.per_channel):
+            if self._drop(ids.popleft()) is not None:
+                self.evicted += 1
+        if len(ids) > 2 * self.per_channel:
+            self._channels[channel_id] = deque(i for i in ids if i in messages)
+
+    def update_content(self, message_id: int, content: str):
+        item = self._messages.get(message_id)
+        if item is None:
+            return
+        m = self._decode(message_id, item[0], item[1])
+        self.bytes -= _cost(item[1])
+        blob = self._encode(m._replace(content=content))
+        self._messages[message_id] = (item[0], blob)
+        self.bytes += _cost(blob)
+
+    # ----------------- Leitura -----------------
+    def get(self, message_id: int) -> Optional[CachedMessage]:
+        item = self._messages.get(message_id)
+        return None if item is None else self._decode(message_id, item[0], item[1])
+
+    def pop(self, message_id: int) -> Optional[CachedMessage]:
+        item = self._drop(message_id)
+        if item is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self._decode(message_id, item[0], item[1])
+
+    def pop_many(self, message_ids: Iterable[int]) -> List[CachedMessage]:
+        """Mensagens encontradas, em ordem cronológica (ids do Discord crescem com o tempo)."""
+        return [m for m in (self.pop(mid) for mid in sorted(message_ids)) if m is not None]
+
+    def forget_channel(self, channel_id: int):
+        for mid in self._channels.pop(channel_id, ()):
+            self._drop(mid)
+        self._live.pop(channel_id, None)
+
+    def line(self) -> str:
+        return (f'{len(self)} mensagens | {self.bytes / 1024:.0f} KiB de {self.max_bytes / 1024:.0f} KiB | '
+                f'{len(self._channels)} canais | acertos {self.hits} / falhas {self.misses} | expulsas {self.evicted}')
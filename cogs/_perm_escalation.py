@@ -0,0 +1,110 @@
+"""Detecção de escalada de permissões perigosas só com operações de bits.
+
+Módulo auxiliar (prefixo ``_``: não é carregado como cog pelo ``bot.py``).
+
+Todas as permissões são tratadas como o inteiro de ``Permissions.value``
+mascarado pelas perigosas: o que um cargo ganhou é ``(antes ^ depois) & depois``
+e o que um membro ganhou é ``novo & ~antigo``. O índice guarda os bits
+perigosos de cada cargo e, por membro, o OR dos bits dos cargos que ele tem;
+membros sem nenhum bit perigoso não ocupam memória.
+"""
+from typing import Dict, Iterable, List, NamedTuple
+
+import discord
+
+
+def permission_mask(names: Iterable[str]) -> int:
+    """Máscara com os flags de ``names`` (nomes inválidos são ignorados)."""
+    return discord.Permissions(**{n: True for n in names if n in discord.Permissions.VALID_FLAGS}).value
+
+
+def permission_names(bits: int) -> List[str]:
+    """Nomes dos flags ligados em ``bits``, para o log."""
+    return [name for name, on in discord.Permissions(bits) if on]
+
+
+class Escalation(NamedTuple):
+    gained: int  # bits perigosos novos
+    role_ids: List[int]  # cargos que trouxeram os bits (vazio numa atualização de cargo)
+
+
+class EscalationIndex:
+    def __init__(self, mask: int):
+        self.mask = mask
+        # guild_id -> role_id -> bits perigosos do cargo
+        self._roles: Dict[int, Dict[int, int]] = {}
+        # guild_id -> member_id -> OR dos bits perigosos (só membros com algum bit)
+        self._members: Dict[int, Dict[int, int]] = {}
+
+    def set_mask(self, mask: int):
+        if mask != self.mask:
+            self.mask = mask
+            self._roles.clear()
+            self._members.clear()
+
+    def load_guild(self, guild: discord.Guild):
+        mask = self.mask
+        self._roles[guild.id] = {r.id: r.permissions.value & mask for r in guild.roles}
+        self._members[guild.id] = {}
+
+    def forget_guild(self, guild_id: int):
+        self._roles.pop(guild_id, None)
+        self._members.pop(guild_id, None)
+
+    def role_bits(self, guild_id: int, role: discord.Role) -> int:
+        bits = self._roles.get(guild_id, {}).get(role.id)
+        return role.permissions.value & self.mask if bits is None else bits
+
+    def _bits_of(self, guild_id: int, roles: Iterable[discord.Role]) -> int:
+        bits = 0
+        for r in roles:
+            bits |= self.role_bits(guild_id, r)
+        return bits
+
+    def member_bits(self, guild_id: int, member_id: int, roles: Iterable[discord.Role]) -> int:
+        bits = self._members.get(guild_id, {}).get(member_id)
+        return self._bits_of(guild_id, roles) if bits is None else bits
+
+    def _store_member(self, guild_id: int, member_id: int, bits: int):
+        members = self._members.setdefault(guild_id, {})
+        if bits:
+            members[member_id] = bits
+        else:
+            members.pop(member_id, None)
+
+    # ----------------- Eventos -----------------
+    def role_updated(self, before: discord.Role, after: discord.Role) -> int:
+        """Atualiza o cargo e devolve os bits perigosos que ele ganhou."""
+        gid = after.guild.id
+        old = self.role_bits(gid, before)
+        new = after.permissions.value & self.mask
+        self._roles.setdefault(gid, {})[after.id] = new
+        if old != new and gid in self._members:
+            # Evento raro: o OR dos titulares mudou e o índice não sabe quem são; recalcula sob demanda
+            self._members[gid] = {}
+        return (old ^ new) & new
+
+    def role_deleted(self, role: discord.Role):
+        gid = role.guild.id
+        old = self._roles.get(gid, {}).pop(role.id, 0)
+        if old and gid in self._members:
+            self._members[gid] = {}
+
+    def member_updated(self, before: discord.Member, after: discord.Member) -> Escalation:
+        """Aplica a troca de cargos do membro e devolve o que ele ganhou (e por quais cargos)."""
+        gid = after.guild.id
+        old = self.member_bits(gid, before.id, before.roles)
+        before_ids = {r.id for r in before.roles}
+        added = [r for r in after.roles if r.id not in before_ids]
+        if len(after.roles) < len(before.roles) + len(added):
+            # Perdeu algum cargo: o OR precisa ser refeito (poucos cargos por membro)
+            new = self._bits_of(gid, after.roles)
+        else:
+            new = old | self._bits_of(gid, added)
+        self._store_member(gid, after.id, new)
+        gained = new & ~old
+        via = [r.id for r in added if self.role_bits(gid, r) & gained] if gained else []
+        return Escalation(gained, via)
+
+    def __len__(self) -> int:
+        return sum(len(m) for m in self._members.values())
@@ -0,0 +1,174 @@
+"""Punições em lote: junta alvos numa janela curta e aplica com o mínimo de chamadas.
+
+Módulo auxiliar (prefixo ``_``: não é carregado como cog pelo ``bot.py``).
+
+- ``ban``: ``guild.bulk_ban`` com até 200 usuários por chamada para cada motivo
+  compartilhado por dois ou mais alvos; alvos com motivo único (ou bulk que
+  falhou inteiro) levam ban individual com concorrência limitada;
+- ``kick`` / ``timeout``: fila com concorrência limitada (``run_limited``).
+
+O motivo é guardado por alvo: cada punição sai no audit log com o motivo de
+quem a enviou, mesmo dividindo o lote com outras.
+
+Cada lote gera um único callback ``on_flush(batch)``, usado pelas cogs para
+mandar um embed de resumo em vez de um log por membro.
+"""
+import asyncio
+import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import discord
+
+from cogs._ratelimit import run_limited
+
+BULK_BAN_LIMIT = 200
+
+
+class PunishBatch:
+    """Resultado de um lote: ids punidos, ids que falharam e número de chamadas à API."""
+    __slots__ = ('guild', 'action', 'targets', 'ok', 'failed', 'calls', 'started', 'elapsed', 'errors')
+
+    def __init__(self, guild: discord.Guild, action: str):
+        self.guild = guild
+        self.action = action
+        # id -> (alvo, até quando (timeout), motivo, future)
+        self.targets: Dict[int, Tuple[discord.abc.Snowflake, Optional[datetime.datetime], Optional[str], asyncio.Future]] = {}
+        self.ok: List[int] = []
+        self.failed: List[int] = []
+        self.calls = 0
+        self.started = 0.0
+        self.elapsed = 0.0
+        self.errors: List[str] = []
+
+
+class PunishmentBatcher:
+    def __init__(self, window_seconds: float = 1.0, concurrency: int = 5, delete_message_seconds: int = 0,
+                 on_flush: Optional[Callable[[PunishBatch], Awaitable[None]]] = None):
+        self.window_seconds = max(0.0, float(window_seconds))
+        self.concurrency = max(1, int(concurrency))
+        self.delete_message_seconds = max(0, min(604800, int(delete_message_seconds)))
+        self.on_flush = on_flush
+        self._open: Dict[Tuple[int, str], PunishBatch] = {}
+        self._tasks: set = set()
+
+    def submit(self, guild: discord.Guild, target: discord.abc.Snowflake, action: str, reason: Optional[str] = None,
+               until: Optional[datetime.datetime] = None) -> asyncio.Future:
+        """Agenda ``action`` (ban | kick | timeout) para ``target``; a future resolve com True/False.
+
+        O mesmo alvo enviado de novo dentro da janela reaproveita a future existente
+        (e o motivo do primeiro envio).
+        ``timeout`` exige um ``discord.Member`` e ``until``.
+        """
+        key = (guild.id, action)
+        batch = self._open.get(key)
+        if batch is None:
+            batch = PunishBatch(guild, action)
+            self._open[key] = batch
+            task = asyncio.create_task(self._flush_later(key, batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        existing = batch.targets.get(target.id)
+        if existing is not None:
+            return existing[3]
+        fut = asyncio.get_running_loop().create_future()
+        batch.targets[target.id] = (target, until, reason, fut)
+        return fut
+
+    def pending(self) -> int:
+        return sum(len(b.targets) for b in self._open.values())
+
+    async def close(self):
+        """Aplica imediatamente os lotes abertos (usado no unload da cog)."""
+        for key, batch in list(self._open.items()):
+            self._open.pop(key, None)
+            await self._run(batch)
+
+    async def _flush_later(self, key: Tuple[int, str], batch: PunishBatch):
+        await asyncio.sleep(self.window_seconds)
+        if self._open.get(key) is not batch:
+            return  # já aplicado por close()
+        del self._open[key]
+        await self._run(batch)
+
+    async def _run(self, batch: PunishBatch):
+        loop = asyncio.get_running_loop()
+        batch.started = loop.time()
+        try:
+            if batch.action == 'ban':
+                results = await self._ban(batch)
+            elif batch.action == 'kick':
+                results = await self._each(batch, lambda t, _u, r: batch.guild.kick(t, reason=r))
+            elif batch.action == 'timeout':
+                results = await self._each(batch, lambda t, u, r: t.timeout(u, reason=r))
+            else:
+                raise ValueError(f'ação desconhecida: {batch.action}')
+        except Exception as e:
+            batch.errors.append(str(e)[:200])
+            results = {}
+        for uid, (_, _, _, fut) in batch.targets.items():
+            ok = results.get(uid, False)
+            (batch.ok if ok else batch.failed).append(uid)
+            if not fut.done():
+                fut.set_result(ok)
+        batch.elapsed = loop.time() - batch.started
+        if self.on_flush is not None:
+            try:
+                await self.on_flush(batch)
+            except Exception:
+                pass
+
+    async def _each(self, batch: PunishBatch, call) -> Dict[int, bool]:
+        items = list(batch.targets.values())
+        batch.calls += len(items)
+
+        async def one(item):
+            target, until, reason, _ = item
+            await call(target, until, reason)
+
+        results = await run_limited(items, one, self.concurrency)
+        for _, res in results:
+            if isinstance(res, Exception):
+                batch.errors.append(str(res)[:200])
+        return {item[0].id: not isinstance(res, Exception) for item, res in results}
+
+    async def _single_bans(self, batch: PunishBatch, items: List[Tuple[discord.abc.Snowflake, Optional[str]]],
+                           results: Dict[int, bool]):
+        batch.calls += len(items)
+
+        async def single(item):
+            user, reason = item
+            await batch.guild.ban(user, reason=reason, delete_message_seconds=self.delete_message_seconds)
+
+        for (user, _), res in await run_limited(items, single, self.concurrency):
+            results[user.id] = not isinstance(res, Exception)
+            if isinstance(res, Exception):
+                batch.errors.append(str(res)[:200])
+
+    async def _ban(self, batch: PunishBatch) -> Dict[int, bool]:
+        # bulk_ban leva um motivo só: agrupa por motivo
+        by_reason: Dict[Optional[str], List[discord.abc.Snowflake]] = {}
+        for target, _, reason, _ in batch.targets.values():
+            by_reason.setdefault(reason, []).append(target)
+        results: Dict[int, bool] = {}
+        singles: List[Tuple[discord.abc.Snowflake, Optional[str]]] = []
+        for reason, users in by_reason.items():
+            if len(users) == 1:
+                singles.append((users[0], reason))
+                continue
+            for i in range(0, len(users), BULK_BAN_LIMIT):
+                chunk = users[i:i + BULK_BAN_LIMIT]
+                batch.calls += 1
+                try:
+                    res = await batch.guild.bulk_ban(chunk, reason=reason, delete_message_seconds=self.delete_message_seconds)
+                except (discord.Forbidden, discord.HTTPException) as e:
+                    # Bulk exige Banir Membros + Gerenciar Servidor; tenta um a um
+                    batch.errors.append(f'bulk_ban: {e}'[:200])
+                    singles += [(user, reason) for user in chunk]
+                    continue
+                for obj in res.banned:
+                    results[obj.id] = True
+                for obj in res.failed:
+                    results[obj.id] = False
+        if singles:
+            await self._single_bans(batch, singles, results)
+        return results
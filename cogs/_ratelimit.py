@@ -0,0 +1,116 @@
+"""Execução concorrente de chamadas à API do Discord, limitada e com progresso.
+
+Módulo auxiliar (prefixo ``_``: não é carregado como cog pelo ``bot.py``).
+
+O discord.py já lê os cabeçalhos ``X-RateLimit-*`` de cada rota, segura o bucket
+quando ``remaining`` chega a zero e repete em 429. Por isso aqui não há sleeps
+fixos: só limitamos quantas requisições ficam em voo ao mesmo tempo, e rotas
+diferentes (ex.: convites e canais) andam em paralelo, cada uma no ritmo que o
+próprio Discord informa.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Iterable, List, Optional, Tuple, TypeVar
+
+T = TypeVar('T')
+
+
+class BatchProgress:
+    """Contadores de um lote de ações, usados para montar o campo de progresso do log.
+
+    O worker retorna ``False`` para item pulado (nada a fazer); qualquer outro
+    retorno conta como sucesso e exceções contam como falha.
+    """
+    __slots__ = ('label', 'total', 'ok', 'skipped', 'failed', 'started', 'finished', 'last_error')
+
+    def __init__(self, label: str, total: Optional[int] = None):
+        self.label = label
+        self.total = total
+        self.ok = 0
+        self.skipped = 0
+        self.failed = 0
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    @property
+    def done(self) -> int:
+        return self.ok + self.skipped + self.failed
+
+    def elapsed(self) -> float:
+        if self.started is None:
+            return 0.0
+        end = self.finished if self.finished is not None else asyncio.get_running_loop().time()
+        return end - self.started
+
+    def line(self) -> str:
+        total = '?' if self.total is None else str(self.total)
+        text = f"{self.label}: {self.ok} ok"
+        if self.skipped:
+            text += f", {self.skipped} sem mudança"
+        if self.failed:
+            text += f", {self.failed} falhas"
+        text += f" ({self.done}/{total}, {self.elapsed():.1f}s)"
+        if self.finished is None:
+            text += ' …'
+        return text
+
+
+async def run_limited(
+    items: Iterable[T],
+    worker: Callable[[T], Awaitable[Any]],
+    concurrency: int = 5,
+    progress: Optional[BatchProgress] = None,
+) -> List[Tuple[T, Any]]:
+    """Executa ``worker(item)`` para cada item com no máximo ``concurrency`` em voo.
+
+    Retorna ``[(item, resultado_ou_exceção), ...]`` na ordem dos itens.
+    Cancelamento é propagado; demais exceções são capturadas por item.
+    """
+    items = list(items)
+    loop = asyncio.get_running_loop()
+    if progress is not None:
+        progress.total = len(items)
+        progress.started = loop.time()
+    sem = asyncio.Semaphore(max(1, int(concurrency)))
+
+    async def one(item: T):
+        async with sem:
+            try:
+                result = await worker(item)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if progress is not None:
+                    progress.failed += 1
+                    progress.last_error = str(e)[:200]
+                return item, e
+        if progress is not None:
+            if result is False:
+                progress.skipped += 1
+            else:
+                progress.ok += 1
+        return item, result
+
+    try:
+        return list(await asyncio.gather(*(one(i) for i in items)))
+    finally:
+        if progress is not None:
+            progress.finished = loop.time()
+
+
+async def report_progress(
+    tasks: Iterable[asyncio.Future],
+    update: Callable[[], Awaitable[Any]],
+    interval: float = 2.0,
+):
+    """Chama ``update()`` a cada ``interval`` segundos até as tasks terminarem, e uma vez no fim.
+
+    Edições de mensagem também consomem rate limit, então o intervalo não deve ser curto demais.
+    """
+    pending = set(tasks)
+    while pending:
+        _, pending = await asyncio.wait(pending, timeout=max(0.5, float(interval)))
+        try:
+            await update()
+        except Exception:
+            pass
@@ -0,0 +1,199 @@
+"""Agendador único de remoção de cargos protegidos (um heap por prazo, uma task só).
+
+Módulo auxiliar (prefixo ``_``: não é carregado como cog pelo ``bot.py``).
+
+Cada membro tem no máximo uma pendência: novos cargos para o mesmo membro são
+somados à pendência existente e saem todos num único ``remove_roles``. O heap
+guarda ``(prazo, seq, guild_id, member_id)``; entradas antigas de uma pendência
+reagendada são descartadas ao sair do heap (remoção preguiçosa).
+
+Depois de remover, a pendência volta para o heap como verificação (outro bot
+ou usuário pode reconceder o cargo). Falhas são reagendadas com backoff
+exponencial. ``export``/``import_state`` passam as pendências como dados puros
+para a próxima instância quando a cog é recarregada.
+"""
+import asyncio
+import heapq
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import discord
+
+from cogs._ratelimit import run_limited
+
+Key = Tuple[int, int]  # (guild_id, member_id)
+
+
+class PendingRemoval:
+    __slots__ = ('guild_id', 'member_id', 'role_ids', 'reason', 'attempt', 'failures', 'due', 'removed')
+
+    def __init__(self, guild_id: int, member_id: int, role_ids: Set[int], reason: str):
+        self.guild_id = guild_id
+        self.member_id = member_id
+        self.role_ids = set(role_ids)
+        self.reason = reason
+        self.attempt = 0  # execuções já feitas
+        self.failures = 0
+        self.due = 0.0
+        self.removed = False  # já removeu ao menos uma vez (as próximas execuções são verificações)
+
+
+# on_result(evento, pendência, membro, cargos, erro); evento: removed | reinforced | failed | gave_up
+ResultCallback = Callable[[str, PendingRemoval, discord.Member, List[discord.Role], Optional[Exception]], Awaitable[None]]
+
+
+class RoleEnforcer:
+    def __init__(self, get_guild: Callable[[int], Optional[discord.Guild]], verify_delay: float = 2.0,
+                 verify_rounds: int = 3, max_failures: int = 5, max_backoff: float = 60.0, concurrency: int = 5,
+                 on_result: Optional[ResultCallback] = None):
+        self.get_guild = get_guild
+        self.on_result = on_result
+        self.configure(verify_delay, verify_rounds, max_failures, max_backoff, concurrency)
+        self._heap: List[Tuple[float, int, int, int]] = []
+        self._pending: Dict[Key, PendingRemoval] = {}
+        self._seq = 0
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.api_calls = 0
+
+    def configure(self, verify_delay: float, verify_rounds: int, max_failures: int, max_backoff: float, concurrency: int):
+        self.verify_delay = max(0.0, float(verify_delay))
+        self.verify_rounds = max(0, int(verify_rounds))
+        self.max_failures = max(1, int(max_failures))
+        self.max_backoff = max(self.verify_delay, float(max_backoff))
+        self.concurrency = max(1, int(concurrency))
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    # ----------------- Ciclo de vida -----------------
+    def start(self):
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._worker())
+
+    def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+        self._task = None
+
+    def export(self) -> List[Tuple[int, int, List[int], str, int, int, bool, float]]:
+        """Pendências como dados puros; o prazo vira segundos restantes."""
+        now = asyncio.get_running_loop().time()
+        return [(p.guild_id, p.member_id, sorted(p.role_ids), p.reason, p.attempt, p.failures, p.removed,
+                 max(0.0, p.due - now)) for p in self._pending.values()]
+
+    def import_state(self, rows: Iterable[Tuple[int, int, List[int], str, int, int, bool, float]]):
+        for guild_id, member_id, role_ids, reason, attempt, failures, removed, remaining in rows:
+            p = self.schedule(guild_id, member_id, role_ids, reason, remaining)
+            p.attempt, p.failures, p.removed = attempt, failures, removed
+
+    # ----------------- Agendamento -----------------
+    def schedule(self, guild_id: int, member_id: int, role_ids: Iterable[int], reason: str, delay: float = 0.0) -> PendingRemoval:
+        """Agenda (ou antecipa) a remoção; cargos do mesmo membro são somados à pendência existente."""
+        due = asyncio.get_running_loop().time() + max(0.0, delay)
+        key = (guild_id, member_id)
+        p = self._pending.get(key)
+        if p is None:
+            p = self._pending[key] = PendingRemoval(guild_id, member_id, set(role_ids), reason)
+            p.due = float('inf')
+        else:
+            new = set(role_ids) - p.role_ids
+            p.role_ids |= set(role_ids)
+            if new:
+                # Cargo novo reconcedido: volta a ser remoção, com rodadas de verificação completas
+                p.removed = False
+                p.attempt = 0
+        if due < p.due:
+            p.due = due
+            self._push(p)
+        return p
+
+    def _push(self, p: PendingRemoval):
+        self._seq += 1
+        heapq.heappush(self._heap, (p.due, self._seq, p.guild_id, p.member_id))
+        if self._wake is not None:
+            self._wake.set()
+
+    def _pop_due(self, now: float) -> List[PendingRemoval]:
+        due: List[PendingRemoval] = []
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            when, _, gid, mid = heapq.heappop(heap)
+            p = self._pending.get((gid, mid))
+            # Entrada velha de uma pendência que foi reagendada
+            if p is None or p.due != when:
+                continue
+            p.due = float('inf')
+            due.append(p)
+        return due
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self._wake.clear()
+            now = loop.time()
+            batch = self._pop_due(now)
+            if batch:
+                await run_limited(batch, self._process, self.concurrency)
+                continue
+            timeout = self._heap[0][0] - now if self._heap else None
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run_due(self):
+        """Processa agora o que já venceu (usado em testes e no unload)."""
+        batch = self._pop_due(asyncio.get_running_loop().time())
+        await run_limited(batch, self._process, self.concurrency)
+
+    # ----------------- Execução -----------------
+    def _done(self, p: PendingRemoval):
+        self._pending.pop((p.guild_id, p.member_id), None)
+
+    def _again(self, p: PendingRemoval, delay: float):
+        p.due = asyncio.get_running_loop().time() + delay
+        self._push(p)
+
+    async def _notify(self, event: str, p: PendingRemoval, member, roles, error=None):
+        if self.on_result is not None:
+            try:
+                await self.on_result(event, p, member, roles, error)
+            except Exception:
+                pass
+
+    async def _process(self, p: PendingRemoval):
+        guild = self.get_guild(p.guild_id)
+        member = guild.get_member(p.member_id) if guild else None
+        if member is None:
+            self._done(p)
+            return False
+        p.attempt += 1
+        present = [r for r in member.roles if r.id in p.role_ids]
+        if not present:
+            # Verificação sem nada a remover: encerra (ou espera a próxima rodada se nunca removeu)
+            if p.removed or p.attempt > self.verify_rounds:
+                self._done(p)
+            else:
+                self._again(p, self.verify_delay)
+            return False
+        self.api_calls += 1
+        try:
+            await member.remove_roles(*present, reason=f'ProtectRoles: {p.reason}')
+        except (discord.HTTPException, discord.Forbidden) as e:
+            p.failures += 1
+            if p.failures >= self.max_failures or isinstance(e, discord.Forbidden):
+                self._done(p)
+                await self._notify('gave_up', p, member, present, e)
+                return None
+            await self._notify('failed', p, member, present, e)
+            self._again(p, min(self.max_backoff, self.verify_delay * (2 ** p.failures)))
+            return None
+        event = 'reinforced' if p.removed else 'removed'
+        p.removed = True
+        p.failures = 0
+        if p.attempt <= self.verify_rounds:
+            self._again(p, self.verify_delay)
+        else:
+            self._done(p)
+        await self._notify(event, p, member, present)
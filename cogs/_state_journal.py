@@ -0,0 +1,112 @@
+"""Journal SQLite do estado temporário de emergência/lockdown (sobrevive a reinícios).
+
+Módulo auxiliar (prefixo ``_``: não é carregado como cog pelo ``bot.py``).
+
+Cada cog grava, antes de alterar o servidor, a sessão (guild + prazo de
+restauração em horário de parede) e os valores originais de cada alvo
+(ex.: slowmode de um canal, ``Permissions.value`` de um cargo). Na
+inicialização a cog relê as sessões abertas, restaura o que já venceu e
+reagenda o resto para o prazo original. ``INSERT OR IGNORE`` mantém sempre
+o primeiro original gravado, então reaplicar uma medida não sobrescreve o
+valor verdadeiro com o valor de lockdown.
+"""
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    scope TEXT NOT NULL,
+    guild_id INTEGER NOT NULL,
+    started REAL NOT NULL,
+    deadline REAL,
+    PRIMARY KEY (scope, guild_id)
+);
+CREATE TABLE IF NOT EXISTS entries (
+    scope TEXT NOT NULL,
+    guild_id INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    target_id INTEGER NOT NULL,
+    original INTEGER NOT NULL,
+    PRIMARY KEY (scope, guild_id, kind, target_id)
+);
+"""
+
+
+class JournalSession(NamedTuple):
+    guild_id: int
+    started: float  # time.time()
+    deadline: Optional[float]  # time.time(); None = só restauração manual
+    entries: Dict[str, Dict[int, int]]  # kind -> {target_id: original}
+
+
+class StateJournal:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # isolation_level=None: transações explícitas (BEGIN IMMEDIATE / COMMIT) em _tx
+        self._db = sqlite3.connect(str(self.path), isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(_SCHEMA)
+
+    def close(self):
+        self._db.close()
+
+    def _tx(self):
+        self._db.execute('BEGIN IMMEDIATE')
+        return self._db
+
+    def begin(self, scope: str, guild_id: int, deadline: Optional[float], entries: Iterable[Tuple[str, int, int]] = ()):
+        """Abre (ou mantém) a sessão e grava os originais numa única transação."""
+        db = self._tx()
+        try:
+            db.execute('INSERT OR IGNORE INTO sessions (scope, guild_id, started, deadline) VALUES (?, ?, ?, ?)',
+                       (scope, guild_id, time.time(), deadline))
+            db.execute('UPDATE sessions SET deadline = ? WHERE scope = ? AND guild_id = ?', (deadline, scope, guild_id))
+            db.executemany('INSERT OR IGNORE INTO entries (scope, guild_id, kind, target_id, original) VALUES (?, ?, ?, ?, ?)',
+                           [(scope, guild_id, kind, tid, int(orig)) for kind, tid, orig in entries])
+            db.execute('COMMIT')
+        except Exception:
+            db.execute('ROLLBACK')
+            raise
+
+    def record(self, scope: str, guild_id: int, entries: Iterable[Tuple[str, int, int]]):
+        """Acrescenta originais a uma sessão já aberta."""
+        rows = [(scope, guild_id, kind, tid, int(orig)) for kind, tid, orig in entries]
+        if not rows:
+            return
+        db = self._tx()
+        try:
+            db.executemany('INSERT OR IGNORE INTO entries (scope, guild_id, kind, target_id, original) VALUES (?, ?, ?, ?, ?)', rows)
+            db.execute('COMMIT')
+        except Exception:
+            db.execute('ROLLBACK')
+            raise
+
+    def originals(self, scope: str, guild_id: int, kind: str) -> Dict[int, int]:
+        rows = self._db.execute('SELECT target_id, original FROM entries WHERE scope = ? AND guild_id = ? AND kind = ?',
+                                (scope, guild_id, kind))
+        return {tid: orig for tid, orig in rows}
+
+    def end(self, scope: str, guild_id: int):
+        db = self._tx()
+        try:
+            db.execute('DELETE FROM entries WHERE scope = ? AND guild_id = ?', (scope, guild_id))
+            db.execute('DELETE FROM sessions WHERE scope = ? AND guild_id = ?', (scope, guild_id))
+            db.execute('COMMIT')
+        except Exception:
+            db.execute('ROLLBACK')
+            raise
+
+    def sessions(self, scope: str) -> List[JournalSession]:
+        result: List[JournalSession] = []
+        for guild_id, started, deadline in self._db.execute(
+                'SELECT guild_id, started, deadline FROM sessions WHERE scope = ?', (scope,)).fetchall():
+            entries: Dict[str, Dict[int, int]] = {}
+            for kind, tid, orig in self._db.execute(
+                    'SELECT kind, target_id, original FROM entries WHERE scope = ? AND guild_id = ?', (scope, guild_id)):
+                entries.setdefault(kind, {})[tid] = orig
+            result.append(JournalSession(guild_id, started, deadline, entries))
+        return result
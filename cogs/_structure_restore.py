@@ -0,0 +1,208 @@
+"""Recriação de cargos, categorias e canais apagados a partir das lápides do snapshot.
+
+Módulo auxiliar (prefixo ``_``: não é carregado como cog pelo ``bot.py``).
+
+Ordem das fases (cada uma concorrente via ``run_limited``):
+
+1. cargos, mais altos primeiro, e um único ``edit_role_positions`` no fim;
+2. categorias;
+3. canais (com a categoria nova) e recolocação de canais que ficaram sem categoria;
+4. overwrites dos cargos recriados em canais que continuaram existindo.
+
+Cada criação devolve um id novo; o mapa ``id antigo -> id novo`` é usado para
+traduzir categorias e overwrites e é repassado a ``on_mapped`` para ser gravado.
+Rodar de novo com o mesmo mapa pula o que já existe, então uma restauração
+interrompida continua de onde parou.
+"""
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import discord
+
+from cogs._guild_snapshot import ChannelSnap, GuildSnapshot, RoleSnap
+from cogs._ratelimit import BatchProgress, run_limited
+
+CATEGORY = discord.ChannelType.category.value
+# Tipos que dá para recriar pela API de bot (threads e diretórios ficam de fora)
+CREATABLE = {
+    discord.ChannelType.text.value,
+    discord.ChannelType.news.value,
+    discord.ChannelType.voice.value,
+    discord.ChannelType.stage_voice.value,
+    discord.ChannelType.forum.value,
+}
+
+
+class RestorePlan(NamedTuple):
+    roles: List[RoleSnap]
+    categories: List[ChannelSnap]
+    channels: List[ChannelSnap]
+    # (canal vivo, cargo antigo, allow, deny)
+    overwrites: List[Tuple[int, int, int, int]]
+    # (canal vivo, categoria antiga)
+    reparent: List[Tuple[int, int]]
+
+    @property
+    def total(self) -> int:
+        return len(self.roles) + len(self.categories) + len(self.channels) + len(self.overwrites) + len(self.reparent)
+
+
+def build_plan(snapshot: GuildSnapshot, since: float) -> RestorePlan:
+    """Seleciona as lápides apagadas a partir de ``since`` (time.time())."""
+    roles = [t.snap for t in snapshot.deleted_roles.values()
+             if t.deleted_at >= since and not t.snap.managed and t.snap.id != snapshot.guild_id]
+    roles.sort(key=lambda r: r.position, reverse=True)
+    categories: List[ChannelSnap] = []
+    channels: List[ChannelSnap] = []
+    reparent: List[Tuple[int, int]] = []
+    for tomb in snapshot.deleted_channels.values():
+        if tomb.deleted_at < since:
+            continue
+        snap = tomb.snap
+        if snap.type == CATEGORY:
+            categories.append(snap)
+            for child in tomb.extra.get('children', []):
+                live = snapshot.channels.get(child)
+                if live is not None and not live.category_id:
+                    reparent.append((child, snap.id))
+        elif snap.type in CREATABLE:
+            channels.append(snap)
+    categories.sort(key=lambda c: c.position)
+    channels.sort(key=lambda c: (c.category_id, c.position))
+    overwrites: List[Tuple[int, int, int, int]] = []
+    for role in roles:
+        for channel_id, allow, deny in snapshot.deleted_roles[role.id].extra.get('overwrites', []):
+            # Canais apagados já levam os próprios overwrites na lápide
+            if channel_id in snapshot.channels:
+                overwrites.append((channel_id, role.id, allow, deny))
+    return RestorePlan(roles, categories, channels, overwrites, reparent)
+
+
+class StructureRestorer:
+    def __init__(self, guild: discord.Guild, plan: RestorePlan, id_map: Optional[Dict[int, int]] = None,
+                 concurrency: int = 5, reason: Optional[str] = None,
+                 on_mapped: Optional[Callable[[str, int, int], None]] = None):
+        self.guild = guild
+        self.plan = plan
+        self.id_map: Dict[int, int] = dict(id_map or {})
+        self.concurrency = max(1, int(concurrency))
+        self.reason = reason
+        self.on_mapped = on_mapped
+        self.roles = BatchProgress('Cargos', len(plan.roles))
+        self.categories = BatchProgress('Categorias', len(plan.categories))
+        self.channels = BatchProgress('Canais', len(plan.channels) + len(plan.reparent))
+        self.overwrites = BatchProgress('Overwrites', len(plan.overwrites))
+
+    @property
+    def batches(self) -> List[BatchProgress]:
+        return [self.roles, self.categories, self.channels, self.overwrites]
+
+    @property
+    def failed(self) -> int:
+        return sum(b.failed for b in self.batches)
+
+    def _map(self, kind: str, old_id: int, new_id: int):
+        self.id_map[old_id] = new_id
+        if self.on_mapped is not None:
+            self.on_mapped(kind, old_id, new_id)
+
+    def _role(self, old_id: int) -> Optional[discord.Role]:
+        return self.guild.get_role(self.id_map.get(old_id, old_id))
+
+    def _channel(self, old_id: int):
+        return self.guild.get_channel(self.id_map.get(old_id, old_id))
+
+    def _overwrites(self, snap: ChannelSnap) -> Dict[discord.abc.Snowflake, discord.PermissionOverwrite]:
+        result: Dict[discord.abc.Snowflake, discord.PermissionOverwrite] = {}
+        for target_id, is_member, allow, deny in snap.overwrites:
+            if is_member:
+                target = self.guild.get_member(target_id) or discord.Object(target_id, type=discord.Member)
+            else:
+                target = self._role(target_id)
+                if target is None:
+                    continue  # cargo apagado e não recriado
+            result[target] = discord.PermissionOverwrite.from_pair(discord.Permissions(allow), discord.Permissions(deny))
+        return result
+
+    async def run(self):
+        await self._restore_roles()
+        await run_limited(self.plan.categories, self._create_category, self.concurrency, self.categories)
+        # Canais novos e recolocação de canais existentes contam no mesmo progresso
+        await run_limited([('create', c) for c in self.plan.channels] + [('move', m) for m in self.plan.reparent],
+                          self._channel_step, self.concurrency, self.channels)
+        await run_limited(self.plan.overwrites, self._apply_overwrite, self.concurrency, self.overwrites)
+
+    async def _restore_roles(self):
+        async def create(snap: RoleSnap):
+            if self.id_map.get(snap.id) and self._role(snap.id) is not None:
+                return False
+            role = await self.guild.create_role(
+                name=snap.name, permissions=discord.Permissions(snap.permissions), colour=discord.Colour(snap.color),
+                hoist=snap.hoist, mentionable=snap.mentionable, reason=self.reason,
+            )
+            self._map('role', snap.id, role.id)
+
+        await run_limited(self.plan.roles, create, self.concurrency, self.roles)
+        # Cargos nascem no fundo da lista: uma chamada só reposiciona todos
+        top = self.guild.me.top_role.position if self.guild.me else 0
+        positions = {}
+        for snap in self.plan.roles:
+            role = self._role(snap.id)
+            if role is not None and top > 1:
+                positions[role] = max(1, min(snap.position, top - 1))
+        if positions:
+            try:
+                await self.guild.edit_role_positions(positions, reason=self.reason)
+            except (discord.Forbidden, discord.HTTPException) as e:
+                self.roles.last_error = f'posições: {e}'[:200]
+
+    async def _create_category(self, snap: ChannelSnap):
+        if self.id_map.get(snap.id) and self._channel(snap.id) is not None:
+            return False
+        cat = await self.guild.create_category(snap.name, overwrites=self._overwrites(snap),
+                                               position=snap.position, reason=self.reason)
+        self._map('channel', snap.id, cat.id)
+
+    async def _channel_step(self, step: Tuple[str, object]):
+        kind, data = step
+        if kind == 'move':
+            channel_id, old_category = data
+            channel = self.guild.get_channel(channel_id)
+            category = self._channel(old_category)
+            if channel is None or not isinstance(category, discord.CategoryChannel) or channel.category_id == category.id:
+                return False
+            await channel.edit(category=category, reason=self.reason)
+            return True
+        return await self._create_channel(data)
+
+    async def _create_channel(self, snap: ChannelSnap):
+        if self.id_map.get(snap.id) and self._channel(snap.id) is not None:
+            return False
+        category = self._channel(snap.category_id) if snap.category_id else None
+        if not isinstance(category, discord.CategoryChannel):
+            category = None
+        common = dict(category=category, position=snap.position, overwrites=self._overwrites(snap), reason=self.reason)
+        guild = self.guild
+        if snap.type in (discord.ChannelType.text.value, discord.ChannelType.news.value):
+            channel = await guild.create_text_channel(
+                snap.name, news=snap.type == discord.ChannelType.news.value, topic=snap.topic,
+                slowmode_delay=snap.slowmode, nsfw=snap.nsfw, **common)
+        elif snap.type == discord.ChannelType.voice.value:
+            # O limite de bitrate cai se o servidor perdeu boosts
+            channel = await guild.create_voice_channel(
+                snap.name, bitrate=min(snap.bitrate or 64000, int(guild.bitrate_limit)), user_limit=snap.user_limit, **common)
+        elif snap.type == discord.ChannelType.stage_voice.value:
+            channel = await guild.create_stage_channel(snap.name, **common)
+        else:
+            channel = await guild.create_forum(snap.name, topic=snap.topic, slowmode_delay=snap.slowmode, nsfw=snap.nsfw, **common)
+        self._map('channel', snap.id, channel.id)
+
+    async def _apply_overwrite(self, item: Tuple[int, int, int, int]):
+        channel_id, old_role, allow, deny = item
+        channel = self.guild.get_channel(channel_id)
+        role = self._role(old_role)
+        if channel is None or role is None:
+            return False
+        overwrite = discord.PermissionOverwrite.from_pair(discord.Permissions(allow), discord.Permissions(deny))
+        if channel.overwrites_for(role) == overwrite:
+            return False
+        await channel.set_permissions(role, overwrite=overwrite, reason=self.reason)
@@ -0,0 +1,134 @@
+"""Transcrição comprimida (gzip) de mensagens apagadas, escrita em streaming.
+
+Módulo auxiliar (prefixo ``_``: não é carregado como cog pelo ``bot.py``).
+
+Cada mensagem é formatada e passada direto ao ``GzipFile``; nada acumula o
+texto inteiro. O destino é um ``SpooledTemporaryFile``: fica em memória até
+``spool_bytes`` comprimidos e depois vai para um arquivo temporário em disco.
+A memória usada é a janela do zlib mais o spool, qualquer que seja o número de
+mensagens (uma limpeza de 10 mil mensagens custa o mesmo que uma de 10).
+
+Formatos: ``txt`` (uma linha por mensagem) e ``html`` (página simples, com o
+conteúdo escapado).
+"""
+import datetime
+import gzip
+import html
+import tempfile
+from typing import Optional
+
+import discord
+
+from cogs._message_cache import CachedMessage
+
+_HTML_HEAD = ('<!DOCTYPE html><html lang="pt-BR"><head><meta charset="utf-8"><title>{title}</title><style>'
+              'body{{font-family:sans-serif;background:#313338;color:#dbdee1}}'
+              '.m{{margin:4px 0}}.t{{color:#949ba4;font-size:12px}}.a{{font-weight:bold;color:#f2f3f5}}'
+              '.c{{white-space:pre-wrap}}.x{{color:#949ba4;font-style:italic}}</style></head><body>'
+              '<h2>{title}</h2><p class="t">{subtitle}</p>\n')
+_HTML_FOOT = '<p class="t">{count} mensagens ({missing} fora do cache)</p></body></html>\n'
+
+
+def _when(ts: float) -> str:
+    return datetime.datetime.fromtimestamp(ts, datetime.timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _size(n: int) -> str:
+    return f'{n / 1024:.0f} KiB' if n >= 1024 else f'{n} B'
+
+
+class Transcript:
+    def __init__(self, title: str, subtitle: str = '', fmt: str = 'txt', spool_bytes: int = 1024 * 1024,
+                 level: int = 6):
+        self.fmt = 'html' if str(fmt).lower() == 'html' else 'txt'
+        self._spool = tempfile.SpooledTemporaryFile(max_size=max(0, int(spool_bytes)))
+        # mtime=0: o mesmo conteúdo gera o mesmo arquivo
+        self._gz: Optional[gzip.GzipFile] = gzip.GzipFile(fileobj=self._spool, mode='wb', compresslevel=level, mtime=0)
+        self._file: Optional[discord.File] = None
+        self.count = 0
+        self.missing = 0
+        self.raw_bytes = 0
+        self._size = 0
+        if self.fmt == 'html':
+            self._write(_HTML_HEAD.format(title=html.escape(title), subtitle=html.escape(subtitle)))
+        else:
+            self._write(f'{title}\n{subtitle}\n\n' if subtitle else f'{title}\n\n')
+
+    def __enter__(self) -> 'Transcript':
+        return self
+
+    def __exit__(self, *exc):
+        self.discard()
+
+    def _write(self, text: str):
+        data = text.encode('utf-8')
+        self.raw_bytes += len(data)
+        self._gz.write(data)
+
+    def add(self, m: CachedMessage):
+        self.count += 1
+        if self.fmt == 'html':
+            parts = [f'<div class="m"><span class="t">{_when(m.created)}</span> '
+                     f'<span class="a">{html.escape(m.author_name)}</span> <span class="t">({m.author_id})</span>'
+                     f'<div class="c">{html.escape(m.content)}</div>']
+            for name, size, url in m.attachments:
+                parts.append(f'<div>📎 <a href="{html.escape(url)}">{html.escape(name)}</a> ({_size(size)})</div>')
+            parts.append('</div>\n')
+            self._write(''.join(parts))
+            return
+        # Linhas seguintes do conteúdo ficam recuadas para não parecerem outra mensagem
+        content = m.content.replace('\n', '\n    ')
+        lines = [f'[{_when(m.created)}] {m.author_name} ({m.author_id}): {content}']
+        lines += [f'    📎 {name} ({_size(size)}) {url}' for name, size, url in m.attachments]
+        self._write('\n'.join(lines) + '\n')
+
+    def add_missing(self, message_id: int):
+        """Mensagem apagada cujo conteúdo não estava em nenhum cache."""
+        self.count += 1
+        self.missing += 1
+        created = discord.utils.snowflake_time(message_id).timestamp()
+        if self.fmt == 'html':
+            self._write(f'<div class="m"><span class="t">{_when(created)}</span> '
+                        f'<span class="x">mensagem {message_id} fora do cache</span></div>\n')
+        else:
+            self._write(f'[{_when(created)}] (mensagem {message_id} fora do cache)\n')
+
+    def close(self) -> int:
+        """Finaliza o gzip e devolve o tamanho comprimido; ``add`` não pode mais ser chamado."""
+        if self._gz is not None:
+            if self.fmt == 'html':
+                self._write(_HTML_FOOT.format(count=self.count, missing=self.missing))
+            self._gz.close()  # não fecha o spool (fileobj externo)
+            self._gz = None
+            self._size = self._spool.tell()
+        return self._size
+
+    @property
+    def compressed_bytes(self) -> int:
+        # Com o gzip aberto, parte do que já foi escrito ainda está no buffer do zlib
+        return self._spool.tell() if self._gz is not None else self._size
+
+    @property
+    def on_disk(self) -> bool:
+        return bool(getattr(self._spool, '_rolled', False))
+
+    def to_file(self, filename: str) -> discord.File:
+        self.close()
+        self._spool.seek(0)
+        self._file = discord.File(self._spool, filename=f'{filename}.{self.fmt}.gz')
+        return self._file
+
+    def read(self) -> bytes:
+        self.close()
+        self._spool.seek(0)
+        return self._spool.read()
+
+    def discard(self):
+        if self._gz is not None:
+            self._gz.close()
+            self._gz = None
+        if self._file is not None:
+            # Devolve o close original que o discord.File substitui
+            self._file.close()
+            self._file = None
+        self._spool.close()
@@ -1,12 +1,22 @@
 import asyncio
 import datetime
-from collections import deque
-from typing import Deque, Dict, Any, List, Set
+import time
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, Any, List, Set
 
 import discord
 from discord.ext import commands
 
 from config_loader import config_manager
+from cogs._join_cohort import CohortWindow, extract_features
+from cogs._punish_batch import PunishBatch, PunishmentBatcher
+from cogs._ratelimit import BatchProgress, report_progress, run_limited
+from cogs._state_journal import StateJournal
+
+DATA_DIR = Path(__file__).parent.parent / 'data'
+JOURNAL_FILE = DATA_DIR / 'state_journal.sqlite3'
+JOURNAL_SCOPE = 'anti_raid'
 
 DEFAULTS = {
     "anti_raid": {
@@ -18,6 +28,30 @@ DEFAULTS = {
             "flagged_join_threshold_count": 5,
             "sliding_window_seconds": 120
         },
+        "cohort": {
+            "enabled": True,
+            "window_seconds": 300,
+            "capacity": 512,
+            "created_tolerance_hours": 24,
+            "weights": {
+                "created": 3,
+                "name_shape": 1,
+                "name_prefix": 1,
+                "default_avatar": 1,
+                "no_flags": 0.5
+            },
+            "min_pair_score": 4,
+            "cluster_min_size": 5,
+            "activate_emergency": True,
+            "timeout_flagged": True,
+            "action": "none",
+            "log_cooldown_seconds": 30
+        },
+        "batch": {
+            "window_seconds": 1.0,
+            "concurrency": 5,
+            "delete_message_seconds": 3600
+        },
         "emergency": {
             "auto_disable_seconds": 600,
             "apply_slowmode": True,
@@ -29,7 +63,11 @@ DEFAULTS = {
             "timeout_duration_seconds": 900,
             "timeout_account_age_hours_max": 72,
             "revoke_invites": True,
+            "revoke_mode": "all",
+            "abused_invite_min_share": 0.5,
             "recreate_invites_after": False,
+            "max_concurrency": 8,
+            "progress_update_seconds": 2,
             "notify_channel_id": 0,
             "notify_ping_role_ids": [],
             "notify_ping_user_ids": [],
@@ -52,7 +90,13 @@ DEFAULTS = {
             "manual_activate": "Modo emergência ativado manualmente por {user}.",
             "manual_deactivate": "Modo emergência desativado manualmente por {user}.",
             "timeout_reason": "Modo emergência anti-raid (conta jovem)",
-            "invite_revoke_fail": "Falha ao revogar convites: {error}"
+            "invite_revoke_fail": "Falha ao revogar convites: {error}",
+            "cohort_reason": "Coorte suspeita: {size} contas parecidas em {window}s",
+            "cohort_title": "🧬 Coorte suspeita de raid",
+            "cohort_status": "Coorte: {flagged} contas sinalizadas | Vetorizado: {vectorized}",
+            "cohort_reason_action": "Anti-raid: coorte suspeita",
+            "batch_title": "Anti-Raid: punição em lote",
+            "journal_resumed": "Emergência retomada após reinício"
         },
         "log_channel_id": 0,
         "debug": False
@@ -60,6 +104,40 @@ DEFAULTS = {
 }
 
 
+class JoinWindow:
+    """Timestamps monotônicos de entradas em lista ordenada, consultados com bisect.
+
+    Inserção é append (O(1)); expurgo e contagem por janela usam bisect (O(log n)).
+    O prefixo expirado é descartado em lote quando passa da metade da lista.
+    """
+    __slots__ = ('_times', '_start', 'retention', 'max_entries')
+
+    def __init__(self, retention: float, max_entries: int = 500):
+        self._times: List[float] = []
+        self._start = 0
+        self.retention = float(retention)
+        self.max_entries = max(1, int(max_entries))
+
+    def __len__(self) -> int:
+        return len(self._times) - self._start
+
+    def add(self, t: float):
+        self._times.append(t)
+        self.prune(t)
+        if len(self) > self.max_entries:
+            self._start = len(self._times) - self.max_entries
+
+    def prune(self, now: float):
+        self._start = bisect_left(self._times, now - self.retention, self._start)
+        if self._start > 256 and self._start * 2 > len(self._times):
+            del self._times[:self._start]
+            self._start = 0
+
+    def count_since(self, now: float, seconds: float) -> int:
+        """Quantidade de entradas com ``now - t <= seconds``."""
+        return len(self._times) - bisect_left(self._times, now - seconds, self._start)
+
+
 class AntiRaidCog(commands.Cog):
     """Detecção de raid: monitora taxa de joins e idade das contas e ativa modo emergência."""
 
@@ -75,17 +153,61 @@ class AntiRaidCog(commands.Cog):
         self.log_channel_id: int = self.cfg.get('log_channel_id', 0)
         self.debug: bool = self.cfg.get('debug', False)
 
-        self._join_times: Deque[float] = deque(maxlen=500)
-        self._flagged_join_times: Deque[float] = deque(maxlen=500)
+        # Retenção cobre a maior das janelas para que a contagem por intervalo
+        # continue correta mesmo se interval > sliding_window
+        retention = max(
+            float(self.detection.get('sliding_window_seconds', 120)),
+            float(self.detection.get('join_threshold_interval_seconds', 30))
+        )
+        self._join_times = JoinWindow(retention)
+        self._flagged_join_times = JoinWindow(retention)
         self._emergency_active: bool = False
         self._emergency_started_at: float | None = None
         self._auto_disable_task: asyncio.Task | None = None
         self._original_slowmodes: Dict[int, int] = {}
+        self._bg_tasks: Set[asyncio.Task] = set()
+        # Journal de estado (slowmodes originais + prazo) para sobreviver a reinícios
+        if not hasattr(self, 'journal'):
+            self.journal = StateJournal(JOURNAL_FILE)
+            self._replayed = False
+
+        self.cohort_cfg: Dict[str, Any] = self.cfg.get('cohort', {})
+        # guild_id -> features das entradas recentes / membros sinalizados em coorte (id -> instante)
+        self._cohorts: Dict[int, CohortWindow] = {}
+        self._cohort_flagged: Dict[int, Dict[int, float]] = {}
+        # guild_id -> ids já enviados ao batcher por cohort.action (saem junto com o sinalizado)
+        self._cohort_punished: Dict[int, Set[int]] = {}
+        self._cohort_last_log: Dict[int, float] = {}
+
+        batch_cfg: Dict[str, Any] = self.cfg.get('batch', {})
+        # Timeouts/kicks em fila com concorrência limitada, bans via bulk_ban; um resumo por lote
+        self.batcher = PunishmentBatcher(
+            window_seconds=float(batch_cfg.get('window_seconds', 1.0)),
+            concurrency=int(batch_cfg.get('concurrency', 5)),
+            delete_message_seconds=int(batch_cfg.get('delete_message_seconds', 3600)),
+            on_flush=self._log_batch
+        )
 
     # ---------------- Recarregar -----------------
     def refresh_config(self):
+        if self._auto_disable_task and not self._auto_disable_task.done():
+            self._auto_disable_task.cancel()
         self.raw_cfg = config_manager.reload_cog('anti_raid')
         self.__init__(self.bot)
+        # __init__ zera o estado em memória; o journal devolve a emergência em andamento
+        self._track(self._replay_journal())
+
+    async def cog_load(self):
+        # Recarga da extensão com o bot já conectado: on_ready não dispara de novo
+        if self.bot.is_ready():
+            self._replayed = True
+            self._track(self._replay_journal())
+
+    async def cog_unload(self):
+        if self._auto_disable_task and not self._auto_disable_task.done():
+            self._auto_disable_task.cancel()
+        await self.batcher.close()
+        self.journal.close()
 
     # ---------------- Utilidades -----------------
     def _now(self) -> float:
@@ -115,22 +237,15 @@ class AntiRaidCog(commands.Cog):
             return True
         return False
 
-    async def _log_embed(self, guild: discord.Guild, title: str, fields: List[tuple], color_hex: str | None = None):
+    def _log_target(self, guild: discord.Guild) -> discord.TextChannel | None:
         channel_id = self.emergency_cfg.get('notify_channel_id') or self.log_channel_id
         if not channel_id:
-            return
+            return None
         ch = guild.get_channel(channel_id)
-        if not isinstance(ch, discord.TextChannel):
-            return
+        return ch if isinstance(ch, discord.TextChannel) else None
+
+    def _build_embed(self, title: str, fields: List[tuple], color_hex: str | None = None) -> discord.Embed:
         embed_cfg = self.emergency_cfg.get('notify_embed', {})
-        if not embed_cfg.get('enabled', True):
-            # texto simples
-            try:
-                lines = [title] + [f"{n}: {v}" for n, v, _ in fields]
-                await ch.send('\n'.join(lines))
-            except Exception:
-                pass
-            return
         color_hex = color_hex or embed_cfg.get('color', 'FF0000')
         try:
             color_val = int(str(color_hex), 16)
@@ -139,8 +254,24 @@ class AntiRaidCog(commands.Cog):
         embed = discord.Embed(title=title, color=color_val)
         for name, value, inline in fields:
             embed.add_field(name=name, value=value, inline=inline)
-        p_roles = self.emergency_cfg.get('notify_ping_role_ids', [])
-        p_users = self.emergency_cfg.get('notify_ping_user_ids', [])
+        return embed
+
+    async def _log_embed(self, guild: discord.Guild, title: str, fields: List[tuple], color_hex: str | None = None,
+                         ping: bool = True) -> discord.Message | None:
+        ch = self._log_target(guild)
+        if ch is None:
+            return None
+        embed_cfg = self.emergency_cfg.get('notify_embed', {})
+        if not embed_cfg.get('enabled', True):
+            # texto simples
+            try:
+                lines = [title] + [f"{n}: {v}" for n, v, _ in fields]
+                return await ch.send('\n'.join(lines))
+            except Exception:
+                return None
+        embed = self._build_embed(title, fields, color_hex)
+        p_roles = self.emergency_cfg.get('notify_ping_role_ids', []) if ping else []
+        p_users = self.emergency_cfg.get('notify_ping_user_ids', []) if ping else []
         ping_text = ''
         if p_roles:
             ping_text += ' '.join(f'<@&{rid}>' for rid in p_roles)
@@ -148,62 +279,108 @@ class AntiRaidCog(commands.Cog):
             ping_text += ' ' + ' '.join(f'<@{uid}>' for uid in p_users)
         try:
             if ping_text.strip():
-                await ch.send(ping_text.strip(), embed=embed)
-            else:
-                await ch.send(embed=embed)
+                return await ch.send(ping_text.strip(), embed=embed)
+            return await ch.send(embed=embed)
         except Exception:
-            pass
+            return None
+
+    async def _edit_log(self, msg: discord.Message | None, title: str, fields: List[tuple], color_hex: str | None = None):
+        """Atualiza a mensagem de log (progresso das medidas)."""
+        if msg is None:
+            return
+        embed_cfg = self.emergency_cfg.get('notify_embed', {})
+        if not embed_cfg.get('enabled', True):
+            lines = [title] + [f"{n}: {v}" for n, v, _ in fields]
+            await msg.edit(content='\n'.join(lines))
+            return
+        await msg.edit(embed=self._build_embed(title, fields, color_hex))
 
     # ---------------- Emergência -----------------
+    def _slowmode_targets(self, guild: discord.Guild) -> List[discord.TextChannel]:
+        if self.emergency_cfg.get('apply_slowmode_all_text', True):
+            return list(guild.text_channels)
+        targets: List[discord.TextChannel] = []
+        for cid in set(self.emergency_cfg.get('apply_slowmode_channel_ids', [])):
+            c = guild.get_channel(cid)
+            if isinstance(c, discord.TextChannel):
+                targets.append(c)
+        return targets
+
+    async def _revoke_invites(self, guild: discord.Guild, progress: BatchProgress):
+        try:
+            invites = await guild.invites()
+        except Exception as e:
+            progress.last_error = self.msgs.get('invite_revoke_fail', 'Falha ao revogar convites: {error}').format(error=e)
+            progress.total = 0
+            progress.started = progress.finished = self._now()
+            return
+
+        if self.emergency_cfg.get('revoke_mode', 'all') == 'abused':
+            abused = await self._abused_invite_codes(guild)
+            if abused:
+                invites = [inv for inv in invites if inv.code in abused]
+                progress.label = f"Convites abusados revogados ({', '.join(sorted(abused))})"
+
+        async def revoke(inv: discord.Invite):
+            await inv.delete(reason='Anti-Raid emergência')
+
+        await run_limited(invites, revoke, self._concurrency(), progress)
+
+    async def _abused_invite_codes(self, guild: discord.Guild) -> Set[str]:
+        """Convites por onde entrou a maior parte da janela (via InviteTrackerCog); vazio = revogar todos."""
+        tracker = self.bot.get_cog('InviteTrackerCog')
+        if tracker is None or not tracker.is_tracked(guild.id):
+            return set()
+        window_sec = float(self.detection.get('sliding_window_seconds', 120))
+        counts = await tracker.recent_codes(guild.id, window_sec)
+        total = sum(counts.values())
+        if not total:
+            return set()
+        min_share = float(self.emergency_cfg.get('abused_invite_min_share', 0.5))
+        return {code for code, n in counts.items() if n / total >= min_share}
+
+    async def _apply_slowmode(self, targets: List[discord.TextChannel], slow_val: int, progress: BatchProgress):
+        async def apply(ch: discord.TextChannel):
+            if ch.rate_limit_per_user == slow_val:
+                return False
+            await ch.edit(rate_limit_per_user=slow_val, reason='Anti-Raid emergência slowmode')
+
+        await run_limited(targets, apply, self._concurrency(), progress)
+
+    def _concurrency(self) -> int:
+        return max(1, int(self.emergency_cfg.get('max_concurrency', 8)))
+
     async def _activate_emergency(self, guild: discord.Guild, reason: str):
         if self._emergency_active:
             return
         self._emergency_active = True
         self._emergency_started_at = self._now()
 
+        # Dispara as medidas antes de qualquer log: tempo até proteger é o que importa.
+        # Convites e slowmode usam rotas diferentes e rodam em paralelo.
+        work: List[asyncio.Task] = []
+        batches: List[BatchProgress] = []
         actions: List[str] = []
-
-        # Revogar convites
         if self.emergency_cfg.get('revoke_invites', True):
-            revoked = 0
-            try:
-                invites = await guild.invites()
-                for inv in invites:
-                    try:
-                        await inv.delete(reason='Anti-Raid emergência')
-                        revoked += 1
-                        await asyncio.sleep(0.3)
-                    except Exception:
-                        pass
-                actions.append(f"Convites revogados: {revoked}")
-            except Exception as e:
-                actions.append(f"Falha revogar convites: {e}")
+            inv_prog = BatchProgress('Convites revogados')
+            batches.append(inv_prog)
+            work.append(asyncio.create_task(self._revoke_invites(guild, inv_prog)))
         else:
             actions.append("Revogação de convites: desativada")
 
-        # Aplicar slowmode
-        slow_changed = 0
+        slow_val = int(self.emergency_cfg.get('slowmode_seconds', 8))
+        auto_sec = int(self.emergency_cfg.get('auto_disable_seconds', 600))
+        targets = self._slowmode_targets(guild) if self.emergency_cfg.get('apply_slowmode', True) else []
+        for ch in targets:
+            self._original_slowmodes.setdefault(ch.id, ch.rate_limit_per_user)
+        # Grava prazo e originais antes de alterar qualquer canal (uma transação só)
+        self._journal_call(self.journal.begin, JOURNAL_SCOPE, guild.id,
+                           time.time() + auto_sec if auto_sec > 0 else None,
+                           [('slowmode', ch.id, self._original_slowmodes[ch.id]) for ch in targets])
         if self.emergency_cfg.get('apply_slowmode', True):
-            target_channels: List[discord.TextChannel] = []
-            if self.emergency_cfg.get('apply_slowmode_all_text', True):
-                target_channels.extend(guild.text_channels)
-            else:
-                ids = set(self.emergency_cfg.get('apply_slowmode_channel_ids', []))
-                for cid in ids:
-                    c = guild.get_channel(cid)
-                    if isinstance(c, discord.TextChannel):
-                        target_channels.append(c)
-            slow_val = int(self.emergency_cfg.get('slowmode_seconds', 8))
-            for ch in target_channels:
-                try:
-                    self._original_slowmodes[ch.id] = ch.rate_limit_per_user
-                    if ch.rate_limit_per_user != slow_val:
-                        await ch.edit(rate_limit_per_user=slow_val, reason='Anti-Raid emergência slowmode')
-                        slow_changed += 1
-                        await asyncio.sleep(0.25)
-                except Exception:
-                    pass
-            actions.append(f"Slowmode {slow_val}s aplicado em {slow_changed} canais")
+            slow_prog = BatchProgress(f'Slowmode {slow_val}s')
+            batches.append(slow_prog)
+            work.append(asyncio.create_task(self._apply_slowmode(targets, slow_val, slow_prog)))
         else:
             actions.append("Slowmode: desativado")
 
@@ -222,7 +399,6 @@ class AntiRaidCog(commands.Cog):
             actions.append("Recriação de convites: não programada")
 
         # Auto disable info
-        auto_sec = int(self.emergency_cfg.get('auto_disable_seconds', 600))
         if auto_sec > 0:
             actions.append(f"Auto-desativação em {auto_sec}s")
         else:
@@ -230,18 +406,27 @@ class AntiRaidCog(commands.Cog):
 
         embed_cfg = self.emergency_cfg.get('notify_embed', {})
         title = embed_cfg.get('title_activate', 'Modo Emergência Ativado')
-
-        # Monta campos incluindo medidas
-        fields = [
-            ('Motivo', reason, False),
-            ('Entradas janela', str(len(self._join_times)), True),
-            ('Flagged', str(len(self._flagged_join_times)), True),
-            ('Medidas', '\n'.join(actions)[:1024], False)
-        ]
-        await self._log_embed(guild, title, fields)
+        window_sec = float(self.detection.get('sliding_window_seconds', 120))
+        now = self._now()
+        started = self._emergency_started_at
+
+        def build_fields() -> List[tuple]:
+            progress_lines = [b.line() for b in batches]
+            progress_lines += [b.last_error for b in batches if b.last_error]
+            if work and all(t.done() for t in work):
+                progress_lines.append(f"Concluído em {self._now() - started:.1f}s")
+            return [
+                ('Motivo', reason, False),
+                ('Entradas janela', str(self._join_times.count_since(now, window_sec)), True),
+                ('Flagged', str(self._flagged_join_times.count_since(now, window_sec)), True),
+                ('Progresso', '\n'.join(progress_lines)[:1024] or '—', False),
+                ('Medidas', '\n'.join(actions)[:1024], False)
+            ]
 
         if auto_sec > 0:
             self._auto_disable_task = asyncio.create_task(self._auto_disable_later(guild, auto_sec))
+        # Log e progresso em segundo plano: o join que disparou segue direto para o timeout
+        self._track(self._log_progress(guild, title, build_fields, work, batches))
 
     async def _auto_disable_later(self, guild: discord.Guild, seconds: int):
         try:
@@ -254,45 +439,127 @@ class AntiRaidCog(commands.Cog):
         if not self._emergency_active:
             return
         self._emergency_active = False
-        embed_cfg = self.emergency_cfg.get('notify_embed', {})
-        title = embed_cfg.get('title_deactivate', 'Modo Emergência Desativado')
-        reason_field = 'Automático (timeout)' if auto else (f'Manual por {user.mention}' if user else 'Manual')
-        await self._log_embed(guild, title, [
-            ('Origem', reason_field, False),
-            ('Duração (s)', f"{int(self._now() - (self._emergency_started_at or self._now()))}", True)
-        ], color_hex='00AA55')
-        self._emergency_started_at = None
+        # Cancel auto task (se a própria task está desativando, não cancela a si mesma)
+        if self._auto_disable_task and not self._auto_disable_task.done() and self._auto_disable_task is not asyncio.current_task():
+            self._auto_disable_task.cancel()
+        self._auto_disable_task = None
+
+        work: List[asyncio.Task] = []
+        batches: List[BatchProgress] = []
         # Reverter slowmode
         if self.emergency_cfg.get('apply_slowmode', True) and self._original_slowmodes:
             revert_val = int(self.emergency_cfg.get('revert_slowmode_seconds', 0))
-            for cid, original in list(self._original_slowmodes.items()):
-                ch = guild.get_channel(cid)
-                if isinstance(ch, discord.TextChannel):
-                    try:
-                        target_val = revert_val if revert_val >= 0 else original
-                        if ch.rate_limit_per_user != target_val:
-                            await ch.edit(rate_limit_per_user=target_val, reason='Anti-Raid revert slowmode')
-                            await asyncio.sleep(0.25)
-                    except Exception:
-                        pass
+            originals = dict(self._original_slowmodes)
             self._original_slowmodes.clear()
-        # Cancel auto task
+            channels = [c for c in (guild.get_channel(cid) for cid in originals) if isinstance(c, discord.TextChannel)]
+
+            async def revert(ch: discord.TextChannel):
+                target_val = revert_val if revert_val >= 0 else originals[ch.id]
+                if ch.rate_limit_per_user == target_val:
+                    return False
+                await ch.edit(rate_limit_per_user=target_val, reason='Anti-Raid revert slowmode')
+
+            prog = BatchProgress('Slowmode revertido')
+            batches.append(prog)
+
+            async def revert_all():
+                await run_limited(channels, revert, self._concurrency(), prog)
+                # Só sai do journal depois de reverter: se cair no meio, o replay refaz
+                self._journal_call(self.journal.end, JOURNAL_SCOPE, guild.id)
+
+            work.append(asyncio.create_task(revert_all()))
+        else:
+            self._journal_call(self.journal.end, JOURNAL_SCOPE, guild.id)
+
+        embed_cfg = self.emergency_cfg.get('notify_embed', {})
+        title = embed_cfg.get('title_deactivate', 'Modo Emergência Desativado')
+        reason_field = 'Automático (timeout)' if auto else (f'Manual por {user.mention}' if user else 'Manual')
+        duration = f"{int(self._now() - (self._emergency_started_at or self._now()))}"
+        self._emergency_started_at = None
+
+        def build_fields() -> List[tuple]:
+            fields = [
+                ('Origem', reason_field, False),
+                ('Duração (s)', duration, True)
+            ]
+            if batches:
+                fields.append(('Progresso', '\n'.join(b.line() for b in batches)[:1024], False))
+            return fields
+
+        self._track(self._log_progress(guild, title, build_fields, work, batches, color_hex='00AA55'))
+
+    def _journal_call(self, fn, *args):
+        # Falha de disco não pode impedir a proteção em si
+        try:
+            fn(*args)
+        except Exception as e:
+            print(f'[anti_raid] Falha no journal de estado: {e}')
+
+    async def _replay_journal(self):
+        """Retoma emergências abertas antes de um reinício: restaura as vencidas, reagenda as demais."""
+        try:
+            sessions = self.journal.sessions(JOURNAL_SCOPE)
+        except Exception as e:
+            print(f'[anti_raid] Falha ao ler journal de estado: {e}')
+            return
+        sessions = sorted((s for s in sessions if self.bot.get_guild(s.guild_id) is not None), key=lambda s: s.started)
+        if not sessions:
+            return
+        # O estado em memória é de uma emergência só: a mais recente é retomada, as demais são revertidas já
+        for sess in sessions[:-1]:
+            print(f'[anti_raid] Emergência de {sess.guild_id} no journal junto com outra; revertendo agora')
+            self._load_session(sess)
+            await self._deactivate_emergency(self.bot.get_guild(sess.guild_id), auto=True)
+        sess = sessions[-1]
+        guild = self.bot.get_guild(sess.guild_id)
+        self._load_session(sess)
+        if sess.deadline is None:
+            remaining_text = 'manual'
+        else:
+            remaining = sess.deadline - time.time()
+            remaining_text = f'{max(0, int(remaining))}s'
+            if remaining <= 0:
+                await self._deactivate_emergency(guild, auto=True)
+                return
+            self._auto_disable_task = asyncio.create_task(self._auto_disable_later(guild, remaining))
+        if self.debug:
+            print(f'[anti_raid] emergência retomada em {guild.id}: {len(self._original_slowmodes)} canais, desativação {remaining_text}')
+        await self._log_embed(guild, self.msgs.get('journal_resumed', 'Emergência retomada após reinício'), [
+            ('Canais em slowmode', str(len(self._original_slowmodes)), True),
+            ('Desativação em', remaining_text, True)
+        ], color_hex='FF8800', ping=False)
+
+    def _load_session(self, sess):
+        """Substitui o estado da emergência em memória pelo de uma sessão do journal."""
         if self._auto_disable_task and not self._auto_disable_task.done():
             self._auto_disable_task.cancel()
         self._auto_disable_task = None
+        self._emergency_active = True
+        self._emergency_started_at = self._now() - max(0.0, time.time() - sess.started)
+        self._original_slowmodes = dict(sess.entries.get('slowmode', {}))
+
+    def _track(self, coro):
+        task = asyncio.create_task(coro)
+        self._bg_tasks.add(task)
+        task.add_done_callback(self._bg_tasks.discard)
+
+    async def _log_progress(self, guild: discord.Guild, title: str, build_fields, work: List[asyncio.Task],
+                            batches: List[BatchProgress], color_hex: str | None = None):
+        """Envia o log e o edita com o progresso das medidas até todas terminarem."""
+        msg = await self._log_embed(guild, title, build_fields(), color_hex=color_hex)
+        interval = float(self.emergency_cfg.get('progress_update_seconds', 2))
+        await report_progress(work, lambda: self._edit_log(msg, title, build_fields(), color_hex=color_hex), interval)
+        if self.debug and batches:
+            print('[anti_raid] ' + ' | '.join(b.line() for b in batches))
 
     # ---------------- Detecção -----------------
     def _record_join(self, age_hours: float):
         now = self._now()
-        self._join_times.append(now)
+        self._join_times.add(now)
         if age_hours <= float(self.detection.get('min_account_age_hours_flag', 12)):
-            self._flagged_join_times.append(now)
-        # Expurgo por sliding_window
-        window_sec = float(self.detection.get('sliding_window_seconds', 120))
-        while self._join_times and (now - self._join_times[0]) > window_sec:
-            self._join_times.popleft()
-        while self._flagged_join_times and (now - self._flagged_join_times[0]) > window_sec:
-            self._flagged_join_times.popleft()
+            self._flagged_join_times.add(now)
+        else:
+            self._flagged_join_times.prune(now)
 
     def _should_activate(self) -> str | None:
         # Retorna motivo ou None
@@ -300,16 +567,122 @@ class AntiRaidCog(commands.Cog):
         interval = float(self.detection.get('join_threshold_interval_seconds', 30))
         flagged_needed = int(self.detection.get('flagged_join_threshold_count', 5))
         now = self._now()
-        # Conta quantos joins últimos interval segundos
-        recent = [t for t in self._join_times if now - t <= interval]
-        if len(recent) >= count_needed:
-            return self.msgs.get('activated_reason', 'Threshold atingido').format(count=len(recent), interval=int(interval))
-        flagged_recent = [t for t in self._flagged_join_times if now - t <= interval]
-        if flagged_needed > 0 and len(flagged_recent) >= flagged_needed:
-            return f"Flagged atingido: {len(flagged_recent)} em {int(interval)}s"
+        # Conta quantos joins últimos interval segundos (bisect, O(log n))
+        recent = self._join_times.count_since(now, interval)
+        if recent >= count_needed:
+            return self.msgs.get('activated_reason', 'Threshold atingido').format(count=recent, interval=int(interval))
+        flagged_recent = self._flagged_join_times.count_since(now, interval)
+        if flagged_needed > 0 and flagged_recent >= flagged_needed:
+            return f"Flagged atingido: {flagged_recent} em {int(interval)}s"
         return None
 
+    def _cohort_window(self, guild_id: int) -> CohortWindow:
+        win = self._cohorts.get(guild_id)
+        if win is None:
+            c = self.cohort_cfg
+            win = CohortWindow(
+                capacity=int(c.get('capacity', 512)),
+                window_seconds=float(c.get('window_seconds', 300)),
+                created_tolerance_seconds=float(c.get('created_tolerance_hours', 24)) * 3600,
+                weights=c.get('weights', {}),
+                min_pair_score=float(c.get('min_pair_score', 4))
+            )
+            self._cohorts[guild_id] = win
+        return win
+
+    def _observe_cohort(self, member: discord.Member) -> List[int]:
+        """Pontua a entrada contra a coorte recente; retorna o cluster (inclui o membro) se sinalizado."""
+        flags = getattr(member, 'public_flags', None)
+        feat = extract_features(member.id, member.name or '', member.avatar is not None, flags.value if flags else 0)
+        now = self._now()
+        neighbors = self._cohort_window(member.guild.id).observe(member.id, feat, now)
+        if len(neighbors) + 1 < int(self.cohort_cfg.get('cluster_min_size', 5)):
+            return []
+        cluster = neighbors + [member.id]
+        flagged = self._cohort_flagged.setdefault(member.guild.id, {})
+        for mid in cluster:
+            flagged[mid] = now
+        # Expurgo dos sinalizados fora da janela
+        cutoff = now - float(self.cohort_cfg.get('window_seconds', 300))
+        punished = self._cohort_punished.get(member.guild.id, set())
+        for mid in [m for m, t in flagged.items() if t < cutoff]:
+            del flagged[mid]
+            punished.discard(mid)
+        return cluster
+
+    def cohort_targets(self, guild_id: int) -> List[int]:
+        """Membros sinalizados em coorte ainda dentro da janela (alvos para ação em lote)."""
+        cutoff = self._now() - float(self.cohort_cfg.get('window_seconds', 300))
+        return [mid for mid, t in self._cohort_flagged.get(guild_id, {}).items() if t >= cutoff]
+
+    async def _log_cohort(self, guild: discord.Guild, cluster: List[int]):
+        now = self._now()
+        cooldown = float(self.cohort_cfg.get('log_cooldown_seconds', 30))
+        if now - self._cohort_last_log.get(guild.id, float('-inf')) < cooldown:
+            return
+        self._cohort_last_log[guild.id] = now
+        targets = self.cohort_targets(guild.id)
+        mentions = ' '.join(f'<@{mid}>' for mid in targets[:40])
+        if len(targets) > 40:
+            mentions += f' (+{len(targets) - 40})'
+        await self._log_embed(guild, self.msgs.get('cohort_title', 'Coorte suspeita de raid'), [
+            ('Cluster atual', str(len(cluster)), True),
+            ('Sinalizados na janela', str(len(targets)), True),
+            ('Membros', mentions[:1024] or '—', False)
+        ], color_hex='FF8800', ping=False)
+
+    def _punish_cohort(self, guild: discord.Guild):
+        """Aplica ``cohort.action`` aos sinalizados na janela que ainda não foram punidos (entram no mesmo lote)."""
+        action = self.cohort_cfg.get('action', 'none')
+        if action not in ('ban', 'kick', 'timeout'):
+            return
+        reason = self.msgs.get('cohort_reason_action', 'Anti-raid: coorte suspeita')
+        until = None
+        if action == 'timeout':
+            duration = int(self.emergency_cfg.get('timeout_duration_seconds', 900))
+            until = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=duration)
+        punished = self._cohort_punished.setdefault(guild.id, set())
+        for mid in self.cohort_targets(guild.id):
+            if mid in punished:
+                continue
+            target = guild.get_member(mid)
+            if target is None:
+                if action != 'ban':
+                    continue
+                target = discord.Object(id=mid)
+            punished.add(mid)
+            fut = self.batcher.submit(guild, target, action, reason=reason, until=until)
+
+            def _failed(f: asyncio.Future, mid: int = mid):
+                # Falhou: pode ser tentado de novo no próximo cluster
+                if f.cancelled() or not f.result():
+                    punished.discard(mid)
+            fut.add_done_callback(_failed)
+
+    async def _log_batch(self, batch: PunishBatch):
+        ids = batch.ok[:40]
+        mentions = ' '.join(f'<@{uid}>' for uid in ids)
+        if len(batch.ok) > 40:
+            mentions += f' (+{len(batch.ok) - 40})'
+        fields = [
+            ('Ação', batch.action, True),
+            ('Aplicados', str(len(batch.ok)), True),
+            ('Falhas', str(len(batch.failed)), True),
+            ('Chamadas API', f'{batch.calls} em {batch.elapsed:.1f}s', True),
+            ('Membros', mentions[:1024] or '—', False)
+        ]
+        if batch.errors:
+            fields.append(('Erros', '\n'.join(batch.errors[:3])[:1024], False))
+        await self._log_embed(batch.guild, self.msgs.get('batch_title', 'Anti-Raid: punição em lote'), fields,
+                              color_hex='FF8800', ping=False)
+
     # ---------------- Eventos -----------------
+    @commands.Cog.listener()
+    async def on_ready(self):
+        if not self._replayed:
+            self._replayed = True
+            await self._replay_journal()
+
     @commands.Cog.listener()
     async def on_member_join(self, member: discord.Member):
         if not self.enabled or not member.guild:
@@ -317,22 +690,30 @@ class AntiRaidCog(commands.Cog):
         guild = member.guild
         age_hours = self._account_age_hours(member)
         self._record_join(age_hours)
+        cluster: List[int] = []
+        if self.cohort_cfg.get('enabled', True):
+            cluster = self._observe_cohort(member)
+            if cluster:
+                self._track(self._log_cohort(guild, cluster))
+                self._punish_cohort(guild)
         # Check trigger
         if not self._emergency_active:
             reason = self._should_activate()
+            if not reason and cluster and self.cohort_cfg.get('activate_emergency', True):
+                reason = self.msgs.get('cohort_reason', 'Coorte suspeita: {size} contas').format(
+                    size=len(cluster), window=int(self.cohort_cfg.get('window_seconds', 300)))
             if reason:
                 await self._activate_emergency(guild, reason)
         # Apply newcomer timeout if emergency active
         if self._emergency_active and self.emergency_cfg.get('timeout_newcomers', True):
             max_age = float(self.emergency_cfg.get('timeout_account_age_hours_max', 72))
-            if age_hours <= max_age:
+            in_cohort = bool(cluster) and self.cohort_cfg.get('timeout_flagged', True)
+            if age_hours <= max_age or in_cohort:
                 duration = int(self.emergency_cfg.get('timeout_duration_seconds', 900))
                 until = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=duration)
-                try:
-                    await member.timeout(until, reason=self.msgs.get('timeout_reason', 'Anti-raid'))
-                except Exception:
-                    if self.debug:
-                        print('[anti_raid] Falha timeout newcomer')
+                ok = await self.batcher.submit(guild, member, 'timeout', reason=self.msgs.get('timeout_reason', 'Anti-raid'), until=until)
+                if not ok and self.debug:
+                    print('[anti_raid] Falha timeout newcomer')
 
     # ---------------- Comandos -----------------
     @commands.command(name='antiraidstatus')
@@ -341,17 +722,19 @@ class AntiRaidCog(commands.Cog):
             return
         now = self._now()
         interval = float(self.detection.get('join_threshold_interval_seconds', 30))
-        recent = [t for t in self._join_times if now - t <= interval]
-        flagged_recent = [t for t in self._flagged_join_times if now - t <= interval]
         header = self.msgs.get('status_header', 'Anti-Raid Status')
         line = self.msgs.get('status_values', 'Estado').format(
             active=self._emergency_active,
-            joins=len(recent),
-            flagged=len(flagged_recent),
+            joins=self._join_times.count_since(now, interval),
+            flagged=self._flagged_join_times.count_since(now, interval),
             threshold=self.detection.get('join_threshold_count', 10),
             interval=int(interval)
         )
-        await ctx.reply(f"{header}\n{line}")
+        cohort_line = self.msgs.get('cohort_status', 'Coorte: {flagged}').format(
+            flagged=len(self.cohort_targets(ctx.guild.id)),
+            vectorized=self._cohort_window(ctx.guild.id).use_numpy
+        )
+        await ctx.reply(f"{header}\n{line}\n{cohort_line}")
 
     @commands.command(name='antiraidactivate')
     async def anti_raid_activate(self, ctx: commands.Context):
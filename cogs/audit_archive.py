@@ -0,0 +1,210 @@
+import re
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import discord
+from discord.ext import commands, tasks
+
+from config_loader import config_manager
+from cogs._audit_archive import ArchivedEvent, ArchiveWriter, AuditArchive, SearchQuery
+
+DATA_DIR = Path(__file__).parent.parent / 'data'
+ARCHIVE_FILE = DATA_DIR / 'audit_archive.sqlite3'
+
+DEFAULTS = {
+    "audit_archive": {
+        "enabled": True,
+        "batch_size": 500,
+        "flush_interval_seconds": 2,
+        "max_queue": 50000,
+        "retention_days": 90,
+        "page_size": 10,
+        "messages": {
+            "search_title": "Arquivo de auditoria",
+            "search_empty": "Nenhum evento encontrado.",
+            "search_usage": "Uso: !auditsearch [user:@membro] [acao:nome] [canal:#canal] [dias:N] [texto]",
+            "status_header": "Arquivo de auditoria",
+            "status_main": "Eventos guardados (guild): {count} | Na fila: {queued} | Gravados: {written} | Descartados: {dropped}",
+            "status_cfg": "Lote: {batch} | Intervalo: {interval}s | Retenção: {retention} dias"
+        }
+    }
+}
+
+_ID = re.compile(r'(\d{15,21})')
+
+
+def parse_query(guild_id: int, text: str) -> SearchQuery:
+    """``user:``, ``acao:``, ``canal:`` e ``dias:`` viram filtros; o resto é texto livre (FTS)."""
+    user_id = channel_id = since = None
+    action = ''
+    free: List[str] = []
+    for token in text.split():
+        key, _, value = token.partition(':')
+        key = key.lower()
+        if value and key in ('user', 'usuario', 'usuário'):
+            m = _ID.search(value)
+            user_id = int(m.group(1)) if m else None
+        elif value and key in ('canal', 'channel'):
+            m = _ID.search(value)
+            channel_id = int(m.group(1)) if m else None
+        elif value and key in ('acao', 'ação', 'action'):
+            action = value.lower()
+        elif value and key in ('dias', 'days') and value.isdigit():
+            since = time.time() - int(value) * 86400
+        else:
+            free.append(token)
+    return SearchQuery(guild_id, ' '.join(free), user_id, action, channel_id, since)
+
+
+def format_event(ev: ArchivedEvent) -> str:
+    parts = [f'<t:{int(ev.ts)}:f>', f'`{ev.action}`']
+    if ev.user_id:
+        parts.append(f'por <@{ev.user_id}>')
+    if ev.target_id and ev.target_id != ev.user_id:
+        parts.append(f'alvo `{ev.target_id}`')
+    if ev.channel_id:
+        parts.append(f'em <#{ev.channel_id}>')
+    line = ' '.join(parts)
+    if ev.content:
+        content = ev.content if len(ev.content) <= 150 else ev.content[:150] + '…'
+        line += '\n> ' + content.replace('\n', ' ')
+    return line
+
+
+class AuditSearchView(discord.ui.View):
+    """Páginas por cursor: guarda o ``id`` de corte de cada página já vista."""
+
+    def __init__(self, cog: 'AuditArchiveCog', author_id: int, query: SearchQuery):
+        super().__init__(timeout=180)
+        self.cog = cog
+        self.author_id = author_id
+        self.query = query
+        self.cursors: List[Optional[int]] = [None]
+        self.events: List[ArchivedEvent] = []
+        self.has_next = False
+
+    async def load(self):
+        size = self.cog.page_size
+        # Um a mais para saber se existe próxima página
+        rows = await self.cog.writer.search(self.query, self.cursors[-1], size + 1)
+        self.has_next = len(rows) > size
+        self.events = rows[:size]
+        self.prev_button.disabled = len(self.cursors) <= 1
+        self.next_button.disabled = not self.has_next
+
+    def embed(self) -> discord.Embed:
+        msgs = self.cog.msgs
+        desc = '\n'.join(format_event(e) for e in self.events) or msgs.get('search_empty', 'Nenhum evento encontrado.')
+        embed = discord.Embed(title=msgs.get('search_title', 'Arquivo de auditoria'), description=desc[:4000],
+                              color=discord.Color.blurple())
+        embed.set_footer(text=f'Página {len(self.cursors)}')
+        return embed
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return interaction.user.id == self.author_id
+
+    @discord.ui.button(label='Anterior', style=discord.ButtonStyle.secondary)
+    async def prev_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if len(self.cursors) > 1:
+            self.cursors.pop()
+        await self.load()
+        await interaction.response.edit_message(embed=self.embed(), view=self)
+
+    @discord.ui.button(label='Próximo', style=discord.ButtonStyle.secondary)
+    async def next_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if self.has_next and self.events:
+            self.cursors.append(self.events[-1].id)
+        await self.load()
+        await interaction.response.edit_message(embed=self.embed(), view=self)
+
+
+class AuditArchiveCog(commands.Cog):
+    """Guarda todos os eventos dos cogs de auditoria num SQLite local pesquisável.
+
+    Os cogs ``audit_*`` chamam :meth:`record` junto com o log no canal; a gravação
+    acontece em lotes numa thread própria, fora do loop de eventos.
+    """
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.raw_cfg = config_manager.load_cog('audit_archive', defaults=DEFAULTS)
+        self.cfg = self.raw_cfg.get('audit_archive', {})
+        self.enabled: bool = self.cfg.get('enabled', True)
+        self.page_size: int = max(1, min(25, int(self.cfg.get('page_size', 10))))
+        self.retention_days: float = float(self.cfg.get('retention_days', 90))
+        self.msgs: Dict[str, str] = self.cfg.get('messages', {})
+        # Sobrevive ao refresh_config (o __init__ é chamado de novo)
+        if not hasattr(self, 'writer'):
+            self.writer = ArchiveWriter(AuditArchive(ARCHIVE_FILE))
+        self.writer.batch_size = max(1, int(self.cfg.get('batch_size', 500)))
+        self.writer.flush_interval = max(0.0, float(self.cfg.get('flush_interval_seconds', 2)))
+        self.writer.max_queue = max(self.writer.batch_size, int(self.cfg.get('max_queue', 50000)))
+
+    def refresh_config(self):
+        self.raw_cfg = config_manager.reload_cog('audit_archive')
+        self.__init__(self.bot)
+
+    async def cog_load(self):
+        self.writer.start()
+        if not self.prune_loop.is_running():
+            self.prune_loop.start()
+
+    async def cog_unload(self):
+        self.prune_loop.cancel()
+        await self.writer.close()
+
+    # ----------------- API para os cogs de auditoria -----------------
+    def record(self, guild: discord.Guild, source: str, action: str, *, user=None, target=None, channel=None,
+               content: str = ''):
+        """Enfileira o evento (aceita objetos do discord ou ids)."""
+        if not self.enabled or guild is None:
+            return
+        self.writer.record(guild.id, source, action, getattr(user, 'id', user), getattr(target, 'id', target),
+                           getattr(channel, 'id', channel), content)
+
+    @tasks.loop(hours=6)
+    async def prune_loop(self):
+        if self.retention_days > 0:
+            removed = await self.writer.prune(time.time() - self.retention_days * 86400)
+            if removed:
+                print(f'[audit_archive] {removed} eventos antigos removidos')
+
+    # ----------------- Comandos -----------------
+    @commands.command(name='auditsearch')
+    async def audit_search(self, ctx: commands.Context, *, consulta: str = ''):
+        """Busca no arquivo. Filtros: user:@membro acao:nome canal:#canal dias:N; o resto é texto (FTS)."""
+        if not ctx.author.guild_permissions.manage_guild:
+            return await ctx.reply('Sem permissão.')
+        if not consulta.strip():
+            return await ctx.reply(self.msgs.get('search_usage', 'Uso: !auditsearch [user:@membro] [acao:nome] [canal:#canal] [dias:N] [texto]'))
+        # O que ainda está na fila também precisa aparecer
+        await self.writer.flush()
+        view = AuditSearchView(self, ctx.author.id, parse_query(ctx.guild.id, consulta))
+        await view.load()
+        await ctx.reply(embed=view.embed(), view=view)
+
+    @commands.command(name='auditarchivestatus')
+    async def audit_archive_status(self, ctx: commands.Context):
+        if not ctx.author.guild_permissions.manage_guild:
+            return await ctx.reply('Sem permissão.')
+        w = self.writer
+        lines = [self.msgs.get('status_header', 'Arquivo de auditoria')]
+        lines.append(self.msgs.get('status_main', '').format(
+            count=await w.count(ctx.guild.id), queued=len(w), written=w.written, dropped=w.dropped))
+        lines.append(self.msgs.get('status_cfg', '').format(
+            batch=w.batch_size, interval=w.flush_interval, retention=int(self.retention_days)))
+        if w.last_error:
+            lines.append(f'Último erro: {w.last_error}')
+        await ctx.reply('\n'.join(lines))
+
+    @commands.command(name='auditarchivereload')
+    async def audit_archive_reload(self, ctx: commands.Context):
+        if not ctx.author.guild_permissions.manage_guild:
+            return await ctx.reply('Sem permissão.')
+        self.refresh_config()
+        await ctx.reply('Config audit_archive recarregada.')
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(AuditArchiveCog(bot))
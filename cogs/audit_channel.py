@@ -1,8 +1,12 @@
+import asyncio
 import datetime
 import discord
 from discord.ext import commands
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Set, Tuple
 from config_loader import config_manager
+from cogs._audit_archive import archive_event
+from cogs._audit_cache import get_audit_cache
+from cogs._perm_escalation import permission_names
 
 DEFAULTS = {
     "audit_channel": {
@@ -13,17 +17,24 @@ DEFAULTS = {
             "enabled": True,
             "color": "33CC99",
             "title_channel_update": "Atualização de canal",
+            "title_channel_update_group": "Atualização de canais em massa",
             "title_channel_create": "Criação de canal",
             "title_channel_delete": "Exclusão de canal"
         },
         "options": {
             "log_update": True,
             "log_create": False,
-            "log_delete": False
+            "log_delete": False,
+            # Atualizações próximas viram uma entrada só (ex.: sincronizar permissões de uma categoria)
+            "debounce_seconds": 2,
+            "debounce_max_seconds": 10,
+            "max_change_lines": 15
         },
         "messages": {
             "channel_update": "{executor} modificou canal {channel} alterações: {changes}",
             "channel_update_unknown": "Canal {channel} modificado (executor desconhecido) alterações: {changes}",
+            "channel_update_group": "{executor} modificou {count} canais",
+            "channel_update_group_unknown": "{count} canais modificados (executor desconhecido)",
             "channel_create": "{executor} criou canal {channel}",
             "channel_create_unknown": "Canal {channel} criado (executor desconhecido)",
             "channel_delete": "{executor} excluiu canal {channel}",
@@ -31,12 +42,87 @@ DEFAULTS = {
             "status_header": "Auditoria canais",
             "status_main": "Habilitado: {enabled} | Janela: {window}s",
             "status_channel": "Canal log: {channel}",
-            "status_opts": "Update: {update} | Create: {create} | Delete: {delete}"
+            "status_opts": "Update: {update} | Create: {create} | Delete: {delete}",
+            "status_debounce": "Agrupamento: {debounce}s (máx. {max}s) | Canais pendentes: {pending}"
         },
         "debug": False
     }
 }
 
+# Estado de uma permissão no overwrite: permitida, negada ou herdada
+_STATE = {1: '✅', -1: '❌', 0: '⬜'}
+
+_OVERWRITE_ACTIONS = {
+    'create': discord.AuditLogAction.overwrite_create,
+    'delete': discord.AuditLogAction.overwrite_delete,
+    'update': discord.AuditLogAction.overwrite_update,
+}
+
+
+def _target_name(target) -> str:
+    if isinstance(target, discord.Role):
+        return target.name if target.name.startswith('@') else f'@{target.name}'
+    name = getattr(target, 'display_name', None) or getattr(target, 'name', None)
+    return str(name) if name else f'`{target.id}`'
+
+
+def _state(allow: int, deny: int, bit: int) -> int:
+    return 1 if allow & bit else -1 if deny & bit else 0
+
+
+def _bit_changes(old: Tuple[int, int], new: Tuple[int, int]) -> str:
+    changed = (old[0] ^ new[0]) | (old[1] ^ new[1])
+    parts = []
+    for name in permission_names(changed):
+        bit = discord.Permissions(**{name: True}).value
+        parts.append(f'{name} {_STATE[_state(*old, bit)]}→{_STATE[_state(*new, bit)]}')
+    return ', '.join(parts)
+
+
+def overwrite_changes(before: Dict[Any, discord.PermissionOverwrite],
+                      after: Dict[Any, discord.PermissionOverwrite]) -> List[Tuple[str, str]]:
+    """Diferença de overwrites por alvo, como ``(tipo, linha)`` com tipo ``create``/``delete``/``update``.
+
+    Os bits mexidos de cada alvo são ``(allow_antes ^ allow_depois) | (deny_antes ^ deny_depois)``.
+    """
+    old = {t.id: (t, tuple(p.value for p in ow.pair())) for t, ow in before.items()}
+    changes: List[Tuple[str, str]] = []
+    for target, ow in after.items():
+        new_bits = tuple(p.value for p in ow.pair())
+        prev = old.pop(target.id, None)
+        if prev is None:
+            detail = _bit_changes((0, 0), new_bits) or 'vazio'
+            changes.append(('create', f'{_target_name(target)}: criado ({detail})'))
+        elif prev[1] != new_bits:
+            changes.append(('update', f'{_target_name(target)}: {_bit_changes(prev[1], new_bits)}'))
+    for target, _ in old.values():
+        changes.append(('delete', f'{_target_name(target)}: removido'))
+    return changes
+
+
+class _PendingUpdates:
+    """Atualizações de canal de uma guild esperando o fim da rajada."""
+    __slots__ = ('first', 'deadline', 'channels', 'task')
+
+    def __init__(self, now: float):
+        self.first = now
+        self.deadline = now
+        # channel_id -> [before mais antigo, after mais recente]
+        self.channels: Dict[int, List[discord.abc.GuildChannel]] = {}
+        self.task: asyncio.Task | None = None
+
+
+def _clip(lines: List[str], limit: int, max_chars: int = 1000) -> str:
+    shown, size = [], 0
+    for line in lines[:limit]:
+        if size + len(line) + 1 > max_chars:
+            break
+        shown.append(line)
+        size += len(line) + 1
+    rest = len(lines) - len(shown)
+    return '\n'.join(shown) + (f'\n… +{rest}' if rest else '')
+
+
 class AuditChannelCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
@@ -49,12 +135,27 @@ class AuditChannelCog(commands.Cog):
         self.msgs: Dict[str, str] = self.cfg.get('messages', {})
         self.opts: Dict[str, Any] = self.cfg.get('options', {})
         self.debug: bool = self.cfg.get('debug', False)
+        self.debounce: float = max(0.0, float(self.opts.get('debounce_seconds', 2)))
+        self.debounce_max: float = max(self.debounce, float(self.opts.get('debounce_max_seconds', 10)))
+        self.max_lines: int = max(1, int(self.opts.get('max_change_lines', 15)))
+        # Sobrevive ao refresh_config (o __init__ é chamado de novo)
+        if not hasattr(self, '_pending'):
+            self._pending: Dict[int, _PendingUpdates] = {}
 
     def refresh_config(self):
         self.raw_cfg = config_manager.reload_cog('audit_channel')
         self.__init__(self.bot)
 
-    async def _log(self, guild: discord.Guild, title: str, lines: List[Tuple[str,str,bool]]):
+    def cog_unload(self):
+        for pending in self._pending.values():
+            if pending.task is not None:
+                pending.task.cancel()
+        self._pending.clear()
+
+    async def _log(self, guild: discord.Guild, title: str, lines: List[Tuple[str,str,bool]], *, action: str = '',
+                   user=None, target=None, channel=None, content: str | None = None):
+        archive_event(self.bot, guild, 'audit_channel', action, user=user, target=target, channel=channel,
+                      content=content, fields=lines)
         if not self.log_channel_id:
             return
         ch = guild.get_channel(self.log_channel_id)
@@ -83,17 +184,12 @@ class AuditChannelCog(commands.Cog):
     async def _find_executor(self, guild: discord.Guild, target: discord.abc.GuildChannel, action: discord.AuditLogAction) -> discord.User | None:
         if not guild.me.guild_permissions.view_audit_log:
             return None
-        now = datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc)
-        async for entry in guild.audit_logs(limit=10, action=action):
-            if entry.target and getattr(entry.target, 'id', None) == target.id:
-                created = entry.created_at
-                if created.tzinfo is None:
-                    created = created.replace(tzinfo=datetime.timezone.utc)
-                if (now - created).total_seconds() <= self.window:
-                    return entry.user
-        return None
-
-    def _diff_channel(self, before: discord.abc.GuildChannel, after: discord.abc.GuildChannel) -> List[str]:
+        entry = await get_audit_cache(self.bot).find(guild, action, target.id, self.window, limit=10)
+        return entry.user if entry else None
+
+    def _diff_channel(self, before: discord.abc.GuildChannel, after: discord.abc.GuildChannel
+                      ) -> Tuple[List[str], Set[discord.AuditLogAction]]:
+        """Alterações legíveis e as ações do audit log que podem tê-las gerado."""
         changes = []
         # Generic attributes
         if hasattr(before, 'name') and before.name != after.name:
@@ -110,26 +206,129 @@ class AuditChannelCog(commands.Cog):
                 changes.append(f"bitrate: {before.bitrate} -> {after.bitrate}")
             if before.user_limit != after.user_limit:
                 changes.append(f"user_limit: {before.user_limit} -> {after.user_limit}")
-        # Overwrites count change (detailed diff seria maior)
-        if len(before.overwrites) != len(after.overwrites):
-            changes.append('permissões (overwrites) alteradas')
-        return changes
+        actions = {discord.AuditLogAction.channel_update} if changes else set()
+        for kind, line in overwrite_changes(before.overwrites, after.overwrites):
+            changes.append(line)
+            actions.add(_OVERWRITE_ACTIONS[kind])
+        return changes, actions
 
     @commands.Cog.listener()
     async def on_guild_channel_update(self, before: discord.abc.GuildChannel, after: discord.abc.GuildChannel):
         if not self.enabled or not self.opts.get('log_update', True):
             return
-        changes = self._diff_channel(before, after)
-        if not changes:
+        gid = after.guild.id
+        pending = self._pending.get(gid)
+        if pending is None or after.id not in pending.channels:
+            # Só posição/outros campos não logados: nem entra no buffer
+            if not self._diff_channel(before, after)[0]:
+                return
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        if pending is None:
+            pending = self._pending[gid] = _PendingUpdates(now)
+        entry = pending.channels.get(after.id)
+        if entry is None:
+            pending.channels[after.id] = [before, after]
+        else:
+            entry[1] = after  # mantém o estado de antes da rajada
+        pending.deadline = now + self.debounce
+        if pending.task is None:
+            pending.task = asyncio.create_task(self._flush_later(after.guild, pending))
+
+    async def _flush_later(self, guild: discord.Guild, pending: _PendingUpdates):
+        loop = asyncio.get_running_loop()
+        while True:
+            wait = min(pending.deadline, pending.first + self.debounce_max) - loop.time()
+            if wait <= 0:
+                break
+            await asyncio.sleep(wait)
+        if self._pending.get(guild.id) is pending:
+            del self._pending[guild.id]
+        try:
+            await self._flush(guild, pending)
+        except Exception as e:
+            print(f'[audit_channel] falha ao logar atualizações: {e}')
+
+    async def _find_executors(self, guild: discord.Guild, actions: Set[discord.AuditLogAction], channel_ids: Set[int],
+                              window: float) -> Dict[int, discord.User]:
+        """Uma busca por ação para todos os canais da rajada (não uma por canal)."""
+        if not guild.me.guild_permissions.view_audit_log:
+            return {}
+        cache = get_audit_cache(self.bot)
+        limit = min(100, 2 * len(channel_ids) + 5)
+        now = datetime.datetime.now(datetime.timezone.utc)
+        found: Dict[int, discord.User] = {}
+        for action in sorted(actions, key=lambda a: a.value):
+            for entry in await cache.recent(guild, action, limit):
+                tid = getattr(entry.target, 'id', None)
+                if tid not in channel_ids or tid in found:
+                    continue
+                created = entry.created_at if entry.created_at.tzinfo else entry.created_at.replace(tzinfo=datetime.timezone.utc)
+                if (now - created).total_seconds() <= window:
+                    found[tid] = entry.user
+        return found
+
+    def _mention(self, channel: discord.abc.GuildChannel) -> str:
+        return channel.mention if hasattr(channel, 'mention') else channel.name
+
+    async def _flush(self, guild: discord.Guild, pending: _PendingUpdates):
+        diffs = []
+        actions: Set[discord.AuditLogAction] = set()
+        for before, after in pending.channels.values():
+            changes, acts = self._diff_channel(before, after)
+            if changes:  # voltou ao estado original dentro da rajada
+                diffs.append((after, changes))
+                actions |= acts
+        if not diffs:
             return
-        executor = await self._find_executor(after.guild, after, discord.AuditLogAction.channel_update)
+        # A entrada do audit log é do primeiro evento da rajada
+        window = self.window + asyncio.get_running_loop().time() - pending.first
+        executors = await self._find_executors(guild, actions, {c.id for c, _ in diffs}, window)
+        if len(diffs) == 1:
+            channel, changes = diffs[0]
+            await self._log_single(guild, channel, changes, executors.get(channel.id))
+            return
+        await self._log_group(guild, diffs, executors)
+
+    async def _log_single(self, guild: discord.Guild, after: discord.abc.GuildChannel, changes: List[str],
+                          executor: discord.User | None):
         title = self.embed_cfg.get('title_channel_update', 'Atualização de canal')
         joined = ', '.join(changes)
         if executor:
-            msg = self.msgs.get('channel_update', '{executor} modificou canal {channel} alterações: {changes}').format(executor=executor.mention, channel=after.mention if hasattr(after,'mention') else after.name, changes=joined)
+            msg = self.msgs.get('channel_update', '{executor} modificou canal {channel} alterações: {changes}').format(executor=executor.mention, channel=self._mention(after), changes=joined)
+        else:
+            msg = self.msgs.get('channel_update_unknown', 'Canal {channel} modificado (executor desconhecido) alterações: {changes}').format(channel=self._mention(after), changes=joined)
+        lines = [('Evento', msg[:1024], False)]
+        if len(msg) > 1024:
+            lines.append(('Alterações', _clip(changes, self.max_lines), False))
+        await self._log(guild, title, lines, action='channel_update', user=executor,
+                        target=after, channel=after, content=f'#{after.name} {msg}')
+
+    async def _log_group(self, guild: discord.Guild, diffs: List[Tuple[discord.abc.GuildChannel, List[str]]],
+                         executors: Dict[int, discord.User]):
+        count = len(diffs)
+        people = {u.id: u for u in executors.values()}
+        if people:
+            msg = self.msgs.get('channel_update_group', '{executor} modificou {count} canais').format(
+                executor=', '.join(u.mention for u in people.values()), count=count)
+        else:
+            msg = self.msgs.get('channel_update_group_unknown', '{count} canais modificados (executor desconhecido)').format(count=count)
+        lines = [('Evento', msg, False)]
+        distinct = {tuple(changes) for _, changes in diffs}
+        if len(distinct) == 1:
+            # Sincronização: a mesma mudança em todos os canais aparece uma vez só
+            lines.append(('Canais', _clip([self._mention(c) for c, _ in diffs], 40), False))
+            lines.append(('Alterações', _clip(diffs[0][1], self.max_lines), False))
         else:
-            msg = self.msgs.get('channel_update_unknown', 'Canal {channel} modificado (executor desconhecido) alterações: {changes}').format(channel=after.mention if hasattr(after,'mention') else after.name, changes=joined)
-        await self._log(after.guild, title, [('Evento', msg, False)])
+            per_channel = [f'{self._mention(c)}: {", ".join(changes)}' for c, changes in diffs]
+            lines.append(('Alterações por canal', _clip(per_channel, self.max_lines), False))
+        title = self.embed_cfg.get('title_channel_update_group', 'Atualização de canais em massa')
+        # Canal de log: uma entrada; arquivo pesquisável: uma por canal (o filtro canal: continua valendo)
+        await self._log(guild, title, lines)
+        for channel, changes in diffs:
+            executor = executors.get(channel.id)
+            archive_event(self.bot, guild, 'audit_channel', 'channel_update', user=executor, target=channel,
+                          channel=channel, content=f'#{channel.name} {", ".join(changes)}')
 
     @commands.Cog.listener()
     async def on_guild_channel_create(self, channel: discord.abc.GuildChannel):
@@ -141,10 +340,14 @@ class AuditChannelCog(commands.Cog):
             msg = self.msgs.get('channel_create', '{executor} criou canal {channel}').format(executor=executor.mention, channel=channel.mention if hasattr(channel,'mention') else channel.name)
         else:
             msg = self.msgs.get('channel_create_unknown', 'Canal {channel} criado (executor desconhecido)').format(channel=channel.mention if hasattr(channel,'mention') else channel.name)
-        await self._log(channel.guild, title, [('Evento', msg, False)])
+        await self._log(channel.guild, title, [('Evento', msg, False)], action='channel_create', user=executor,
+                        target=channel, channel=channel, content=f'#{channel.name} {msg}')
 
     @commands.Cog.listener()
     async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
+        pending = self._pending.get(channel.guild.id)
+        if pending is not None:
+            pending.channels.pop(channel.id, None)
         if not self.enabled or not self.opts.get('log_delete', False):
             return
         executor = await self._find_executor(channel.guild, channel, discord.AuditLogAction.channel_delete)
@@ -153,7 +356,8 @@ class AuditChannelCog(commands.Cog):
             msg = self.msgs.get('channel_delete', '{executor} excluiu canal {channel}').format(executor=executor.mention, channel=channel.name)
         else:
             msg = self.msgs.get('channel_delete_unknown', 'Canal {channel} excluído (executor desconhecido)').format(channel=channel.name)
-        await self._log(channel.guild, title, [('Evento', msg, False)])
+        await self._log(channel.guild, title, [('Evento', msg, False)], action='channel_delete', user=executor,
+                        target=channel, channel=channel.id, content=f'#{channel.name} {msg}')
 
     @commands.command(name='channelauditreload')
     async def channel_reload(self, ctx: commands.Context):
@@ -170,6 +374,8 @@ class AuditChannelCog(commands.Cog):
         lines.append(m.get('status_main', '').format(enabled=self.enabled, window=self.window))
         lines.append(m.get('status_channel', '').format(channel=ch.mention if ch else '(não definido)'))
         lines.append(m.get('status_opts', '').format(update=self.opts.get('log_update', True), create=self.opts.get('log_create', False), delete=self.opts.get('log_delete', False)))
+        lines.append(m.get('status_debounce', 'Agrupamento: {debounce}s (máx. {max}s) | Canais pendentes: {pending}').format(
+            debounce=self.debounce, max=self.debounce_max, pending=sum(len(p.channels) for p in self._pending.values())))
         await ctx.reply('\n'.join(lines))
 
 async def setup(bot: commands.Bot):
@@ -1,8 +1,9 @@
-import datetime
 import discord
 from discord.ext import commands
 from typing import Dict, Any, List, Tuple
 from config_loader import config_manager
+from cogs._audit_archive import archive_event
+from cogs._audit_cache import get_audit_cache
 
 DEFAULTS = {
     "audit_movecall": {
@@ -45,7 +46,10 @@ class AuditMoveCallCog(commands.Cog):
         self.raw_cfg = config_manager.reload_cog('audit_movecall')
         self.__init__(self.bot)
 
-    async def _log(self, guild: discord.Guild, title: str, lines: List[Tuple[str,str,bool]]):
+    async def _log(self, guild: discord.Guild, title: str, lines: List[Tuple[str,str,bool]], *, action: str = '',
+                   user=None, target=None, channel=None, content: str | None = None):
+        archive_event(self.bot, guild, 'audit_movecall', action, user=user, target=target, channel=channel,
+                      content=content, fields=lines)
         if not self.log_channel_id:
             return
         ch = guild.get_channel(self.log_channel_id)
@@ -74,15 +78,8 @@ class AuditMoveCallCog(commands.Cog):
     async def _find_executor(self, guild: discord.Guild, target: discord.Member, action: discord.AuditLogAction) -> discord.User | None:
         if not guild.me.guild_permissions.view_audit_log:
             return None
-        now = datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc)
-        async for entry in guild.audit_logs(limit=6, action=action):
-            if entry.target and getattr(entry.target, 'id', None) == target.id:
-                created = entry.created_at
-                if created.tzinfo is None:
-                    created = created.replace(tzinfo=datetime.timezone.utc)
-                if (now - created).total_seconds() <= self.window:
-                    return entry.user
-        return None
+        entry = await get_audit_cache(self.bot).find(guild, action, target.id, self.window, limit=6)
+        return entry.user if entry else None
 
     @commands.Cog.listener()
     async def on_voice_state_update(self, member: discord.Member, before: discord.VoiceState, after: discord.VoiceState):
@@ -119,7 +116,8 @@ class AuditMoveCallCog(commands.Cog):
                         'from': before_ch.mention if before_ch else '(nenhuma)'
                     })
                     title = self.embed_cfg.get('title_disconnect', 'Desconexão da call')
-                await self._log(member.guild, title, [('Evento', msg, False)])
+                await self._log(member.guild, title, [('Evento', msg, False)], action='voice_disconnect',
+                                user=executor, target=member, channel=before_ch)
             elif before_ch is None:
                 # Entrou - ignorar; foco em mover/desconectar
                 return
@@ -142,7 +140,8 @@ class AuditMoveCallCog(commands.Cog):
                         'to': after_ch.mention
                     })
                 title = self.embed_cfg.get('title_move', 'Movimento na call')
-                await self._log(member.guild, title, [('Evento', msg, False)])
+                await self._log(member.guild, title, [('Evento', msg, False)], action='voice_move',
+                                user=executor, target=member, channel=after_ch)
 
     @commands.command(name='movecallauditreload')
     async def movecall_reload(self, ctx: commands.Context):
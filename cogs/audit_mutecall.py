@@ -1,8 +1,9 @@
-import datetime
 import discord
 from discord.ext import commands
 from typing import Dict, Any, List, Tuple
 from config_loader import config_manager
+from cogs._audit_archive import archive_event
+from cogs._audit_cache import get_audit_cache
 
 DEFAULTS = {
     "audit_mutecall": {
@@ -48,7 +49,10 @@ class AuditMuteCallCog(commands.Cog):
         self.raw_cfg = config_manager.reload_cog('audit_mutecall')
         self.__init__(self.bot)
 
-    async def _log(self, guild: discord.Guild, title: str, lines: List[Tuple[str,str,bool]]):
+    async def _log(self, guild: discord.Guild, title: str, lines: List[Tuple[str,str,bool]], *, action: str = '',
+                   user=None, target=None, channel=None, content: str | None = None):
+        archive_event(self.bot, guild, 'audit_mutecall', action, user=user, target=target, channel=channel,
+                      content=content, fields=lines)
         if not self.log_channel_id:
             return
         ch = guild.get_channel(self.log_channel_id)
@@ -77,15 +81,8 @@ class AuditMuteCallCog(commands.Cog):
     async def _find_executor(self, guild: discord.Guild, target: discord.Member) -> discord.User | None:
         if not guild.me.guild_permissions.view_audit_log:
             return None
-        now = datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc)
-        async for entry in guild.audit_logs(limit=10, action=discord.AuditLogAction.member_update):
-            if entry.target and getattr(entry.target, 'id', None) == target.id:
-                created = entry.created_at
-                if created.tzinfo is None:
-                    created = created.replace(tzinfo=datetime.timezone.utc)
-                if (now - created).total_seconds() <= self.window:
-                    return entry.user
-        return None
+        entry = await get_audit_cache(self.bot).find(guild, discord.AuditLogAction.member_update, target.id, self.window, limit=10)
+        return entry.user if entry else None
 
     @commands.Cog.listener()
     async def on_voice_state_update(self, member: discord.Member, before: discord.VoiceState, after: discord.VoiceState):
@@ -106,7 +103,9 @@ class AuditMuteCallCog(commands.Cog):
                     msg = self.msgs.get('unmute_other', '{executor} removeu silêncio de {target}').format(executor=executor.mention, target=member.mention)
                 else:
                     msg = f"Silêncio removido de {member.mention} (executor desconhecido)"
-            await self._log(member.guild, title, [('Evento', msg, False)])
+            await self._log(member.guild, title, [('Evento', msg, False)],
+                            action='voice_mute' if after.mute else 'voice_unmute', user=executor, target=member,
+                            channel=after.channel)
         if before.deaf != after.deaf:
             executor = await self._find_executor(member.guild, member)
             if after.deaf:
@@ -121,7 +120,9 @@ class AuditMuteCallCog(commands.Cog):
                     msg = self.msgs.get('undeaf_other', '{executor} removeu ensurdecimento de {target}').format(executor=executor.mention, target=member.mention)
                 else:
                     msg = f"Ensurdecimento removido de {member.mention} (executor desconhecido)"
-            await self._log(member.guild, title, [('Evento', msg, False)])
+            await self._log(member.guild, title, [('Evento', msg, False)],
+                            action='voice_deaf' if after.deaf else 'voice_undeaf', user=executor, target=member,
+                            channel=after.channel)
 
     @commands.command(name='mutecallauditreload')
     async def mutecall_reload(self, ctx: commands.Context):
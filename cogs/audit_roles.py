@@ -1,8 +1,10 @@
-import datetime
 import discord
 from discord.ext import commands
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Set, Tuple
 from config_loader import config_manager
+from cogs._audit_archive import archive_event
+from cogs._audit_cache import get_audit_cache
+from cogs._perm_escalation import EscalationIndex, permission_mask, permission_names
 
 DEFAULTS = {
     "audit_roles": {
@@ -13,12 +15,23 @@ DEFAULTS = {
             "enabled": True,
             "color": "FFAA33",
             "title_roles": "Mudança de cargos",
-            "title_role_perms": "Permissões de cargo"
+            "title_role_perms": "Permissões de cargo",
+            "title_escalation": "Escalada de permissões"
         },
         "options": {
             "log_member_roles_change": True,
             "log_role_permissions_change": True
         },
+        # Bits perigosos que aparecem num cargo ou num membro fora de um caminho autorizado
+        "escalation": {
+            "enabled": True,
+            "action": "alert",  # alert | revert
+            "dangerous_permissions": ["administrator", "manage_guild", "manage_roles", "manage_channels",
+                                      "manage_webhooks", "ban_members", "kick_members", "moderate_members"],
+            "authorized_user_ids": [],
+            "authorized_role_ids": [],
+            "revert_unknown_executor": False
+        },
         "messages": {
             "roles_added": "{executor} adicionou cargos {roles} ao {target}",
             "roles_removed": "{executor} removeu cargos {roles} de {target}",
@@ -28,7 +41,10 @@ DEFAULTS = {
             "status_header": "Auditoria cargos",
             "status_main": "Habilitado: {enabled} | Janela: {window}s",
             "status_channel": "Canal log: {channel}",
-            "status_opts": "Log member roles: {member_roles} | Log role perms: {role_perms}"
+            "status_opts": "Log member roles: {member_roles} | Log role perms: {role_perms}",
+            "escalation_role": "Cargo {role} ganhou {perms}",
+            "escalation_member": "{target} ganhou {perms} via {roles}",
+            "status_escalation": "Escalada: ação={action} | detectadas: {count} | membros indexados: {indexed}"
         },
         "debug": False
     }
@@ -46,12 +62,27 @@ class AuditRolesCog(commands.Cog):
         self.msgs: Dict[str, str] = self.cfg.get('messages', {})
         self.opts: Dict[str, Any] = self.cfg.get('options', {})
         self.debug: bool = self.cfg.get('debug', False)
+        self.esc_cfg: Dict[str, Any] = self.cfg.get('escalation', {})
+        self.esc_users: Set[int] = set(self.esc_cfg.get('authorized_user_ids', []))
+        self.esc_roles: Set[int] = set(self.esc_cfg.get('authorized_role_ids', []))
+        mask = permission_mask(self.esc_cfg.get('dangerous_permissions', []))
+        # Sobrevive ao refresh_config (o __init__ é chamado de novo)
+        if not hasattr(self, 'escalation'):
+            self.escalation = EscalationIndex(mask)
+            self.escalations_seen = 0
+        else:
+            self.escalation.set_mask(mask)
+            for guild in self.bot.guilds:
+                self.escalation.load_guild(guild)
 
     def refresh_config(self):
         self.raw_cfg = config_manager.reload_cog('audit_roles')
         self.__init__(self.bot)
 
-    async def _log(self, guild: discord.Guild, title: str, lines: List[Tuple[str,str,bool]]):
+    async def _log(self, guild: discord.Guild, title: str, lines: List[Tuple[str,str,bool]], *, action: str = '',
+                   user=None, target=None, channel=None, content: str | None = None):
+        archive_event(self.bot, guild, 'audit_roles', action, user=user, target=target, channel=channel,
+                      content=content, fields=lines)
         if not self.log_channel_id:
             return
         ch = guild.get_channel(self.log_channel_id)
@@ -80,18 +111,76 @@ class AuditRolesCog(commands.Cog):
     async def _find_executor(self, guild: discord.Guild, target: discord.Member | discord.Role, action: discord.AuditLogAction) -> discord.User | None:
         if not guild.me.guild_permissions.view_audit_log:
             return None
-        now = datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc)
-        async for entry in guild.audit_logs(limit=10, action=action):
-            if entry.target and getattr(entry.target, 'id', None) == target.id:
-                created = entry.created_at
-                if created.tzinfo is None:
-                    created = created.replace(tzinfo=datetime.timezone.utc)
-                if (now - created).total_seconds() <= self.window:
-                    return entry.user
-        return None
+        entry = await get_audit_cache(self.bot).find(guild, action, target.id, self.window, limit=10)
+        return entry.user if entry else None
+
+    # ---------------- Escalada de permissões -----------------
+    def _esc_on(self) -> bool:
+        return self.enabled and self.esc_cfg.get('enabled', True) and bool(self.escalation.mask)
+
+    def _is_authorized_path(self, guild: discord.Guild, executor: discord.abc.User) -> bool:
+        if executor.id in self.esc_users or executor.id == guild.owner_id or executor.id == getattr(self.bot.user, 'id', None):
+            return True
+        member = guild.get_member(executor.id)
+        return bool(member and any(r.id in self.esc_roles for r in member.roles))
+
+    async def _handle_escalation(self, guild: discord.Guild, target: discord.Member | discord.Role, gained: int,
+                                 via: List[discord.Role], action: discord.AuditLogAction):
+        """Só roda quando algum bit perigoso apareceu; aí sim vale buscar o executor."""
+        self.escalations_seen += 1
+        executor = await self._find_executor(guild, target, action)
+        if executor is not None and self._is_authorized_path(guild, executor):
+            return
+        perms = ', '.join(permission_names(gained))
+        revert = self.esc_cfg.get('action', 'alert') == 'revert' and (
+            executor is not None or self.esc_cfg.get('revert_unknown_executor', False))
+        result = 'só alerta'
+        if revert:
+            reason = f'Escalada de permissões não autorizada ({perms})'
+            try:
+                if isinstance(target, discord.Role):
+                    await target.edit(permissions=discord.Permissions(target.permissions.value & ~gained), reason=reason)
+                else:
+                    await target.remove_roles(*via, reason=reason)
+                result = 'revertida'
+            except Exception as e:
+                result = f'falha ao reverter: {e}'[:200]
+        if isinstance(target, discord.Role):
+            msg = self.msgs.get('escalation_role', 'Cargo {role} ganhou {perms}').format(role=target.mention, perms=perms)
+        else:
+            msg = self.msgs.get('escalation_member', '{target} ganhou {perms} via {roles}').format(
+                target=target.mention, perms=perms, roles=', '.join(r.mention for r in via) or '(?)')
+        await self._log(guild, self.embed_cfg.get('title_escalation', 'Escalada de permissões'), [
+            ('Evento', msg, False),
+            ('Executor', executor.mention if executor else '(desconhecido)', True),
+            ('Ação', result, True)
+        ], action='permission_escalation', user=executor, target=target, content=f'{msg} {perms} {result}')
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        for guild in self.bot.guilds:
+            self.escalation.load_guild(guild)
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild: discord.Guild):
+        self.escalation.load_guild(guild)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        self.escalation.forget_guild(guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role: discord.Role):
+        self.escalation.role_deleted(role)
 
     @commands.Cog.listener()
     async def on_member_update(self, before: discord.Member, after: discord.Member):
+        if self._esc_on() and before.roles != after.roles:
+            esc = self.escalation.member_updated(before, after)
+            if esc.gained:
+                via = [r for r in after.roles if r.id in esc.role_ids]
+                await self._handle_escalation(after.guild, after, esc.gained, via,
+                                              discord.AuditLogAction.member_role_update)
         if not self.enabled or not self.opts.get('log_member_roles_change', True):
             return
         before_roles = set(r.id for r in before.roles)
@@ -105,20 +194,30 @@ class AuditRolesCog(commands.Cog):
         added_mentions = [after.guild.get_role(rid).mention for rid in added_ids if after.guild.get_role(rid)]
         removed_mentions = [after.guild.get_role(rid).mention for rid in removed_ids if after.guild.get_role(rid)]
         executor = await self._find_executor(after.guild, after, discord.AuditLogAction.member_role_update)
+        # Nomes para a busca no arquivo (menções não são pesquisáveis)
+        added_names = ' '.join(after.guild.get_role(rid).name for rid in added_ids if after.guild.get_role(rid))
+        removed_names = ' '.join(after.guild.get_role(rid).name for rid in removed_ids if after.guild.get_role(rid))
         title = self.embed_cfg.get('title_roles', 'Mudança de cargos')
         if executor:
             if added_mentions:
                 msg_add = self.msgs.get('roles_added', '{executor} adicionou cargos {roles} ao {target}').format(executor=executor.mention, roles=', '.join(added_mentions), target=after.mention)
-                await self._log(after.guild, title, [('Evento', msg_add, False)])
+                await self._log(after.guild, title, [('Evento', msg_add, False)], action='member_roles_add',
+                                user=executor, target=after, content=f'{msg_add} {added_names}')
             if removed_mentions:
                 msg_rem = self.msgs.get('roles_removed', '{executor} removeu cargos {roles} de {target}').format(executor=executor.mention, roles=', '.join(removed_mentions), target=after.mention)
-                await self._log(after.guild, title, [('Evento', msg_rem, False)])
+                await self._log(after.guild, title, [('Evento', msg_rem, False)], action='member_roles_remove',
+                                user=executor, target=after, content=f'{msg_rem} {removed_names}')
         else:
             msg = self.msgs.get('roles_changed_unknown', 'Cargos mudaram em {target} (executor desconhecido) adicionados: {added} removidos: {removed}').format(target=after.mention, added=', '.join(added_mentions) or '(nenhum)', removed=', '.join(removed_mentions) or '(nenhum)')
-            await self._log(after.guild, title, [('Evento', msg, False)])
+            await self._log(after.guild, title, [('Evento', msg, False)], action='member_roles_change',
+                            target=after, content=f'{msg} {added_names} {removed_names}')
 
     @commands.Cog.listener()
     async def on_guild_role_update(self, before: discord.Role, after: discord.Role):
+        if self._esc_on():
+            gained = self.escalation.role_updated(before, after)
+            if gained:
+                await self._handle_escalation(after.guild, after, gained, [], discord.AuditLogAction.role_update)
         if not self.enabled or not self.opts.get('log_role_permissions_change', True):
             return
         if before.permissions != after.permissions or before.name != after.name or before.color != after.color or before.hoist != after.hoist or before.mentionable != after.mentionable:
@@ -128,7 +227,8 @@ class AuditRolesCog(commands.Cog):
                 msg = self.msgs.get('role_perms_changed', '{executor} modificou permissões do cargo {role}').format(executor=executor.mention, role=after.mention)
             else:
                 msg = self.msgs.get('role_perms_changed_unknown', 'Permissões modificadas em {role} (executor desconhecido)').format(role=after.mention)
-            await self._log(after.guild, title, [('Evento', msg, False)])
+            await self._log(after.guild, title, [('Evento', msg, False)], action='role_update', user=executor,
+                            target=after, content=f'@{after.name} {msg}')
 
     @commands.command(name='rolesauditreload')
     async def roles_reload(self, ctx: commands.Context):
@@ -145,6 +245,9 @@ class AuditRolesCog(commands.Cog):
         lines.append(m.get('status_main', '').format(enabled=self.enabled, window=self.window))
         lines.append(m.get('status_channel', '').format(channel=ch.mention if ch else '(não definido)'))
         lines.append(m.get('status_opts', '').format(member_roles=self.opts.get('log_member_roles_change', True), role_perms=self.opts.get('log_role_permissions_change', True)))
+        lines.append(m.get('status_escalation', 'Escalada: ação={action} | detectadas: {count} | membros indexados: {indexed}').format(
+            action=self.esc_cfg.get('action', 'alert') if self._esc_on() else 'desligada',
+            count=self.escalations_seen, indexed=len(self.escalation)))
         await ctx.reply('\n'.join(lines))
 
 async def setup(bot: commands.Bot):
@@ -1,8 +1,14 @@
 import datetime
 import discord
+import time
+from collections import OrderedDict
 from discord.ext import commands
 from typing import Dict, Any, List, Tuple
 from config_loader import config_manager
+from cogs._audit_archive import archive_event
+from cogs._audit_cache import get_audit_cache
+from cogs._message_cache import CachedMessage, MessageCache
+from cogs._transcript import Transcript
 
 DEFAULTS = {
     "audit_user": {
@@ -14,6 +20,7 @@ DEFAULTS = {
             "color": "0077AA",
             "title_message_delete": "Mensagem apagada",
             "title_message_bulk_delete": "Mensagens apagadas em massa",
+            "title_manual_purge": "Limpeza de chat",
             "title_voice_join": "Entrou na call",
             "title_voice_leave": "Saiu da call",
             "title_voice_move": "Moveu de call"
@@ -24,13 +31,30 @@ DEFAULTS = {
             "log_voice": True,
             "include_content": True,
             "truncate_content": 300,
-            "avoid_duplicate_with_movecall": True
+            "avoid_duplicate_with_movecall": True,
+            # Anexa ao log um arquivo .gz com as mensagens apagadas em massa
+            "bulk_transcript": True,
+            "transcript_format": "txt"
+        },
+        # Conteúdo das mensagens recentes para logar deleções fora do cache do discord.py
+        "message_cache": {
+            "enabled": True,
+            "per_channel": 200,
+            "max_megabytes": 32,
+            "compress": True,
+            "compress_min_bytes": 64,
+            "include_bots": False
         },
         "messages": {
             "message_delete_other": "{executor} apagou mensagem de {author}",
             "message_delete_self": "{author} apagou a própria mensagem",
             "message_delete_unknown": "Mensagem de {author} apagada (executor desconhecido)",
             "message_bulk_delete": "{executor} apagou {count} mensagens em {channel}",
+            "message_bulk_recovered": "{found} de {count} com conteúdo",
+            "message_delete_uncached": "Mensagem {id} apagada (conteúdo fora do cache)",
+            "manual_purge": "{executor} limpou {count} mensagens em {channel}",
+            "transcript_attached": "{count} mensagens no anexo ({size})",
+            "transcript_too_big": "Transcrição grande demais para anexar ({size})",
             "voice_join_self": "{user} entrou em {channel}",
             "voice_leave_self": "{user} saiu de {channel}",
             "voice_move_self": "{user} moveu-se de {from} para {to}",
@@ -38,7 +62,8 @@ DEFAULTS = {
             "status_header": "Auditoria usuário",
             "status_main": "Habilitado: {enabled} | Janela audit: {window}s",
             "status_opts": "Msg delete: {msgdel} | Bulk: {bulk} | Voz: {voice}"
-            ,"status_dup": "Evitar duplicatas movecall: {avoid_dup}"
+            ,"status_dup": "Evitar duplicatas movecall: {avoid_dup}",
+            "status_cache": "Cache de conteúdo: {cache}"
         },
         "debug": False
     }
@@ -56,12 +81,30 @@ class AuditUserCog(commands.Cog):
         self.msgs: Dict[str, str] = self.cfg.get('messages', {})
         self.opts: Dict[str, Any] = self.cfg.get('options', {})
         self.debug: bool = self.cfg.get('debug', False)
+        self.cache_cfg: Dict[str, Any] = self.cfg.get('message_cache', {})
+        self.cache_enabled: bool = self.enabled and self.cache_cfg.get('enabled', True)
+        settings = (int(self.cache_cfg.get('per_channel', 200)), int(float(self.cache_cfg.get('max_megabytes', 32)) * 1024 * 1024),
+                    self.cache_cfg.get('compress', True), int(self.cache_cfg.get('compress_min_bytes', 64)))
+        # Fica no bot: sobrevive a reload da extensão e ao refresh_config
+        cache = getattr(self.bot, '_message_content_cache', None)
+        if not isinstance(cache, MessageCache):
+            cache = self.bot._message_content_cache = MessageCache(*settings)
+        else:
+            cache.configure(*settings)
+        self.message_cache: MessageCache = cache
+        # Ids que o !clear está apagando (id -> expira em): o comando loga esses com transcrição,
+        # os eventos de deleção deles não; deleções de outros no mesmo canal seguem logadas
+        if not hasattr(self, '_purged_ids'):
+            self._purged_ids: 'OrderedDict[int, float]' = OrderedDict()
 
     def refresh_config(self):
         self.raw_cfg = config_manager.reload_cog('audit_user')
         self.__init__(self.bot)
 
-    async def _log(self, guild: discord.Guild, title: str, fields: List[Tuple[str,str,bool]]):
+    async def _log(self, guild: discord.Guild, title: str, fields: List[Tuple[str,str,bool]], *, action: str = '',
+                   user=None, target=None, channel=None, content: str | None = None, file: discord.File | None = None):
+        archive_event(self.bot, guild, 'audit_user', action, user=user, target=target, channel=channel,
+                      content=content, fields=fields)
         if not self.log_channel_id:
             return
         ch = guild.get_channel(self.log_channel_id)
@@ -77,104 +120,211 @@ class AuditUserCog(commands.Cog):
             for n,v,i in fields:
                 embed.add_field(name=n, value=v, inline=i)
             try:
-                await ch.send(embed=embed)
+                await ch.send(embed=embed, file=file) if file else await ch.send(embed=embed)
             except Exception:
                 pass
         else:
             try:
                 txt = title + '\n' + '\n'.join(f"{n}: {v}" for n,v,_ in fields)
-                await ch.send(txt)
+                await ch.send(txt, file=file) if file else await ch.send(txt)
             except Exception:
                 pass
 
     async def _find_executor_message_delete(self, guild: discord.Guild, author: discord.User | discord.Member, channel: discord.TextChannel) -> discord.User | None:
         if not guild.me.guild_permissions.view_audit_log:
             return None
-        now = datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc)
-        async for entry in guild.audit_logs(limit=6, action=discord.AuditLogAction.message_delete):
-            if entry.target and getattr(entry.target, 'id', None) == author.id:
-                created = entry.created_at
-                if created.tzinfo is None:
-                    created = created.replace(tzinfo=datetime.timezone.utc)
-                if (now - created).total_seconds() <= self.window:
-                    extra = getattr(entry, 'extra', None)
-                    # Optionally match channel if available
-                    if extra and getattr(extra, 'channel', None) and extra.channel.id != channel.id:
-                        continue
-                    return entry.user
-        return None
+        def same_channel(entry: discord.AuditLogEntry) -> bool:
+            extra = getattr(entry, 'extra', None)
+            # Optionally match channel if available
+            return not (extra and getattr(extra, 'channel', None) and extra.channel.id != channel.id)
+
+        entry = await get_audit_cache(self.bot).find(guild, discord.AuditLogAction.message_delete, author.id,
+                                                     self.window, limit=6, predicate=same_channel)
+        return entry.user if entry else None
 
     async def _find_executor_voice(self, guild: discord.Guild, member: discord.Member, action: discord.AuditLogAction) -> discord.User | None:
         if not guild.me.guild_permissions.view_audit_log:
             return None
-        now = datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc)
-        async for entry in guild.audit_logs(limit=6, action=action):
-            if entry.target and getattr(entry.target, 'id', None) == member.id:
-                created = entry.created_at
-                if created.tzinfo is None:
-                    created = created.replace(tzinfo=datetime.timezone.utc)
-                if (now - created).total_seconds() <= self.window:
-                    return entry.user
-        return None
+        entry = await get_audit_cache(self.bot).find(guild, action, member.id, self.window, limit=6)
+        return entry.user if entry else None
+
+    # ---------------- Cache de conteúdo -----------------
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message):
+        if not self.cache_enabled or message.guild is None:
+            return
+        if message.author.bot and not self.cache_cfg.get('include_bots', False):
+            return
+        self.message_cache.add(CachedMessage.from_message(message))
+
+    @commands.Cog.listener()
+    async def on_raw_message_edit(self, payload: discord.RawMessageUpdateEvent):
+        if 'content' in payload.data:
+            self.message_cache.update_content(payload.message_id, payload.data['content'] or '')
 
     @commands.Cog.listener()
-    async def on_message_delete(self, message: discord.Message):
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
+        self.message_cache.forget_channel(channel.id)
+
+    def _recover(self, message_id: int, cached_message: discord.Message | None) -> CachedMessage | None:
+        """Consome a entrada do cache próprio; usa a mensagem do discord.py se ela ainda existir."""
+        ours = self.message_cache.pop(message_id)
+        if cached_message is not None and cached_message.guild is not None:
+            return CachedMessage.from_message(cached_message)
+        return ours
+
+    def _content_text(self, m: CachedMessage) -> str:
+        text = m.content or '(sem texto)'
+        if m.attachments:
+            text += '\n' + '\n'.join(f'📎 {name} ({size / 1024:.0f} KiB)' for name, size, _ in m.attachments)
+        return text
+
+    # ---------------- Transcrições -----------------
+    def new_transcript(self, channel: discord.abc.GuildChannel, title: str) -> Transcript:
+        subtitle = f'#{channel.name} ({channel.id}) | {datetime.datetime.utcnow():%Y-%m-%d %H:%M} UTC'
+        return Transcript(title, subtitle, fmt=self.opts.get('transcript_format', 'txt'))
+
+    def _attach(self, guild: discord.Guild, transcript: Transcript, name: str) -> Tuple[discord.File | None, str]:
+        """Arquivo para o log (ou None se passar do limite de upload do servidor) e a linha de resumo."""
+        size = transcript.close()
+        size_txt = f'{size / 1024:.0f} KiB'
+        if size > guild.filesize_limit:
+            return None, self.msgs.get('transcript_too_big', 'Transcrição grande demais para anexar ({size})').format(size=size_txt)
+        line = self.msgs.get('transcript_attached', '{count} mensagens no anexo ({size})').format(count=transcript.count, size=size_txt)
+        return transcript.to_file(name), line
+
+    def expect_purge(self, message_ids: List[int], ttl: float = 60.0):
+        """Marca ids que o !clear vai apagar (chamar antes da deleção: o evento pode chegar antes da resposta HTTP)."""
+        now = time.monotonic()
+        purged = self._purged_ids
+        # Expurgo dos antigos (inserção em ordem de expiração)
+        while purged and next(iter(purged.values())) < now:
+            purged.popitem(last=False)
+        for mid in message_ids:
+            purged[mid] = now + ttl
+
+    def _consume_purged(self, message_ids: List[int]) -> List[int]:
+        """Remove dos ids os apagados pelo !clear; devolve os que sobraram (deleções de outros)."""
+        purged = self._purged_ids
+        return [mid for mid in message_ids if purged.pop(mid, None) is None]
+
+    async def log_manual_purge(self, channel: discord.TextChannel, executor: discord.abc.User, count: int,
+                               transcript: Transcript | None):
+        """Entrada única do !clear, com a transcrição em anexo."""
+        guild = channel.guild
+        if not self.enabled or not self.opts.get('log_bulk_delete', True):
+            return
+        msg_line = self.msgs.get('manual_purge', '{executor} limpou {count} mensagens em {channel}').format(
+            executor=executor.mention, count=count, channel=channel.mention)
+        fields = [('Evento', msg_line, False), ('Canal', channel.mention, True)]
+        file = None
+        if transcript is not None:
+            file, line = self._attach(guild, transcript, f'limpeza-{channel.id}')
+            fields.append(('Transcrição', line, True))
+        await self._log(guild, self.embed_cfg.get('title_manual_purge', 'Limpeza de chat'), fields,
+                        action='message_purge', user=executor, channel=channel, content=msg_line, file=file)
+
+    # ---------------- Deleções -----------------
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent):
+        recovered = self._recover(payload.message_id, payload.cached_message)
+        if not self._consume_purged([payload.message_id]):
+            return
         if not self.enabled or not self.opts.get('log_message_delete', True):
             return
-        if not message.guild or not message.author:
+        guild = self.bot.get_guild(payload.guild_id) if payload.guild_id else None
+        if guild is None:
             return
-        guild = message.guild
-        author = message.author
-        channel = message.channel if isinstance(message.channel, discord.TextChannel) else None
-        if channel is None:
+        channel = guild.get_channel(payload.channel_id)
+        if not isinstance(channel, discord.TextChannel):
             return
-        executor = await self._find_executor_message_delete(guild, author, channel)
         title = self.embed_cfg.get('title_message_delete', 'Mensagem apagada')
+        if recovered is None:
+            # Nem o discord.py nem o cache próprio viram a mensagem (anterior ao boot ou já expulsa)
+            msg_line = self.msgs.get('message_delete_uncached', 'Mensagem {id} apagada (conteúdo fora do cache)').format(id=payload.message_id)
+            await self._log(guild, title, [('Evento', msg_line, False), ('Canal', channel.mention, True)],
+                            action='message_delete', channel=channel)
+            return
+        author_id = recovered.author_id
+        author_mention = f'<@{author_id}>'
+        executor = await self._find_executor_message_delete(guild, discord.Object(author_id), channel)
         content_field = ''
         if self.opts.get('include_content', True):
-            raw = message.content or '(sem texto)'
+            raw = self._content_text(recovered)
             limit = int(self.opts.get('truncate_content', 300))
             if len(raw) > limit:
                 raw = raw[:limit] + '…'
             content_field = raw.replace('`', '\u200b`')
         if executor:
-            if executor.id == author.id:
-                msg_line = self.msgs.get('message_delete_self', '{author} apagou a própria mensagem').format(author=author.mention)
+            if executor.id == author_id:
+                msg_line = self.msgs.get('message_delete_self', '{author} apagou a própria mensagem').format(author=author_mention)
             else:
-                msg_line = self.msgs.get('message_delete_other', '{executor} apagou mensagem de {author}').format(executor=executor.mention, author=author.mention)
+                msg_line = self.msgs.get('message_delete_other', '{executor} apagou mensagem de {author}').format(executor=executor.mention, author=author_mention)
         else:
-            msg_line = self.msgs.get('message_delete_unknown', 'Mensagem de {author} apagada (executor desconhecido)').format(author=author.mention)
+            msg_line = self.msgs.get('message_delete_unknown', 'Mensagem de {author} apagada (executor desconhecido)').format(author=author_mention)
         fields = [
             ('Evento', msg_line, False),
             ('Canal', channel.mention, True),
-            ('Autor', author.mention, True)
+            ('Autor', author_mention, True)
         ]
         if content_field:
             fields.append(('Conteúdo', content_field, False))
-        await self._log(guild, title, fields)
+        # O arquivo guarda o texto inteiro (o embed é truncado)
+        await self._log(guild, title, fields, action='message_delete', user=executor, target=author_id, channel=channel,
+                        content=f'{recovered.author_name}: {self._content_text(recovered)}')
 
     @commands.Cog.listener()
-    async def on_bulk_message_delete(self, messages: List[discord.Message]):
-        if not self.enabled or not self.opts.get('log_bulk_delete', True):
-            return
-        if not messages:
+    async def on_raw_bulk_message_delete(self, payload: discord.RawBulkMessageDeleteEvent):
+        from_lib = {m.id: m for m in payload.cached_messages}
+        # Apagadas pelo !clear só liberam o cache; o comando loga elas
+        for mid in payload.message_ids:
+            if mid in self._purged_ids:
+                self._recover(mid, None)
+        ids = sorted(self._consume_purged(list(payload.message_ids)))
+        # Até 100 por evento (limite do bulk delete): cabe em memória sem problema
+        found = [(mid, self._recover(mid, from_lib.get(mid))) for mid in ids]
+        recovered = [m for _, m in found if m is not None]
+        if not self.enabled or not self.opts.get('log_bulk_delete', True) or not ids:
             return
-        guild = messages[0].guild
+        guild = self.bot.get_guild(payload.guild_id) if payload.guild_id else None
         if guild is None:
             return
-        channel = messages[0].channel if isinstance(messages[0].channel, discord.TextChannel) else None
-        if channel is None:
+        channel = guild.get_channel(payload.channel_id)
+        if not isinstance(channel, discord.TextChannel):
             return
         # Bulk delete audit log entry target may not match; we take first author as sample
-        sample_author = messages[0].author
-        executor = await self._find_executor_message_delete(guild, sample_author, channel)
-        count = len(messages)
+        executor = None
+        if recovered:
+            executor = await self._find_executor_message_delete(guild, discord.Object(recovered[0].author_id), channel)
+        count = len(ids)
         title = self.embed_cfg.get('title_message_bulk_delete', 'Mensagens apagadas em massa')
         if executor:
             msg_line = self.msgs.get('message_bulk_delete', '{executor} apagou {count} mensagens em {channel}').format(executor=executor.mention, count=count, channel=channel.mention)
         else:
             msg_line = f"{count} mensagens apagadas em {channel.mention} (executor desconhecido)"
-        await self._log(guild, title, [('Evento', msg_line, False)])
+        fields = [('Evento', msg_line, False),
+                  ('Recuperadas', self.msgs.get('message_bulk_recovered', '{found} de {count} com conteúdo').format(found=len(recovered), count=count), True)]
+        file = transcript = None
+        if self.opts.get('bulk_transcript', True):
+            transcript = self.new_transcript(channel, title)
+            for mid, m in found:
+                if m is not None:
+                    transcript.add(m)
+                else:
+                    transcript.add_missing(mid)
+            file, line = self._attach(guild, transcript, f'apagadas-{channel.id}')
+            fields.append(('Transcrição', line, True))
+        elif recovered and self.opts.get('include_content', True):
+            limit = int(self.opts.get('truncate_content', 300))
+            # Últimas mensagens primeiro no embed (as mais prováveis de interessar)
+            preview = '\n'.join(f'{m.author_name}: {m.content[:80] or "(anexo)"}' for m in recovered[-8:])
+            fields.append(('Conteúdo (últimas)', preview[:max(limit, 300)].replace('`', '\u200b`'), False))
+        try:
+            await self._log(guild, title, fields, action='message_bulk_delete', user=executor, channel=channel,
+                            content='\n'.join(f'{m.author_name}: {m.content}' for m in recovered)[:20000] or msg_line, file=file)
+        finally:
+            if transcript is not None:
+                transcript.discard()
 
     @commands.Cog.listener()
     async def on_voice_state_update(self, member: discord.Member, before: discord.VoiceState, after: discord.VoiceState):
@@ -194,13 +344,15 @@ class AuditUserCog(commands.Cog):
         if before_ch is None and after_ch is not None:
             title = self.embed_cfg.get('title_voice_join', 'Entrou na call')
             msg_line = self.msgs.get('voice_join_self', '{user} entrou em {channel}').format(user=member.mention, channel=after_ch.mention)
-            await self._log(member.guild, title, [('Evento', msg_line, False)])
+            await self._log(member.guild, title, [('Evento', msg_line, False)], action='voice_join', user=member,
+                            channel=after_ch)
             return
         # Leave
         if after_ch is None and before_ch is not None:
             title = self.embed_cfg.get('title_voice_leave', 'Saiu da call')
             msg_line = self.msgs.get('voice_leave_self', '{user} saiu de {channel}').format(user=member.mention, channel=before_ch.mention)
-            await self._log(member.guild, title, [('Evento', msg_line, False)])
+            await self._log(member.guild, title, [('Evento', msg_line, False)], action='voice_leave', user=member,
+                            channel=before_ch)
             return
         # Move
         if before_ch and after_ch and before_ch != after_ch:
@@ -221,7 +373,8 @@ class AuditUserCog(commands.Cog):
                     'from': before_ch.mention,
                     'to': after_ch.mention
                 })
-            await self._log(member.guild, title, [('Evento', msg_line, False)])
+            await self._log(member.guild, title, [('Evento', msg_line, False)], action='voice_move', user=executor,
+                            target=member, channel=after_ch)
 
     @commands.command(name='userauditreload')
     async def user_audit_reload(self, ctx: commands.Context):
@@ -238,6 +391,8 @@ class AuditUserCog(commands.Cog):
         lines.append(m.get('status_main', '').format(enabled=self.enabled, window=self.window))
         lines.append(m.get('status_opts', '').format(msgdel=self.opts.get('log_message_delete', True), bulk=self.opts.get('log_bulk_delete', True), voice=self.opts.get('log_voice', True)))
         lines.append(m.get('status_dup', '').format(avoid_dup=self.opts.get('avoid_duplicate_with_movecall', True)))
+        lines.append(m.get('status_cache', 'Cache de conteúdo: {cache}').format(
+            cache=self.message_cache.line() if self.cache_enabled else 'desligado'))
         lines.append(f"Canal log: {ch.mention if ch else '(não definido)'}")
         await ctx.reply('\n'.join(lines))
 
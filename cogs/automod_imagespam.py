@@ -0,0 +1,312 @@
+import asyncio
+import datetime
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List
+
+import discord
+from discord.ext import commands
+
+from config_loader import config_manager
+from cogs._image_hash import PILLOW_AVAILABLE, HashEntry, HashWindow, image_fingerprint
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "automod_imagespam": {
+        "enabled": True,
+        "debug": False,
+        "log_channel_id": 0,
+        "action": "delete_warn",  # delete | delete_warn | delete_punish
+        "punishment": {
+            "type": "timeout",
+            "duration_seconds": 600,
+            "reason": "Spam de imagens"
+        },
+        "fingerprint": {
+            "algorithm": "dhash",  # dhash | ahash
+            "hash_size": 8,
+            "max_distance": 3,
+            "max_image_mb": 8,
+            "workers": 2,
+            "max_pending": 64,
+            # Acima de max_pending as mensagens esperam na fila (até max_queued / queue_wait_seconds)
+            "max_queued": 1000,
+            "queue_wait_seconds": 30
+        },
+        "window": {
+            "seconds": 120,
+            "max_entries": 2000
+        },
+        "thresholds": {
+            "distinct_authors": 3,
+            "same_author_repeats": 3
+        },
+        "ignore": {
+            "channel_ids": [],
+            "user_ids": [],
+            "role_ids": []
+        },
+        "warn": {
+            "message": "{user} imagem repetida detectada: {reason}",
+            "delete_delay": 6
+        },
+        "messages": {
+            "reason_multi_author": "mesma imagem enviada por {authors} contas",
+            "reason_repeat": "mesma imagem repetida {count}x",
+            "log_title": "Spam de imagens detectado",
+            "status_header": "Automod ImageSpam — resumo",
+            "status_main": "Enabled: {enabled} | Ação: {action} | Algoritmo: {algorithm} | Distância: {distance} | Janela: {window}s/{max_entries}",
+            "status_thresholds": "Autores distintos: {authors} | Repetições mesmo autor: {repeats} | Hashes em memória: {stored}",
+            "status_queue": "Em verificação/fila: {active}/{queued} | Não verificadas: {dropped}"
+        }
+    }
+}
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.webp', '.bmp')
+
+
+class AutoModImageSpam(commands.Cog):
+    """Detecta a mesma imagem (hash perceptual) postada por várias contas ou repetida pela mesma conta."""
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.raw_cfg = config_manager.load_cog('automod_imagespam', defaults=DEFAULTS)
+        self.cfg = self.raw_cfg.get('automod_imagespam', {})
+        self.enabled: bool = self.cfg.get('enabled', True)
+        self.debug: bool = self.cfg.get('debug', False)
+        self.log_channel_id: int = self.cfg.get('log_channel_id', 0)
+        self.action: str = self.cfg.get('action', 'delete_warn')
+        self.punish_cfg: Dict[str, Any] = self.cfg.get('punishment', {})
+        self.fp_cfg: Dict[str, Any] = self.cfg.get('fingerprint', {})
+        self.window_cfg: Dict[str, Any] = self.cfg.get('window', {})
+        self.thresholds: Dict[str, Any] = self.cfg.get('thresholds', {})
+        self.ignore_cfg: Dict[str, Any] = self.cfg.get('ignore', {})
+        self.warn_cfg: Dict[str, Any] = self.cfg.get('warn', {})
+        self.msgs: Dict[str, str] = self.cfg.get('messages', {})
+
+        self.algorithm: str = self.fp_cfg.get('algorithm', 'dhash')
+        self.hash_size: int = int(self.fp_cfg.get('hash_size', 8))
+        self.max_distance: int = int(self.fp_cfg.get('max_distance', 3))
+        self.max_image_bytes: int = int(float(self.fp_cfg.get('max_image_mb', 8)) * 1024 * 1024)
+        self.ignore_roles = frozenset(self.ignore_cfg.get('role_ids', []))
+
+        if self.enabled and not PILLOW_AVAILABLE:
+            logger.warning('automod_imagespam desativada: Pillow não está instalado.')
+            self.enabled = False
+
+        # guild_id -> janela de hashes recentes (memória limitada por max_entries)
+        # Sobrevive ao refresh_config (o __init__ é chamado de novo) se o formato dos hashes não mudou
+        window_params = (self.hash_size, self.max_distance, self.window_cfg.get('seconds', 120),
+                         self.window_cfg.get('max_entries', 2000))
+        if not hasattr(self, '_windows') or self._window_params != window_params:
+            self._windows: Dict[int, HashWindow] = {}
+        self._window_params = window_params
+        self._pool: ProcessPoolExecutor | None = None
+        # Limita downloads/decodes simultâneos; o excesso espera na fila (limitada em tamanho e tempo).
+        # Semáforo e contadores são do processo todo: handlers em andamento liberam o mesmo semáforo
+        # depois de um refresh_config (um max_pending novo só vale ao recarregar a extensão).
+        if not hasattr(self, '_pending'):
+            self._pending = asyncio.Semaphore(max(1, int(self.fp_cfg.get('max_pending', 64))))
+            self._queued = 0
+            self._active = 0
+            self.dropped = 0  # imagens não verificadas por fila cheia/espera esgotada
+            self._last_drop_warn = float('-inf')
+        self.max_queued: int = max(0, int(self.fp_cfg.get('max_queued', 1000)))
+        self.queue_wait: float = max(0.1, float(self.fp_cfg.get('queue_wait_seconds', 30)))
+
+    def refresh_config(self):
+        old_pool = self._pool
+        self.raw_cfg = config_manager.reload_cog('automod_imagespam')
+        self.__init__(self.bot)
+        if old_pool is not None:
+            # Sem cancelar: os fingerprints já enviados terminam no pool antigo
+            old_pool.shutdown(wait=False)
+
+    async def cog_unload(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    # ----------------- Helpers -----------------
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=max(1, int(self.fp_cfg.get('workers', 2))))
+        return self._pool
+
+    def _window(self, guild_id: int) -> HashWindow:
+        win = self._windows.get(guild_id)
+        if win is None:
+            bits = self.hash_size * self.hash_size
+            win = HashWindow(
+                window_seconds=float(self.window_cfg.get('seconds', 120)),
+                max_entries=int(self.window_cfg.get('max_entries', 2000)),
+                bits=bits,
+                bands=max(4, self.max_distance + 1)
+            )
+            self._windows[guild_id] = win
+        return win
+
+    def _ignored(self, message: discord.Message) -> bool:
+        if not message.guild or message.author.bot:
+            return True
+        if message.channel.id in self.ignore_cfg.get('channel_ids', []):
+            return True
+        if message.author.id in self.ignore_cfg.get('user_ids', []):
+            return True
+        if self.ignore_roles and any(r.id in self.ignore_roles for r in getattr(message.author, 'roles', [])):
+            return True
+        return False
+
+    def _is_image(self, att: discord.Attachment) -> bool:
+        ctype = (att.content_type or '').lower()
+        if ctype:
+            return ctype.startswith('image/')
+        return att.filename.lower().endswith(IMAGE_EXTENSIONS)
+
+    async def fingerprint_bytes(self, data: bytes) -> int | None:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_pool(), image_fingerprint, data, self.algorithm, self.hash_size)
+
+    async def _fingerprint(self, att: discord.Attachment) -> int | None:
+        if att.size > self.max_image_bytes:
+            return None
+        try:
+            data = await att.read(use_cached=True)
+        except Exception:
+            return None
+        return await self.fingerprint_bytes(data)
+
+    def check_hash(self, guild_id: int, value: int, author_id: int, channel_id: int, message_id: int, now: float) -> str | None:
+        """Registra o hash na janela da guild e retorna o motivo se for spam."""
+        win = self._window(guild_id)
+        matches = win.similar(value, self.max_distance, now)
+        win.add(HashEntry(now, value, author_id, channel_id, message_id))
+        authors = {m.author_id for m in matches}
+        authors.add(author_id)
+        distinct_needed = int(self.thresholds.get('distinct_authors', 3))
+        if distinct_needed > 0 and len(authors) >= distinct_needed:
+            return self.msgs.get('reason_multi_author', 'mesma imagem enviada por {authors} contas').format(authors=len(authors))
+        repeats_needed = int(self.thresholds.get('same_author_repeats', 3))
+        same = 1 + sum(1 for m in matches if m.author_id == author_id)
+        if repeats_needed > 0 and same >= repeats_needed:
+            return self.msgs.get('reason_repeat', 'mesma imagem repetida {count}x').format(count=same)
+        return None
+
+    # ----------------- Logging & Punir -----------------
+    async def _log(self, guild: discord.Guild, message: discord.Message, reason: str, value: int):
+        if not self.log_channel_id:
+            return
+        ch = guild.get_channel(self.log_channel_id)
+        if not isinstance(ch, discord.TextChannel):
+            return
+        embed = discord.Embed(title=self.msgs.get('log_title', 'Spam de imagens detectado'), color=int('FF5500', 16))
+        embed.add_field(name='Autor', value=message.author.mention, inline=True)
+        embed.add_field(name='Canal', value=message.channel.mention, inline=True)
+        embed.add_field(name='Motivo', value=reason, inline=False)
+        embed.add_field(name='Hash', value=f'`{value:0{self.hash_size * self.hash_size // 4}x}`', inline=False)
+        try:
+            await ch.send(embed=embed)
+        except Exception:
+            pass
+
+    async def _apply_punishment(self, member: discord.Member, reason: str):
+        if self.action != 'delete_punish':
+            return
+        if self.punish_cfg.get('type', 'timeout') == 'timeout':
+            duration = int(self.punish_cfg.get('duration_seconds', 600))
+            until = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=duration)
+            try:
+                await member.timeout(until, reason=self.punish_cfg.get('reason', reason))
+            except Exception:
+                if self.debug:
+                    print('[automod_imagespam] Falha timeout')
+
+    async def _handle_violation(self, message: discord.Message, reason: str, value: int):
+        try:
+            await message.delete()
+        except Exception:
+            return
+        if self.action in ('delete_warn', 'delete_punish'):
+            text = self.warn_cfg.get('message', '{user} imagem repetida detectada: {reason}').format(user=message.author.mention, reason=reason)
+            try:
+                sent = await message.channel.send(text)
+                delay = int(self.warn_cfg.get('delete_delay', 6))
+                if delay > 0:
+                    await sent.delete(delay=delay)
+            except Exception:
+                pass
+        await self._apply_punishment(message.author, reason)
+        await self._log(message.guild, message, reason, value)
+
+    def _drop(self, count: int, why: str):
+        """Conta imagens que não puderam ser verificadas; avisa no log no máximo uma vez por minuto."""
+        self.dropped += count
+        now = asyncio.get_running_loop().time()
+        if now - self._last_drop_warn >= 60:
+            self._last_drop_warn = now
+            logger.warning('automod_imagespam: %s, %d imagens sem verificação até agora', why, self.dropped)
+
+    # ----------------- Event -----------------
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message):
+        if not self.enabled or not message.attachments:
+            return
+        if self._ignored(message):
+            return
+        images = [a for a in message.attachments if self._is_image(a)]
+        if not images:
+            return
+        if not self._pending.locked():
+            await self._pending.acquire()  # vaga livre: não suspende
+        elif self._queued >= self.max_queued:
+            return self._drop(len(images), 'fila cheia')
+        else:
+            self._queued += 1
+            try:
+                await asyncio.wait_for(self._pending.acquire(), self.queue_wait)
+            except asyncio.TimeoutError:
+                return self._drop(len(images), 'espera esgotada')
+            finally:
+                self._queued -= 1
+        self._active += 1
+        try:
+            hashes = await asyncio.gather(*(self._fingerprint(a) for a in images))
+        finally:
+            self._active -= 1
+            self._pending.release()
+        now = asyncio.get_running_loop().time()
+        for value in hashes:
+            if value is None:
+                continue
+            reason = self.check_hash(message.guild.id, value, message.author.id, message.channel.id, message.id, now)
+            if reason:
+                return await self._handle_violation(message, reason, value)
+
+    # ----------------- Commands -----------------
+    @commands.command(name='imagespamreload')
+    async def imagespam_reload(self, ctx: commands.Context):
+        if not ctx.author.guild_permissions.manage_guild:
+            return await ctx.reply('Sem permissão.')
+        self.refresh_config()
+        await ctx.reply('Config automod_imagespam recarregada.')
+
+    @commands.command(name='imagespamstatus')
+    async def imagespam_status(self, ctx: commands.Context):
+        win = self._windows.get(ctx.guild.id) if ctx.guild else None
+        lines = [self.msgs.get('status_header', 'Automod ImageSpam — resumo')]
+        lines.append(self.msgs.get('status_main', '').format(
+            enabled=self.enabled, action=self.action, algorithm=self.algorithm, distance=self.max_distance,
+            window=self.window_cfg.get('seconds', 120), max_entries=self.window_cfg.get('max_entries', 2000)
+        ))
+        lines.append(self.msgs.get('status_thresholds', '').format(
+            authors=self.thresholds.get('distinct_authors', 3), repeats=self.thresholds.get('same_author_repeats', 3),
+            stored=len(win) if win else 0
+        ))
+        lines.append(self.msgs.get('status_queue', 'Em verificação/fila: {active}/{queued} | Não verificadas: {dropped}').format(
+            active=self._active, queued=self._queued, dropped=self.dropped))
+        await ctx.reply('\n'.join(lines))
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(AutoModImageSpam(bot))
@@ -41,12 +41,44 @@ DEFAULTS = {
             "replied": "Mensagem enviada.",
             "reacted": "Reações adicionadas."
         },
+        "reaction_concurrency": 3,
         "debug": False
     }
 }
 
 EMOJI_ID_PATTERN = re.compile(r"^<a?:[A-Za-z0-9_]+:(\d+)>$")
 
+
+class TTLCooldowns:
+    """Cooldowns com expiração: entradas vencidas são descartadas periodicamente."""
+
+    def __init__(self, purge_every: int = 256):
+        self._expires: Dict[Tuple[str, int], float] = {}
+        self._purge_every = purge_every
+        self._ops = 0
+
+    def __len__(self) -> int:
+        return len(self._expires)
+
+    def hit(self, key: Tuple[str, int], seconds: int, now: float | None = None) -> bool:
+        """Retorna True (e inicia o cooldown) se a chave não estiver em cooldown."""
+        if seconds <= 0:
+            return True
+        now = time.monotonic() if now is None else now
+        self._ops += 1
+        if self._ops >= self._purge_every:
+            self.purge(now)
+        if self._expires.get(key, 0.0) > now:
+            return False
+        self._expires[key] = now + seconds
+        return True
+
+    def purge(self, now: float | None = None):
+        now = time.monotonic() if now is None else now
+        self._ops = 0
+        for key in [k for k, exp in self._expires.items() if exp <= now]:
+            del self._expires[key]
+
 class EntretMentionsCog(commands.Cog):
     """Reage a menções configuradas: usuários, cargos e menção ao próprio bot."""
 
@@ -60,22 +92,31 @@ class EntretMentionsCog(commands.Cog):
         self.targets: Dict[str, Any] = self.cfg.get('targets', {})
         self.msgs: Dict[str, str] = self.cfg.get('messages', {})
         self.debug: bool = self.cfg.get('debug', False)
-        # cooldowns: chave (tipo,user/role/bot,id) -> timestamp
-        self._cooldowns: Dict[Tuple[str, int], float] = {}
+        self.bypass_role_set = frozenset(self.bypass_roles)
+        self.ignore_channel_set = frozenset(self.ignore_channels)
+        # Índices id -> regra (evita varrer todas as regras a cada mensagem)
+        self._user_rules: Dict[int, Dict[str, Any]] = {}
+        self._role_rules: Dict[int, Dict[str, Any]] = {}
+        for rule in self.targets.get('users', []) or []:
+            uid = int(rule.get('id', 0))
+            if uid > 0:
+                self._user_rules.setdefault(uid, rule)
+        for rule in self.targets.get('roles', []) or []:
+            rid = int(rule.get('id', 0))
+            if rid > 0:
+                self._role_rules.setdefault(rid, rule)
+        # cooldowns: chave (tipo, id) -> expiração
+        self._cooldowns = TTLCooldowns()
+        # guild_id -> token -> emoji resolvido (None = não encontrado)
+        self._emoji_cache: Dict[int, Dict[str, Optional[discord.Emoji | str]]] = {}
+        self._reaction_limit = asyncio.Semaphore(max(1, int(self.cfg.get('reaction_concurrency', 3))))
 
     def refresh_config(self):
         self.raw_cfg = config_manager.reload_cog('entret_mentions')
         self.__init__(self.bot)
 
     def _cooldown_ok(self, key: Tuple[str, int], seconds: int) -> bool:
-        if seconds <= 0:
-            return True
-        now = time.time()
-        last = self._cooldowns.get(key, 0.0)
-        if now - last >= seconds:
-            self._cooldowns[key] = now
-            return True
-        return False
+        return self._cooldowns.hit(key, seconds)
 
     def _allowed_mentions(self) -> discord.AllowedMentions:
         # Evita pings acidentais nos replies
@@ -89,53 +130,69 @@ class EntretMentionsCog(commands.Cog):
         except Exception:
             return template
 
-    def _resolve_emoji(self, guild: discord.Guild, token: str) -> Optional[discord.PartialEmoji | str]:
-        if not token:
-            return None
+    def _emoji_id(self, token: str) -> Optional[int]:
         m = EMOJI_ID_PATTERN.match(token)
         if m:
-            try:
-                eid = int(m.group(1))
-                # 1) tenta no próprio servidor
-                e = discord.utils.get(guild.emojis, id=eid)
-                if e:
-                    return e
-                # 2) tenta cache global do bot (emojis externos)
-                e2 = self.bot.get_emoji(eid)
-                if e2:
-                    return e2
-                return None
-            except Exception:
-                return None
+            return int(m.group(1))
         # id numérico puro
         if token.isdigit():
+            return int(token)
+        return None
+
+    def _configured_tokens(self) -> List[str]:
+        tokens: List[str] = []
+        for rule in list(self._user_rules.values()) + list(self._role_rules.values()):
+            tokens.extend(rule.get('react_emojis') or [])
+        bot_rule = self.targets.get('bot')
+        if isinstance(bot_rule, dict):
+            tokens.extend(bot_rule.get('react_emojis') or [])
+        return tokens
+
+    def _build_emoji_cache(self, guild: discord.Guild) -> Dict[str, Optional[discord.Emoji | str]]:
+        """Resolve todos os tokens configurados de uma vez para a guild."""
+        by_id = {e.id: e for e in guild.emojis}
+        resolved: Dict[str, Optional[discord.Emoji | str]] = {}
+        for token in self._configured_tokens():
+            if not token or token in resolved:
+                continue
+            eid = self._emoji_id(token)
+            if eid is None:
+                resolved[token] = token  # assume unicode
+                continue
+            # 1) próprio servidor; 2) cache global do bot (emojis externos)
+            resolved[token] = by_id.get(eid) or self.bot.get_emoji(eid)
+        self._emoji_cache[guild.id] = resolved
+        return resolved
+
+    def _resolve_emoji(self, guild: discord.Guild, token: str) -> Optional[discord.Emoji | str]:
+        if not token:
+            return None
+        cache = self._emoji_cache.get(guild.id)
+        if cache is None:
+            cache = self._build_emoji_cache(guild)
+        if token in cache:
+            return cache[token]
+        # Token fora da config (não deveria ocorrer): resolve e guarda
+        eid = self._emoji_id(token)
+        value = token if eid is None else (discord.utils.get(guild.emojis, id=eid) or self.bot.get_emoji(eid))
+        cache[token] = value
+        return value
+
+    async def _react(self, message: discord.Message, emoji: discord.Emoji | str):
+        async with self._reaction_limit:
             try:
-                eid = int(token)
-                # 1) tenta no próprio servidor
-                e = discord.utils.get(guild.emojis, id=eid)
-                if e:
-                    return e
-                # 2) tenta cache global do bot (emojis externos)
-                e2 = self.bot.get_emoji(eid)
-                if e2:
-                    return e2
-                return None
+                await message.add_reaction(emoji)
             except Exception:
-                return None
-        # assume unicode
-        return token
+                pass
 
     async def _do_actions(self, message: discord.Message, react_emojis: List[str] | None, reply: Optional[str]):
-        # Reagir
+        # Reagir em sequência: o Discord mostra as reações na ordem em que foram adicionadas.
+        # reaction_concurrency limita só quantas mensagens recebem reações ao mesmo tempo.
         if react_emojis:
             for tok in react_emojis:
                 emoji = self._resolve_emoji(message.guild, tok) if message.guild else tok
-                if emoji is None:
-                    continue
-                try:
-                    await message.add_reaction(emoji)
-                except Exception:
-                    continue
+                if emoji is not None:
+                    await self._react(message, emoji)
         # Responder
         if reply:
             try:
@@ -143,29 +200,34 @@ class EntretMentionsCog(commands.Cog):
             except Exception:
                 pass
 
+    @commands.Cog.listener()
+    async def on_guild_emojis_update(self, guild: discord.Guild, before, after):
+        # Emojis desta guild podem estar em cache como "externos" de outras guilds
+        self._emoji_cache.clear()
+
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message):
         if message.author.bot or not message.guild:
             return
         if not self.enabled:
             return
-        if message.channel.id in self.ignore_channels:
+        if not message.mentions and not message.role_mentions:
             return
-        if self.bypass_roles and isinstance(message.author, discord.Member):
-            if any(r.id in self.bypass_roles for r in message.author.roles):
+        if message.channel.id in self.ignore_channel_set:
+            return
+        if self.bypass_role_set and isinstance(message.author, discord.Member):
+            if any(r.id in self.bypass_role_set for r in message.author.roles):
                 return
 
         # Preparar contexto
         bot_member = message.guild.me
-        mentions_users = list(message.mentions) if message.mentions else []
-        mentions_roles = list(message.role_mentions) if message.role_mentions else []
+        mentioned_user_ids = {u.id for u in message.mentions}
+        mentioned_role_ids = {r.id for r in message.role_mentions}
 
         # Alvos: usuários específicos
-        for user_rule in self.targets.get('users', []) or []:
-            uid = int(user_rule.get('id', 0))
-            if uid <= 0:
-                continue
-            if any(u.id == uid for u in mentions_users):
+        for uid in mentioned_user_ids:
+            user_rule = self._user_rules.get(uid)
+            if user_rule is not None:
                 cooldown = int(user_rule.get('cooldown_seconds', 0))
                 key = ('user', uid)
                 if not self._cooldown_ok(key, cooldown):
@@ -181,11 +243,9 @@ class EntretMentionsCog(commands.Cog):
                 await self._do_actions(message, user_rule.get('react_emojis'), reply)
 
         # Alvos: cargos específicos
-        for role_rule in self.targets.get('roles', []) or []:
-            rid = int(role_rule.get('id', 0))
-            if rid <= 0:
-                continue
-            if any(r.id == rid for r in mentions_roles):
+        for rid in mentioned_role_ids:
+            role_rule = self._role_rules.get(rid)
+            if role_rule is not None:
                 cooldown = int(role_rule.get('cooldown_seconds', 0))
                 key = ('role', rid)
                 if not self._cooldown_ok(key, cooldown):
@@ -203,7 +263,7 @@ class EntretMentionsCog(commands.Cog):
         # Alvo: menção ao bot
         bot_rule = (self.targets.get('bot') or {}) if isinstance(self.targets.get('bot'), dict) else {}
         if bot_rule.get('enabled', True) and bot_member:
-            if any(u.id == bot_member.id for u in mentions_users):
+            if bot_member.id in mentioned_user_ids:
                 cooldown = int(bot_rule.get('cooldown_seconds', 0))
                 key = ('bot', bot_member.id)
                 if self._cooldown_ok(key, cooldown):
@@ -1,8 +1,8 @@
 import discord
 from discord.ext import commands
 from config_loader import config_manager
+from cogs._audit_cache import get_audit_cache
 from discord.utils import utcnow
-import datetime
 
 class BanCog(commands.Cog):
     def __init__(self, bot):
@@ -223,16 +223,10 @@ class BanCog(commands.Cog):
         reason_text: str | None = None
         if guild.me.guild_permissions.view_audit_log:
             # Procura executor no audit log recente
-            now = datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc)
-            async for entry in guild.audit_logs(limit=6, action=discord.AuditLogAction.ban):
-                if entry.target and entry.target.id == user.id:
-                    created = entry.created_at
-                    if created.tzinfo is None:
-                        created = created.replace(tzinfo=datetime.timezone.utc)
-                    if (now - created).total_seconds() <= 8:  # janela fixa
-                        executor = entry.user
-                        reason_text = entry.reason
-                        break
+            entry = await get_audit_cache(self.bot).find(guild, discord.AuditLogAction.ban, user.id, 8, limit=6)  # janela fixa
+            if entry is not None:
+                executor = entry.user
+                reason_text = entry.reason
         terceirizado = executor is not None and executor.id != self.bot.user.id
         moderador = executor or self.bot.user
         # Motivo preferindo o audit log; se executor for o próprio bot, não marcamos como terceirizado
@@ -3,6 +3,7 @@ from discord.ext import commands
 import datetime
 import re
 from config_loader import config_manager
+from cogs._audit_cache import get_audit_cache
 
 from discord.utils import utcnow
 
@@ -243,15 +244,8 @@ async def setup(bot):
         alterado = False
         try:
             if guild.me.guild_permissions.view_audit_log:
-                now = datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc)
-                async for entry in guild.audit_logs(limit=6, action=discord.AuditLogAction.member_update):
-                    if entry.target and entry.target.id == after.id:
-                        created = entry.created_at
-                        if created.tzinfo is None:
-                            created = created.replace(tzinfo=datetime.timezone.utc)
-                        if (now - created).total_seconds() <= 8:
-                            executor = entry.user
-                            break
+                entry = await get_audit_cache(self.bot).find(guild, discord.AuditLogAction.member_update, after.id, 8, limit=6)
+                executor = entry.user if entry else None
         except Exception:
             pass
         terceirizado = executor is not None and executor.id != self.bot.user.id
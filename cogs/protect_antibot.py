@@ -1,10 +1,12 @@
 import asyncio
-from typing import Dict, Any, List, Set
+from typing import Dict, Any, List, Optional, Set, Tuple
 
 import discord
 from discord.ext import commands
 
 from config_loader import config_manager
+from cogs._audit_cache import get_audit_cache
+from cogs._latency import LatencyHistogram
 
 DEFAULTS = {
     "protect_antibot": {
@@ -15,6 +17,12 @@ DEFAULTS = {
         "whitelist_inviter_ids": [],
         "whitelist_inviter_role_ids": [],
         "block_if_missing_inviter": True,
+        # Caminho rápido: bot fora da whitelist sai na hora; o inviter é resolvido depois
+        "fast_path": True,
+        # Com whitelist de inviters: espera até este tempo pelo bot_add do gateway antes do kick rápido
+        "fast_path_inviter_wait_ms": 300,
+        "inviter_action": "none",  # none | kick | ban (inviter não autorizado, resolvido depois do kick)
+        "inviter_lookup_attempts": 3,
         "dm_inviter": True,
         "dm_inviter_message": "Você não pode adicionar bots ao servidor.",
         "dm_delete_delay": 8,
@@ -26,14 +34,17 @@ DEFAULTS = {
             "status_main": "Habilitado: {enabled} | Ação: {action} | Canal log: {log_channel_id}",
             "status_whitelists": "Bots permitidos: {bots} | Inviters permitidos: {users} | Roles inviters: {roles}",
             "dm_inviter": "{user}, você não está autorizado(a) a adicionar bots aqui.",
-            "log_missing_inviter": "Não foi possível determinar o autor do add do bot {bot_id}."
+            "log_missing_inviter": "Não foi possível determinar o autor do add do bot {bot_id}.",
+            "status_latency": "Entrada → remoção: {latency}",
+            "fast_path_allowed_inviter": "Inviter autorizado, mas o bot não está em whitelist_bot_ids: adicione o ID {bot_id} e convide de novo."
         },
         "log_embed": {
             "enabled": True,
             "color": "FF8800",
             "title_action": "Bot bloqueado",
             "title_fail": "Falha AntiBot",
-            "title_allowed": "Bot permitido (whitelist)"
+            "title_allowed": "Bot permitido (whitelist)",
+            "title_fast_allowed": "Bot removido de inviter autorizado"
         },
         "debug": False
     }
@@ -61,6 +72,27 @@ class ProtectAntiBotCog(commands.Cog):
         self.msgs: Dict[str, str] = self.cfg.get('messages', {})
         self.log_embed_cfg: Dict[str, Any] = self.cfg.get('log_embed', {})
         self.debug: bool = self.cfg.get('debug', False)
+        self.fast_path: bool = self.cfg.get('fast_path', True)
+        self.fast_path_inviter_wait: float = max(0.0, float(self.cfg.get('fast_path_inviter_wait_ms', 300)) / 1000)
+        self.inviter_action: str = str(self.cfg.get('inviter_action', 'none')).lower()
+        self.inviter_lookup_attempts: int = max(1, int(self.cfg.get('inviter_lookup_attempts', 3)))
+        # Sobrevive ao refresh_config (o __init__ é chamado de novo)
+        if not hasattr(self, 'latency'):
+            self.latency = LatencyHistogram()
+            # (guild_id, bot_id) -> (inviter_id, instante) vindos do gateway de audit log
+            self._recent_adds: Dict[Tuple[int, int], Tuple[int, float]] = {}
+            self._bg_tasks: Set[asyncio.Task] = set()
+            # (guild_id, bot_id) -> evento de quem espera o bot_add no caminho rápido
+            self._add_waiters: Dict[Tuple[int, int], asyncio.Event] = {}
+
+    async def cog_unload(self):
+        for task in self._bg_tasks:
+            task.cancel()
+
+    def _track(self, coro):
+        task = asyncio.create_task(coro)
+        self._bg_tasks.add(task)
+        task.add_done_callback(self._bg_tasks.discard)
 
     def refresh_config(self):
         self.raw_cfg = config_manager.reload_cog('protect_antibot')
@@ -104,66 +136,155 @@ class ProtectAntiBotCog(commands.Cog):
             except Exception:
                 pass
 
-    async def _punish_bot(self, member: discord.Member, inviter: discord.abc.User | None):
-        reason = self.reason_template.format(
-            bot=str(member), bot_id=member.id, inviter=getattr(inviter, 'mention', 'desconhecido'), action=self.action
-        )
-        action_title = self.log_embed_cfg.get('title_action', 'Bot bloqueado')
-        if self.action == 'ban':
-            try:
+    def _reason(self, member: discord.Member, inviter_text: str) -> str:
+        return self.reason_template.format(bot=str(member), bot_id=member.id, inviter=inviter_text, action=self.action)
+
+    async def _remove_bot(self, member: discord.Member, reason: str) -> Optional[Exception]:
+        """Executa o kick/ban e devolve o erro (ou None). Não loga: é o caminho crítico."""
+        try:
+            if self.action == 'ban':
                 await member.ban(reason=reason, delete_message_days=0)
-                await self._log(member.guild, action_title, [
-                    ('Bot', member.mention, True),
-                    ('ID', str(member.id), True),
-                    ('Ação', 'ban', True),
-                    ('Inviter', getattr(inviter, 'mention', 'desconhecido'), True)
-                ])
-            except Exception as e:
-                await self._log(member.guild, self.log_embed_cfg.get('title_fail', 'Falha AntiBot'), [
-                    ('Bot', member.mention, True),
-                    ('Erro', f'```{e}```', False)
-                ])
-        else:  # kick padrão
-            try:
+            else:
                 await member.kick(reason=reason)
-                await self._log(member.guild, action_title, [
-                    ('Bot', member.mention, True),
-                    ('ID', str(member.id), True),
-                    ('Ação', 'kick', True),
-                    ('Inviter', getattr(inviter, 'mention', 'desconhecido'), True)
-                ])
-            except Exception as e:
-                await self._log(member.guild, self.log_embed_cfg.get('title_fail', 'Falha AntiBot'), [
-                    ('Bot', member.mention, True),
-                    ('Erro', f'```{e}```', False)
-                ])
+        except Exception as e:
+            return e
+        return None
+
+    async def _log_removal(self, member: discord.Member, inviter: discord.abc.User | None, error: Optional[Exception],
+                           extra: List[tuple] = ()):
+        if error is not None:
+            await self._log(member.guild, self.log_embed_cfg.get('title_fail', 'Falha AntiBot'), [
+                ('Bot', member.mention, True),
+                ('Erro', f'```{error}```', False)
+            ])
+            return
+        await self._log(member.guild, self.log_embed_cfg.get('title_action', 'Bot bloqueado'), [
+            ('Bot', member.mention, True),
+            ('ID', str(member.id), True),
+            ('Ação', self.action, True),
+            ('Inviter', f'<@{inviter.id}>' if inviter else 'desconhecido', True),
+            *extra
+        ])
 
+    async def _dm(self, inviter: discord.abc.User | None):
+        if not (self.dm_inviter and inviter and isinstance(inviter, (discord.User, discord.Member))):
+            return
+        try:
+            dm_msg = self.msgs.get('dm_inviter', self.dm_inviter_message).format(user=inviter.mention)
+            sent = await inviter.send(dm_msg)
+            if self.dm_delete_delay > 0:
+                await asyncio.sleep(self.dm_delete_delay)
+                try:
+                    await sent.delete()
+                except Exception:
+                    pass
+        except Exception:
+            pass
+
+    async def _punish_bot(self, member: discord.Member, inviter: discord.abc.User | None):
+        error = await self._remove_bot(member, self._reason(member, getattr(inviter, 'mention', 'desconhecido')))
+        await self._log_removal(member, inviter, error)
         # DM para inviter (opcional)
-        if self.dm_inviter and inviter and isinstance(inviter, (discord.User, discord.Member)):
-            try:
-                dm_msg = self.msgs.get('dm_inviter', self.dm_inviter_message).format(user=inviter.mention)
-                sent = await inviter.send(dm_msg)
-                if self.dm_delete_delay > 0:
-                    await asyncio.sleep(self.dm_delete_delay)
-                    try:
-                        await sent.delete()
-                    except Exception:
-                        pass
-            except Exception:
-                pass
+        await self._dm(inviter)
 
     async def _fetch_inviter(self, guild: discord.Guild, bot_member: discord.Member) -> discord.abc.User | None:
         # Usa audit log bot_add
         inviter = None
         try:
-            async for entry in guild.audit_logs(limit=6, action=discord.AuditLogAction.bot_add):
-                if entry.target.id == bot_member.id:
-                    inviter = entry.user
-                    break
+            # Sem janela: o bot_add é único por entrada do bot
+            entry = await get_audit_cache(self.bot).find(guild, discord.AuditLogAction.bot_add, bot_member.id,
+                                                         float('inf'), limit=6)
+            inviter = entry.user if entry else None
         except Exception:
             inviter = None
         return inviter
 
+    async def _resolve_inviter(self, guild: discord.Guild, bot_member: discord.Member) -> discord.abc.User | None:
+        """Inviter pelo gateway de audit log; se ainda não chegou, REST com algumas tentativas."""
+        for attempt in range(self.inviter_lookup_attempts):
+            cached = self._recent_adds.pop((guild.id, bot_member.id), None)
+            if cached is not None:
+                return guild.get_member(cached[0]) or self.bot.get_user(cached[0]) or discord.Object(cached[0])
+            inviter = await self._fetch_inviter(guild, bot_member)
+            if inviter is not None:
+                return inviter
+            await asyncio.sleep(1 + attempt)
+        return None
+
+    def _cached_inviter_whitelisted(self, guild: discord.Guild, bot_id: int) -> bool:
+        cached = self._recent_adds.get((guild.id, bot_id))
+        return cached is not None and self._is_inviter_whitelisted(guild, discord.Object(cached[0]))
+
+    async def _wait_allowed_inviter(self, guild: discord.Guild, bot_id: int) -> bool:
+        """Inviter autorizado conhecido pelo gateway; com whitelist de inviters, espera o bot_add por pouco tempo.
+
+        O gateway não garante que o ``bot_add`` chegue antes do ``GUILD_MEMBER_ADD``.
+        """
+        if self._cached_inviter_whitelisted(guild, bot_id):
+            return True
+        if not (self.whitelist_inviter_ids or self.whitelist_inviter_role_ids) or self.fast_path_inviter_wait <= 0:
+            return False
+        key = (guild.id, bot_id)
+        event = self._add_waiters.setdefault(key, asyncio.Event())
+        try:
+            await asyncio.wait_for(event.wait(), self.fast_path_inviter_wait)
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            if self._add_waiters.get(key) is event:
+                del self._add_waiters[key]
+        return self._cached_inviter_whitelisted(guild, bot_id)
+
+    async def _punish_inviter(self, guild: discord.Guild, inviter: discord.abc.User, bot_member: discord.Member) -> str:
+        if self.inviter_action not in ('kick', 'ban') or inviter.id in (guild.owner_id, getattr(self.bot.user, 'id', None)):
+            return 'nenhuma'
+        reason = f'AntiBot: adicionou o bot não autorizado {bot_member} ({bot_member.id})'
+        try:
+            if self.inviter_action == 'ban':
+                await guild.ban(discord.Object(inviter.id), reason=reason, delete_message_days=0)
+            else:
+                await guild.kick(discord.Object(inviter.id), reason=reason)
+        except Exception as e:
+            return f'falhou: {e}'[:200]
+        return self.inviter_action
+
+    async def _after_fast_removal(self, member: discord.Member, error: Optional[Exception], elapsed: float):
+        """Segunda metade do caminho rápido: descobre o inviter, loga, pune e avisa."""
+        guild = member.guild
+        inviter = await self._resolve_inviter(guild, member)
+        latency = ('Entrada → remoção', f'{elapsed * 1000:.0f}ms', True)
+        if inviter is not None and self._is_inviter_whitelisted(guild, inviter):
+            await self._log(guild, self.log_embed_cfg.get('title_fast_allowed', 'Bot removido de inviter autorizado'), [
+                ('Bot', member.mention, True),
+                ('Inviter', f'<@{inviter.id}>', True),
+                latency,
+                ('Aviso', self.msgs.get('fast_path_allowed_inviter', '').format(bot_id=member.id) or '-', False)
+            ])
+            return
+        extra = [latency]
+        if inviter is not None and error is None:
+            extra.append(('Inviter punido', await self._punish_inviter(guild, inviter, member), True))
+        elif inviter is None:
+            extra.append(('Aviso', self.msgs.get('log_missing_inviter', '').format(bot_id=member.id) or '-', False))
+        await self._log_removal(member, inviter, error, extra)
+        if error is None:
+            await self._dm(inviter)
+
+    @commands.Cog.listener()
+    async def on_audit_log_entry_create(self, entry: discord.AuditLogEntry):
+        if entry.action != discord.AuditLogAction.bot_add or entry.user_id is None:
+            return
+        now = asyncio.get_running_loop().time()
+        adds = self._recent_adds
+        key = (entry.guild.id, getattr(entry.target, 'id', 0))
+        adds[key] = (entry.user_id, now)
+        waiter = self._add_waiters.get(key)
+        if waiter is not None:
+            waiter.set()
+        if len(adds) > 256:
+            for key in [k for k, (_, t) in adds.items() if now - t > 60]:
+                del adds[key]
+
     @commands.Cog.listener()
     async def on_member_join(self, member: discord.Member):
         if not self.enabled:
@@ -171,6 +292,8 @@ class ProtectAntiBotCog(commands.Cog):
         if not member.bot:
             return  # só interessa bots
 
+        started = asyncio.get_running_loop().time()
+
         # Whitelist de bot
         if member.id in self.whitelist_bot_ids:
             if self.log_channel_id:
@@ -180,6 +303,16 @@ class ProtectAntiBotCog(commands.Cog):
                 ])
             return
 
+        # Caminho rápido: decide só com dados locais; nenhuma chamada REST antes do kick.
+        # Se o bot_add do gateway chegou (ou chega dentro da espera curta) com um inviter autorizado, cai no fluxo normal.
+        if self.fast_path and not await self._wait_allowed_inviter(member.guild, member.id):
+            error = await self._remove_bot(member, self._reason(member, 'desconhecido (resolvendo)'))
+            elapsed = asyncio.get_running_loop().time() - started
+            if error is None:
+                self.latency.record(elapsed)
+            self._track(self._after_fast_removal(member, error, elapsed))
+            return
+
         inviter = await self._fetch_inviter(member.guild, member)
         if inviter is None and self.block_if_missing_inviter:
             # Sem inviter conhecido: punir
@@ -227,6 +360,7 @@ class ProtectAntiBotCog(commands.Cog):
         lines.append(self.msgs.get('status_main', 'Habilitado: {enabled} | Ação: {action} | Canal log: {log_channel_id}').format(
             enabled=self.enabled, action=self.action, log_channel_id=self.log_channel_id
         ))
+        lines.append(self.msgs.get('status_latency', 'Entrada → remoção: {latency}').format(latency=self.latency.line()))
         lines.append(self.msgs.get('status_whitelists', 'Bots permitidos: {bots} | Inviters permitidos: {users} | Roles inviters: {roles}').format(
             bots=', '.join(bots), users=', '.join(users), roles=', '.join(roles)
         ))
@@ -1,12 +1,26 @@
 import asyncio
 import datetime
-from collections import defaultdict, deque
-from typing import Dict, Any, Deque, Tuple, List, Set
+import time
+from pathlib import Path
+from typing import Dict, Any, Tuple, List, Set
 
 import discord
 from discord.ext import commands
 
 from config_loader import config_manager
+from cogs._action_counter import ActionCounter
+from cogs._latency import LatencyHistogram
+from cogs._ratelimit import BatchProgress, report_progress, run_limited
+from cogs._state_journal import StateJournal
+from cogs._structure_restore import StructureRestorer, build_plan
+
+DATA_DIR = Path(__file__).parent.parent / 'data'
+JOURNAL_FILE = DATA_DIR / 'state_journal.sqlite3'
+JOURNAL_SCOPE = 'antinuke'
+# Mapa id antigo -> id novo de uma restauração de estrutura em andamento
+RESTORE_SCOPE = 'antinuke_restore'
+# Permissões retiradas dos cargos no lockdown
+LOCKDOWN_STRIP_MASK = discord.Permissions(administrator=True, manage_channels=True, manage_roles=True).value
 
 DEFAULTS = {
     "protect_antinuke": {
@@ -19,14 +33,28 @@ DEFAULTS = {
             "role_delete": 2,
             "emoji_delete": 5,
             "webhook_delete": 5,
+            "member_ban": 8,
+            "member_kick": 8,
+            "member_prune": 2,
+            "webhook_create": 4,
+            "role_grant": 3,
             "combined": 6
         },
+        # Ações somadas no limite combinado (ban/kick ficam de fora: moderação legítima em raid)
+        "combined_actions": ["channel_delete", "role_delete", "emoji_delete", "webhook_delete",
+                             "member_prune", "webhook_create", "role_grant"],
         "monitor": {
             "channel_delete": True,
             "role_delete": True,
             "emoji_delete": True,
-            "webhook_delete": True
+            "webhook_delete": True,
+            "member_ban": True,
+            "member_kick": True,
+            "member_prune": True,
+            "webhook_create": True,
+            "role_grant": True
         },
+        "max_tracked_executors": 5000,
         "punishment": {
             "type": "ban",  # ban | kick | timeout | remove_roles
             "timeout_seconds": 1800,
@@ -35,6 +63,12 @@ DEFAULTS = {
             "keep_role_ids": []
         },
         "dangerous_permissions": ["administrator", "manage_channels", "manage_roles", "manage_webhooks", "manage_emojis"],
+        "trust": {
+            "user_ids": [],
+            "role_ids": [],
+            "bot_ids": []
+        },
+        "latency_target_ms": 300,
         "lockdown": {
             "enabled": True,
             "apply_on_trigger": True,
@@ -42,16 +76,30 @@ DEFAULTS = {
             "target_channel_ids": [],
             "all_text_channels": True,
             "remove_manage_channels_from_roles": True,
-            "restore_after_seconds": 600
+            "restore_after_seconds": 600,
+            "max_concurrency": 8
+        },
+        "restore": {
+            "window_minutes": 60,
+            "max_concurrency": 5,
+            "progress_update_seconds": 3
         },
         "messages": {
             "log_delete": "AntiNuke: {action} por {executor} alvo={target} (total {count}/{threshold} em {interval}s)",
             "log_punish": "Punindo {executor} por ações massivas: {reason}",
             "log_lockdown": "Lockdown aplicado: slowmode={slowmode}s canais={channel_count}",
             "log_restore": "Lockdown restaurado.",
+            "journal_resumed": "Lockdown retomado após reinício",
+            "restore_no_snapshot": "Sem snapshot da estrutura desta guild (a cog protect_snapshot está carregada?).",
+            "restore_nothing": "Nada apagado nos últimos {minutes} minutos.",
+            "restore_busy": "Já existe uma restauração em andamento.",
+            "restore_reason": "AntiNuke: restauração da estrutura",
+            "restore_pending": "Restauração da estrutura interrompida pelo reinício. Use !antinukerestore para continuar.",
             "status_header": "Proteção AntiNuke",
             "status_main": "Enabled={enabled} | Interval={interval}s | Combined={combined_t}/{combined_th}",
             "status_thresholds": "Del Canal={cd_t}/{cd_th} | Del Cargo={rd_t}/{rd_th} | Del Emoji={ed_t}/{ed_th} | Del Webhook={wd_t}/{wd_th}",
+            "status_thresholds_members": "Ban={mb_t}/{mb_th} | Kick={mk_t}/{mk_th} | Prune={mp_t}/{mp_th} | Webhook criado={wc_t}/{wc_th} | Cargo perigoso dado={rg_t}/{rg_th} | Executores rastreados={tracked}",
+            "status_latency": "Evento→punição: {latency} | <= {target}ms: {share:.0%}",
             "punish_reason": "Excesso de ações destrutivas"
         },
         "log_embed": {
@@ -60,14 +108,29 @@ DEFAULTS = {
             "title_event": "Evento AntiNuke",
             "title_punish": "Usuário punido (AntiNuke)",
             "title_lockdown": "Lockdown Ativado",
-            "title_restore": "Lockdown Encerrado"
+            "title_restore": "Lockdown Encerrado",
+            "title_structure_restore": "Estrutura restaurada"
         }
     }
 }
 
 
+# Ações do audit log monitoradas -> chave usada em thresholds/monitor
+AUDIT_ACTIONS = {
+    discord.AuditLogAction.channel_delete: 'channel_delete',
+    discord.AuditLogAction.role_delete: 'role_delete',
+    discord.AuditLogAction.emoji_delete: 'emoji_delete',
+    discord.AuditLogAction.webhook_delete: 'webhook_delete',
+    discord.AuditLogAction.ban: 'member_ban',
+    discord.AuditLogAction.kick: 'member_kick',
+    discord.AuditLogAction.member_prune: 'member_prune',
+    discord.AuditLogAction.webhook_create: 'webhook_create',
+    discord.AuditLogAction.member_role_update: 'role_grant',
+}
+
+
 class ProtectAntiNukeCog(commands.Cog):
-    """Protege contra deleções em massa de canais, cargos, emojis e webhooks."""
+    """Protege contra nukes: deleções em massa, bans/kicks/prunes, criação de webhooks e cargos perigosos dados."""
 
     def __init__(self, bot: commands.Bot):
         self.bot = bot
@@ -81,28 +144,95 @@ class ProtectAntiNukeCog(commands.Cog):
         self.monitor_cfg: Dict[str, bool] = self.cfg.get('monitor', {})
         self.punish_cfg: Dict[str, Any] = self.cfg.get('punishment', {})
         self.dangerous_perms: List[str] = self.cfg.get('dangerous_permissions', [])
+        self.dangerous_mask: int = discord.Permissions(
+            **{p: True for p in self.dangerous_perms if p in discord.Permissions.VALID_FLAGS}).value
+        self.combined_actions: List[str] = self.cfg.get('combined_actions', DEFAULTS['protect_antinuke']['combined_actions'])
         self.lockdown_cfg: Dict[str, Any] = self.cfg.get('lockdown', {})
+        self.restore_cfg: Dict[str, Any] = self.cfg.get('restore', {})
+        self.trust_cfg: Dict[str, List[int]] = self.cfg.get('trust', {})
+        self.latency_target_ms: float = float(self.cfg.get('latency_target_ms', 300))
         self.msgs: Dict[str, str] = self.cfg.get('messages', {})
         self.embed_cfg: Dict[str, Any] = self.cfg.get('log_embed', {})
 
-        # executor_id -> deque timestamps por ação
-        self._action_windows: Dict[str, Dict[int, Deque[float]]] = defaultdict(lambda: defaultdict(lambda: deque()))
-        # executor_id -> combined total recente
-        self._combined_counts: Dict[int, Deque[Tuple[str, float]]] = defaultdict(lambda: deque())
+        # (guild_id, executor_id) -> ações na janela; executores ociosos são descartados
+        self._counter = ActionCounter(AUDIT_ACTIONS.values(), self.interval,
+                                      int(self.cfg.get('max_tracked_executors', 5000)))
         # lockdown estado
         self._lockdown_active: bool = False
         self._original_slowmodes: Dict[int, int] = {}
         self._original_role_perms: Dict[int, discord.Permissions] = {}
         self._restore_task: asyncio.Task | None = None
+        # guild_id -> ids que nunca contam como nuker (dono, bot, whitelist); montado fora do caminho crítico
+        self._trust: Dict[int, frozenset] = {}
+        # (guild_id, executor_id) -> instante da última punição (evita punir de novo a cada evento)
+        self._punished_at: Dict[Tuple[int, int], float] = {}
+        self._bg_tasks: Set[asyncio.Task] = set()
+        # Journal de estado (originais + prazo de restauração) para sobreviver a reinícios
+        if not hasattr(self, 'journal'):
+            self.journal = StateJournal(JOURNAL_FILE)
+            self._replayed = False
+            self._structure_tasks: Dict[int, asyncio.Task] = {}
+            self.latency = LatencyHistogram()
 
     def refresh_config(self):
+        if self._restore_task and not self._restore_task.done():
+            self._restore_task.cancel()
         self.raw_cfg = config_manager.reload_cog('protect_antinuke')
         self.__init__(self.bot)
+        # __init__ zera o estado em memória; o journal devolve o lockdown em andamento
+        asyncio.create_task(self._replay_journal())
+        self._rebuild_trust_all()
+
+    async def cog_load(self):
+        if self.bot.is_ready():
+            self._replayed = True
+            self._rebuild_trust_all()
+            asyncio.create_task(self._replay_journal())
+
+    async def cog_unload(self):
+        if self._restore_task and not self._restore_task.done():
+            self._restore_task.cancel()
+        for task in self._structure_tasks.values():
+            task.cancel()
+        for task in self._bg_tasks:
+            task.cancel()
+        self.journal.close()
 
     # ---------------- Utilidades -----------------
     def _now(self) -> float:
         return asyncio.get_event_loop().time()
 
+    def _track(self, coro):
+        task = asyncio.create_task(coro)
+        self._bg_tasks.add(task)
+        task.add_done_callback(self._bg_tasks.discard)
+
+    # ---------------- Confiança -----------------
+    def _build_trust(self, guild: discord.Guild) -> frozenset:
+        ids = {guild.owner_id}
+        if self.bot.user is not None:
+            ids.add(self.bot.user.id)
+        ids.update(int(i) for i in self.trust_cfg.get('user_ids', []))
+        ids.update(int(i) for i in self.trust_cfg.get('bot_ids', []))
+        for rid in self.trust_cfg.get('role_ids', []):
+            role = guild.get_role(int(rid))
+            if role is not None:
+                ids.update(m.id for m in role.members)
+        ids.discard(None)
+        table = frozenset(ids)
+        self._trust[guild.id] = table
+        return table
+
+    def _rebuild_trust_all(self):
+        for guild in self.bot.guilds:
+            self._build_trust(guild)
+
+    def _is_trusted(self, guild: discord.Guild, user_id: int) -> bool:
+        table = self._trust.get(guild.id)
+        if table is None:
+            table = self._build_trust(guild)
+        return user_id in table
+
     async def _log(self, guild: discord.Guild, title: str, fields: List[tuple]):
         if not self.log_channel_id:
             return
@@ -129,32 +259,18 @@ class ProtectAntiNukeCog(commands.Cog):
             except Exception:
                 pass
 
-    def _record_action(self, executor_id: int, action_key: str):
-        now = self._now()
-        dq = self._action_windows[action_key][executor_id]
-        dq.append(now)
-        # expurgo
-        while dq and (now - dq[0]) > self.interval:
-            dq.popleft()
-        # combined
-        c_dq = self._combined_counts[executor_id]
-        c_dq.append((action_key, now))
-        while c_dq and (now - c_dq[0][1]) > self.interval:
-            c_dq.popleft()
-
-    def _count(self, executor_id: int, action_key: str) -> int:
-        return len(self._action_windows[action_key][executor_id])
-
-    def _combined_count(self, executor_id: int) -> int:
-        return len(self._combined_counts[executor_id])
-
-    def _exceeds_threshold(self, executor_id: int, action_key: str) -> bool:
-        th = int(self.thresholds.get(action_key, 999999))
-        return th > 0 and self._count(executor_id, action_key) >= th
+    def _record_action(self, guild_id: int, executor_id: int, action_key: str) -> int:
+        return self._counter.add((guild_id, executor_id), action_key, self._now())
+
+    def _count(self, guild_id: int, executor_id: int, action_key: str) -> int:
+        return self._counter.count((guild_id, executor_id), action_key, self._now())
 
-    def _exceeds_combined(self, executor_id: int) -> bool:
-        th = int(self.thresholds.get('combined', 999999))
-        return th > 0 and self._combined_count(executor_id) >= th
+    def _combined_count(self, guild_id: int, executor_id: int) -> int:
+        return self._counter.combined((guild_id, executor_id), self._now(), self.combined_actions)
+
+    def _exceeds(self, action_key: str, count: int) -> bool:
+        th = int(self.thresholds.get(action_key, 999999))
+        return th > 0 and count >= th
 
     async def _apply_lockdown(self, guild: discord.Guild):
         if self._lockdown_active or not self.lockdown_cfg.get('enabled', True):
@@ -169,40 +285,60 @@ class ProtectAntiNukeCog(commands.Cog):
                 c = guild.get_channel(cid)
                 if isinstance(c, discord.TextChannel):
                     targets.append(c)
-        changed = 0
-        for ch in targets:
-            try:
-                self._original_slowmodes[ch.id] = ch.rate_limit_per_user
-                if ch.rate_limit_per_user != slow_val:
-                    await ch.edit(rate_limit_per_user=slow_val, reason='AntiNuke Lockdown')
-                    changed += 1
-                    await asyncio.sleep(0.25)
-            except Exception:
-                pass
-        # Remover permissões perigosas de roles (opcional)
+        strip_roles: List[discord.Role] = []
+        skipped_roles = 0
         if self.lockdown_cfg.get('remove_manage_channels_from_roles', True):
+            me = guild.me
             for role in guild.roles:
-                if role.is_default():
+                if role.is_default() or not role.permissions.value & LOCKDOWN_STRIP_MASK:
                     continue
-                perms = role.permissions
-                original = perms.value
-                if perms.manage_channels or perms.manage_roles or perms.administrator:
-                    self._original_role_perms[role.id] = perms
-                    new_perms = discord.Permissions(value=original)
-                    new_perms.manage_channels = False
-                    new_perms.manage_roles = False
-                    new_perms.administrator = False
-                    try:
-                        await role.edit(permissions=new_perms, reason='AntiNuke Lockdown perms strip')
-                        await asyncio.sleep(0.3)
-                    except Exception:
-                        pass
-        await self._log(guild, self.embed_cfg.get('title_lockdown', 'Lockdown Ativado'), [
-            ('Slowmode', f'{slow_val}s', True),
-            ('Canais alterados', str(changed), True),
-            ('Roles perms alterados', str(len(self._original_role_perms)), True)
-        ])
+                # Cargo acima do bot: a edição falharia, nem tenta
+                if me is not None and role >= me.top_role:
+                    skipped_roles += 1
+                    continue
+                strip_roles.append(role)
+            # Maior impacto primeiro: os cargos mais altos perdem as permissões antes
+            strip_roles.sort(key=lambda r: r.position, reverse=True)
         restore_after = int(self.lockdown_cfg.get('restore_after_seconds', 600))
+        # Grava prazo e originais antes de alterar qualquer coisa (uma transação só)
+        self._journal_call(self.journal.begin, JOURNAL_SCOPE, guild.id,
+                           time.time() + restore_after if restore_after > 0 else None,
+                           [('slowmode', ch.id, ch.rate_limit_per_user) for ch in targets]
+                           + [('role_perms', r.id, r.permissions.value) for r in strip_roles])
+        for ch in targets:
+            self._original_slowmodes[ch.id] = ch.rate_limit_per_user
+        for role in strip_roles:
+            self._original_role_perms[role.id] = role.permissions
+
+        async def strip_role(role: discord.Role):
+            new_perms = discord.Permissions(role.permissions.value & ~LOCKDOWN_STRIP_MASK)
+            await role.edit(permissions=new_perms, reason='AntiNuke Lockdown perms strip')
+
+        async def slow_channel(ch: discord.TextChannel):
+            if ch.rate_limit_per_user == slow_val:
+                return False
+            await ch.edit(rate_limit_per_user=slow_val, reason='AntiNuke Lockdown')
+
+        concurrency = max(1, int(self.lockdown_cfg.get('max_concurrency', 8)))
+        role_prog = BatchProgress('Cargos')
+        ch_prog = BatchProgress('Slowmode')
+        started = self._now()
+        # Cargos e canais são rotas diferentes: rodam em paralelo, cada um com seu limite
+        await asyncio.gather(
+            run_limited(strip_roles, strip_role, concurrency, role_prog),
+            run_limited(targets, slow_channel, concurrency, ch_prog)
+        )
+        fields = [
+            ('Slowmode', f'{slow_val}s', True),
+            ('Tempo total', f'{self._now() - started:.1f}s', True),
+            ('Etapas', f'{role_prog.line()}\n{ch_prog.line()}', False)
+        ]
+        if skipped_roles:
+            fields.append(('Cargos acima do bot', str(skipped_roles), True))
+        errors = [p.last_error for p in (role_prog, ch_prog) if p.last_error]
+        if errors:
+            fields.append(('Último erro', '\n'.join(errors)[:1000], False))
+        await self._log(guild, self.embed_cfg.get('title_lockdown', 'Lockdown Ativado'), fields)
         if restore_after > 0:
             self._restore_task = asyncio.create_task(self._restore_lockdown_later(guild, restore_after))
 
@@ -216,54 +352,183 @@ class ProtectAntiNukeCog(commands.Cog):
     async def _restore_lockdown(self, guild: discord.Guild, auto: bool = False):
         if not self._lockdown_active:
             return
-        # Reverter slowmode
-        for cid, original in list(self._original_slowmodes.items()):
-            ch = guild.get_channel(cid)
-            if isinstance(ch, discord.TextChannel):
-                try:
-                    if ch.rate_limit_per_user != original:
-                        await ch.edit(rate_limit_per_user=original, reason='AntiNuke Lockdown restore')
-                        await asyncio.sleep(0.25)
-                except Exception:
-                    pass
+        self._lockdown_active = False
+        if self._restore_task and not self._restore_task.done() and self._restore_task is not asyncio.current_task():
+            self._restore_task.cancel()
+        self._restore_task = None
+        slowmodes = dict(self._original_slowmodes)
+        role_perms = dict(self._original_role_perms)
         self._original_slowmodes.clear()
-        # Reverter permissões
-        for rid, perms in list(self._original_role_perms.items()):
-            role = guild.get_role(rid)
-            if role:
-                try:
-                    await role.edit(permissions=perms, reason='AntiNuke restore perms')
-                    await asyncio.sleep(0.3)
-                except Exception:
-                    pass
         self._original_role_perms.clear()
-        self._lockdown_active = False
+        concurrency = max(1, int(self.lockdown_cfg.get('max_concurrency', 8)))
+
+        # Reverter slowmode
+        async def restore_channel(ch: discord.TextChannel):
+            original = slowmodes[ch.id]
+            if ch.rate_limit_per_user == original:
+                return False
+            await ch.edit(rate_limit_per_user=original, reason='AntiNuke Lockdown restore')
+
+        # Reverter permissões
+        async def restore_role(role: discord.Role):
+            perms = role_perms[role.id]
+            if role.permissions.value == perms.value:
+                return False
+            await role.edit(permissions=perms, reason='AntiNuke restore perms')
+
+        channels = [c for c in (guild.get_channel(cid) for cid in slowmodes) if isinstance(c, discord.TextChannel)]
+        roles = sorted((r for r in (guild.get_role(rid) for rid in role_perms) if r is not None),
+                       key=lambda r: r.position, reverse=True)
+        ch_prog = BatchProgress('Slowmode')
+        role_prog = BatchProgress('Cargos')
+        started = self._now()
+        # Canais e cargos são rotas diferentes: restauram em paralelo
+        await asyncio.gather(
+            run_limited(channels, restore_channel, concurrency, ch_prog),
+            run_limited(roles, restore_role, concurrency, role_prog)
+        )
+        # Só sai do journal depois de restaurar: se cair no meio, o replay refaz
+        self._journal_call(self.journal.end, JOURNAL_SCOPE, guild.id)
         await self._log(guild, self.embed_cfg.get('title_restore', 'Lockdown Encerrado'), [
-            ('Origem', 'Auto' if auto else 'Manual', True)
+            ('Origem', 'Auto' if auto else 'Manual', True),
+            ('Tempo total', f'{self._now() - started:.1f}s', True),
+            ('Restaurado', f'{role_prog.line()}\n{ch_prog.line()}', False)
         ])
+
+    def _journal_call(self, fn, *args):
+        # Falha de disco não pode impedir a proteção em si
+        try:
+            fn(*args)
+        except Exception as e:
+            print(f'[antinuke] Falha no journal de estado: {e}')
+
+    async def _replay_journal(self):
+        """Retoma lockdowns abertos antes de um reinício: restaura os vencidos, reagenda os demais."""
+        try:
+            sessions = self.journal.sessions(JOURNAL_SCOPE)
+        except Exception as e:
+            print(f'[antinuke] Falha ao ler journal de estado: {e}')
+            return
+        sessions = sorted((s for s in sessions if self.bot.get_guild(s.guild_id) is not None), key=lambda s: s.started)
+        if not sessions:
+            return
+        # O estado em memória é de um lockdown só: o mais recente é retomado, os demais são restaurados já
+        for sess in sessions[:-1]:
+            print(f'[antinuke] Lockdown de {sess.guild_id} no journal junto com outro; restaurando agora')
+            self._load_session(sess)
+            await self._restore_lockdown(self.bot.get_guild(sess.guild_id), auto=True)
+        sess = sessions[-1]
+        guild = self.bot.get_guild(sess.guild_id)
+        self._load_session(sess)
+        if sess.deadline is None:
+            remaining_text = 'manual'
+        else:
+            remaining = sess.deadline - time.time()
+            remaining_text = f'{max(0, int(remaining))}s'
+            if remaining <= 0:
+                await self._restore_lockdown(guild, auto=True)
+                return
+            self._restore_task = asyncio.create_task(self._restore_lockdown_later(guild, remaining))
+        await self._log(guild, self.msgs.get('journal_resumed', 'Lockdown retomado após reinício'), [
+            ('Canais', str(len(self._original_slowmodes)), True),
+            ('Cargos', str(len(self._original_role_perms)), True),
+            ('Restauração em', remaining_text, True)
+        ])
+
+    def _load_session(self, sess):
+        """Substitui o estado de lockdown em memória pelo de uma sessão do journal."""
         if self._restore_task and not self._restore_task.done():
             self._restore_task.cancel()
         self._restore_task = None
+        self._lockdown_active = True
+        self._original_slowmodes = dict(sess.entries.get('slowmode', {}))
+        self._original_role_perms = {rid: discord.Permissions(value) for rid, value in sess.entries.get('role_perms', {}).items()}
 
-    async def _punish(self, guild: discord.Guild, member: discord.Member, reason: str):
-        if not member:
+    # ---------------- Restauração da estrutura -----------------
+    async def _restore_structure(self, guild: discord.Guild, since: float, status: discord.Message | None = None) -> StructureRestorer | None:
+        snap_cog = self.bot.get_cog('GuildSnapshotCog')
+        snapshot = snap_cog.get_snapshot(guild.id) if snap_cog else None
+        if snapshot is None:
+            return None
+        # Restauração anterior interrompida: reaproveita o mapa de ids e a janela original
+        try:
+            prior = {s.guild_id: s for s in self.journal.sessions(RESTORE_SCOPE)}.get(guild.id)
+        except Exception as e:
+            print(f'[antinuke] Falha ao ler journal de estado: {e}')
+            prior = None
+        id_map: Dict[int, int] = {}
+        if prior is not None:
+            since = min(since, float(prior.entries.get('since', {}).get(0, since)))
+            id_map.update(prior.entries.get('role', {}))
+            id_map.update(prior.entries.get('channel', {}))
+        plan = build_plan(snapshot, since)
+        self._journal_call(self.journal.begin, RESTORE_SCOPE, guild.id, None, [('since', 0, int(since))])
+        restorer = StructureRestorer(
+            guild, plan, id_map, int(self.restore_cfg.get('max_concurrency', 5)),
+            self.msgs.get('restore_reason', 'AntiNuke: restauração da estrutura'),
+            on_mapped=lambda kind, old, new: self._journal_call(self.journal.record, RESTORE_SCOPE, guild.id, [(kind, old, new)])
+        )
+        if not plan.total:
+            self._journal_call(self.journal.end, RESTORE_SCOPE, guild.id)
+            return restorer
+        started = self._now()
+
+        def progress_text() -> str:
+            return '\n'.join(b.line() for b in restorer.batches)
+
+        async def update():
+            if status is not None:
+                await status.edit(content=f'{progress_text()}\nTempo: {self._now() - started:.1f}s')
+
+        work = asyncio.create_task(restorer.run())
+        await report_progress([work], update, float(self.restore_cfg.get('progress_update_seconds', 3)))
+        await work
+        if not restorer.failed:
+            # Tudo recriado: as lápides saem do snapshot e o mapa sai do journal
+            snapshot.drop_tombstones([c.id for c in plan.categories + plan.channels], [r.id for r in plan.roles])
+            self._journal_call(self.journal.end, RESTORE_SCOPE, guild.id)
+        fields = [
+            ('Progresso', progress_text(), False),
+            ('Tempo', f'{self._now() - started:.1f}s', True),
+            ('Ids remapeados', str(len(restorer.id_map)), True)
+        ]
+        errors = [b.last_error for b in restorer.batches if b.last_error]
+        if errors:
+            fields.append(('Último erro', '\n'.join(errors)[:1000], False))
+        await self._log(guild, self.embed_cfg.get('title_structure_restore', 'Estrutura restaurada'), fields)
+        return restorer
+
+    async def _notify_pending_restores(self):
+        try:
+            sessions = self.journal.sessions(RESTORE_SCOPE)
+        except Exception:
             return
+        for sess in sessions:
+            guild = self.bot.get_guild(sess.guild_id)
+            if guild is not None:
+                await self._log(guild, self.msgs.get('restore_pending', 'Restauração da estrutura interrompida pelo reinício.'), [
+                    ('Ids já recriados', str(len(sess.entries.get('role', {})) + len(sess.entries.get('channel', {}))), True)
+                ])
+
+    async def _punish(self, guild: discord.Guild, executor_id: int, reason: str) -> bool:
+        """Aplica a punição e devolve se deu certo. Não loga: o log vem depois, fora do caminho crítico."""
         ptype = self.punish_cfg.get('type', 'ban')
-        await self._log(guild, self.embed_cfg.get('title_punish', 'Usuário punido'), [
-            ('Executor', member.mention, True),
-            ('Ação', ptype, True),
-            ('Motivo', reason, False)
-        ])
+        member = guild.get_member(executor_id)
         try:
             if ptype == 'ban':
-                await guild.ban(member, reason=reason, delete_message_days=0)
+                # Object basta: não espera cache de membro nem fetch
+                await guild.ban(discord.Object(executor_id), reason=reason, delete_message_seconds=0)
             elif ptype == 'kick':
-                await guild.kick(member, reason=reason)
+                await guild.kick(discord.Object(executor_id), reason=reason)
             elif ptype == 'timeout':
+                if member is None:
+                    return False
                 seconds = int(self.punish_cfg.get('timeout_seconds', 1800))
                 until = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=seconds)
                 await member.timeout(until, reason=reason)
             elif ptype == 'remove_roles':
+                if member is None:
+                    return False
                 keep_ids = set(self.punish_cfg.get('keep_role_ids', []))
                 dangerous_only = self.punish_cfg.get('remove_dangerous_only', True)
                 to_remove = []
@@ -278,95 +543,112 @@ class ProtectAntiNukeCog(commands.Cog):
                         to_remove.append(r)
                 if to_remove:
                     await member.remove_roles(*to_remove, reason=reason)
-        except Exception:
+        except Exception as e:
             if self.debug:
-                print('[antinuke] Falha ao punir usuário')
+                print(f'[antinuke] Falha ao punir usuário: {e}')
+            return False
+        return True
 
-    async def _handle_action(self, guild: discord.Guild, action: str, target: str, executor: discord.Member):
-        if not executor:
+    async def _handle_action(self, guild: discord.Guild, action: str, target: str, executor_id: int | None,
+                             started: float | None = None):
+        """Caminho crítico: contar, decidir e punir. Logs e lockdown vão para tasks em segundo plano."""
+        if not executor_id:
+            return
+        started = self._now() if started is None else started
+        if self._is_trusted(guild, executor_id):
             return
-        self._record_action(executor.id, action)
-        count = self._count(executor.id, action)
-        threshold = int(self.thresholds.get(action, 999999))
-        combined_t = self._combined_count(executor.id)
-        combined_th = int(self.thresholds.get('combined', 999999))
-        # Log do evento
-        await self._log(guild, self.embed_cfg.get('title_event', 'Evento AntiNuke'), [
-            ('Executor', executor.mention, True),
+        count = self._record_action(guild.id, executor_id, action)
+        combined_t = self._combined_count(guild.id, executor_id)
+        if self._exceeds(action, count) or (action in self.combined_actions and self._exceeds('combined', combined_t)):
+            key = (guild.id, executor_id)
+            last = self._punished_at.get(key)
+            # Uma punição por executor por janela: os eventos seguintes do mesmo spree não repetem a chamada
+            if last is None or started - last > self.interval:
+                if len(self._punished_at) > 256:
+                    self._punished_at = {k: t for k, t in self._punished_at.items() if started - t <= self.interval}
+                self._punished_at[key] = started
+                reason = self.msgs.get('punish_reason', 'Excesso de ações destrutivas')
+                ok = await self._punish(guild, executor_id, reason)
+                elapsed = self._now() - started
+                self.latency.record(elapsed)
+                if self.lockdown_cfg.get('enabled', True) and self.lockdown_cfg.get('apply_on_trigger', True):
+                    self._track(self._apply_lockdown(guild))
+                self._track(self._log(guild, self.embed_cfg.get('title_punish', 'Usuário punido'), [
+                    ('Executor', f'<@{executor_id}>', True),
+                    ('Ação', self.punish_cfg.get('type', 'ban') + ('' if ok else ' (falhou)'), True),
+                    ('Latência', f'{elapsed * 1000:.0f}ms', True),
+                    ('Motivo', reason, False)
+                ]))
+        self._track(self._log(guild, self.embed_cfg.get('title_event', 'Evento AntiNuke'), [
+            ('Executor', f'<@{executor_id}>', True),
             ('Ação', action, True),
             ('Alvo', target, True),
-            ('Count', f'{count}/{threshold}', True),
-            ('Combined', f'{combined_t}/{combined_th}', True)
-        ])
-        # Verificar thresholds
-        if self._exceeds_threshold(executor.id, action) or self._exceeds_combined(executor.id):
-            await self._punish(guild, executor, self.msgs.get('punish_reason', 'Excesso de ações destrutivas'))
-            # Ativar lockdown se configurado
-            if self.lockdown_cfg.get('enabled', True) and self.lockdown_cfg.get('apply_on_trigger', True):
-                await self._apply_lockdown(guild)
-
-    # ---------------- Audit Helpers -----------------
-    async def _fetch_audit_executor(self, guild: discord.Guild, action: discord.AuditLogAction, target_id: int | None) -> discord.Member | None:
-        try:
-            async for entry in guild.audit_logs(limit=6, action=action):
-                if target_id is not None:
-                    if getattr(entry.target, 'id', None) != target_id:
-                        continue
-                return guild.get_member(entry.user.id)
-        except Exception:
-            return None
-        return None
+            ('Count', f'{count}/{int(self.thresholds.get(action, 999999))}', True),
+            ('Combined', f"{combined_t}/{int(self.thresholds.get('combined', 999999))}", True)
+        ]))
 
     # ---------------- Eventos -----------------
     @commands.Cog.listener()
-    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
-        if not self.enabled or not self.monitor_cfg.get('channel_delete', True):
-            return
-        guild = channel.guild
-        executor = await self._fetch_audit_executor(guild, discord.AuditLogAction.channel_delete, channel.id)
-        await self._handle_action(guild, 'channel_delete', f'{channel.name}', executor)
+    async def on_ready(self):
+        self._rebuild_trust_all()
+        if not self._replayed:
+            self._replayed = True
+            await self._replay_journal()
+            await self._notify_pending_restores()
 
     @commands.Cog.listener()
-    async def on_guild_role_delete(self, role: discord.Role):
-        if not self.enabled or not self.monitor_cfg.get('role_delete', True):
-            return
-        guild = role.guild
-        executor = await self._fetch_audit_executor(guild, discord.AuditLogAction.role_delete, role.id)
-        await self._handle_action(guild, 'role_delete', f'{role.name}', executor)
+    async def on_guild_join(self, guild: discord.Guild):
+        self._build_trust(guild)
 
     @commands.Cog.listener()
-    async def on_guild_emojis_update(self, guild: discord.Guild, before: List[discord.Emoji], after: List[discord.Emoji]):
-        if not self.enabled or not self.monitor_cfg.get('emoji_delete', True):
-            return
-        # Emojis removidos
-        removed = {e.id: e for e in before if e.id not in {a.id for a in after}}
-        if not removed:
+    async def on_guild_update(self, before: discord.Guild, after: discord.Guild):
+        if before.owner_id != after.owner_id:
+            self._build_trust(after)
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before: discord.Member, after: discord.Member):
+        trust_roles = self.trust_cfg.get('role_ids', [])
+        if not trust_roles or before.roles == after.roles:
             return
-        for eid, emoji in list(removed.items())[:5]:  # limita spam
-            executor = await self._fetch_audit_executor(guild, discord.AuditLogAction.emoji_delete, eid)
-            await self._handle_action(guild, 'emoji_delete', f'{emoji.name}', executor)
+        changed = {r.id for r in before.roles} ^ {r.id for r in after.roles}
+        if changed.intersection(int(r) for r in trust_roles):
+            self._build_trust(after.guild)
 
     @commands.Cog.listener()
-    async def on_webhooks_update(self, channel: discord.abc.GuildChannel):
-        if not self.enabled or not self.monitor_cfg.get('webhook_delete', True):
+    async def on_audit_log_entry_create(self, entry: discord.AuditLogEntry):
+        # O executor chega junto com a entrada pelo gateway: nenhuma busca REST por ação
+        started = self._now()
+        if not self.enabled:
+            return
+        action = AUDIT_ACTIONS.get(entry.action)
+        if action is None or not self.monitor_cfg.get(action, True):
             return
-        guild = channel.guild
-        # audit log para deletions recentes
-        executor = await self._fetch_audit_executor(guild, discord.AuditLogAction.webhook_delete, None)
-        if executor:
-            await self._handle_action(guild, 'webhook_delete', f'{channel.name}', executor)
+        if action == 'role_grant':
+            # Só conta cargo dado que carrega permissão perigosa
+            added = getattr(entry.after, 'roles', None) or []
+            roles = [entry.guild.get_role(r.id) for r in added]
+            if not any(r is not None and r.permissions.value & self.dangerous_mask for r in roles):
+                return
+            target = f'<@{getattr(entry.target, "id", "?")}> +' + ', '.join(r.name for r in roles if r is not None)
+        elif action == 'member_prune':
+            target = f'{getattr(entry.extra, "members_removed", "?")} membros'
+        elif action in ('member_ban', 'member_kick'):
+            target = f'<@{getattr(entry.target, "id", "?")}>'
+        else:
+            target = getattr(entry.before, 'name', None) or getattr(entry.after, 'name', None) or str(getattr(entry.target, 'id', '?'))
+        await self._handle_action(entry.guild, action, target, entry.user_id, started)
 
     # ---------------- Commands -----------------
     @commands.command(name='antinukestatus')
     async def antinuke_status(self, ctx: commands.Context):
         t = self.thresholds
         # Totais atuais por ação para autor (diagnóstico local) - opcional
-        user_id = ctx.author.id
-        cd_t = self._count(user_id, 'channel_delete')
-        rd_t = self._count(user_id, 'role_delete')
-        ed_t = self._count(user_id, 'emoji_delete')
-        wd_t = self._count(user_id, 'webhook_delete')
-        combined_t = self._combined_count(user_id)
+        gid, user_id = ctx.guild.id, ctx.author.id
+        cd_t = self._count(gid, user_id, 'channel_delete')
+        rd_t = self._count(gid, user_id, 'role_delete')
+        ed_t = self._count(gid, user_id, 'emoji_delete')
+        wd_t = self._count(gid, user_id, 'webhook_delete')
+        combined_t = self._combined_count(gid, user_id)
         lines = [self.msgs.get('status_header', 'Proteção AntiNuke')]
         lines.append(self.msgs.get('status_main', 'Enabled={enabled} | Interval={interval}s | Combined={combined_t}/{combined_th}').format(
             enabled=self.enabled, interval=self.interval, combined_t=combined_t, combined_th=t.get('combined', 0)
@@ -377,6 +659,18 @@ class ProtectAntiNukeCog(commands.Cog):
             ed_t=ed_t, ed_th=t.get('emoji_delete', 0),
             wd_t=wd_t, wd_th=t.get('webhook_delete', 0)
         ))
+        lines.append(self.msgs.get('status_thresholds_members', '').format(
+            mb_t=self._count(gid, user_id, 'member_ban'), mb_th=t.get('member_ban', 0),
+            mk_t=self._count(gid, user_id, 'member_kick'), mk_th=t.get('member_kick', 0),
+            mp_t=self._count(gid, user_id, 'member_prune'), mp_th=t.get('member_prune', 0),
+            wc_t=self._count(gid, user_id, 'webhook_create'), wc_th=t.get('webhook_create', 0),
+            rg_t=self._count(gid, user_id, 'role_grant'), rg_th=t.get('role_grant', 0),
+            tracked=len(self._counter)
+        ))
+        lines.append(self.msgs.get('status_latency', 'Evento→punição: {latency}').format(
+            latency=self.latency.line(), target=int(self.latency_target_ms),
+            share=self.latency.share_under(self.latency_target_ms)
+        ))
         await ctx.reply('\n'.join(lines))
 
     @commands.command(name='antinukereload')
@@ -393,12 +687,33 @@ class ProtectAntiNukeCog(commands.Cog):
         await self._restore_lockdown(ctx.guild, auto=False)
         await ctx.reply('Lockdown restaurado manualmente.')
 
+    @commands.command(name='antinukerestore')
+    async def antinuke_restore(self, ctx: commands.Context, minutes: int = 0):
+        """Recria cargos, categorias e canais apagados nos últimos ``minutes`` minutos."""
+        if not ctx.author.guild_permissions.manage_guild:
+            return await ctx.reply('Sem permissão.')
+        running = self._structure_tasks.get(ctx.guild.id)
+        if running and not running.done():
+            return await ctx.reply(self.msgs.get('restore_busy', 'Já existe uma restauração em andamento.'))
+        snap_cog = self.bot.get_cog('GuildSnapshotCog')
+        if snap_cog is None or snap_cog.get_snapshot(ctx.guild.id) is None:
+            return await ctx.reply(self.msgs.get('restore_no_snapshot', 'Sem snapshot da estrutura desta guild.'))
+        minutes = minutes if minutes > 0 else int(self.restore_cfg.get('window_minutes', 60))
+        status = await ctx.reply('Restaurando estrutura…')
+        task = asyncio.create_task(self._restore_structure(ctx.guild, time.time() - minutes * 60, status))
+        self._structure_tasks[ctx.guild.id] = task
+        try:
+            restorer = await task
+        finally:
+            self._structure_tasks.pop(ctx.guild.id, None)
+        if restorer is not None and not restorer.plan.total:
+            await status.edit(content=self.msgs.get('restore_nothing', 'Nada apagado nos últimos {minutes} minutos.').format(minutes=minutes))
+
     @commands.command(name='antinukeclear')
     async def antinuke_clear(self, ctx: commands.Context):
         if not ctx.author.guild_permissions.manage_guild:
             return await ctx.reply('Sem permissão.')
-        self._action_windows.clear()
-        self._combined_counts.clear()
+        self._counter.clear()
         await ctx.reply('Counters AntiNuke limpos.')
 
 async def setup(bot: commands.Bot):
@@ -2,8 +2,14 @@ import discord
 from discord.ext import commands
 from typing import Dict, Any, List
 import asyncio
+from pathlib import Path
 
 from config_loader import config_manager
+from cogs._file_sniff import AttachmentSniffer, refine_container
+from cogs._file_hash import AttachmentHasher, HashBlocklist
+
+DATA_DIR = Path(__file__).parent.parent / 'data'
+HASH_BLOCKLIST_FILE = DATA_DIR / 'file_hash_blocklist.json'
 
 DEFAULTS = {
     "protect_files": {
@@ -18,6 +24,23 @@ DEFAULTS = {
         ],
         "bypass_roles": [],
         "ignore_channels": [],
+        "content_sniffing": {
+            "enabled": False,
+            "head_bytes": 4096,
+            "max_concurrency": 4,
+            "cache_size": 2048,
+            "timeout_seconds": 5,
+            "block_on_mismatch": True,
+            "block_on_error": False
+        },
+        "hash_blocklist": {
+            "enabled": False,
+            "max_file_mb": 25,
+            "chunk_kb": 256,
+            "max_concurrency": 2,
+            "cache_size": 4096,
+            "timeout_seconds": 30
+        },
         "log_channel_id": 0,
         "log_embed": {
             "enabled": True,
@@ -34,6 +57,16 @@ DEFAULTS = {
             "deleted": "{user} sua mensagem foi removida: {reason}",
             "reason_blocked_ext": "Extensão bloqueada: {ext}",
             "reason_not_allowed": "Tipo de arquivo não permitido neste canal.",
+            "reason_content_blocked": "Conteúdo real do arquivo é .{ext}",
+            "reason_content_mismatch": "Conteúdo não corresponde ao tipo declarado (detectado: .{ext})",
+            "reason_sniff_error": "Não foi possível verificar o conteúdo do arquivo.",
+            "reason_hash_blocked": "Arquivo bloqueado (hash conhecido).",
+            "hash_added": "Hash adicionado à blocklist: `{hash}` ({filename})",
+            "hash_exists": "Hash já estava na blocklist: `{hash}`",
+            "hash_removed": "Hash removido da blocklist: `{hash}`",
+            "hash_not_found": "Hash não encontrado na blocklist.",
+            "hash_need_reply": "Responda a uma mensagem com anexo para bloquear o arquivo.",
+            "hash_fail": "Falha ao calcular hash de {filename}: {error}",
             "summary_header": "Proteção de arquivos",
             "summary_flags": "Imgs:{allow_images} Vídeos:{allow_videos} GIFs:{allow_gifs}",
             "line_allowed": "Permitido: .{ext}",
@@ -64,10 +97,36 @@ class ProtectFilesCog(commands.Cog):
         self.feedback_cfg: Dict[str, Any] = self.cfg.get('feedback', {})
         self.msgs: Dict[str, str] = self.cfg.get('messages', {})
         self.debug: bool = self.cfg.get('debug', False)
+        self.sniff_cfg: Dict[str, Any] = self.cfg.get('content_sniffing', {})
+        self.sniffer: AttachmentSniffer | None = None
+        if self.sniff_cfg.get('enabled', False):
+            self.sniffer = AttachmentSniffer(
+                head_bytes=int(self.sniff_cfg.get('head_bytes', 4096)),
+                max_concurrency=int(self.sniff_cfg.get('max_concurrency', 4)),
+                cache_size=int(self.sniff_cfg.get('cache_size', 2048)),
+                timeout=float(self.sniff_cfg.get('timeout_seconds', 5))
+            )
+        self.hash_cfg: Dict[str, Any] = self.cfg.get('hash_blocklist', {})
+        self.hash_blocklist = HashBlocklist(HASH_BLOCKLIST_FILE)
+        self.hasher = AttachmentHasher(
+            chunk_size=int(self.hash_cfg.get('chunk_kb', 256)) * 1024,
+            max_bytes=int(float(self.hash_cfg.get('max_file_mb', 25)) * 1024 * 1024),
+            max_concurrency=int(self.hash_cfg.get('max_concurrency', 2)),
+            cache_size=int(self.hash_cfg.get('cache_size', 4096)),
+            timeout=float(self.hash_cfg.get('timeout_seconds', 30))
+        )
 
     def refresh_config(self):
+        old_clients = [c for c in (self.sniffer, self.hasher) if c is not None]
         self.raw_cfg = config_manager.reload_cog('protect_files')
         self.__init__(self.bot)
+        for client in old_clients:
+            asyncio.create_task(client.close())
+
+    async def cog_unload(self):
+        if self.sniffer is not None:
+            await self.sniffer.close()
+        await self.hasher.close()
 
     def _ext_from_name(self, filename: str) -> str:
         if not filename or '.' not in filename:
@@ -96,6 +155,50 @@ class ProtectFilesCog(commands.Cog):
         # Por padrão: bloquear outros tipos
         return False, self.msgs.get('reason_not_allowed', 'Tipo de arquivo não permitido neste canal.')
 
+    def _declared_category(self, att: discord.Attachment) -> str:
+        ctype = (att.content_type or '').lower()
+        ext = self._ext_from_name(att.filename)
+        if ctype == 'image/gif' or ext == 'gif':
+            return 'gif'
+        if ctype.startswith('image/'):
+            return 'image'
+        if ctype.startswith('video/'):
+            return 'video'
+        return ''
+
+    async def _check_content(self, att: discord.Attachment) -> tuple[bool, str]:
+        """Confere os magic bytes de um anexo já aprovado por extensão/content_type."""
+        try:
+            detected = await self.sniffer.sniff(att.id, att.size, att.url)
+        except Exception:
+            if self.sniff_cfg.get('block_on_error', False):
+                return False, self.msgs.get('reason_sniff_error', 'Não foi possível verificar o conteúdo do arquivo.')
+            return True, ''
+        if detected is None:
+            return True, ''
+        # .docx/.xlsx/.odt… são zip por dentro: não viram "arquivo .zip" (bloqueado por padrão)
+        category, real_ext = refine_container(detected, self._ext_from_name(att.filename))
+        if real_ext in self.blocked_ext or (category in ('executable', 'archive') and real_ext not in self.allowed_ext):
+            return False, self.msgs.get('reason_content_blocked', 'Conteúdo real do arquivo é .{ext}').format(ext=real_ext)
+        declared = self._declared_category(att)
+        if declared and self.sniff_cfg.get('block_on_mismatch', True):
+            # GIF conta como imagem quando allow_images cobre o caso
+            compatible = category == declared or {category, declared} <= {'image', 'gif'}
+            if not compatible:
+                return False, self.msgs.get('reason_content_mismatch', 'Conteúdo não corresponde ao tipo declarado (detectado: .{ext})').format(ext=real_ext)
+        return True, ''
+
+    async def _check_hash(self, att: discord.Attachment) -> tuple[bool, str]:
+        if att.size > self.hasher.max_bytes:
+            return True, ''
+        try:
+            digest = await self.hasher.hash_attachment(att.id, att.size, att.url)
+        except Exception:
+            return True, ''
+        if digest in self.hash_blocklist:
+            return False, self.msgs.get('reason_hash_blocked', 'Arquivo bloqueado (hash conhecido).')
+        return True, ''
+
     async def _log(self, guild: discord.Guild, *, title: str, fields: List[tuple]):
         if not self.log_channel_id:
             return
@@ -159,10 +262,25 @@ class ProtectFilesCog(commands.Cog):
             return
         # Avalia todos os anexos
         reasons = []
+        to_sniff: List[discord.Attachment] = []
         for att in message.attachments:
             ok, reason = self._is_allowed_attachment(att)
             if not ok:
                 reasons.append((att.filename, reason))
+            elif self.sniffer is not None:
+                to_sniff.append(att)
+        # Só lê o conteúdo se os metadados não bastaram para bloquear
+        if to_sniff and not reasons:
+            results = await asyncio.gather(*(self._check_content(att) for att in to_sniff))
+            for att, (ok, reason) in zip(to_sniff, results):
+                if not ok:
+                    reasons.append((att.filename, reason))
+        # Blocklist de hashes só baixa arquivos se houver algo bloqueado
+        if not reasons and self.hash_cfg.get('enabled', False) and len(self.hash_blocklist):
+            results = await asyncio.gather(*(self._check_hash(att) for att in message.attachments))
+            for att, (ok, reason) in zip(message.attachments, results):
+                if not ok:
+                    reasons.append((att.filename, reason))
         if reasons:
             # Log e remoção
             detail = '\n'.join([f"• {name} — {rsn}" for name, rsn in reasons])
@@ -185,6 +303,43 @@ class ProtectFilesCog(commands.Cog):
         self.refresh_config()
         await ctx.reply('Config proteção de arquivos recarregada.')
 
+    @commands.command(name='fileblockhash')
+    async def file_block_hash(self, ctx: commands.Context, *, motivo: str = ''):
+        """Adiciona à blocklist o hash dos anexos da mensagem respondida."""
+        if not ctx.author.guild_permissions.manage_guild:
+            return await ctx.reply('Sem permissão.')
+        ref = ctx.message.reference
+        target = None
+        if ref and ref.message_id:
+            target = ref.resolved if isinstance(ref.resolved, discord.Message) else None
+            if target is None:
+                try:
+                    target = await ctx.channel.fetch_message(ref.message_id)
+                except Exception:
+                    target = None
+        if target is None or not target.attachments:
+            return await ctx.reply(self.msgs.get('hash_need_reply', 'Responda a uma mensagem com anexo para bloquear o arquivo.'))
+        lines = []
+        for att in target.attachments:
+            try:
+                digest = await self.hasher.hash_attachment(att.id, att.size, att.url)
+            except Exception as e:
+                lines.append(self.msgs.get('hash_fail', 'Falha ao calcular hash de {filename}: {error}').format(filename=att.filename, error=e))
+                continue
+            added = await self.hash_blocklist.add(digest, filename=att.filename, size=att.size, added_by=ctx.author.id, reason=motivo)
+            key = 'hash_added' if added else 'hash_exists'
+            default = 'Hash adicionado à blocklist: `{hash}` ({filename})' if added else 'Hash já estava na blocklist: `{hash}`'
+            lines.append(self.msgs.get(key, default).format(hash=digest, filename=att.filename))
+        await ctx.reply('\n'.join(lines))
+
+    @commands.command(name='fileunblockhash')
+    async def file_unblock_hash(self, ctx: commands.Context, digest: str):
+        if not ctx.author.guild_permissions.manage_guild:
+            return await ctx.reply('Sem permissão.')
+        if await self.hash_blocklist.remove(digest.strip()):
+            return await ctx.reply(self.msgs.get('hash_removed', 'Hash removido da blocklist: `{hash}`').format(hash=digest.strip().lower()))
+        await ctx.reply(self.msgs.get('hash_not_found', 'Hash não encontrado na blocklist.'))
+
     @commands.command(name='filespolicy')
     async def files_policy(self, ctx: commands.Context):
         lines = [self.msgs.get('summary_header', 'Proteção de arquivos')]
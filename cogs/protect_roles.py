@@ -1,11 +1,12 @@
 import asyncio
-import datetime
-from typing import Dict, Any, List, Set, Tuple
+from typing import Dict, Any, Iterable, List, Set
 
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 
 from config_loader import config_manager
+from cogs._audit_cache import get_audit_cache
+from cogs._role_enforcer import PendingRemoval, RoleEnforcer
 
 DEFAULTS = {
     "protect_roles": {
@@ -16,8 +17,19 @@ DEFAULTS = {
         "audit_window_seconds": 12,
         "enforce_delay_seconds": 2,
         "enforce_retries": 3,
+        "enforce_max_failures": 5,
+        "enforce_max_backoff_seconds": 60,
+        "enforce_concurrency": 5,
         "bypass_bot_users": True,
         "log_channel_id": 0,
+        "sweep": {
+            "enabled": True,
+            "on_startup": True,
+            "interval_minutes": 30,
+            "mode": "report",  # report | remove
+            # role_id -> user ids que podem ter o cargo; cargos fora daqui não são varridos
+            "authorized_holders": {}
+        },
         "feedback": {
             "notify_executer": False,
             "notify_target": False,
@@ -30,12 +42,26 @@ DEFAULTS = {
             "log_retry": "Reforço #{attempt}: removendo {roles} de {member}.",
             "status_header": "Proteção de cargos — resumo",
             "status_roles": "Cargos protegidos: {roles}",
-            "status_allowed": "Autorizados (users): {users} | (roles): {roles}"
+            "status_allowed": "Autorizados (users): {users} | (roles): {roles}",
+            "status_queue": "Remoções pendentes: {pending} | Chamadas remove_roles: {calls}",
+            "status_sweep": "Varredura: modo={mode} | a cada {interval}min | última: {last}",
+            "sweep_reason": "varredura: titular não autorizado"
         },
         "debug": False
     }
 }
 
+def unauthorized_holders(role_id: int, holders: Iterable[discord.Member], authorized: Set[int],
+                         allowed_users: Set[int], skip_bots: bool) -> Dict[int, Set[int]]:
+    """Membros de ``holders`` que não estão na lista do cargo (nem na lista global)."""
+    found: Dict[int, Set[int]] = {}
+    for m in holders:
+        if m.id in authorized or m.id in allowed_users or (skip_bots and m.bot):
+            continue
+        found.setdefault(m.id, set()).add(role_id)
+    return found
+
+
 class ProtectRolesCog(commands.Cog):
     """Impede concessão de cargos protegidos por usuários não autorizados."""
 
@@ -56,9 +82,37 @@ class ProtectRolesCog(commands.Cog):
         self.feedback: Dict[str, Any] = self.cfg.get('feedback', {})
         self.msgs: Dict[str, str] = self.cfg.get('messages', {})
         self.debug: bool = self.cfg.get('debug', False)
+        self.sweep_cfg: Dict[str, Any] = self.cfg.get('sweep', {})
+        # role_id -> titulares autorizados (chaves do JSON são strings)
+        self.authorized_holders: Dict[int, Set[int]] = {
+            int(rid): {int(u) for u in users} for rid, users in self.sweep_cfg.get('authorized_holders', {}).items()
+        }
+        if not hasattr(self, '_last_sweep'):
+            self._last_sweep: Dict[int, str] = {}
+        self.sweep_loop.change_interval(minutes=max(1.0, float(self.sweep_cfg.get('interval_minutes', 30))))
+        if self.sweep_cfg.get('enabled', True) and not self.sweep_loop.is_running():
+            self.sweep_loop.start()
+
+        # Um agendador só para todas as remoções; sobrevive ao refresh_config (o __init__ é chamado de novo)
+        settings = (self.enforce_delay, self.enforce_retries, int(self.cfg.get('enforce_max_failures', 5)),
+                    float(self.cfg.get('enforce_max_backoff_seconds', 60)), int(self.cfg.get('enforce_concurrency', 5)))
+        if not hasattr(self, 'enforcer'):
+            self.enforcer = RoleEnforcer(self.bot.get_guild, *settings, on_result=self._on_enforce_result)
+        else:
+            self.enforcer.configure(*settings)
+
+    async def cog_load(self):
+        # Pendências deixadas pela instância anterior (reload da extensão) como dados puros
+        pending = getattr(self.bot, '_protect_roles_pending', None)
+        if pending:
+            self.enforcer.import_state(pending)
+            self.bot._protect_roles_pending = None
+        self.enforcer.start()
 
-        # Controle de reforço para evitar duplicação massiva (member_id, role_id) -> task running
-        self._enforce_tasks: Dict[Tuple[int, int], asyncio.Task] = {}
+    async def cog_unload(self):
+        self.sweep_loop.cancel()
+        self.enforcer.stop()
+        self.bot._protect_roles_pending = self.enforcer.export()
 
     def refresh_config(self):
         # Recarrega config e reinicializa campos
@@ -113,53 +167,85 @@ class ProtectRolesCog(commands.Cog):
             except Exception:
                 pass
 
-    async def _enforce_remove(self, member: discord.Member, role_ids: Set[int], reason: str, attempt: int = 0):
-        roles = self._role_objs(member.guild, role_ids)
-        if not roles:
-            return
-        try:
-            await member.remove_roles(*roles, reason=f"ProtectRoles: {reason}")
-        except Exception as e:
+    async def _on_enforce_result(self, event: str, pending: PendingRemoval, member: discord.Member,
+                                 roles: List[discord.Role], error: Exception | None):
+        if event == 'removed':
+            return  # o log de negação já saiu no on_member_update
+        if event == 'reinforced':
             await self._log(
                 member.guild,
-                title=self.cfg.get('log_embed', {}).get('title_fail', 'Falha ao remover cargo'),
+                title=self.log_embed_cfg.get('title_retry', 'Reforço de proteção'),
                 fields=[
+                    ('Tentativa', str(pending.attempt), True),
                     ('Membro', member.mention, True),
-                    ('Cargos', ','.join([r.mention for r in roles]), True),
-                    ('Erro', f'```{e}```', False)
+                    ('Cargos', ','.join([r.mention for r in roles]), False)
                 ]
             )
-        else:
-            if attempt:
-                await self._log(
-                    member.guild,
-                    title=self.cfg.get('log_embed', {}).get('title_retry', 'Reforço de proteção'),
-                    fields=[
-                        ('Tentativa', str(attempt), True),
-                        ('Membro', member.mention, True),
-                        ('Cargos', ','.join([r.mention for r in roles]), False)
-                    ]
-                )
-
-    async def _enforce_loop(self, member_id: int, role_ids: Set[int], guild: discord.Guild, base_reason: str):
-        key_list = [(member_id, rid) for rid in role_ids]
-        # marca tasks
-        for key in key_list:
-            self._enforce_tasks[key] = asyncio.current_task()
-        try:
-            for attempt in range(self.enforce_retries):
-                await asyncio.sleep(self.enforce_delay)
-                member = guild.get_member(member_id)
-                if not member:
-                    return
-                current = {r.id for r in member.roles}
-                still_present = set(role_ids) & current
-                if not still_present:
-                    return
-                await self._enforce_remove(member, still_present, base_reason, attempt=attempt+1)
-        finally:
-            for key in key_list:
-                self._enforce_tasks.pop(key, None)
+            return
+        fields = [
+            ('Membro', member.mention, True),
+            ('Cargos', ','.join([r.mention for r in roles]), True),
+            ('Erro', f'```{error}```', False)
+        ]
+        if event == 'failed':
+            fields.insert(0, ('Nova tentativa', f'#{pending.failures + 1}', True))
+        await self._log(member.guild, title=self.log_embed_cfg.get('title_fail', 'Falha ao remover cargo'), fields=fields)
+
+    # ---------------- Varredura -----------------
+    async def sweep(self, guild: discord.Guild, remove: bool | None = None) -> Dict[str, Any]:
+        """Confere os titulares de cada cargo protegido com a lista de autorizados."""
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        remove = self.sweep_cfg.get('mode', 'report') == 'remove' if remove is None else remove
+        roles = [r for r in self._role_objs(guild, self.protected) if r.id in self.authorized_holders]
+        found: Dict[int, Set[int]] = {}
+        checked = 0
+        for role in roles:
+            holders = role.members
+            checked += len(holders)
+            for mid, rids in unauthorized_holders(role.id, holders, self.authorized_holders[role.id],
+                                                  self.allowed_users, self.bypass_bot_users).items():
+                found.setdefault(mid, set()).update(rids)
+            await asyncio.sleep(0)  # cede o loop entre cargos
+        if remove:
+            reason = self.msgs.get('sweep_reason', 'varredura: titular não autorizado')
+            for mid, rids in found.items():
+                self.enforcer.schedule(guild.id, mid, rids, reason)
+        result = {
+            'roles': len(roles), 'checked': checked, 'found': found, 'removed': remove,
+            'elapsed': loop.time() - started, 'chunked': guild.chunked,
+        }
+        self._last_sweep[guild.id] = f"{len(found)} fora da lista ({checked} titulares, {result['elapsed'] * 1000:.0f}ms)"
+        if found:
+            mentions = ', '.join(f'<@{mid}>' for mid in list(found)[:30])
+            await self._log(
+                guild,
+                title=self.log_embed_cfg.get('title_sweep', 'Varredura de cargos protegidos'),
+                fields=[
+                    ('Cargos varridos', str(len(roles)), True),
+                    ('Titulares', str(checked), True),
+                    ('Fora da lista', str(len(found)), True),
+                    ('Ação', 'remoção agendada' if remove else 'só relatório', True),
+                    ('Membros', mentions + (' …' if len(found) > 30 else ''), False)
+                ]
+            )
+        return result
+
+    @tasks.loop(minutes=30)
+    async def sweep_loop(self):
+        if not (self.enabled and self.sweep_cfg.get('enabled', True)):
+            return
+        if self.sweep_loop.current_loop == 0 and not self.sweep_cfg.get('on_startup', True):
+            return
+        for guild in self.bot.guilds:
+            try:
+                await self.sweep(guild)
+            except Exception as e:
+                print(f'[protect_roles] Falha na varredura de {guild.id}: {e}')
+
+    @sweep_loop.before_loop
+    async def _before_sweep(self):
+        await self.bot.wait_until_ready()
 
     @commands.Cog.listener()
     async def on_member_update(self, before: discord.Member, after: discord.Member):
@@ -181,15 +267,10 @@ class ProtectRolesCog(commands.Cog):
         # Descobrir executor pelo audit log
         executor = None
         try:
-            now = datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc)
-            async for entry in guild.audit_logs(limit=6, action=discord.AuditLogAction.member_role_update):
-                if entry.target.id != after.id:
-                    continue
-                # só eventos recentes
-                if entry.created_at and (now - entry.created_at).total_seconds() > self.audit_window:
-                    break
-                executor = entry.user
-                break
+            # só eventos recentes
+            entry = await get_audit_cache(self.bot).find(guild, discord.AuditLogAction.member_role_update, after.id,
+                                                         self.audit_window, limit=6)
+            executor = entry.user if entry else None
         except Exception:
             executor = None
 
@@ -209,11 +290,8 @@ class ProtectRolesCog(commands.Cog):
                 ('Cargos', roles_text or '(?)', False)
             ]
         )
-        await self._enforce_remove(after, protected_added, "executor não autorizado")
-        # Evita duplicar enforcement se já rodando
-        pending = {(after.id, rid) for rid in protected_added}
-        if not any(k in self._enforce_tasks for k in pending):
-            asyncio.create_task(self._enforce_loop(after.id, protected_added, guild, "reforço de segurança"))
+        # Remoção imediata + verificações, tudo no agendador (uma pendência por membro)
+        self.enforcer.schedule(guild.id, after.id, protected_added, "executor não autorizado")
 
     @commands.command(name='protectrolesreload')
     async def protect_roles_reload(self, ctx: commands.Context):
@@ -231,7 +309,27 @@ class ProtectRolesCog(commands.Cog):
         lines = [self.msgs.get('status_header', 'Proteção de cargos — resumo')]
         lines.append(self.msgs.get('status_roles', 'Cargos protegidos: {roles}').format(roles=', '.join(pr)))
         lines.append(self.msgs.get('status_allowed', 'Autorizados (users): {users} | (roles): {roles}').format(users=', '.join(au), roles=', '.join(ar)))
+        lines.append(self.msgs.get('status_queue', 'Remoções pendentes: {pending} | Chamadas remove_roles: {calls}').format(
+            pending=len(self.enforcer), calls=self.enforcer.api_calls))
+        lines.append(self.msgs.get('status_sweep', 'Varredura: modo={mode} | a cada {interval}min | última: {last}').format(
+            mode=self.sweep_cfg.get('mode', 'report'), interval=self.sweep_cfg.get('interval_minutes', 30),
+            last=self._last_sweep.get(g.id, '(nunca)')))
         await ctx.reply('\n'.join(lines))
 
+    @commands.command(name='protectrolessweep')
+    async def protect_roles_sweep(self, ctx: commands.Context, modo: str = ''):
+        """Roda a varredura agora. ``modo``: remove | report (padrão: o do JSON)."""
+        if not ctx.author.guild_permissions.manage_guild:
+            return await ctx.reply('Sem permissão.')
+        remove = {'remove': True, 'report': False}.get(modo.lower())
+        result = await self.sweep(ctx.guild, remove)
+        text = (f"Varredura: {result['roles']} cargos, {result['checked']} titulares, "
+                f"{len(result['found'])} fora da lista em {result['elapsed'] * 1000:.0f}ms")
+        if result['found']:
+            text += ' — remoção agendada.' if result['removed'] else ' — só relatório.'
+        if not result['chunked']:
+            text += ' (cache de membros incompleto: a próxima varredura pode achar mais)'
+        await ctx.reply(text)
+
 async def setup(bot: commands.Bot):
     await bot.add_cog(ProtectRolesCog(bot))
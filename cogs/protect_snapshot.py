@@ -0,0 +1,257 @@
+import asyncio
+from pathlib import Path
+from typing import Dict, Optional
+
+import discord
+from discord.ext import commands, tasks
+
+from config_loader import config_manager
+from cogs._guild_snapshot import (
+    GuildSnapshot, channel_snap, load_snapshot, role_snap, save_snapshot,
+)
+
+DATA_DIR = Path(__file__).parent.parent / 'data'
+SNAPSHOT_DIR = DATA_DIR / 'snapshots'
+
+DEFAULTS = {
+    "protect_snapshot": {
+        "enabled": True,
+        "debug": False,
+        "log_channel_id": 0,
+        "checkpoint_interval_seconds": 60,
+        "tombstone_retention_hours": 72,
+        "messages": {
+            "status_header": "Snapshot da estrutura",
+            "status_main": "Canais: {channels} | Cargos: {roles} | Versão: {version} | Último checkpoint: {saved}",
+            "status_deleted": "Apagados guardados: {deleted_channels} canais, {deleted_roles} cargos (retenção {retention}h)",
+            "offline_title": "Estrutura alterada com o bot offline",
+            "diff_empty": "Nada mudou desde o último checkpoint.",
+            "diff_header": "Mudanças desde o último checkpoint:",
+            "no_snapshot": "Ainda não há snapshot desta guild."
+        }
+    }
+}
+
+
+class GuildSnapshotCog(commands.Cog):
+    """Mantém um snapshot incremental de canais, categorias, cargos e overwrites de cada guild.
+
+    O snapshot é atualizado pelos eventos do gateway (sem fetch) e gravado em disco
+    periodicamente quando mudou. Canais e cargos apagados ficam guardados como
+    lápides para que a estrutura possa ser recriada após um nuke.
+    """
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.raw_cfg = config_manager.load_cog('protect_snapshot', defaults=DEFAULTS)
+        self.cfg = self.raw_cfg.get('protect_snapshot', {})
+        self.enabled: bool = self.cfg.get('enabled', True)
+        self.debug: bool = self.cfg.get('debug', False)
+        self.log_channel_id: int = self.cfg.get('log_channel_id', 0)
+        self.checkpoint_interval: float = max(5.0, float(self.cfg.get('checkpoint_interval_seconds', 60)))
+        self.retention: float = float(self.cfg.get('tombstone_retention_hours', 72)) * 3600
+        self.msgs: Dict[str, str] = self.cfg.get('messages', {})
+        # Sobrevive ao refresh_config (o __init__ é chamado de novo)
+        if not hasattr(self, '_snapshots'):
+            self._snapshots: Dict[int, GuildSnapshot] = {}
+            self._saved_at: Dict[int, float] = {}
+            self._loaded = False
+        self.checkpoint_loop.change_interval(seconds=self.checkpoint_interval)
+        if not self.checkpoint_loop.is_running():
+            self.checkpoint_loop.start()
+
+    def refresh_config(self):
+        self.raw_cfg = config_manager.reload_cog('protect_snapshot')
+        self.__init__(self.bot)
+
+    async def cog_load(self):
+        if self.bot.is_ready():
+            asyncio.create_task(self.load_all())
+
+    async def cog_unload(self):
+        self.checkpoint_loop.cancel()
+        await self.checkpoint()
+
+    # ----------------- API -----------------
+    def get_snapshot(self, guild_id: int) -> Optional[GuildSnapshot]:
+        return self._snapshots.get(guild_id)
+
+    def _path(self, guild_id: int) -> Path:
+        return SNAPSHOT_DIR / f'{guild_id}.json'
+
+    async def load_guild(self, guild: discord.Guild):
+        """Carrega o checkpoint e o reconcilia com o estado atual (o que sumiu offline vira lápide)."""
+        live = GuildSnapshot.from_guild(guild)
+        loop = asyncio.get_running_loop()
+        try:
+            stored = await loop.run_in_executor(None, load_snapshot, self._path(guild.id))
+        except Exception as e:
+            print(f'[protect_snapshot] Checkpoint inválido de {guild.id}: {e}')
+            stored = None
+        if stored is None:
+            self._snapshots[guild.id] = live
+            return
+        diff = stored.rebase(live)
+        stored.prune(self.retention)
+        self._snapshots[guild.id] = stored
+        if diff.channels_removed or diff.roles_removed:
+            await self._log_offline(guild, diff)
+        if self.debug:
+            print(f'[protect_snapshot] {guild.id}: checkpoint v{stored.version}, {len(diff.summary_lines(1000))} mudanças offline')
+
+    async def load_all(self):
+        if not self.enabled or self._loaded:
+            return
+        self._loaded = True
+        for guild in self.bot.guilds:
+            await self.load_guild(guild)
+
+    async def checkpoint(self, force: bool = False) -> int:
+        """Grava os snapshots alterados. Serialização do JSON roda em executor."""
+        loop = asyncio.get_running_loop()
+        saved = 0
+        for gid, snap in list(self._snapshots.items()):
+            if not (snap.dirty or force):
+                continue
+            snap.prune(self.retention)
+            data = snap.to_dict()
+            snap.dirty = False
+            try:
+                await loop.run_in_executor(None, save_snapshot, self._path(gid), data)
+            except Exception as e:
+                snap.dirty = True
+                print(f'[protect_snapshot] Falha ao gravar snapshot de {gid}: {e}')
+                continue
+            self._saved_at[gid] = data['updated_at']
+            saved += 1
+        return saved
+
+    @tasks.loop(seconds=60)
+    async def checkpoint_loop(self):
+        await self.checkpoint()
+
+    @checkpoint_loop.before_loop
+    async def _before_checkpoint(self):
+        await self.bot.wait_until_ready()
+
+    async def _log_offline(self, guild: discord.Guild, diff):
+        if not self.log_channel_id:
+            return
+        ch = guild.get_channel(self.log_channel_id)
+        if not isinstance(ch, discord.TextChannel):
+            return
+        lines = diff.summary_lines(15)
+        embed = discord.Embed(title=self.msgs.get('offline_title', 'Estrutura alterada com o bot offline'),
+                              description='\n'.join(lines)[:4000], color=discord.Color.orange())
+        try:
+            await ch.send(embed=embed)
+        except Exception:
+            pass
+
+    def _snap(self, guild: discord.Guild) -> Optional[GuildSnapshot]:
+        if not self.enabled:
+            return None
+        return self._snapshots.get(guild.id)
+
+    # ----------------- Eventos -----------------
+    @commands.Cog.listener()
+    async def on_ready(self):
+        await self.load_all()
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild: discord.Guild):
+        if self.enabled:
+            await self.load_guild(guild)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        # O checkpoint em disco fica: se o bot voltar, as lápides ainda servem
+        self._snapshots.pop(guild.id, None)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel: discord.abc.GuildChannel):
+        snap = self._snap(channel.guild)
+        if snap is not None:
+            snap.upsert_channel(channel_snap(channel))
+
+    @commands.Cog.listener()
+    async def on_guild_channel_update(self, before: discord.abc.GuildChannel, after: discord.abc.GuildChannel):
+        snap = self._snap(after.guild)
+        if snap is not None:
+            snap.upsert_channel(channel_snap(after))
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
+        snap = self._snap(channel.guild)
+        if snap is not None:
+            snap.delete_channel(channel.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_create(self, role: discord.Role):
+        snap = self._snap(role.guild)
+        if snap is not None:
+            snap.upsert_role(role_snap(role))
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before: discord.Role, after: discord.Role):
+        snap = self._snap(after.guild)
+        if snap is not None:
+            snap.upsert_role(role_snap(after))
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role: discord.Role):
+        snap = self._snap(role.guild)
+        if snap is not None:
+            snap.delete_role(role.id)
+
+    # ----------------- Comandos -----------------
+    @commands.command(name='snapshotstatus')
+    async def snapshot_status(self, ctx: commands.Context):
+        if not ctx.author.guild_permissions.manage_guild:
+            return await ctx.reply('Sem permissão.')
+        snap = self._snapshots.get(ctx.guild.id)
+        if snap is None:
+            return await ctx.reply(self.msgs.get('no_snapshot', 'Ainda não há snapshot desta guild.'))
+        saved_ts = self._saved_at.get(ctx.guild.id)
+        saved = f'<t:{int(saved_ts)}:R>' if saved_ts else '(nunca)'
+        lines = [self.msgs.get('status_header', 'Snapshot da estrutura')]
+        lines.append(self.msgs.get('status_main', '').format(
+            channels=len(snap.channels), roles=len(snap.roles), version=snap.version, saved=saved
+        ))
+        lines.append(self.msgs.get('status_deleted', '').format(
+            deleted_channels=len(snap.deleted_channels), deleted_roles=len(snap.deleted_roles),
+            retention=int(self.retention // 3600)
+        ))
+        await ctx.reply('\n'.join(lines))
+
+    @commands.command(name='snapshotdiff')
+    async def snapshot_diff(self, ctx: commands.Context):
+        """Compara o último checkpoint gravado com o estado atual da guild."""
+        if not ctx.author.guild_permissions.manage_guild:
+            return await ctx.reply('Sem permissão.')
+        stored = await asyncio.get_running_loop().run_in_executor(None, load_snapshot, self._path(ctx.guild.id))
+        if stored is None:
+            return await ctx.reply(self.msgs.get('no_snapshot', 'Ainda não há snapshot desta guild.'))
+        diff = stored.diff(GuildSnapshot.from_guild(ctx.guild))
+        if not diff:
+            return await ctx.reply(self.msgs.get('diff_empty', 'Nada mudou desde o último checkpoint.'))
+        body = '\n'.join(diff.summary_lines(15))
+        await ctx.reply(f"{self.msgs.get('diff_header', 'Mudanças desde o último checkpoint:')}\n```diff\n{body[:1800]}\n```")
+
+    @commands.command(name='snapshotsave')
+    async def snapshot_save(self, ctx: commands.Context):
+        if not ctx.author.guild_permissions.manage_guild:
+            return await ctx.reply('Sem permissão.')
+        saved = await self.checkpoint(force=True)
+        await ctx.reply(f'Checkpoint gravado ({saved} guilds).')
+
+    @commands.command(name='snapshotreload')
+    async def snapshot_reload(self, ctx: commands.Context):
+        if not ctx.author.guild_permissions.manage_guild:
+            return await ctx.reply('Sem permissão.')
+        self.refresh_config()
+        await ctx.reply('Config protect_snapshot recarregada.')
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(GuildSnapshotCog(bot))
@@ -6,6 +6,7 @@ import discord
 from discord.ext import commands
 
 from config_loader import config_manager
+from cogs._punish_batch import PunishBatch, PunishmentBatcher
 
 DEFAULTS = {
     "protect_useralt": {
@@ -21,6 +22,11 @@ DEFAULTS = {
             "title_kicked": "Conta nova expulsa",
             "title_fail": "Falha ao punir conta nova"
         },
+        "batch": {
+            "window_seconds": 1.0,
+            "concurrency": 5,
+            "delete_message_seconds": 0
+        },
         "exempt_user_ids": [],
         "exempt_role_ids": [],
         "exempt_invite_codes": [],
@@ -54,11 +60,24 @@ class ProtectUserAltCog(commands.Cog):
         self.exempt_invite_codes: Set[str] = set([c.lower() for c in self.cfg.get('exempt_invite_codes', [])])
         self.msgs: Dict[str, str] = self.cfg.get('messages', {})
         self.debug: bool = self.cfg.get('debug', False)
+        batch_cfg: Dict[str, Any] = self.cfg.get('batch', {})
+        # Bans viram bulk_ban (até 200 por chamada); kicks passam por fila com concorrência limitada
+        self.batcher = PunishmentBatcher(
+            window_seconds=float(batch_cfg.get('window_seconds', 1.0)),
+            concurrency=int(batch_cfg.get('concurrency', 5)),
+            delete_message_seconds=int(batch_cfg.get('delete_message_seconds', 0)),
+            on_flush=self._log_batch
+        )
+        # member_id -> idade (h), só para o resumo do lote
+        self._ages: Dict[int, float] = {}
 
     def refresh_config(self):
         self.raw_cfg = config_manager.reload_cog('protect_useralt')
         self.__init__(self.bot)
 
+    async def cog_unload(self):
+        await self.batcher.close()
+
     async def _log(self, guild: discord.Guild, title: str, fields: List[tuple]):
         if not self.log_channel_id:
             return
@@ -105,48 +124,52 @@ class ProtectUserAltCog(commands.Cog):
         return False
 
     async def _punish(self, member: discord.Member, age_hours: float):
-        # Banir ou expulsar
-        action_title = self.log_embed_cfg.get('title_banned' if self.do_ban else 'title_kicked', 'Conta nova punida')
+        # Banir ou expulsar (em lote: um resumo por lote em vez de um log por membro)
+        self._ages[member.id] = age_hours
         if self.do_ban:
-            try:
-                # Incluir motivo detalhado com idade real da conta; log será feito pela cog de Ban via on_member_ban
-                await member.ban(reason=f"Conta nova ({age_hours:.1f}h < {self.min_age_hours}h)")
-                # Não enviar log próprio para bans bem-sucedidos; o log padrão de ban cuidará disso
+            # Motivo igual para todos do lote (bulk_ban leva um motivo só); a idade de cada um vai no log
+            ok = await self.batcher.submit(member.guild, member, 'ban', reason=f"Conta nova (<{self.min_age_hours}h)")
+            if ok or not self.kick_if_ban_fails:
                 return
-            except Exception as e:
-                if self.kick_if_ban_fails:
-                    try:
-                        await member.kick(reason="Falha ban conta nova")
-                        await self._log(member.guild, self.log_embed_cfg.get('title_kicked', 'Conta nova expulsa'), [
-                            ('Usuário', member.mention, True),
-                            ('Falha ban', f'```{e}```', False)
-                        ])
-                        return
-                    except Exception as e2:
-                        await self._log(member.guild, self.log_embed_cfg.get('title_fail', 'Falha ao punir conta nova'), [
-                            ('Usuário', member.mention, True),
-                            ('Erro ban', f'```{e}```', False),
-                            ('Erro kick', f'```{e2}```', False)
-                        ])
-                        return
-                else:
-                    await self._log(member.guild, self.log_embed_cfg.get('title_fail', 'Falha ao punir conta nova'), [
-                        ('Usuário', member.mention, True),
-                        ('Erro ban', f'```{e}```', False)
-                    ])
-                    return
+            await self.batcher.submit(member.guild, member, 'kick', reason="Falha ban conta nova")
         else:
-            try:
-                await member.kick(reason=f"Conta nova (<{self.min_age_hours}h)")
-                await self._log(member.guild, action_title, [
-                    ('Usuário', member.mention, True),
-                    ('Idade (h)', f"{age_hours:.1f}", True)
-                ])
-            except Exception as e:
-                await self._log(member.guild, self.log_embed_cfg.get('title_fail', 'Falha ao punir conta nova'), [
-                    ('Usuário', member.mention, True),
-                    ('Erro kick', f'```{e}```', False)
-                ])
+            await self.batcher.submit(member.guild, member, 'kick', reason=f"Conta nova (<{self.min_age_hours}h)")
+
+    async def _log_batch(self, batch: PunishBatch):
+        action_name = {'ban': 'Ban', 'kick': 'Kick'}.get(batch.action, batch.action)
+        if not batch.ok:
+            title = self.log_embed_cfg.get('title_fail', 'Falha ao punir conta nova')
+        elif batch.action == 'ban':
+            title = self.log_embed_cfg.get('title_banned', 'Conta nova banida')
+        else:
+            title = self.log_embed_cfg.get('title_kicked', 'Conta nova expulsa')
+
+        def describe(ids: List[int]) -> str:
+            parts = []
+            for uid in ids[:30]:
+                age = self._ages.get(uid)
+                parts.append(f'<@{uid}> ({age:.1f}h)' if age is not None else f'<@{uid}>')
+            if len(ids) > 30:
+                parts.append(f'(+{len(ids) - 30})')
+            return ' '.join(parts)[:1024]
+
+        fields = [
+            ('Ação', action_name, True),
+            ('Punidos', str(len(batch.ok)), True),
+            ('Falhas', str(len(batch.failed)), True),
+            ('Chamadas API', f'{batch.calls} em {batch.elapsed:.1f}s', True)
+        ]
+        if batch.ok:
+            fields.append(('Usuários', describe(batch.ok), False))
+        if batch.failed:
+            fields.append(('Falharam', describe(batch.failed), False))
+        if batch.errors:
+            fields.append(('Erros', f"```{chr(10).join(batch.errors[:3])[:1000]}```", False))
+        await self._log(batch.guild, f'{title} ({len(batch.ok)})' if batch.ok else title, fields)
+        # Quem falhou no ban ainda pode ir para o lote de kick
+        done_ids = batch.ok if batch.action == 'ban' and self.kick_if_ban_fails else batch.ok + batch.failed
+        for uid in done_ids:
+            self._ages.pop(uid, None)
 
     @commands.Cog.listener()
     async def on_member_join(self, member: discord.Member):
@@ -156,8 +179,15 @@ class ProtectUserAltCog(commands.Cog):
         age_hours = self._account_age_hours(member)
         if age_hours >= self.min_age_hours:
             return
-        # Invite code não é fornecido diretamente no evento; se quiser suportar, pode registrar invites antes.
+        # Convite usado vem do cache de usos do InviteTrackerCog (só consulta se há convites isentos)
         invite_code = None
+        if self.exempt_invite_codes:
+            tracker = self.bot.get_cog('InviteTrackerCog')
+            if tracker is not None:
+                attr = await tracker.resolve(member)
+                # Só isenta com atribuição exata: num lote ambíguo um raider herdaria o convite isento
+                if attr and not attr.ambiguous:
+                    invite_code = attr.code
         if self._is_exempt(member, invite_code):
             return
         await self._punish(member, age_hours)
@@ -1,12 +1,57 @@
+import datetime
 import discord
 from discord.ext import commands
 from config_loader import config_manager
+from cogs._message_cache import CachedMessage
+
+# O bulk delete do Discord só aceita mensagens com menos de 14 dias (margem para o relógio)
+BULK_MAX_AGE = datetime.timedelta(days=14) - datetime.timedelta(minutes=2)
 
 class ClearChatCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.config = config_manager.load_cog("clearchat").get("clearchat", {})
 
+    async def _purge_batches(self, channel: discord.TextChannel, limit: int, transcript, mark=None):
+        """Apaga em lotes de 100 direto do histórico e devolve quantas saíram em cada lote.
+
+        Diferente do ``channel.purge``, não junta todas as mensagens numa lista: cada lote vai
+        para a transcrição (se houver) depois de apagado e é descartado. ``mark`` recebe os ids
+        de cada lote antes da deleção (o audit_user não loga esses ids de novo).
+        """
+        batch = []
+        async for message in channel.history(limit=limit):
+            batch.append(message)
+            if len(batch) == 100:
+                yield await self._delete_batch(channel, batch, transcript, mark)
+                batch = []
+        if batch:
+            yield await self._delete_batch(channel, batch, transcript, mark)
+
+    async def _delete_batch(self, channel: discord.TextChannel, batch, transcript, mark=None) -> int:
+        if mark is not None:
+            mark([m.id for m in batch])
+        cutoff = discord.utils.utcnow() - BULK_MAX_AGE
+        recent = [m for m in batch if m.created_at > cutoff]
+        single = [m for m in batch if m.created_at <= cutoff]
+        done = []
+        if len(recent) >= 2:
+            await channel.delete_messages(recent)
+            done += recent
+        else:
+            single = recent + single
+        # Antigas demais para o bulk: uma por vez
+        for m in single:
+            try:
+                await m.delete()
+            except discord.NotFound:
+                continue
+            done.append(m)
+        if transcript is not None:
+            for m in done:
+                transcript.add(CachedMessage.from_message(m))
+        return len(done)
+
     @commands.command(name="clear")
     @commands.has_permissions(manage_messages=True)
     async def clear(self, ctx, amount: int = None):
@@ -47,21 +92,41 @@ class ClearChatCog(commands.Cog):
         confirm_msg = await ctx.send(confirm_text)
         await confirm_msg.delete(delay=delete_delay)
 
-        # Limpeza eficiente com bulk_delete()
+        # O log (com a transcrição das mensagens) fica com o audit_user, se carregado
+        audit = self.bot.get_cog("AuditUserCog")
+        transcript = None
+        if audit is not None and self.config.get("transcript", True):
+            transcript = audit.new_transcript(text_channel, "Limpeza de chat (mais novas primeiro)")
+
+        # Limpeza eficiente com bulk_delete(), em lotes
+        deleted_count = 0
+        failed = False
+        # Ids apagados aqui não geram log próprio no audit_user (o resumo abaixo cobre)
+        mark = audit.expect_purge if audit is not None else None
         try:
-            deleted = await text_channel.purge(limit=amount + 1)  # +1 para incluir a mensagem do comando
+            async for n in self._purge_batches(text_channel, amount + 1, transcript, mark):  # +1 para incluir a mensagem do comando
+                deleted_count += n
         except discord.Forbidden:
+            failed = True
             text = msgs.get("no_perm_bot", "Não tenho permissão em {channel}.").format(channel=text_channel.mention)
             msg = await ctx.send(text)
             await msg.delete(delay=delete_delay)
-            return
         except discord.HTTPException as e:
+            failed = True
             msg = await ctx.send(f"❌ **Ocorreu um erro ao apagar mensagens: {str(e)}**")
             await msg.delete(delay=delete_delay)
+
+        # Mesmo com erro no meio, o que já foi apagado é logado
+        try:
+            if audit is not None and deleted_count:
+                await audit.log_manual_purge(text_channel, ctx.author, deleted_count, transcript)
+        finally:
+            if transcript is not None:
+                transcript.discard()
+        if failed:
             return
 
         # Informando sucesso e quantidade de mensagens apagadas
-        deleted_count = len(deleted)
         if deleted_count > 0:
             text = msgs.get("success", "{deleted} mensagens apagadas em {channel}.").format(deleted=deleted_count, channel=f"#{text_channel.name}")
             msg = await ctx.send(text)
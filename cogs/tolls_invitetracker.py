@@ -0,0 +1,331 @@
+import asyncio
+from collections import Counter, OrderedDict, deque
+from typing import Any, Deque, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import discord
+from discord.ext import commands
+
+from config_loader import config_manager
+from cogs._ratelimit import run_limited
+
+DEFAULTS = {
+    "invite_tracker": {
+        "enabled": True,
+        "batch_window_seconds": 0.5,
+        "resolve_timeout_seconds": 5,
+        "recent_window_seconds": 300,
+        "warm_concurrency": 4,
+        "track_vanity": True,
+        "messages": {
+            "status_header": "Invite Tracker",
+            "status_main": "Rastreando: {tracked} | Convites em cache: {cached} | Atribuídos: {attributed} | Ambíguos: {ambiguous} | Sem convite: {unknown}",
+            "status_recent": "Últimos {seconds}s: {codes}",
+            "not_tracked": "Convites desta guild não estão sendo rastreados (falta permissão Gerenciar Servidor?)."
+        },
+        "debug": False
+    }
+}
+
+
+class InviteInfo(NamedTuple):
+    code: str
+    uses: int
+    max_uses: int
+    inviter_id: Optional[int]
+
+
+class Attribution(NamedTuple):
+    """Convite pelo qual um membro entrou.
+
+    ``ambiguous`` é True quando o lote teve mais de um convite com uso novo (ou menos
+    usos que entradas) e não dá para saber exatamente qual membro usou qual.
+    """
+    code: Optional[str]
+    inviter_id: Optional[int]
+    ambiguous: bool
+    candidates: Tuple[str, ...]
+
+
+def invite_info(inv: discord.Invite) -> InviteInfo:
+    inviter = getattr(inv, 'inviter', None)
+    return InviteInfo(inv.code, int(inv.uses or 0), int(inv.max_uses or 0), inviter.id if inviter else None)
+
+
+class InviteUsesCache:
+    """Snapshot de usos por convite de uma guild; o diff entre snapshots revela o convite usado."""
+
+    def __init__(self):
+        self.invites: Dict[str, InviteInfo] = {}
+        # Convites apagados desde o último snapshot (on_invite_delete)
+        self._deleted: Dict[str, InviteInfo] = {}
+
+    def __len__(self) -> int:
+        return len(self.invites)
+
+    def load(self, invites: Iterable[InviteInfo]):
+        self.invites = {i.code: i for i in invites}
+        self._deleted.clear()
+
+    def add(self, info: InviteInfo):
+        self.invites[info.code] = info
+
+    def remove(self, code: str):
+        info = self.invites.pop(code, None)
+        if info is not None:
+            self._deleted[code] = info
+
+    def diff(self, fresh: Iterable[InviteInfo]) -> Dict[str, int]:
+        """Substitui o snapshot por ``fresh`` e retorna ``{code: usos novos}``.
+
+        Convite de uso limitado some quando atinge ``max_uses``; se sumiu com usos
+        restantes, conta os usos que faltavam (normalmente 1). Só vale para o que
+        sumiu sem ``on_invite_delete``: convite apagado (revogado por alguém ou
+        pelo anti_raid) não recebe a entrada, nem como ambígua. Na dúvida a
+        entrada fica sem convite, nunca atribuída a um convite revogado.
+        """
+        fresh_map = {i.code: i for i in fresh}
+        deltas: Dict[str, int] = {}
+        for code, info in fresh_map.items():
+            old = self.invites.get(code) or self._deleted.get(code)
+            delta = info.uses - (old.uses if old else 0)
+            if delta > 0:
+                deltas[code] = delta
+        gone = {c: i for c, i in self.invites.items() if c not in fresh_map}
+        for code, old in gone.items():
+            if old.max_uses and old.uses < old.max_uses:
+                deltas[code] = deltas.get(code, 0) + (old.max_uses - old.uses)
+        self.invites = fresh_map
+        self._deleted.clear()
+        return deltas
+
+
+def attribute(deltas: Dict[str, int], member_ids: List[int], inviters: Dict[str, Optional[int]]) -> Dict[int, Attribution]:
+    """Atribui um lote de entradas aos convites com uso novo."""
+    codes = tuple(sorted((c for c, d in deltas.items() if d > 0), key=lambda c: -deltas[c]))
+    if not codes:
+        return {mid: Attribution(None, None, False, ()) for mid in member_ids}
+    top = codes[0]
+    exact = len(codes) == 1 and deltas[top] >= len(member_ids)
+    result = Attribution(top, inviters.get(top), not exact, codes)
+    return {mid: result for mid in member_ids}
+
+
+class _GuildState:
+    __slots__ = ('cache', 'pending', 'flush_task', 'lock', 'recent', 'resolved', 'stats')
+
+    def __init__(self):
+        self.cache = InviteUsesCache()
+        self.pending: Dict[int, asyncio.Future] = {}
+        self.flush_task: Optional[asyncio.Task] = None
+        self.lock = asyncio.Lock()
+        # (loop_time, code) das entradas atribuídas, para consultas por janela (anti_raid)
+        self.recent: Deque[Tuple[float, Optional[str]]] = deque(maxlen=5000)
+        # member_id -> atribuição, para quem consultar depois do lote (LRU)
+        self.resolved: 'OrderedDict[int, Optional[Attribution]]' = OrderedDict()
+        self.stats = Counter()
+
+
+class InviteTrackerCog(commands.Cog):
+    """Cache de usos de convites por guild para descobrir por qual convite cada membro entrou."""
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.raw_cfg = config_manager.load_cog('invite_tracker', defaults=DEFAULTS)
+        self.cfg = self.raw_cfg.get('invite_tracker', {})
+        self.enabled: bool = self.cfg.get('enabled', True)
+        self.batch_window: float = float(self.cfg.get('batch_window_seconds', 0.5))
+        self.resolve_timeout: float = float(self.cfg.get('resolve_timeout_seconds', 5))
+        self.recent_window: float = float(self.cfg.get('recent_window_seconds', 300))
+        self.warm_concurrency: int = int(self.cfg.get('warm_concurrency', 4))
+        self.track_vanity: bool = self.cfg.get('track_vanity', True)
+        self.msgs: Dict[str, str] = self.cfg.get('messages', {})
+        self.debug: bool = self.cfg.get('debug', False)
+        # Sobrevive ao refresh_config (o __init__ é chamado de novo)
+        if not hasattr(self, '_states'):
+            self._states: Dict[int, _GuildState] = {}
+
+    def refresh_config(self):
+        self.raw_cfg = config_manager.reload_cog('invite_tracker')
+        self.__init__(self.bot)
+
+    async def cog_load(self):
+        # Recarga da extensão com o bot já conectado: on_ready não dispara de novo
+        if self.bot.is_ready():
+            asyncio.create_task(self.warm_all())
+
+    async def cog_unload(self):
+        for st in self._states.values():
+            if st.flush_task and not st.flush_task.done():
+                st.flush_task.cancel()
+
+    # ----------------- Cache -----------------
+    async def _fetch(self, guild: discord.Guild) -> List[InviteInfo]:
+        coros = [guild.invites()]
+        with_vanity = self.track_vanity and 'VANITY_URL' in guild.features
+        if with_vanity:
+            coros.append(guild.vanity_invite())
+        results = await asyncio.gather(*coros, return_exceptions=True)
+        if isinstance(results[0], BaseException):
+            raise results[0]
+        infos = [invite_info(i) for i in results[0]]
+        if with_vanity and isinstance(results[1], discord.Invite):
+            infos.append(invite_info(results[1]))
+        return infos
+
+    async def warm(self, guild: discord.Guild) -> bool:
+        st = self._states.setdefault(guild.id, _GuildState())
+        async with st.lock:
+            try:
+                st.cache.load(await self._fetch(guild))
+            except Exception as e:
+                # Sem permissão: a guild fica sem rastreio
+                self._states.pop(guild.id, None)
+                if self.debug:
+                    print(f'[invite_tracker] Falha ao carregar convites de {guild.id}: {e}')
+                return False
+        return True
+
+    async def warm_all(self):
+        if not self.enabled:
+            return
+        await run_limited(self.bot.guilds, self.warm, self.warm_concurrency)
+        if self.debug:
+            print(f'[invite_tracker] cache aquecido: {len(self._states)} guilds')
+
+    def is_tracked(self, guild_id: int) -> bool:
+        return guild_id in self._states
+
+    # ----------------- Atribuição -----------------
+    def _enqueue(self, member: discord.Member) -> Optional[asyncio.Future]:
+        st = self._states.get(member.guild.id)
+        if st is None:
+            return None
+        fut = st.pending.get(member.id)
+        if fut is None:
+            fut = asyncio.get_running_loop().create_future()
+            st.pending[member.id] = fut
+        if st.flush_task is None or st.flush_task.done():
+            st.flush_task = asyncio.create_task(self._flush_later(member.guild, st))
+        return fut
+
+    async def _flush_later(self, guild: discord.Guild, st: _GuildState):
+        # Junta as entradas que chegarem na janela e resolve todas com um único fetch
+        await asyncio.sleep(self.batch_window)
+        while st.pending:
+            batch, st.pending = st.pending, {}
+            async with st.lock:
+                try:
+                    fresh = await self._fetch(guild)
+                except Exception as e:
+                    if self.debug:
+                        print(f'[invite_tracker] Falha fetch convites: {e}')
+                    for fut in batch.values():
+                        if not fut.done():
+                            fut.set_result(None)
+                    continue
+                inviters = {i.code: i.inviter_id for i in fresh}
+                inviters.update({c: i.inviter_id for c, i in st.cache.invites.items() if c not in inviters})
+                deltas = st.cache.diff(fresh)
+            result = attribute(deltas, list(batch), inviters)
+            now = asyncio.get_running_loop().time()
+            for mid, fut in batch.items():
+                attr = result[mid]
+                st.stats['ambiguous' if attr.ambiguous else ('attributed' if attr.code else 'unknown')] += 1
+                st.recent.append((now, attr.code))
+                st.resolved[mid] = attr
+                if not fut.done():
+                    fut.set_result(attr)
+            while len(st.resolved) > 1000:
+                st.resolved.popitem(last=False)
+            if self.debug:
+                print(f'[invite_tracker] lote {len(batch)} entradas, usos: {deltas}')
+
+    async def resolve(self, member: discord.Member) -> Optional[Attribution]:
+        """Convite usado por ``member`` (None se a guild não é rastreada ou não deu para saber)."""
+        st = self._states.get(member.guild.id)
+        if st is None:
+            return None
+        if member.id in st.resolved:
+            return st.resolved[member.id]
+        fut = self._enqueue(member)
+        if fut is None:
+            return None
+        try:
+            return await asyncio.wait_for(asyncio.shield(fut), self.resolve_timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def recent_codes(self, guild_id: int, seconds: float, flush: bool = True) -> Counter:
+        """Contagem de entradas por convite nos últimos ``seconds`` (espera o lote pendente se ``flush``)."""
+        st = self._states.get(guild_id)
+        if st is None:
+            return Counter()
+        if flush and st.flush_task and not st.flush_task.done():
+            try:
+                await asyncio.wait_for(asyncio.shield(st.flush_task), self.resolve_timeout)
+            except Exception:
+                pass
+        cutoff = asyncio.get_running_loop().time() - seconds
+        return Counter(code for ts, code in st.recent if ts >= cutoff and code)
+
+    # ----------------- Eventos -----------------
+    @commands.Cog.listener()
+    async def on_ready(self):
+        await self.warm_all()
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild: discord.Guild):
+        if self.enabled:
+            await self.warm(guild)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        self._states.pop(guild.id, None)
+
+    @commands.Cog.listener()
+    async def on_invite_create(self, invite: discord.Invite):
+        st = self._states.get(getattr(invite.guild, 'id', 0))
+        if st is not None:
+            st.cache.add(invite_info(invite))
+
+    @commands.Cog.listener()
+    async def on_invite_delete(self, invite: discord.Invite):
+        st = self._states.get(getattr(invite.guild, 'id', 0))
+        if st is not None:
+            st.cache.remove(invite.code)
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member: discord.Member):
+        if not self.enabled or member.bot:
+            return
+        self._enqueue(member)
+
+    # ----------------- Comandos -----------------
+    @commands.command(name='invitetrackerreload')
+    async def invitetracker_reload(self, ctx: commands.Context):
+        if not ctx.author.guild_permissions.manage_guild:
+            return await ctx.reply('Sem permissão.')
+        self.refresh_config()
+        ok = await self.warm(ctx.guild) if self.enabled else False
+        await ctx.reply('Config invite_tracker recarregada.' + ('' if ok or not self.enabled else ' ' + self.msgs.get('not_tracked', '')))
+
+    @commands.command(name='invitetrackerstatus')
+    async def invitetracker_status(self, ctx: commands.Context):
+        if not ctx.author.guild_permissions.manage_guild:
+            return await ctx.reply('Sem permissão.')
+        st = self._states.get(ctx.guild.id)
+        if st is None:
+            return await ctx.reply(self.msgs.get('not_tracked', 'Convites desta guild não estão sendo rastreados.'))
+        recent = await self.recent_codes(ctx.guild.id, self.recent_window, flush=False)
+        codes = ', '.join(f'`{c}` ({n})' for c, n in recent.most_common(5)) or '(nenhuma)'
+        lines = [self.msgs.get('status_header', 'Invite Tracker')]
+        lines.append(self.msgs.get('status_main', '').format(
+            tracked=len(self._states), cached=len(st.cache), attributed=st.stats['attributed'],
+            ambiguous=st.stats['ambiguous'], unknown=st.stats['unknown']
+        ))
+        lines.append(self.msgs.get('status_recent', '').format(seconds=int(self.recent_window), codes=codes))
+        await ctx.reply('\n'.join(lines))
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(InviteTrackerCog(bot))
@@ -1,6 +1,6 @@
 import discord
 from discord.ext import commands
-from typing import Dict, Any, List
+from typing import Dict, Any, List, FrozenSet
 import asyncio
 from config_loader import config_manager
 
@@ -16,11 +16,54 @@ DEFAULTS = {
         "messages": {
             "deleted": "{user} sua mensagem foi removida: {reason}",
             "rule_summary_header": "Regras ativas (canal -> restrições)",
-            "rule_line": "<#{channel_id}> texto:{allow_text} imagens:{allow_images} vídeos:{allow_videos} outros:{allow_other_attachments} max_att:{max_attachments}"
+            "rule_line": "<#{channel_id}> texto:{allow_text} imagens:{allow_images} vídeos:{allow_videos} outros:{allow_other_attachments} max_att:{max_attachments}",
+            "rule_line_category": "Categoria <#{category_id}> texto:{allow_text} imagens:{allow_images} vídeos:{allow_videos} outros:{allow_other_attachments} max_att:{max_attachments}"
         }
     }
 }
 
+IMAGE_EXTS = ('.png', '.jpg', '.jpeg', '.gif', '.webp')
+VIDEO_EXTS = ('.mp4', '.mov', '.webm', '.mkv')
+
+
+def attachment_kind(att: discord.Attachment) -> str:
+    """Classifica o anexo em image | video | other (content_type com fallback por extensão)."""
+    ctype = (att.content_type or '').lower()
+    if not ctype and att.filename:
+        name = att.filename.lower()
+        if name.endswith(IMAGE_EXTS):
+            return 'image'
+        if name.endswith(VIDEO_EXTS):
+            return 'video'
+    if ctype.startswith('image/'):
+        return 'image'
+    if ctype.startswith('video/'):
+        return 'video'
+    return 'other'
+
+
+class CompiledRule:
+    """Regra pré-processada: bypass em frozenset e decisões de anexo já resolvidas."""
+    __slots__ = ('raw', 'bypass_roles', 'allow_text', 'allowed_kinds', 'max_attachments',
+                 'require_attachment', 'image_required')
+
+    def __init__(self, raw: Dict[str, Any]):
+        self.raw = raw
+        self.bypass_roles: FrozenSet[int] = frozenset(raw.get('bypass_roles', []) or [])
+        self.allow_text: bool = raw.get('allow_text', True)
+        self.allowed_kinds: Dict[str, bool] = {
+            'image': raw.get('allow_images', True),
+            'video': raw.get('allow_videos', False),
+            'other': raw.get('allow_other_attachments', False)
+        }
+        self.max_attachments = raw.get('max_attachments')
+        self.require_attachment: bool = bool(raw.get('require_attachment'))
+        # Canal só de imagens: mensagem sem anexo é removida
+        self.image_required: bool = bool(
+            raw.get('allow_images') and not self.allow_text
+            and not raw.get('allow_other_attachments') and not raw.get('allow_videos')
+        )
+
 class NoMsgCog(commands.Cog):
     """Enforça regras de conteúdo por canal (ex: somente imagens)."""
     def __init__(self, bot: commands.Bot):
@@ -31,6 +74,9 @@ class NoMsgCog(commands.Cog):
         self.feedback_cfg: Dict[str, Any] = self.cfg.get('feedback', {})
         self.msgs: Dict[str, str] = self.cfg.get('messages', {})
         self.debug = self.cfg.get('debug', False)
+        self._channel_index: Dict[int, CompiledRule] = {}
+        self._category_index: Dict[int, CompiledRule] = {}
+        self._build_index()
 
     def refresh_config(self):
         self.raw_cfg = config_manager.reload_cog('nomsg')
@@ -39,12 +85,31 @@ class NoMsgCog(commands.Cog):
         self.feedback_cfg = self.cfg.get('feedback', {})
         self.msgs = self.cfg.get('messages', {})
         self.debug = self.cfg.get('debug', False)
+        self._build_index()
 
-    def get_rule_for_channel(self, channel_id: int) -> Dict[str, Any] | None:
+    def _build_index(self):
+        """Compila as regras em dicts por canal/categoria (primeira regra definida vence)."""
+        channels: Dict[int, CompiledRule] = {}
+        categories: Dict[int, CompiledRule] = {}
         for r in self.rules:
-            if r.get('channel_id') == channel_id:
-                return r
-        return None
+            compiled = CompiledRule(r)
+            if r.get('channel_id'):
+                channels.setdefault(int(r['channel_id']), compiled)
+            if r.get('category_id'):
+                categories.setdefault(int(r['category_id']), compiled)
+        self._channel_index = channels
+        self._category_index = categories
+
+    def _compiled_for(self, channel_id: int, category_id: int | None = None) -> CompiledRule | None:
+        # Regra do canal tem prioridade sobre a herdada da categoria
+        rule = self._channel_index.get(channel_id)
+        if rule is None and category_id is not None:
+            rule = self._category_index.get(category_id)
+        return rule
+
+    def get_rule_for_channel(self, channel_id: int, category_id: int | None = None) -> Dict[str, Any] | None:
+        compiled = self._compiled_for(channel_id, category_id)
+        return compiled.raw if compiled else None
 
     async def delete_and_feedback(self, message: discord.Message, rule: Dict[str, Any], reason: str):
         notify = self.feedback_cfg.get('notify_user', True)
@@ -85,62 +150,50 @@ class NoMsgCog(commands.Cog):
                 except Exception:
                     pass
 
-    def attachment_type_allowed(self, att: discord.Attachment, rule: Dict[str, Any]) -> bool:
-        ctype = (att.content_type or '').lower()
-        # Fallback por extensão quando content_type vem vazio
-        if not ctype and att.filename:
-            name = att.filename.lower()
-            if name.endswith(('.png', '.jpg', '.jpeg', '.gif', '.webp')):
-                ctype = 'image/unknown'
-            elif name.endswith(('.mp4', '.mov', '.webm', '.mkv')):
-                ctype = 'video/unknown'
-        if ctype.startswith('image/'):
-            return rule.get('allow_images', True)
-        if ctype.startswith('video/'):
-            return rule.get('allow_videos', False)
-        return rule.get('allow_other_attachments', False)
+    def attachment_type_allowed(self, att: discord.Attachment, rule: Dict[str, Any] | CompiledRule) -> bool:
+        if not isinstance(rule, CompiledRule):
+            rule = CompiledRule(rule)
+        return rule.allowed_kinds[attachment_kind(att)]
 
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message):
         if message.author.bot or not message.guild:
             return
-        rule = self.get_rule_for_channel(message.channel.id)
-        if not rule:
+        if not self._channel_index and not self._category_index:
             return
+        compiled = self._compiled_for(message.channel.id, getattr(message.channel, 'category_id', None))
+        if compiled is None:
+            return
+        rule = compiled.raw
         # Bypass por permissão ou role
-        bypass_roles: List[int] = rule.get('bypass_roles', [])
-        if bypass_roles and any(r.id in bypass_roles for r in getattr(message.author, 'roles', [])):
+        if compiled.bypass_roles and any(r.id in compiled.bypass_roles for r in getattr(message.author, 'roles', [])):
             return
         if message.author.guild_permissions.manage_messages:
             return
 
-        allow_text = rule.get('allow_text', True)
-        if not allow_text and message.content.strip():
+        if not compiled.allow_text and message.content.strip():
             reason = rule.get('delete_reason', 'Este canal não permite texto.')
             return await self.delete_and_feedback(message, rule, reason)
 
         # Verifica anexos
         atts = message.attachments
         if atts:
-            max_att = rule.get('max_attachments')
+            max_att = compiled.max_attachments
             if max_att is not None and len(atts) > max_att:
                 reason = rule.get('delete_reason', 'Anexos acima do limite.')
                 return await self.delete_and_feedback(message, rule, reason)
             # Cada tipo
+            allowed_kinds = compiled.allowed_kinds
             for att in atts:
-                if not self.attachment_type_allowed(att, rule):
+                if not allowed_kinds[attachment_kind(att)]:
                     reason = rule.get('delete_reason', 'Tipo de anexo não permitido.')
                     return await self.delete_and_feedback(message, rule, reason)
-            # require_attachment (se definido) garante que ao menos um anexo aceito exista
-            if rule.get('require_attachment') and len(atts) == 0:
-                reason = rule.get('delete_reason', 'Anexo obrigatório.')
-                return await self.delete_and_feedback(message, rule, reason)
         else:
             # Sem anexos e canal exige imagens?
-            if rule.get('allow_images') and not allow_text and not rule.get('allow_other_attachments') and not rule.get('allow_videos'):
+            if compiled.image_required:
                 reason = rule.get('delete_reason', 'É obrigatório enviar imagem.')
                 return await self.delete_and_feedback(message, rule, reason)
-            if rule.get('require_attachment'):
+            if compiled.require_attachment:
                 reason = rule.get('delete_reason', 'Anexo obrigatório.')
                 return await self.delete_and_feedback(message, rule, reason)
 
@@ -161,8 +214,13 @@ class NoMsgCog(commands.Cog):
     async def nomsg_rules(self, ctx: commands.Context):
         lines = [self.msgs.get('rule_summary_header', 'Regras ativas:')]
         for r in self.rules:
-            tmpl = self.msgs.get('rule_line', '<#{channel_id}>')
-            lines.append(tmpl.format(**r))
+            values = {'channel_id': 0, 'category_id': 0, 'allow_text': True, 'allow_images': True, 'allow_videos': False,
+                      'allow_other_attachments': False, 'max_attachments': None}
+            values.update(r)
+            if r.get('channel_id'):
+                lines.append(self.msgs.get('rule_line', '<#{channel_id}>').format(**values))
+            if r.get('category_id'):
+                lines.append(self.msgs.get('rule_line_category', 'Categoria <#{category_id}>').format(**values))
         await ctx.reply('\n'.join(lines))
 
 async def setup(bot: commands.Bot):
@@ -0,0 +1,57 @@
+"""Benchmark: snapshot de uma guild grande (500 canais, 250 cargos).
+
+Uso (na raiz do projeto): python -m tests.bench_guild_snapshot [canais] [cargos]
+Não é coletado pelo unittest (nome não começa com ``test``).
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import discord
+
+from cogs._guild_snapshot import GuildSnapshot, channel_snap, load_snapshot, save_snapshot
+
+
+def _guild(n_channels: int, n_roles: int):
+    roles = [SimpleNamespace(id=1000 + i, name=f'cargo-{i}', permissions=discord.Permissions(i * 7),
+                             colour=discord.Colour(i), hoist=False, mentionable=False, position=i, managed=False)
+             for i in range(n_roles)]
+    channels = []
+    for i in range(n_channels):
+        ow = {discord.Object(1000 + (i + k) % n_roles, type=discord.Role): discord.PermissionOverwrite(send_messages=bool(k % 2))
+              for k in range(4)}
+        channels.append(SimpleNamespace(id=10_000 + i, type=discord.ChannelType.text, name=f'canal-{i}',
+                                        category_id=None, position=i, topic='', nsfw=False, slowmode_delay=0,
+                                        overwrites=ow))
+    return SimpleNamespace(id=1, channels=channels, roles=roles)
+
+
+def _timed(label, fn, repeat=20):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    print(f'{label}: {(time.perf_counter() - start) / repeat * 1e3:.2f}ms')
+    return result
+
+
+def main(n_channels: int = 500, n_roles: int = 250):
+    g = _guild(n_channels, n_roles)
+    print(f'canais: {n_channels} | cargos: {n_roles}')
+    snap = _timed('snapshot completo', lambda: GuildSnapshot.from_guild(g))
+    ch = g.channels[0]
+    _timed('evento (upsert de canal)', lambda: snap.upsert_channel(channel_snap(ch)), repeat=1000)
+    live = GuildSnapshot.from_guild(g)
+    _timed('diff sem mudanças', lambda: snap.diff(live))
+    _timed('lápide de cargo (varre overwrites)', lambda: (snap.delete_role(1000), snap.roles.__setitem__(1000, live.roles[1000])), repeat=200)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'bench.json'
+        _timed('checkpoint (to_dict + JSON)', lambda: save_snapshot(path, snap.to_dict()))
+        print(f'tamanho do checkpoint: {path.stat().st_size / 1024:.1f} KiB')
+        _timed('carregar checkpoint', lambda: load_snapshot(path))
+
+
+if __name__ == '__main__':
+    args = [int(a) for a in sys.argv[1:3]]
+    main(*args)
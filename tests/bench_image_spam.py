@@ -0,0 +1,77 @@
+"""Benchmark: rajada de 500 mensagens com imagem passando pelo pipeline do automod_imagespam.
+
+Uso (na raiz do projeto): python -m tests.bench_image_spam [mensagens] [autores]
+Não é coletado pelo unittest (nome não começa com ``test``).
+"""
+import asyncio
+import io
+import random
+import sys
+import time
+
+from PIL import Image, ImageDraw
+
+from cogs.automod_imagespam import AutoModImageSpam
+
+
+def _base_image(seed: int) -> Image.Image:
+    rnd = random.Random(seed)
+    img = Image.new('RGB', (800, 600), (rnd.randint(0, 255),) * 3)
+    draw = ImageDraw.Draw(img)
+    for _ in range(20):
+        x0, y0 = rnd.randint(0, 800), rnd.randint(0, 600)
+        draw.rectangle([x0, y0, x0 + rnd.randint(40, 300), y0 + rnd.randint(40, 300)],
+                       fill=(rnd.randint(0, 255), rnd.randint(0, 255), rnd.randint(0, 255)))
+    return img
+
+
+def _encode(img: Image.Image, rnd: random.Random) -> bytes:
+    # Variações de formato/qualidade/tamanho como em um raid real
+    scale = rnd.uniform(0.6, 1.0)
+    variant = img.resize((int(800 * scale), int(600 * scale)))
+    buf = io.BytesIO()
+    if rnd.random() < 0.5:
+        variant.save(buf, format='JPEG', quality=rnd.randint(60, 95))
+    else:
+        variant.save(buf, format='PNG')
+    return buf.getvalue()
+
+
+async def main(total: int = 500, authors: int = 120):
+    rnd = random.Random(1234)
+    shock = _base_image(0)
+    others = [_base_image(i) for i in range(1, 40)]
+    payloads = []
+    for i in range(total):
+        # ~60% da rajada é a mesma imagem
+        img = shock if rnd.random() < 0.6 else rnd.choice(others)
+        payloads.append((_encode(img, rnd), rnd.randrange(authors), i))
+
+    cog = AutoModImageSpam(None)
+    cog.enabled = True
+    await cog.fingerprint_bytes(payloads[0][0])  # aquece o pool
+
+    start = time.perf_counter()
+    hashes = await asyncio.gather(*(cog.fingerprint_bytes(data) for data, _, _ in payloads))
+    hash_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    flagged = 0
+    now = 0.0
+    for value, (_, author, msg_id) in zip(hashes, payloads):
+        now += 0.05
+        if value is not None and cog.check_hash(1, value, author, 10, msg_id, now):
+            flagged += 1
+    check_elapsed = time.perf_counter() - start
+    await cog.cog_unload()
+
+    mb = sum(len(d) for d, _, _ in payloads) / (1024 * 1024)
+    print(f'mensagens: {total} ({mb:.1f} MB de imagens) | workers: {cog.fp_cfg.get("workers", 2)}')
+    print(f'fingerprint: {hash_elapsed:.2f}s -> {total / hash_elapsed:.0f} img/s')
+    print(f'janela/decisão: {check_elapsed * 1000:.1f}ms -> {check_elapsed / total * 1e6:.1f}us por mensagem')
+    print(f'sinalizadas: {flagged} | hashes em memória: {len(cog._windows[1])}')
+
+
+if __name__ == '__main__':
+    args = [int(a) for a in sys.argv[1:3]]
+    asyncio.run(main(*args))
@@ -0,0 +1,53 @@
+"""Benchmark: raid de 1000 entradas/min passando pelo analisador de coortes do anti_raid.
+
+Uso (na raiz do projeto): python -m tests.bench_raid_cohort [entradas] [capacidade]
+Não é coletado pelo unittest (nome não começa com ``test``).
+"""
+import random
+import sys
+import time
+
+from cogs._join_cohort import NUMPY_AVAILABLE, CohortWindow, extract_features
+
+DISCORD_EPOCH_MS = 1420070400000
+
+
+def _snowflake(unix_seconds: float, seq: int) -> int:
+    return ((int(unix_seconds * 1000) - DISCORD_EPOCH_MS) << 22) + seq
+
+
+def main(total: int = 1000, capacity: int = 512):
+    rnd = random.Random(99)
+    base = 1_700_000_000
+    joins = []
+    for i in range(total):
+        if rnd.random() < 0.7:
+            # Conta de raid: criada na última hora, sem avatar, nome em série
+            joins.append((_snowflake(base - rnd.randint(0, 3600), i), f'raid{rnd.randint(1000, 9999)}', False, 0))
+        else:
+            created = base - rnd.randint(30, 3000) * 86400
+            joins.append((_snowflake(created, i), f'user_{rnd.getrandbits(24):x}', rnd.random() < 0.8, rnd.choice([0, 64])))
+
+    start = time.perf_counter()
+    feats = [extract_features(uid, name, avatar, flags) for uid, name, avatar, flags in joins]
+    extract_elapsed = time.perf_counter() - start
+    print(f'entradas: {total} | capacidade: {capacity}')
+    print(f'features: {extract_elapsed / total * 1e6:.2f}us por entrada')
+
+    modes = [False, True] if NUMPY_AVAILABLE else [False]
+    for use_numpy in modes:
+        win = CohortWindow(capacity=capacity, use_numpy=use_numpy)
+        flagged = 0
+        start = time.perf_counter()
+        for i, ((uid, *_), feat) in enumerate(zip(joins, feats)):
+            # 1000 entradas/min -> uma a cada 60ms
+            if len(win.observe(uid, feat, i * 0.06)) + 1 >= 5:
+                flagged += 1
+        elapsed = time.perf_counter() - start
+        label = 'numpy' if use_numpy else 'python'
+        print(f'pontuação ({label}): {elapsed / total * 1e6:.1f}us por entrada | sinalizadas: {flagged}')
+
+
+if __name__ == '__main__':
+    args = [int(a) for a in sys.argv[1:3]]
+    main(*args)
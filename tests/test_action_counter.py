@@ -0,0 +1,40 @@
+import unittest
+
+from cogs._action_counter import ActionCounter
+
+
+class TestActionCounter(unittest.TestCase):
+    def test_sliding_counts_and_combined(self):
+        c = ActionCounter(['ban', 'kick', 'channel_delete'], window_seconds=10)
+        key = (1, 42)
+        self.assertEqual(c.add(key, 'ban', 0.0), 1)
+        self.assertEqual(c.add(key, 'ban', 4.0), 2)
+        c.add(key, 'channel_delete', 5.0)
+        self.assertEqual(c.combined(key, 5.0), 3)
+        self.assertEqual(c.combined(key, 5.0, ['channel_delete', 'kick']), 1)
+        # Em t=12 o primeiro ban saiu da janela
+        self.assertEqual(c.count(key, 'ban', 12.0), 1)
+        self.assertEqual(c.count(key, 'ban', 20.0), 0)
+
+    def test_idle_executors_are_evicted(self):
+        c = ActionCounter(['ban'], window_seconds=10)
+        for uid in range(100):
+            c.add((1, uid), 'ban', float(uid) * 0.01)
+        self.assertEqual(len(c), 100)
+        c.add((1, 999), 'ban', 50.0)
+        self.assertEqual(len(c), 1)
+
+    def test_active_executor_survives_and_cap(self):
+        c = ActionCounter(['ban'], window_seconds=100, max_executors=3)
+        c.add('a', 'ban', 0.0)
+        c.add('b', 'ban', 1.0)
+        c.add('c', 'ban', 2.0)
+        c.add('a', 'ban', 3.0)  # 'a' volta para o fim da fila
+        c.add('d', 'ban', 4.0)
+        self.assertEqual(len(c), 3)
+        self.assertEqual(c.count('b', 'ban', 4.0), 0)
+        self.assertEqual(c.count('a', 'ban', 4.0), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import random
+import unittest
+
+from cogs.anti_raid import JoinWindow
+
+
+class TestJoinWindow(unittest.TestCase):
+    def test_matches_linear_count(self):
+        rnd = random.Random(7)
+        win = JoinWindow(retention=120, max_entries=100000)
+        times = []
+        t = 0.0
+        for _ in range(5000):
+            t += rnd.expovariate(20)
+            win.add(t)
+            times.append(t)
+            for interval in (5, 30, 120):
+                expected = sum(1 for x in times if t - x <= interval)
+                if rnd.random() < 0.05:
+                    self.assertEqual(win.count_since(t, interval), expected)
+        self.assertEqual(len(win), sum(1 for x in times if t - x <= 120))
+
+    def test_interval_longer_than_sliding_window(self):
+        # retention = max(interval, sliding_window): contagem do intervalo não é truncada
+        win = JoinWindow(retention=max(30, 60))
+        for i in range(60):
+            win.add(float(i))
+        self.assertEqual(win.count_since(59.0, 30), 31)
+        self.assertEqual(win.count_since(59.0, 60), 60)
+
+    def test_bounded(self):
+        win = JoinWindow(retention=1000, max_entries=10)
+        for i in range(50):
+            win.add(float(i))
+        self.assertEqual(len(win), 10)
+        self.assertEqual(win.count_since(49.0, 1000), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import discord
+
+
+class _Bot:
+    def __init__(self, guild, mid, events):
+        self.id = mid
+        self.bot = True
+        self.guild = guild
+        self.mention = f'<@{mid}>'
+        self._events = events
+
+    def __str__(self):
+        return f'bot#{self.id}'
+
+    async def kick(self, reason=None):
+        self._events.append(('kick', self.id))
+
+    async def ban(self, reason=None, delete_message_days=0):
+        self._events.append(('ban', self.id))
+
+
+class TestAntiBotFastPath(unittest.TestCase):
+    def _run(self, scenario, **cfg):
+        from cogs import protect_antibot as ab
+        events = []
+
+        async def go():
+            bot = mock.MagicMock()
+            bot.user.id = 1
+            cog = ab.ProtectAntiBotCog(bot)
+            cog.enabled = True
+            cog.action = 'kick'
+            cog.fast_path = True
+            cog.dm_inviter = False
+            cog.whitelist_bot_ids = {500}
+            cog.whitelist_inviter_ids = cfg.get('inviter_ids', {60})
+            cog.fast_path_inviter_wait = cfg.get('wait', 0.3)
+            cog.inviter_action = cfg.get('inviter_action', 'none')
+            cog.inviter_lookup_attempts = 1
+
+            async def fetch_inviter(guild, member):
+                # Audit log REST lento: o kick não pode esperar por isto
+                events.append(('fetch', member.id))
+                await asyncio.sleep(0.2)
+                return cfg.get('inviter')
+
+            async def log(guild, title, fields):
+                events.append(('log', title))
+
+            async def guild_kick(user, reason=None):
+                events.append(('kick_inviter', user.id))
+
+            guild = mock.MagicMock(id=9, owner_id=2)
+            guild.kick.side_effect = guild_kick
+            cog._fetch_inviter = fetch_inviter
+            cog._log = log
+            await scenario(cog, guild, events)
+            await asyncio.gather(*cog._bg_tasks)
+            return cog
+
+        return asyncio.run(go()), events
+
+    def test_kicks_before_resolving_inviter(self):
+        inviter = SimpleNamespace(id=77, mention='<@77>')
+
+        async def scenario(cog, guild, events):
+            await cog.on_member_join(_Bot(guild, 300, events))
+            await cog.on_member_join(_Bot(guild, 500, events))  # whitelist: fica
+
+        # Sem whitelist de inviters: nenhuma espera antes do kick
+        cog, events = self._run(scenario, inviter=inviter, inviter_action='kick', inviter_ids=set())
+        self.assertEqual(events[0], ('kick', 300))
+        self.assertNotIn(('kick', 500), events)
+        self.assertLess(events.index(('kick', 300)), events.index(('fetch', 300)))
+        self.assertIn(('kick_inviter', 77), events)
+        self.assertEqual(cog.latency.total, 1)
+        self.assertLess(cog.latency.max_ms, 50)
+
+    def test_gateway_bot_add_from_allowed_inviter_skips_fast_path(self):
+        async def scenario(cog, guild, events):
+            await cog.on_audit_log_entry_create(SimpleNamespace(
+                action=discord.AuditLogAction.bot_add, user_id=60, guild=guild, target=discord.Object(301)))
+            await cog.on_member_join(_Bot(guild, 301, events))
+
+        cog, events = self._run(scenario, inviter=SimpleNamespace(id=60, mention='<@60>'))
+        self.assertNotIn(('kick', 301), events)
+        self.assertEqual(cog.latency.total, 0)
+
+    def test_late_gateway_bot_add_from_allowed_inviter_is_awaited(self):
+        async def scenario(cog, guild, events):
+            async def late_entry():
+                await asyncio.sleep(0.05)
+                await cog.on_audit_log_entry_create(SimpleNamespace(
+                    action=discord.AuditLogAction.bot_add, user_id=60, guild=guild, target=discord.Object(302)))
+            await asyncio.gather(cog.on_member_join(_Bot(guild, 302, events)), late_entry())
+
+        cog, events = self._run(scenario, inviter=SimpleNamespace(id=60, mention='<@60>'))
+        self.assertNotIn(('kick', 302), events)
+        self.assertEqual(cog._add_waiters, {})
+
+    def test_wait_is_bounded(self):
+        async def scenario(cog, guild, events):
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            await cog.on_member_join(_Bot(guild, 303, events))
+            events.append(('elapsed', loop.time() - started))
+
+        cog, events = self._run(scenario, inviter=None, wait=0.05)
+        self.assertEqual(events[0], ('kick', 303))
+        elapsed = dict(e for e in events if e[0] == 'elapsed')['elapsed']
+        self.assertGreaterEqual(elapsed, 0.05)
+        self.assertLess(elapsed, 0.15)
+
+
+if __name__ == '__main__':
+    unittest.main()
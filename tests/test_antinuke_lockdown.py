@@ -0,0 +1,137 @@
+import asyncio
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import discord
+
+
+class _Role:
+    def __init__(self, rid, position, perms, log):
+        self.id = rid
+        self.position = position
+        self.permissions = discord.Permissions(perms)
+        self.log = log
+
+    def is_default(self):
+        return self.position == 0
+
+    def __ge__(self, other):
+        return self.position >= other.position
+
+    async def edit(self, permissions, reason=None):
+        self.log.append(self.id)
+        await asyncio.sleep(0.01)
+        self.permissions = permissions
+
+
+class _Channel:
+    def __init__(self, cid):
+        self.id = cid
+        self.rate_limit_per_user = 0
+
+    async def edit(self, rate_limit_per_user, reason=None):
+        await asyncio.sleep(0.01)
+        self.rate_limit_per_user = rate_limit_per_user
+
+
+class TestAntiNukeLockdown(unittest.TestCase):
+    def test_strips_highest_roles_first_and_restores(self):
+        from cogs import protect_antinuke as an
+        admin = discord.Permissions(administrator=True).value
+        manage = discord.Permissions(manage_channels=True, send_messages=True).value
+        order = []
+        roles = [_Role(1, 0, 0, order), _Role(2, 3, manage, order), _Role(3, 7, admin, order),
+                 _Role(4, 5, manage, order), _Role(5, 9, admin, order), _Role(6, 2, 0, order)]
+        by_id = {r.id: r for r in roles}
+        channels = [_Channel(100 + i) for i in range(20)]
+        guild = mock.MagicMock(id=7, roles=roles, text_channels=channels)
+        guild.me.top_role = _Role(99, 8, 0, [])  # cargo 5 (posição 9) fica acima do bot
+        guild.get_role.side_effect = by_id.get
+        guild.get_channel.side_effect = {c.id: c for c in channels}.get
+
+        with tempfile.TemporaryDirectory() as tmp:
+            async def go():
+                with mock.patch.object(an, 'JOURNAL_FILE', Path(tmp) / 'j.sqlite3'), \
+                        mock.patch.object(an.discord, 'TextChannel', _Channel):
+                    cog = an.ProtectAntiNukeCog(mock.MagicMock())
+                    cog.lockdown_cfg = {'slowmode_seconds': 10, 'restore_after_seconds': 0, 'max_concurrency': 2}
+                    cog._log = mock.AsyncMock()
+                    loop = asyncio.get_running_loop()
+                    start = loop.time()
+                    await cog._apply_lockdown(guild)
+                    elapsed = loop.time() - start
+                    fields = {n: v for n, v, _ in cog._log.call_args.args[2]}
+                    await cog._restore_lockdown(guild)
+                    cog.journal.close()
+                    return elapsed, fields
+            elapsed, fields = asyncio.run(go())
+
+        self.assertEqual(order[:3], [3, 4, 2])
+        self.assertTrue(all(c.rate_limit_per_user == 0 for c in channels))
+        self.assertEqual(by_id[2].permissions.value, manage)
+        self.assertEqual(by_id[3].permissions.value, admin)
+        self.assertEqual(by_id[5].permissions.value, admin)  # nunca tocado
+        self.assertIn('Cargos: 3 ok', fields['Etapas'])
+        self.assertIn('Slowmode: 20 ok', fields['Etapas'])
+        self.assertEqual(fields['Cargos acima do bot'], '1')
+        # 20 canais a 10ms com 2 em voo (+ cargos em paralelo), bem abaixo do sequencial com sleeps
+        self.assertLess(elapsed, 0.5)
+
+
+class _SlowChannel(_Channel):
+    def __init__(self, cid, slow):
+        super().__init__(cid)
+        self.rate_limit_per_user = slow
+
+
+class TestAntiNukeReplay(unittest.TestCase):
+    def test_two_guilds_do_not_share_lockdown_state(self):
+        from cogs import protect_antinuke as an
+        from cogs._state_journal import StateJournal
+        log = []
+        chans = {7: {1: _SlowChannel(1, 10)}, 8: {2: _SlowChannel(2, 10)}}
+        roles = {7: {10: _Role(10, 3, 0, log)}, 8: {20: _Role(20, 3, 0, log)}}
+        admin = discord.Permissions(administrator=True).value
+        guilds = {}
+        for gid in chans:
+            guilds[gid] = mock.MagicMock(id=gid)
+            guilds[gid].get_channel.side_effect = chans[gid].get
+            guilds[gid].get_role.side_effect = roles[gid].get
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'j.sqlite3'
+            j = StateJournal(path)
+            # Guild 7: lockdown sem prazo (mais antigo); guild 8: vencido
+            j.begin(an.JOURNAL_SCOPE, 7, None, [('slowmode', 1, 2), ('role_perms', 10, admin)])
+            time.sleep(0.01)
+            j.begin(an.JOURNAL_SCOPE, 8, time.time() - 5, [('slowmode', 2, 30), ('role_perms', 20, admin)])
+            j.close()
+
+            async def go():
+                with mock.patch.object(an, 'JOURNAL_FILE', path), \
+                        mock.patch.object(an.discord, 'TextChannel', _Channel):
+                    bot = mock.MagicMock()
+                    bot.get_guild.side_effect = guilds.get
+                    cog = an.ProtectAntiNukeCog(bot)
+                    cog._log = mock.AsyncMock()
+                    await cog._replay_journal()
+                    open_sessions = cog.journal.sessions(an.JOURNAL_SCOPE)
+                    cog.journal.close()
+                    return cog, open_sessions
+            cog, open_sessions = asyncio.run(go())
+
+        # Cada guild volta aos próprios valores
+        self.assertEqual(chans[7][1].rate_limit_per_user, 2)
+        self.assertEqual(chans[8][2].rate_limit_per_user, 30)
+        self.assertEqual(roles[7][10].permissions.value, admin)
+        self.assertEqual(roles[8][20].permissions.value, admin)
+        self.assertFalse(cog._lockdown_active)
+        self.assertEqual((cog._original_slowmodes, cog._original_role_perms), ({}, {}))
+        self.assertEqual(open_sessions, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
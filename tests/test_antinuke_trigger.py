@@ -0,0 +1,120 @@
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+import discord
+
+from cogs._latency import LatencyHistogram
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    def test_buckets_and_percentiles(self):
+        h = LatencyHistogram((100, 300, 1000))
+        for s in (0.02, 0.05, 0.12, 0.25, 0.8, 3.0):
+            h.record(s)
+        self.assertEqual(h.counts, [2, 2, 1, 1])
+        self.assertEqual(h.percentile(50), 300)
+        self.assertEqual(h.percentile(100), 3000)
+        self.assertAlmostEqual(h.share_under(300), 4 / 6)
+        self.assertIn('n=6', h.line())
+
+
+def _entry(action, guild, user_id, target_id, **kw):
+    return SimpleNamespace(action=action, guild=guild, user_id=user_id, target=discord.Object(target_id),
+                           before=kw.get('before', SimpleNamespace()), after=kw.get('after', SimpleNamespace()),
+                           extra=kw.get('extra'))
+
+
+class TestAntiNukeTrigger(unittest.TestCase):
+    def _run(self, scenario):
+        from cogs import protect_antinuke as an
+        events = []
+        with tempfile.TemporaryDirectory() as tmp:
+            async def go():
+                with mock.patch.object(an, 'JOURNAL_FILE', Path(tmp) / 'j.sqlite3'):
+                    bot = mock.MagicMock()
+                    bot.user.id = 1
+                    cog = an.ProtectAntiNukeCog(bot)
+                    cog.thresholds = {'channel_delete': 3, 'member_ban': 8, 'role_grant': 3, 'combined': 6}
+                    cog.monitor_cfg = {}
+                    cog.punish_cfg = {'type': 'ban'}
+                    cog.lockdown_cfg = {'enabled': False}
+                    cog.trust_cfg = {'user_ids': [50]}
+
+                    async def ban(user, **kw):
+                        events.append(('ban', user.id))
+                        await asyncio.sleep(0.05)
+
+                    async def log(guild, title, fields):
+                        events.append(('log', title))
+
+                    guild = mock.MagicMock(id=9, owner_id=2)
+                    guild.ban.side_effect = ban
+                    cog._log = log
+                    try:
+                        await scenario(cog, guild, events)
+                        await asyncio.gather(*cog._bg_tasks)
+                    finally:
+                        cog.journal.close()
+                    return cog
+            cog = asyncio.run(go())
+        return cog, events
+
+    def test_punishes_on_nth_action_before_logging(self):
+        async def scenario(cog, guild, events):
+            for i in range(5):
+                await cog.on_audit_log_entry_create(_entry(
+                    discord.AuditLogAction.channel_delete, guild, 77, 100 + i, before=SimpleNamespace(name=f'canal-{i}')))
+        cog, events = self._run(scenario)
+        bans = [e for e in events if e[0] == 'ban']
+        self.assertEqual(bans, [('ban', 77)])  # só uma punição no spree inteiro
+        # A punição vem antes de qualquer log
+        self.assertEqual(events[0], ('ban', 77))
+        self.assertEqual(cog.latency.total, 1)
+        self.assertLess(cog.latency.max_ms, 300)
+
+    def test_trusted_executors_are_ignored(self):
+        async def scenario(cog, guild, events):
+            for uid in (2, 50, 1):  # dono, whitelist e o próprio bot
+                for _ in range(4):
+                    await cog._handle_action(guild, 'channel_delete', 'x', uid)
+            counts.append(cog._combined_count(9, 2))
+
+        counts = []
+        cog, events = self._run(scenario)
+        self.assertEqual(events, [])
+        self.assertEqual(counts, [0])
+
+    def test_ban_spree_and_dangerous_role_grants(self):
+        admin = SimpleNamespace(id=500, name='Admin', permissions=discord.Permissions(administrator=True))
+        plain = SimpleNamespace(id=501, name='Membro', permissions=discord.Permissions(send_messages=True))
+        punished_after_7 = []
+
+        async def scenario(cog, guild, events):
+            guild.get_role.side_effect = {500: admin, 501: plain}.get
+            # Cargo comum dado em massa (ex.: autorole) não conta
+            for i in range(10):
+                await cog.on_audit_log_entry_create(_entry(
+                    discord.AuditLogAction.member_role_update, guild, 88, i, after=SimpleNamespace(roles=[plain])))
+            # Ban tem limite próprio e não entra no combinado: 7 bans não punem, o 8º pune
+            for i in range(8):
+                if i == 7:
+                    punished_after_7.extend(e for e in events if e[0] == 'ban')
+                await cog.on_audit_log_entry_create(_entry(discord.AuditLogAction.ban, guild, 66, 1000 + i))
+            for i in range(3):
+                await cog.on_audit_log_entry_create(_entry(
+                    discord.AuditLogAction.member_role_update, guild, 88, i, after=SimpleNamespace(roles=[admin])))
+            counts.append(cog._count(9, 88, 'role_grant'))
+
+        counts = []
+        cog, events = self._run(scenario)
+        self.assertEqual(punished_after_7, [])
+        self.assertEqual([e for e in events if e[0] == 'ban'], [('ban', 66), ('ban', 88)])
+        self.assertEqual(counts, [3])
+
+
+if __name__ == '__main__':
+    unittest.main()
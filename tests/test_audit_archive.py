@@ -0,0 +1,101 @@
+import asyncio
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+
+from cogs._audit_archive import ArchiveWriter, AuditArchive, SearchQuery, archive_event, fts_phrase
+from cogs.audit_archive import parse_query
+
+
+class TestAuditArchive(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.archive = AuditArchive(Path(self.tmp.name) / 'a.sqlite3')
+
+    def tearDown(self):
+        self.archive.close()
+        self.tmp.cleanup()
+
+    def test_filters_fts_and_cursor_paging(self):
+        now = time.time()
+        rows = [(1, now - 86400 * 8, 'audit_channel', 'channel_delete', 77, 500, 500, '#general excluído')]
+        rows += [(1, now - i, 'audit_user', 'message_delete', 77 if i % 2 else 78, 90, 10, f'mensagem número {i}')
+                 for i in range(25)]
+        rows.append((2, now, 'audit_channel', 'channel_delete', 77, 501, 501, '#general de outra guild'))
+        self.archive.write_batch(rows)
+
+        hit = self.archive.search(SearchQuery(1, text='general', action='channel_delete'))
+        self.assertEqual([(e.user_id, e.target_id) for e in hit], [(77, 500)])
+        self.assertEqual(self.archive.search(SearchQuery(1, text='general', since=now - 86400)), [])
+
+        q = SearchQuery(1, user_id=77, action='message_delete')
+        seen, cursor = [], None
+        while True:
+            page = self.archive.search(q, cursor, limit=5)
+            if not page:
+                break
+            seen += [e.id for e in page]
+            cursor = page[-1].id
+        self.assertEqual(len(seen), 12)
+        self.assertEqual(seen, sorted(seen, reverse=True))
+        # Texto do usuário não vira operador FTS
+        self.assertEqual(fts_phrase('a" OR b*'), '"a" "OR" "b*"')
+        self.archive.search(SearchQuery(1, text='"(NEAR'))
+
+    def test_prune_keeps_fts_in_sync(self):
+        now = time.time()
+        self.archive.write_batch([(1, now - 1000, 's', 'a', None, None, None, 'velho'),
+                                  (1, now, 's', 'a', None, None, None, 'novo')])
+        self.assertEqual(self.archive.prune(now - 10, chunk=1), 1)
+        self.assertEqual(self.archive.search(SearchQuery(1, text='velho')), [])
+        self.assertEqual(len(self.archive.search(SearchQuery(1, text='novo'))), 1)
+
+    def test_writer_batches_without_blocking(self):
+        async def go():
+            writer = ArchiveWriter(self.archive, batch_size=500, flush_interval=0.05, max_queue=100000)
+            writer.start()
+            loop = asyncio.get_running_loop()
+            t0 = loop.time()
+            for i in range(10000):
+                writer.record(1, 'audit_user', 'message_delete', i, None, 10, f'texto {i}')
+            enqueue = loop.time() - t0
+            await asyncio.sleep(0.3)
+            await writer.close()
+            return enqueue, writer.written
+
+        enqueue, written = asyncio.run(go())
+        self.assertEqual(written, 10000)
+        archive = AuditArchive(self.archive.path)
+        self.assertEqual(archive.count(1), 10000)
+        archive.close()
+        self.assertLess(enqueue, 0.5)
+
+    def test_parse_query(self):
+        q = parse_query(1, 'user:<@123456789012345678> acao:channel_delete canal:<#223456789012345678> dias:7 geral chat')
+        self.assertEqual(q.user_id, 123456789012345678)
+        self.assertEqual(q.channel_id, 223456789012345678)
+        self.assertEqual(q.action, 'channel_delete')
+        self.assertEqual(q.text, 'geral chat')
+        self.assertIsNotNone(q.since)
+
+
+class TestArchiveEvent(unittest.TestCase):
+    def test_content_from_fields_and_skips(self):
+        recorded = []
+        archive = SimpleNamespace(record=lambda *a, **kw: recorded.append((a, kw)))
+        bot = SimpleNamespace(get_cog=lambda name: archive if name == 'AuditArchiveCog' else None)
+        guild = SimpleNamespace(id=1)
+        fields = [('Membro', '<@5>', True), ('Canal', '<#9>', True)]
+        archive_event(bot, guild, 'audit_user', 'message_delete', user=5, fields=fields)
+        archive_event(bot, guild, 'audit_user', 'message_delete', content='texto', fields=fields)
+        archive_event(bot, guild, 'audit_user', '', fields=fields)  # sem ação: só canal de log
+        archive_event(SimpleNamespace(get_cog=lambda name: None), guild, 'audit_user', 'x')
+        self.assertEqual([a for a, _ in recorded], [(guild, 'audit_user', 'message_delete')] * 2)
+        self.assertEqual([kw['content'] for _, kw in recorded], ['<@5>\n<#9>', 'texto'])
+        self.assertEqual(recorded[0][1]['user'], 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
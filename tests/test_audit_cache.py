@@ -0,0 +1,112 @@
+import asyncio
+import datetime
+import unittest
+from types import SimpleNamespace
+
+import discord
+
+from cogs._audit_cache import AuditLogCache, get_audit_cache
+
+BAN = discord.AuditLogAction.ban
+MOVE = discord.AuditLogAction.member_move
+UPDATE = discord.AuditLogAction.member_role_update
+
+
+def _entry(target_id, user_id, age=0.0):
+    created = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=age)
+    return SimpleNamespace(target=discord.Object(target_id), user=SimpleNamespace(id=user_id), created_at=created)
+
+
+class _Guild:
+    def __init__(self, entries):
+        self.id = 1
+        self.entries = entries  # action -> lista (mais novas primeiro)
+        self.calls = []
+
+    def audit_logs(self, limit, action):
+        self.calls.append((action, limit))
+        entries = list(self.entries.get(action, []))[:limit]
+
+        async def gen():
+            await asyncio.sleep(0.02)  # latência da API
+            for e in entries:
+                yield e
+        return gen()
+
+
+class TestAuditLogCache(unittest.TestCase):
+    def test_concurrent_callers_share_one_request(self):
+        async def go():
+            guild = _Guild({MOVE: [_entry(10, 77), _entry(11, 78)]})
+            cache = AuditLogCache()
+            found = await asyncio.gather(*(cache.find(guild, MOVE, 10, 5) for _ in range(3)),
+                                         cache.find(guild, MOVE, 11, 5))
+            return guild, cache, found
+
+        guild, cache, found = asyncio.run(go())
+        self.assertEqual([e.user.id for e in found], [77, 77, 77, 78])
+        self.assertEqual(guild.calls, [(MOVE, 10)])
+        self.assertEqual(cache.requests, 1)
+
+    def test_actions_are_separate_and_window_is_per_caller(self):
+        async def go():
+            guild = _Guild({MOVE: [_entry(10, 77, age=6)], BAN: [_entry(10, 90)]})
+            cache = AuditLogCache()
+            wide = await cache.find(guild, MOVE, 10, 8)
+            narrow = await cache.find(guild, MOVE, 10, 5)
+            ban = await cache.find(guild, BAN, 10, 5)
+            return guild, wide, narrow, ban
+
+        guild, wide, narrow, ban = asyncio.run(go())
+        self.assertEqual(wide.user.id, 77)
+        self.assertIsNone(narrow)
+        self.assertEqual(ban.user.id, 90)
+        self.assertEqual(len([c for c in guild.calls if c[0] == MOVE]), 1)
+
+    def test_stale_miss_fetches_again(self):
+        async def go():
+            guild = _Guild({BAN: []})
+            cache = AuditLogCache(grace=0.05)
+            first = await cache.find(guild, BAN, 10, 5)
+            await asyncio.sleep(0.1)
+            # Entrada criada depois da primeira busca: o cache não pode escondê-la
+            guild.entries[BAN] = [_entry(10, 90)]
+            second = await cache.find(guild, BAN, 10, 5)
+            # Acerto no cache não gera outra requisição
+            third = await cache.find(guild, BAN, 10, 5)
+            return guild, first, second, third
+
+        guild, first, second, third = asyncio.run(go())
+        self.assertIsNone(first)
+        self.assertEqual(second.user.id, 90)
+        self.assertIs(third, second)
+        self.assertEqual(len(guild.calls), 2)
+
+    def test_same_target_two_executors_1s_apart(self):
+        async def go():
+            guild = _Guild({UPDATE: [_entry(42, 1)]})
+            cache = AuditLogCache(grace=0.5)
+            first = await cache.find(guild, UPDATE, 42, 5)
+            await asyncio.sleep(1.0)
+            # B mexe no mesmo membro: o resultado antigo tem uma entrada dele (de A), mas é anterior ao evento
+            guild.entries[UPDATE] = [_entry(42, 2), _entry(42, 1, age=1)]
+            second = await cache.find(guild, UPDATE, 42, 5)
+            return cache, first, second
+
+        cache, first, second = asyncio.run(go())
+        self.assertEqual(first.user.id, 1)
+        self.assertEqual(second.user.id, 2)
+        self.assertEqual(cache.requests, 2)
+
+    def test_predicate_and_shared_instance(self):
+        async def go():
+            guild = _Guild({BAN: [_entry(10, 90), _entry(10, 91)]})
+            return await get_audit_cache(bot).find(guild, BAN, 10, 5, predicate=lambda e: e.user.id == 91)
+
+        bot = SimpleNamespace()
+        self.assertEqual(asyncio.run(go()).user.id, 91)
+        self.assertIs(get_audit_cache(bot), bot._audit_log_cache)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -17,7 +17,8 @@ class TestConfigLoader(unittest.TestCase):
         for cog in [
             'ban', 'castigo', 'buscarmembro', 'clearchat', 'mutecall',
             'automod_chat', 'automod_spam', 'automod_nomention',
-            'protect_antibot', 'anti_raid', 'protect_antinuke'
+            'protect_antibot', 'anti_raid', 'protect_antinuke', 'automod_imagespam',
+            'invite_tracker', 'protect_snapshot', 'audit_archive'
         ]:
             data = config_manager.load_cog(cog)
             self.assertIsInstance(data, dict)
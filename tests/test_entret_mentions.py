@@ -0,0 +1,127 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from cogs.entret_mentions import EntretMentionsCog, TTLCooldowns
+
+CFG = {'entret_mentions': {
+    'targets': {
+        'users': [
+            {'id': 0, 'react_emojis': ['❌']},  # id 0 (modelo) não entra no índice
+            {'id': '5', 'react_emojis': ['1️⃣', '<:dois:222>', '3️⃣'], 'reply': 'oi {user}', 'cooldown_seconds': 60},
+            {'id': 5, 'react_emojis': ['❌']},  # duplicada: vale a primeira
+        ],
+        'roles': [{'id': 7, 'react_emojis': ['✅'], 'cooldown_seconds': 0}],
+        'bot': {'enabled': True, 'react_emojis': ['👀'], 'cooldown_seconds': 60},
+    },
+    'reaction_concurrency': 3,
+}}
+
+
+def _cog(bot_emojis=None):
+    bot_emojis = bot_emojis or {}
+    with mock.patch('cogs.entret_mentions.config_manager') as cm:
+        cm.load_cog.return_value = CFG
+        return EntretMentionsCog(SimpleNamespace(get_emoji=lambda eid: bot_emojis.get(eid)))
+
+
+class _Message:
+    def __init__(self, guild, user_ids=(), role_ids=()):
+        self.guild = guild
+        self.author = SimpleNamespace(id=1, bot=False, mention='<@1>')
+        self.mentions = [SimpleNamespace(id=u) for u in user_ids]
+        self.role_mentions = [SimpleNamespace(id=r) for r in role_ids]
+        self.reactions = []
+        self.sent = []
+        self._calls = 0
+        msg = self
+
+        async def send(text, **kw):
+            msg.sent.append(text)
+        self.channel = SimpleNamespace(id=50, mention='<#50>', send=send)
+
+    async def add_reaction(self, emoji):
+        # A primeira demora mais: em paralelo terminaria por último
+        self._calls += 1
+        await asyncio.sleep(0.04 / self._calls)
+        self.reactions.append(getattr(emoji, 'name', emoji))
+
+
+def _guild():
+    return SimpleNamespace(id=1, me=SimpleNamespace(id=999, mention='<@999>'), emojis=[SimpleNamespace(id=222, name='dois')],
+                           get_member=lambda uid: SimpleNamespace(mention=f'<@{uid}>'), get_role=lambda rid: None)
+
+
+class TestMentionIndex(unittest.TestCase):
+    def test_index_by_id(self):
+        cog = _cog()
+        self.assertEqual(set(cog._user_rules), {5})
+        self.assertEqual(cog._user_rules[5]['reply'], 'oi {user}')
+        self.assertEqual(set(cog._role_rules), {7})
+
+    def test_reactions_keep_configured_order(self):
+        async def go():
+            cog = _cog()
+            guild = _guild()
+            msg = _Message(guild, user_ids=[5, 123], role_ids=[7, 8])
+            await cog.on_message(msg)
+            return msg
+        msg = asyncio.run(go())
+        self.assertEqual(msg.reactions, ['1️⃣', 'dois', '3️⃣', '✅'])
+        self.assertEqual(msg.sent, ['oi <@5>'])
+
+    def test_cooldown_per_target(self):
+        async def go():
+            cog = _cog()
+            guild = _guild()
+            first = _Message(guild, user_ids=[5, 999], role_ids=[7])
+            second = _Message(guild, user_ids=[5, 999], role_ids=[7])
+            await cog.on_message(first)
+            await cog.on_message(second)
+            return first, second
+        first, second = asyncio.run(go())
+        self.assertEqual(first.reactions, ['1️⃣', 'dois', '3️⃣', '✅', '👀'])
+        # Usuário e bot em cooldown; o cargo tem cooldown 0
+        self.assertEqual(second.reactions, ['✅'])
+        self.assertEqual(second.sent, [])
+
+    def test_emoji_cache(self):
+        external = SimpleNamespace(id=333, name='externo')
+        cog = _cog({333: external})
+        guild = _guild()
+        self.assertEqual(cog._resolve_emoji(guild, '<:dois:222>').name, 'dois')
+        self.assertIs(cog._resolve_emoji(guild, '333'), external)
+        self.assertIsNone(cog._resolve_emoji(guild, '<:sumiu:444>'))
+        self.assertEqual(cog._resolve_emoji(guild, '👀'), '👀')
+        # Emoji criado depois: só aparece depois do on_guild_emojis_update
+        guild.emojis.append(SimpleNamespace(id=444, name='sumiu'))
+        self.assertIsNone(cog._resolve_emoji(guild, '<:sumiu:444>'))
+        asyncio.run(cog.on_guild_emojis_update(guild, [], guild.emojis))
+        self.assertEqual(cog._resolve_emoji(guild, '<:sumiu:444>').name, 'sumiu')
+
+
+class TestTTLCooldowns(unittest.TestCase):
+    def test_hit_and_expire(self):
+        cd = TTLCooldowns()
+        self.assertTrue(cd.hit(('user', 1), 10, now=100.0))
+        self.assertFalse(cd.hit(('user', 1), 10, now=109.9))
+        self.assertTrue(cd.hit(('role', 1), 10, now=105.0))
+        self.assertTrue(cd.hit(('user', 1), 10, now=110.0))
+        # Sem cooldown: sempre passa e nem guarda a chave
+        self.assertTrue(cd.hit(('bot', 1), 0, now=110.0))
+        self.assertTrue(cd.hit(('bot', 1), 0, now=110.0))
+        self.assertEqual(len(cd), 2)
+
+    def test_purges_expired_keys(self):
+        cd = TTLCooldowns(purge_every=10)
+        for i in range(100):
+            cd.hit(('user', i), 5, now=float(i))
+        # Só sobram as chaves ainda em cooldown (mais as inseridas desde a última limpeza)
+        self.assertLessEqual(len(cd), 15)
+        cd.purge(now=1000.0)
+        self.assertEqual(len(cd), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,245 @@
+import asyncio
+import hashlib
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from cogs._file_hash import AttachmentHasher, FileTooLarge, HashBlocklist
+from cogs._file_sniff import AttachmentSniffer, classify_head, refine_container
+
+PNG = b'\x89PNG\r\n\x1a\n' + b'\x00' * 20000
+EXE = b'MZ\x90\x00' + b'\x00' * 20000
+ZIP = b'PK\x03\x04' + b'\x00' * 20000
+MP4 = b'\x00\x00\x00\x18ftypisom' + b'\x00' * 20000
+TXT = b'apenas texto' * 100
+
+# Mesmo tamanho e mesmos 96 KiB iniciais; só o final difere
+SAME_PREFIX = b'MZ\x90\x00' + b'\x00' * (96 * 1024)
+BLOCKED = SAME_PREFIX + b'a' * 100
+HARMLESS = SAME_PREFIX + b'b' * 100
+
+FIXTURES = {'/foto.png': PNG, '/virus.png': EXE, '/pacote.zip': ZIP, '/video.mp4': MP4, '/nota.txt': TXT,
+            '/1/inofensivo.bin': HARMLESS, '/2/bloqueado.bin': BLOCKED}
+
+
+class _FixtureHandler(BaseHTTPRequestHandler):
+    """Servidor local que imita o CDN: respeita Range e registra bytes enviados."""
+
+    def do_GET(self):
+        body = FIXTURES.get(self.path.split('?')[0])
+        if body is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        rng = self.headers.get('Range')
+        server = self.server
+        with server.lock:
+            server.requests.append((self.path, rng))
+        if rng and server.honor_range:
+            start, end = rng.split('=', 1)[1].split('-')
+            chunk = body[int(start):int(end) + 1]
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{int(start) + len(chunk) - 1}/{len(body)}')
+        else:
+            chunk = body
+            self.send_response(200)
+        self.send_header('Content-Length', str(len(chunk)))
+        self.end_headers()
+        try:
+            self.wfile.write(chunk)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        with server.lock:
+            server.bytes_sent += len(chunk)
+
+    def log_message(self, *args):
+        pass
+
+
+class _FixtureServerMixin:
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _FixtureHandler)
+        self.server.lock = threading.Lock()
+        self.server.requests = []
+        self.server.bytes_sent = 0
+        self.server.honor_range = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.base = f'http://127.0.0.1:{self.server.server_address[1]}'
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _run(self, coro):
+        return asyncio.run(coro)
+
+
+class TestClassifyHead(unittest.TestCase):
+    def test_known_signatures(self):
+        self.assertEqual(classify_head(PNG[:64]), ('image', 'png'))
+        self.assertEqual(classify_head(EXE[:64]), ('executable', 'exe'))
+        self.assertEqual(classify_head(ZIP[:64]), ('archive', 'zip'))
+        self.assertEqual(classify_head(MP4[:64]), ('video', 'mp4'))
+        self.assertEqual(classify_head(b'RIFF\x00\x00\x00\x00WEBPVP8 '), ('image', 'webp'))
+
+    def test_unknown(self):
+        self.assertIsNone(classify_head(TXT[:64]))
+        self.assertIsNone(classify_head(b''))
+
+    def test_zip_containers(self):
+        zipped = classify_head(ZIP[:64])
+        self.assertEqual(refine_container(zipped, 'docx'), ('document', 'docx'))
+        self.assertEqual(refine_container(zipped, 'jar'), ('executable', 'jar'))
+        self.assertEqual(refine_container(zipped, 'png'), ('archive', 'zip'))
+        # Só zip vira contêiner: um exe renomeado para .docx continua exe
+        self.assertEqual(refine_container(classify_head(EXE[:64]), 'docx'), ('executable', 'exe'))
+
+
+class TestProtectFilesContent(unittest.TestCase):
+    def _check(self, filename, head):
+        from types import SimpleNamespace
+        from cogs.protect_files import ProtectFilesCog
+
+        class _Sniffer:
+            async def sniff(self, attachment_id, size, url):
+                return classify_head(head[:64])
+
+        async def go():
+            cog = ProtectFilesCog(SimpleNamespace())
+            cog.allowed_ext = ['docx', 'xlsx', 'pdf']
+            cog.blocked_ext = ['exe', 'jar', 'zip', 'rar']
+            cog.sniffer = _Sniffer()
+            att = SimpleNamespace(id=1, size=len(head), url='http://x/', filename=filename,
+                                  content_type='application/vnd.openxmlformats-officedocument')
+            result = await cog._check_content(att)
+            await cog.hasher.close()
+            return result
+        return asyncio.run(go())
+
+    def test_allowed_office_file_not_blocked_as_zip(self):
+        self.assertEqual(self._check('planilha.xlsx', ZIP), (True, ''))
+        self.assertEqual(self._check('relatorio.docx', ZIP), (True, ''))
+
+    def test_real_zip_and_disguised_exe_still_blocked(self):
+        self.assertFalse(self._check('pacote.zip', ZIP)[0])
+        self.assertFalse(self._check('relatorio.docx', EXE)[0])
+
+
+class TestAttachmentSniffer(_FixtureServerMixin, unittest.TestCase):
+    def test_range_read_and_cache(self):
+        async def go():
+            sniffer = AttachmentSniffer(head_bytes=1024)
+            try:
+                first = await sniffer.sniff(1, len(EXE), self.base + '/virus.png')
+                second = await sniffer.sniff(1, len(EXE), self.base + '/virus.png')
+                return first, second
+            finally:
+                await sniffer.close()
+        first, second = self._run(go())
+        self.assertEqual(first, ('executable', 'exe'))
+        self.assertEqual(second, first)
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(self.server.requests[0][1], 'bytes=0-1023')
+        self.assertLessEqual(self.server.bytes_sent, 1024)
+
+    def test_concurrent_same_attachment_fetched_once(self):
+        async def go():
+            sniffer = AttachmentSniffer(head_bytes=512, max_concurrency=2)
+            try:
+                return await asyncio.gather(*(sniffer.sniff(7, len(PNG), self.base + '/foto.png') for _ in range(10)))
+            finally:
+                await sniffer.close()
+        results = self._run(go())
+        self.assertTrue(all(r == ('image', 'png') for r in results))
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_server_ignoring_range(self):
+        self.server.honor_range = False
+
+        async def go():
+            sniffer = AttachmentSniffer(head_bytes=512)
+            try:
+                return await sniffer.sniff(3, len(ZIP), self.base + '/pacote.zip')
+            finally:
+                await sniffer.close()
+        self.assertEqual(self._run(go()), ('archive', 'zip'))
+
+    def test_http_error_not_cached(self):
+        async def go():
+            sniffer = AttachmentSniffer(head_bytes=512)
+            try:
+                with self.assertRaises(Exception):
+                    await sniffer.sniff(9, 10, self.base + '/inexistente.png')
+                return len(sniffer.cache)
+            finally:
+                await sniffer.close()
+        self.assertEqual(self._run(go()), 0)
+
+
+class TestAttachmentHasher(_FixtureServerMixin, unittest.TestCase):
+    def test_hash_cached_per_attachment(self):
+        async def go():
+            hasher = AttachmentHasher(chunk_size=4096)
+            try:
+                a = await hasher.hash_attachment(1, len(EXE), self.base + '/virus.png?ex=1&hm=a')
+                b = await hasher.hash_attachment(1, len(EXE), self.base + '/virus.png?ex=2&hm=b')
+                return a, b
+            finally:
+                await hasher.close()
+        a, b = self._run(go())
+        self.assertEqual(a, hashlib.sha256(EXE).hexdigest())
+        self.assertEqual(a, b)
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_same_size_same_prefix_not_confused(self):
+        self.assertEqual(len(HARMLESS), len(BLOCKED))
+
+        async def go():
+            hasher = AttachmentHasher(chunk_size=4096)
+            try:
+                # O inofensivo primeiro não pode "emprestar" o hash ao bloqueado (nem o contrário)
+                harmless, blocked = await asyncio.gather(
+                    hasher.hash_attachment(10, len(HARMLESS), self.base + '/1/inofensivo.bin'),
+                    hasher.hash_attachment(20, len(BLOCKED), self.base + '/2/bloqueado.bin'))
+                again = await hasher.hash_attachment(20, len(BLOCKED), self.base + '/2/bloqueado.bin')
+                return harmless, blocked, again, hasher.downloads
+            finally:
+                await hasher.close()
+        harmless, blocked, again, downloads = self._run(go())
+        self.assertEqual(harmless, hashlib.sha256(HARMLESS).hexdigest())
+        self.assertEqual(blocked, hashlib.sha256(BLOCKED).hexdigest())
+        self.assertEqual(again, blocked)
+        self.assertEqual(downloads, 2)
+
+    def test_max_bytes(self):
+        async def go():
+            hasher = AttachmentHasher(chunk_size=4096, max_bytes=1000)
+            try:
+                await hasher.hash_attachment(2, len(PNG), self.base + '/foto.png')
+            finally:
+                await hasher.close()
+        with self.assertRaises(FileTooLarge):
+            self._run(go())
+
+
+class TestHashBlocklist(unittest.TestCase):
+    def test_persistence(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'blocklist.json'
+            digest = hashlib.sha256(EXE).hexdigest()
+
+            async def go():
+                bl = HashBlocklist(path)
+                self.assertTrue(await bl.add(digest.upper(), filename='virus.png'))
+                self.assertFalse(await bl.add(digest))
+            asyncio.run(go())
+            reloaded = HashBlocklist(path)
+            self.assertIn(digest, reloaded)
+            self.assertEqual(reloaded.get(digest)['filename'], 'virus.png')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+
+import discord
+
+from cogs._guild_snapshot import (
+    GuildSnapshot, channel_snap, load_snapshot, role_snap, save_snapshot,
+)
+
+
+def _role(rid, name, position, perms=0):
+    return SimpleNamespace(id=rid, name=name, permissions=discord.Permissions(perms), colour=discord.Colour(0),
+                           hoist=False, mentionable=False, position=position, managed=False)
+
+
+def _channel(cid, name, position, category_id=None, ctype=discord.ChannelType.text, overwrites=None):
+    return SimpleNamespace(id=cid, type=ctype, name=name, category_id=category_id, position=position,
+                           topic=None, nsfw=False, slowmode_delay=0, overwrites=overwrites or {})
+
+
+def _guild():
+    everyone = _role(1, '@everyone', 0, 1024)
+    mod = _role(2, 'Mod', 2, 8192)
+    ow = {discord.Object(2, type=discord.Role): discord.PermissionOverwrite(send_messages=True),
+          discord.Object(1, type=discord.Role): discord.PermissionOverwrite(send_messages=False),
+          discord.Object(99, type=discord.Member): discord.PermissionOverwrite(view_channel=True)}
+    cat = _channel(10, 'Geral', 0, ctype=discord.ChannelType.category)
+    chat = _channel(11, 'chat', 0, category_id=10, overwrites=ow)
+    staff = _channel(12, 'staff', 1, category_id=10)
+    return SimpleNamespace(id=5, channels=[cat, chat, staff], roles=[everyone, mod])
+
+
+class TestGuildSnapshot(unittest.TestCase):
+    def test_overwrites_are_primitive_and_sorted(self):
+        snap = channel_snap(_guild().channels[1])
+        send = discord.Permissions(send_messages=True).value
+        view = discord.Permissions(view_channel=True).value
+        self.assertEqual(snap.overwrites, ((1, 0, 0, send), (2, 0, send, 0), (99, 1, view, 0)))
+
+    def test_role_delete_keeps_overwrites_in_tombstone(self):
+        snap = GuildSnapshot.from_guild(_guild())
+        tomb = snap.delete_role(2, now=100.0)
+        self.assertNotIn(2, snap.roles)
+        self.assertEqual(tomb.extra['overwrites'], [(11, discord.Permissions(send_messages=True).value, 0)])
+        # Recriado (mesmo id, ex.: evento repetido) sai das lápides
+        snap.upsert_role(role_snap(_role(2, 'Mod', 2, 8192)))
+        self.assertNotIn(2, snap.deleted_roles)
+
+    def test_category_delete_records_children_and_prune(self):
+        snap = GuildSnapshot.from_guild(_guild())
+        tomb = snap.delete_channel(10, now=100.0)
+        self.assertEqual(sorted(tomb.extra['children']), [11, 12])
+        self.assertEqual(snap.prune(50, now=140.0), 0)
+        self.assertEqual(snap.prune(50, now=200.0), 1)
+        self.assertEqual(snap.deleted_channels, {})
+
+    def test_upsert_unchanged_does_not_dirty(self):
+        g = _guild()
+        snap = GuildSnapshot.from_guild(g)
+        snap.dirty = False
+        version = snap.version
+        snap.upsert_channel(channel_snap(g.channels[2]))
+        self.assertFalse(snap.dirty)
+        self.assertEqual(snap.version, version)
+
+    def test_diff_and_rebase(self):
+        g = _guild()
+        stored = GuildSnapshot.from_guild(g)
+        g.channels[2].name = 'staff-2'
+        g.channels.pop(1)
+        g.roles.pop(1)
+        live = GuildSnapshot.from_guild(g)
+        diff = stored.diff(live)
+        self.assertEqual([c.id for c in diff.channels_removed], [11])
+        self.assertEqual([r.id for r in diff.roles_removed], [2])
+        self.assertEqual([(o.id, f) for o, _, f in diff.channels_changed], [(12, ('name',))])
+        stored.rebase(live, now=100.0)
+        self.assertFalse(stored.diff(live))
+        self.assertEqual(set(stored.deleted_channels), {11})
+        # Canal e cargo sumiram juntos: a lápide do cargo ainda sabe do overwrite
+        self.assertEqual([o[0] for o in stored.deleted_roles[2].extra['overwrites']], [11])
+
+    def test_checkpoint_roundtrip(self):
+        snap = GuildSnapshot.from_guild(_guild())
+        snap.delete_role(2, now=100.0)
+        snap.delete_channel(10, now=100.0)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'snapshots' / '5.json'
+            save_snapshot(path, snap.to_dict())
+            loaded = load_snapshot(path)
+        self.assertEqual(loaded.channels, snap.channels)
+        self.assertEqual(loaded.roles, snap.roles)
+        self.assertEqual(loaded.deleted_roles, snap.deleted_roles)
+        self.assertEqual(loaded.deleted_channels, snap.deleted_channels)
+        self.assertFalse(loaded.diff(snap))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+import io
+import random
+import unittest
+
+from cogs._image_hash import PILLOW_AVAILABLE, HashEntry, HashWindow, dhash, ahash, hamming
+
+if PILLOW_AVAILABLE:
+    from PIL import Image, ImageDraw
+
+
+def _make_image(seed: int, fmt: str = 'PNG', size=(320, 240)) -> bytes:
+    rnd = random.Random(seed)
+    img = Image.new('RGB', size, (rnd.randint(0, 255), rnd.randint(0, 255), rnd.randint(0, 255)))
+    draw = ImageDraw.Draw(img)
+    for _ in range(12):
+        x0, y0 = rnd.randint(0, size[0]), rnd.randint(0, size[1])
+        draw.ellipse([x0, y0, x0 + rnd.randint(20, 120), y0 + rnd.randint(20, 120)],
+                     fill=(rnd.randint(0, 255), rnd.randint(0, 255), rnd.randint(0, 255)))
+    buf = io.BytesIO()
+    img.save(buf, format=fmt)
+    return buf.getvalue()
+
+
+@unittest.skipUnless(PILLOW_AVAILABLE, 'Pillow não instalado')
+class TestPerceptualHash(unittest.TestCase):
+    def test_reencoded_image_is_near(self):
+        png = _make_image(1)
+        img = Image.open(io.BytesIO(png)).resize((200, 150))
+        buf = io.BytesIO()
+        img.save(buf, format='JPEG', quality=70)
+        self.assertLessEqual(hamming(dhash(png), dhash(buf.getvalue())), 3)
+        self.assertLessEqual(hamming(ahash(png), ahash(buf.getvalue())), 3)
+
+    def test_different_images_are_far(self):
+        self.assertGreater(hamming(dhash(_make_image(1)), dhash(_make_image(2))), 10)
+
+
+class TestHashWindow(unittest.TestCase):
+    def test_band_lookup_matches_linear_scan(self):
+        rnd = random.Random(42)
+        win = HashWindow(window_seconds=1000, max_entries=500)
+        values = [rnd.getrandbits(64) for _ in range(400)]
+        for i, v in enumerate(values):
+            win.add(HashEntry(float(i), v, i, 1, i))
+        probe = values[10] ^ 0b101  # distância 2
+        found = {e.message_id for e in win.similar(probe, 3, 400.0)}
+        expected = {i for i, v in enumerate(values) if hamming(v, probe) <= 3}
+        self.assertEqual(found, expected)
+        self.assertIn(10, found)
+
+    def test_bounded_by_count_and_time(self):
+        win = HashWindow(window_seconds=10, max_entries=5)
+        for i in range(20):
+            win.add(HashEntry(float(i), i, i, 1, i))
+        self.assertEqual(len(win), 5)
+        self.assertEqual(win.similar(19, 0, 100.0), [])
+        self.assertEqual(len(win), 0)
+        self.assertFalse(win._buckets)
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+class TestImageSpamBackpressure(unittest.TestCase):
+    def _run_burst(self, total, max_pending, max_queued, wait):
+        import asyncio
+        from types import SimpleNamespace
+        from cogs.automod_imagespam import AutoModImageSpam
+
+        async def go():
+            cog = AutoModImageSpam(None)
+            cog.enabled = True
+            cog._pending = asyncio.Semaphore(max_pending)
+            cog.max_queued, cog.queue_wait = max_queued, wait
+            done = []
+
+            async def fingerprint(att):
+                await asyncio.sleep(0.01)
+                done.append(att.id)
+                return None
+            cog._fingerprint = fingerprint
+            cog._ignored = lambda m: False
+            msgs = [SimpleNamespace(attachments=[SimpleNamespace(id=i, content_type='image/png', filename='a.png')])
+                    for i in range(total)]
+            await asyncio.gather(*(cog.on_message(m) for m in msgs))
+            return cog, done
+        return asyncio.run(go())
+
+    def test_burst_is_queued_not_skipped(self):
+        cog, done = self._run_burst(200, max_pending=4, max_queued=1000, wait=30)
+        self.assertEqual(len(done), 200)
+        self.assertEqual(cog.dropped, 0)
+
+    def test_overflow_is_counted(self):
+        cog, done = self._run_burst(50, max_pending=2, max_queued=10, wait=30)
+        self.assertEqual(len(done) + cog.dropped, 50)
+        self.assertEqual(len(done), 12)
+
+    def test_refresh_during_burst_keeps_queue_state(self):
+        import asyncio
+        from types import SimpleNamespace
+        from unittest import mock
+        from cogs.automod_imagespam import AutoModImageSpam
+
+        cfg = {'automod_imagespam': {'enabled': True, 'fingerprint': {'max_pending': 2}}}
+
+        async def go():
+            with mock.patch('cogs.automod_imagespam.config_manager') as cm:
+                cm.load_cog.return_value = cm.reload_cog.return_value = cfg
+                cog = AutoModImageSpam(None)
+                cog.check_hash(1, 0xABCD, 10, 5, 1, asyncio.get_running_loop().time())
+                done = []
+
+                async def fingerprint(att):
+                    await asyncio.sleep(0.01)
+                    done.append(att.id)
+                    return None
+                cog._fingerprint = fingerprint
+                cog._ignored = lambda m: False
+                msgs = [SimpleNamespace(attachments=[SimpleNamespace(id=i, content_type='image/png', filename='a.png')])
+                        for i in range(20)]
+                tasks = [asyncio.create_task(cog.on_message(m)) for m in msgs]
+                await asyncio.sleep(0.015)
+                # Handlers em andamento e na fila atravessam o reload
+                cog.refresh_config()
+                await asyncio.gather(*tasks)
+                return cog, done
+
+        cog, done = asyncio.run(go())
+        self.assertEqual(len(done), 20)
+        self.assertEqual((cog._active, cog._queued, cog.dropped), (0, 0, 0))
+        # Nenhuma vaga extra: o semáforo voltou exatamente a max_pending
+        self.assertEqual(cog._pending._value, 2)
+        self.assertEqual(len(cog._windows[1]), 1)
@@ -0,0 +1,86 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from cogs.tolls_invitetracker import InviteInfo, InviteTrackerCog, InviteUsesCache, attribute
+
+
+class TestInviteUsesCache(unittest.TestCase):
+    def test_diff_counts_new_uses(self):
+        cache = InviteUsesCache()
+        cache.load([InviteInfo('abc', 3, 0, 1), InviteInfo('xyz', 0, 0, 2)])
+        deltas = cache.diff([InviteInfo('abc', 5, 0, 1), InviteInfo('xyz', 0, 0, 2)])
+        self.assertEqual(deltas, {'abc': 2})
+        self.assertEqual(cache.invites['abc'].uses, 5)
+
+    def test_exhausted_invite_counted(self):
+        cache = InviteUsesCache()
+        cache.load([InviteInfo('once', 0, 1, 1), InviteInfo('revoked', 2, 0, 1)])
+        # Sumiu sem on_invite_delete: esgotado pela entrada
+        deltas = cache.diff([])
+        self.assertEqual(deltas, {'once': 1})
+
+    def test_revoked_then_join_not_attributed_to_revoked(self):
+        cache = InviteUsesCache()
+        cache.load([InviteInfo('vip', 1, 5, 1), InviteInfo('geral', 3, 0, 2)])
+        cache.remove('vip')  # on_invite_delete: revogado (manual ou anti_raid)
+        deltas = cache.diff([InviteInfo('geral', 4, 0, 2)])
+        self.assertEqual(deltas, {'geral': 1})
+        result = attribute(deltas, [10], {'geral': 2})[10]
+        self.assertEqual((result.code, result.ambiguous), ('geral', False))
+        # Revogado e entrada por vanity/desconhecido: sem convite, não "vip"
+        cache.load([InviteInfo('vip', 1, 5, 1)])
+        cache.remove('vip')
+        self.assertEqual(cache.diff([]), {})
+
+    def test_created_after_warm(self):
+        cache = InviteUsesCache()
+        cache.load([])
+        cache.add(InviteInfo('new', 0, 0, 9))
+        self.assertEqual(cache.diff([InviteInfo('new', 1, 0, 9)]), {'new': 1})
+
+
+class TestAttribute(unittest.TestCase):
+    def test_single_code_is_exact(self):
+        res = attribute({'abc': 3}, [1, 2, 3], {'abc': 42})
+        self.assertTrue(all(a.code == 'abc' and not a.ambiguous and a.inviter_id == 42 for a in res.values()))
+
+    def test_multiple_codes_ambiguous(self):
+        res = attribute({'abc': 1, 'raid': 4}, [1, 2, 3, 4, 5], {})
+        self.assertEqual(res[1].code, 'raid')
+        self.assertTrue(res[1].ambiguous)
+        self.assertEqual(set(res[1].candidates), {'abc', 'raid'})
+
+    def test_fewer_uses_than_joins_ambiguous(self):
+        self.assertTrue(attribute({'abc': 1}, [1, 2], {})[2].ambiguous)
+        self.assertIsNone(attribute({}, [1], {})[1].code)
+
+
+class TestBatchedResolve(unittest.TestCase):
+    def test_one_fetch_per_batch(self):
+        async def go():
+            with mock.patch('cogs.tolls_invitetracker.config_manager') as cm:
+                cm.load_cog.return_value = {'invite_tracker': {'batch_window_seconds': 0.05}}
+                cog = InviteTrackerCog(SimpleNamespace())
+            uses = {'raid': 0}
+            calls = []
+
+            async def fetch(guild):
+                calls.append(1)
+                return [InviteInfo('raid', uses['raid'], 0, 7)]
+            cog._fetch = fetch
+            guild = SimpleNamespace(id=1, features=[])
+            await cog.warm(guild)
+            members = [SimpleNamespace(id=i, guild=guild, bot=False) for i in range(20)]
+            uses['raid'] = 20
+            results = await asyncio.gather(*(cog.resolve(m) for m in members))
+            return calls, results, await cog.recent_codes(1, 60)
+        calls, results, recent = asyncio.run(go())
+        self.assertEqual(len(calls), 2)  # warm + um único lote
+        self.assertTrue(all(r.code == 'raid' and not r.ambiguous for r in results))
+        self.assertEqual(recent['raid'], 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import asyncio
+import random
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from cogs._join_cohort import NUMPY_AVAILABLE, CohortWindow, extract_features, name_shape, snowflake_created
+
+
+def _snowflake(unix_seconds: float) -> int:
+    return (int(unix_seconds * 1000) - 1420070400000) << 22
+
+
+def _joins(seed: int = 3):
+    """50 contas legítimas variadas + 12 contas de raid criadas juntas, sem avatar, nomes em série."""
+    rnd = random.Random(seed)
+    base = 1_700_000_000
+    legit = []
+    for i in range(50):
+        created = base - rnd.randint(30, 3000) * 86400
+        name = rnd.choice(['ana', 'joao.silva', 'gamer_pro', 'lu', 'marcos', 'xX_dark_Xx']) + str(rnd.randint(0, 99))
+        legit.append((_snowflake(created) + i, extract_features(_snowflake(created) + i, name, rnd.random() < 0.8, rnd.choice([0, 64, 256]))))
+    raid = []
+    for i in range(12):
+        uid = _snowflake(base - 3600 + i * 30) + i
+        raid.append((uid, extract_features(uid, f'raider{rnd.randint(1000, 9999)}', False, 0)))
+    return legit, raid
+
+
+class TestFeatures(unittest.TestCase):
+    def test_shape_and_snowflake(self):
+        self.assertEqual(name_shape('raider_1234'), 'a_0')
+        self.assertEqual(name_shape('raider_9876'), name_shape('bot_1'))
+        self.assertAlmostEqual(snowflake_created(_snowflake(1_700_000_000)), 1_700_000_000, places=2)
+
+
+class TestCohortWindow(unittest.TestCase):
+    def _run(self, use_numpy: bool):
+        legit, raid = _joins()
+        win = CohortWindow(capacity=128, window_seconds=300, use_numpy=use_numpy)
+        now = 0.0
+        legit_hits = 0
+        for uid, feat in legit:
+            now += 1
+            legit_hits = max(legit_hits, len(win.observe(uid, feat, now)))
+        sizes = []
+        for uid, feat in raid:
+            now += 0.5
+            sizes.append(len(win.observe(uid, feat, now)))
+        return legit_hits, sizes, {uid for uid, _ in raid}, win
+
+    def test_raid_cluster_flagged_python(self):
+        legit_hits, sizes, _, _ = self._run(False)
+        self.assertLess(legit_hits, 4)
+        self.assertEqual(sizes[-1], 11)
+
+    @unittest.skipUnless(NUMPY_AVAILABLE, 'NumPy não instalado')
+    def test_numpy_matches_python(self):
+        a = self._run(False)
+        b = self._run(True)
+        self.assertEqual(a[:2], b[:2])
+
+    def test_expiry_and_capacity(self):
+        _, raid = _joins()
+        win = CohortWindow(capacity=4, window_seconds=10, use_numpy=False)
+        for i, (uid, feat) in enumerate(raid):
+            win.add(uid, feat, float(i))
+        self.assertEqual(len(win.similar(raid[0][1], 11.0)), 4)
+        self.assertEqual(win.similar(raid[0][1], 100.0), [])
+
+
+class TestCohortPunishment(unittest.TestCase):
+    def test_each_flagged_member_submitted_once(self):
+        from cogs import anti_raid
+        submitted = []
+
+        async def go():
+            with tempfile.TemporaryDirectory() as tmp, \
+                    mock.patch.object(anti_raid, 'JOURNAL_FILE', Path(tmp) / 'journal.sqlite3'):
+                cog = anti_raid.AntiRaidCog(mock.MagicMock())
+                cog.cohort_cfg = dict(cog.cohort_cfg, action='kick')
+                loop = asyncio.get_running_loop()
+
+                def submit(guild, target, action, reason=None, until=None):
+                    submitted.append(target.id)
+                    fut = loop.create_future()
+                    fut.set_result(target.id != 3)  # o kick do 3 falha
+                    return fut
+                cog.batcher.submit = submit
+                guild = mock.MagicMock(id=1)
+                guild.get_member.side_effect = lambda mid: mock.MagicMock(id=mid)
+                now = cog._now()
+                cog._cohort_flagged[1] = {mid: now for mid in range(5)}
+                cog._punish_cohort(guild)
+                await asyncio.sleep(0)
+                # Raid continua: 5 novos sinalizados; os já punidos não voltam ao lote
+                cog._cohort_flagged[1].update({mid: now for mid in range(5, 10)})
+                cog._punish_cohort(guild)
+                cog.journal.close()
+
+        asyncio.run(go())
+        self.assertEqual(submitted, [0, 1, 2, 3, 4, 3, 5, 6, 7, 8, 9])
+
+
+if __name__ == '__main__':
+    unittest.main()
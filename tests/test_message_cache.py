@@ -0,0 +1,76 @@
+import unittest
+
+from cogs._message_cache import ENTRY_OVERHEAD, CachedMessage, MessageCache
+
+
+def _msg(mid, channel=1, content='oi', attachments=None):
+    return CachedMessage(mid, channel, 99, 1000 + mid % 7, f'user{mid % 7}', 1700000000.0 + mid, content,
+                         attachments or [], False)
+
+
+class TestMessageCache(unittest.TestCase):
+    def test_roundtrip_and_pop(self):
+        cache = MessageCache()
+        long_text = 'mensagem repetida ' * 40
+        cache.add(_msg(1, content=long_text, attachments=[('a.png', 2048, 'https://cdn/a.png')]))
+        cache.add(_msg(2, content='curta'))
+        # Texto longo e repetitivo é comprimido; o curto fica cru
+        self.assertEqual(cache._messages[1][1][:1], b'z')
+        self.assertEqual(cache._messages[2][1][:1], b'r')
+        m = cache.pop(1)
+        self.assertEqual(m.content, long_text)
+        self.assertEqual(m.attachments, [('a.png', 2048, 'https://cdn/a.png')])
+        self.assertIsNone(cache.pop(1))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual(len(cache), 1)
+
+    def test_per_channel_limit(self):
+        cache = MessageCache(per_channel=10)
+        for i in range(50):
+            cache.add(_msg(i, channel=1))
+        cache.add(_msg(100, channel=2))
+        self.assertEqual(len(cache), 11)
+        # Só as 10 mais novas do canal movimentado; o outro canal não foi afetado
+        self.assertIsNone(cache.get(39))
+        self.assertIsNotNone(cache.get(40))
+        self.assertIsNotNone(cache.get(100))
+        # Mensagens apagadas liberam vaga no canal
+        cache.pop_many(range(40, 45))
+        for i in range(200, 205):
+            cache.add(_msg(i, channel=1))
+        self.assertIsNotNone(cache.get(45))
+
+    def test_memory_bound(self):
+        cache = MessageCache(per_channel=10000, max_bytes=64 * 1024)
+        for i in range(20000):
+            cache.add(_msg(i, channel=i % 50, content=f'conteúdo {i} ' * 5))
+            self.assertLessEqual(cache.bytes, cache.max_bytes)
+        self.assertGreater(cache.evicted, 0)
+        # Expulsa as mais antigas primeiro
+        self.assertIsNone(cache.get(0))
+        self.assertIsNotNone(cache.get(19999))
+        self.assertEqual(cache.bytes, sum(len(b) + ENTRY_OVERHEAD for _, b in cache._messages.values()))
+
+    def test_update_and_pop_many_order(self):
+        cache = MessageCache()
+        for i in (5, 3, 9):
+            cache.add(_msg(i))
+        cache.update_content(3, 'editada')
+        cache.update_content(42, 'ignorada')
+        found = cache.pop_many([9, 42, 3, 5])
+        self.assertEqual([m.id for m in found], [3, 5, 9])
+        self.assertEqual(found[0].content, 'editada')
+        self.assertEqual(cache.bytes, 0)
+
+    def test_forget_channel(self):
+        cache = MessageCache()
+        for i in range(10):
+            cache.add(_msg(i, channel=i % 2))
+        cache.forget_channel(0)
+        self.assertEqual(sorted(cache._messages), [1, 3, 5, 7, 9])
+        cache.add(_msg(20, channel=0))
+        self.assertEqual(len(cache), 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from cogs.tolls_nomsg import CompiledRule, NoMsgCog, attachment_kind
+
+RULES = [
+    {'channel_id': 10, 'allow_text': True, 'allow_images': False, 'delete_reason': 'canal'},
+    {'category_id': 100, 'allow_text': False, 'allow_images': True, 'bypass_roles': [7], 'delete_reason': 'categoria'},
+    # Repetida para o mesmo canal: a primeira vence
+    {'channel_id': '10', 'allow_text': False, 'delete_reason': 'ignorada'},
+    {'channel_id': 20, 'category_id': 200, 'require_attachment': True, 'max_attachments': 2},
+]
+
+
+def _att(filename, content_type=None):
+    return SimpleNamespace(filename=filename, content_type=content_type)
+
+
+def _cog(rules=RULES):
+    with mock.patch('cogs.tolls_nomsg.config_manager') as cm:
+        cm.load_cog.return_value = {'nomsg': {'rules': rules, 'feedback': {'notify_user': False}}}
+        return NoMsgCog(SimpleNamespace())
+
+
+class TestCompiledRule(unittest.TestCase):
+    def test_defaults(self):
+        rule = CompiledRule({})
+        self.assertTrue(rule.allow_text)
+        self.assertEqual(rule.allowed_kinds, {'image': True, 'video': False, 'other': False})
+        self.assertEqual(rule.bypass_roles, frozenset())
+        self.assertIsNone(rule.max_attachments)
+        self.assertFalse(rule.image_required)
+        self.assertFalse(rule.require_attachment)
+
+    def test_image_only_channel(self):
+        self.assertTrue(CompiledRule({'allow_text': False, 'allow_images': True}).image_required)
+        self.assertFalse(CompiledRule({'allow_text': False, 'allow_images': True, 'allow_videos': True}).image_required)
+        self.assertFalse(CompiledRule({'allow_text': True, 'allow_images': True}).image_required)
+        self.assertEqual(CompiledRule({'bypass_roles': [1, 2, 2]}).bypass_roles, frozenset({1, 2}))
+
+    def test_attachment_kind(self):
+        self.assertEqual(attachment_kind(_att('a.bin', 'image/png')), 'image')
+        self.assertEqual(attachment_kind(_att('a.bin', 'video/mp4')), 'video')
+        self.assertEqual(attachment_kind(_att('A.JPG')), 'image')
+        self.assertEqual(attachment_kind(_att('a.webm')), 'video')
+        self.assertEqual(attachment_kind(_att('a.zip')), 'other')
+        # content_type informado vence a extensão
+        self.assertEqual(attachment_kind(_att('a.png', 'application/zip')), 'other')
+
+
+class TestRuleLookup(unittest.TestCase):
+    def test_channel_overrides_category(self):
+        cog = _cog()
+        self.assertEqual(cog.get_rule_for_channel(10, 100)['delete_reason'], 'canal')
+        self.assertEqual(cog.get_rule_for_channel(11, 100)['delete_reason'], 'categoria')
+        self.assertIsNone(cog.get_rule_for_channel(11, 101))
+        self.assertIsNone(cog.get_rule_for_channel(11))
+        # Regra com canal e categoria entra nos dois índices
+        self.assertIs(cog._compiled_for(20), cog._compiled_for(21, 200))
+
+    def test_first_rule_wins_and_reload_rebuilds(self):
+        cog = _cog()
+        self.assertEqual(cog.get_rule_for_channel(10)['delete_reason'], 'canal')
+        with mock.patch('cogs.tolls_nomsg.config_manager') as cm:
+            cm.reload_cog.return_value = {'nomsg': {'rules': [{'category_id': 100, 'delete_reason': 'nova'}]}}
+            cog.refresh_config()
+        self.assertIsNone(cog.get_rule_for_channel(10))
+        self.assertEqual(cog.get_rule_for_channel(10, 100)['delete_reason'], 'nova')
+
+
+class _Message:
+    def __init__(self, channel_id, category_id, content='', attachments=(), roles=()):
+        self.author = SimpleNamespace(bot=False, roles=[SimpleNamespace(id=r) for r in roles], mention='<@1>',
+                                      guild_permissions=SimpleNamespace(manage_messages=False))
+        self.guild = SimpleNamespace(id=1)
+        self.channel = SimpleNamespace(id=channel_id, category_id=category_id, mention=f'<#{channel_id}>')
+        self.content = content
+        self.attachments = list(attachments)
+        self.deleted = False
+
+    async def delete(self):
+        self.deleted = True
+
+
+class TestEnforcement(unittest.TestCase):
+    def _run(self, *messages):
+        cog = _cog()
+
+        async def go():
+            for m in messages:
+                await cog.on_message(m)
+        asyncio.run(go())
+        return [m.deleted for m in messages]
+
+    def test_inherited_rule_applies_to_category_channels(self):
+        self.assertEqual(self._run(
+            _Message(11, 100, content='texto'),  # categoria só de imagens
+            _Message(11, 100, attachments=[_att('a.png', 'image/png')]),
+            _Message(11, 100),  # sem anexo num canal só de imagens
+            _Message(11, 100, content='texto', roles=[7]),  # bypass da regra
+            _Message(10, 100, attachments=[_att('a.png', 'image/png')]),  # regra do canal proíbe imagens
+            _Message(10, 100, content='texto'),
+            _Message(12, 300, content='texto'),  # sem regra
+        ), [True, False, True, False, True, False, False])
+
+    def test_attachment_limits(self):
+        img = _att('a.png', 'image/png')
+        self.assertEqual(self._run(
+            _Message(20, None, content='só texto'),
+            _Message(20, None, attachments=[img, img]),
+            _Message(20, None, attachments=[img, img, img]),
+        ), [True, False, True])
+
+
+if __name__ == '__main__':
+    unittest.main()
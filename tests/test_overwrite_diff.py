@@ -0,0 +1,107 @@
+import asyncio
+import datetime
+import unittest
+from types import SimpleNamespace
+
+import discord
+
+from cogs.audit_channel import AuditChannelCog, overwrite_changes
+
+OW = discord.PermissionOverwrite
+
+
+class _Target(discord.Object):
+    def __init__(self, tid, name):
+        super().__init__(tid)
+        self.name = name
+
+
+def _target(tid, name):
+    return _Target(tid, name)
+
+
+class TestOverwriteChanges(unittest.TestCase):
+    def test_same_count_edit_is_detected(self):
+        mod, everyone = _target(1, 'Mod'), _target(2, 'everyone')
+        before = {mod: OW(send_messages=True), everyone: OW(view_channel=False)}
+        after = {mod: OW(send_messages=False, manage_messages=True), everyone: OW(view_channel=False)}
+        changes = overwrite_changes(before, after)
+        self.assertEqual(len(changes), 1)
+        kind, line = changes[0]
+        self.assertEqual(kind, 'update')
+        self.assertTrue(line.startswith('Mod:'))
+        self.assertIn('send_messages ✅→❌', line)
+        self.assertIn('manage_messages ⬜→✅', line)
+        self.assertNotIn('view_channel', line)
+
+    def test_create_delete_and_noop(self):
+        a, b = _target(1, 'A'), _target(3, 'B')
+        self.assertEqual(overwrite_changes({a: OW(speak=True)}, {a: OW(speak=True)}), [])
+        changes = overwrite_changes({a: OW(speak=True)}, {b: OW(connect=False)})
+        self.assertEqual([k for k, _ in changes], ['create', 'delete'])
+        self.assertIn('connect ⬜→❌', changes[0][1])
+        self.assertEqual(changes[1][1], 'A: removido')
+
+
+class _Guild:
+    def __init__(self, entries):
+        self.id = 1
+        self.me = SimpleNamespace(guild_permissions=discord.Permissions(view_audit_log=True))
+        self.entries = entries
+        self.calls = []
+
+    def audit_logs(self, limit, action):
+        self.calls.append(action)
+        entries = [e for e in self.entries if e.action == action][:limit]
+
+        async def gen():
+            for e in entries:
+                yield e
+        return gen()
+
+
+def _channel(cid, guild, overwrites):
+    return SimpleNamespace(id=cid, name=f'c{cid}', mention=f'<#{cid}>', guild=guild, overwrites=overwrites)
+
+
+class TestDebounce(unittest.TestCase):
+    def test_sync_of_50_channels_is_one_entry(self):
+        mod = _target(9, 'Mod')
+        now = datetime.datetime.now(datetime.timezone.utc)
+        user = SimpleNamespace(id=77, mention='<@77>')
+        entries = [SimpleNamespace(action=discord.AuditLogAction.overwrite_update, target=discord.Object(100 + i),
+                                   user=user, created_at=now) for i in range(50)]
+        guild = _Guild(entries)
+        bot = SimpleNamespace(get_cog=lambda name: None)
+        cog = AuditChannelCog(bot)
+        cog.enabled = True
+        cog.opts = dict(cog.opts, log_update=True)
+        cog.debounce, cog.debounce_max = 0.05, 1.0
+        logged = []
+
+        async def fake_log(guild, title, lines, **kw):
+            logged.append((title, lines))
+        cog._log = fake_log
+
+        async def run():
+            bot._audit_log_cache = None
+            for i in range(50):
+                before = _channel(100 + i, guild, {mod: OW(send_messages=True)})
+                after = _channel(100 + i, guild, {mod: OW(send_messages=False)})
+                await cog.on_guild_channel_update(before, after)
+                # Mudança de posição (sem diff) não entra no buffer
+                await cog.on_guild_channel_update(after, after)
+            self.assertEqual(len(cog._pending[1].channels), 50)
+            await asyncio.sleep(0.2)
+
+        asyncio.run(run())
+        self.assertEqual(len(logged), 1)
+        self.assertEqual(guild.calls, [discord.AuditLogAction.overwrite_update])
+        fields = dict((n, v) for n, v, _ in logged[0][1])
+        self.assertIn('<@77> modificou 50 canais', fields['Evento'])
+        self.assertIn('send_messages ✅→❌', fields['Alterações'])
+        self.assertEqual(cog._pending, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import discord
+
+from cogs._perm_escalation import EscalationIndex, permission_mask, permission_names
+
+ADMIN = discord.Permissions(administrator=True).value
+BAN = discord.Permissions(ban_members=True).value
+SEND = discord.Permissions(send_messages=True).value
+MASK = permission_mask(['administrator', 'ban_members', 'nao_existe'])
+
+GUILD = SimpleNamespace(id=1)
+
+
+def _role(rid, value):
+    return SimpleNamespace(id=rid, guild=GUILD, permissions=discord.Permissions(value), mention=f'<@&{rid}>')
+
+
+def _member(mid, roles):
+    return SimpleNamespace(id=mid, guild=GUILD, roles=list(roles), mention=f'<@{mid}>')
+
+
+class TestEscalationIndex(unittest.TestCase):
+    def setUp(self):
+        self.everyone = _role(1, SEND)
+        self.mod = _role(2, BAN | SEND)
+        self.admin = _role(3, ADMIN)
+        GUILD.roles = [self.everyone, self.mod, self.admin]
+        self.idx = EscalationIndex(MASK)
+        self.idx.load_guild(GUILD)
+
+    def test_mask_and_names(self):
+        self.assertEqual(MASK, ADMIN | BAN)
+        self.assertEqual(permission_names(BAN | SEND), ['ban_members', 'send_messages'])
+
+    def test_member_grant_reports_only_new_bits(self):
+        before = _member(10, [self.everyone, self.mod])
+        esc = self.idx.member_updated(before, _member(10, [self.everyone, self.mod, self.admin]))
+        self.assertEqual(esc.gained, ADMIN)
+        self.assertEqual(esc.role_ids, [3])
+        # Segundo cargo que só repete bits já existentes não é escalada
+        again = self.idx.member_updated(_member(10, [self.everyone, self.admin]),
+                                        _member(10, [self.everyone, self.admin, self.mod]))
+        self.assertEqual(again.gained, 0)
+        self.assertEqual(len(self.idx), 1)
+
+    def test_losing_a_role_recomputes_and_frees_memory(self):
+        m = _member(10, [self.everyone, self.mod])
+        self.idx.member_updated(_member(10, [self.everyone]), m)
+        self.assertEqual(len(self.idx), 1)
+        self.idx.member_updated(m, _member(10, [self.everyone]))
+        self.assertEqual(len(self.idx), 0)
+
+    def test_role_update_uses_xor(self):
+        after = _role(1, SEND | ADMIN)
+        self.assertEqual(self.idx.role_updated(self.everyone, after), ADMIN)
+        # Tirar um bit perigoso não é escalada
+        self.assertEqual(self.idx.role_updated(after, _role(1, SEND)), 0)
+        # Bit não perigoso não conta
+        self.assertEqual(self.idx.role_updated(self.mod, _role(2, BAN | SEND | 8192)), 0)
+
+
+class TestAuditRolesEscalation(unittest.TestCase):
+    def test_unauthorized_grant_is_reverted_before_logging(self):
+        from cogs import audit_roles as ar
+        events = []
+
+        async def go():
+            bot = mock.MagicMock()
+            bot.user.id = 1
+            cog = ar.AuditRolesCog(bot)
+            cog.enabled = True
+            cog.opts = {'log_member_roles_change': False}
+            cog.esc_cfg = {'enabled': True, 'action': 'revert'}
+            cog.esc_users = {50}
+            cog.escalation = EscalationIndex(MASK)
+
+            everyone, admin = _role(1, SEND), _role(3, ADMIN)
+            guild = SimpleNamespace(id=1, owner_id=2, roles=[everyone, admin], get_member=lambda mid: None)
+            cog.escalation.load_guild(guild)
+            executor = SimpleNamespace(id=77, mention='<@77>')
+
+            async def find_executor(g, target, action):
+                return executor
+
+            async def log(g, title, lines, **kw):
+                events.append(('log', lines[2][1]))
+
+            async def remove_roles(*roles, reason=None):
+                events.append(('remove', [r.id for r in roles]))
+
+            cog._find_executor = find_executor
+            cog._log = log
+            after = _member(10, [everyone, admin])
+            after.guild = guild
+            after.remove_roles = remove_roles
+            before = _member(10, [everyone])
+            before.guild = guild
+            await cog.on_member_update(before, after)
+            # Executor autorizado: nada acontece
+            executor.id = 50
+            other = _member(11, [everyone, admin])
+            other.guild = guild
+            other.remove_roles = remove_roles
+            await cog.on_member_update(_member(11, [everyone]), other)
+            return cog
+
+        cog = asyncio.run(go())
+        self.assertEqual(events, [('remove', [3]), ('log', 'revertida')])
+        self.assertEqual(cog.escalations_seen, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+import asyncio
+import datetime
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import discord
+
+from cogs._punish_batch import PunishmentBatcher
+
+
+class _FakeGuild:
+    def __init__(self, bulk_fails: bool = False):
+        self.id = 1
+        self.bulk_calls = []
+        self.single_bans = 0
+        self.reasons = []
+        self.kicks = []
+        self.bulk_fails = bulk_fails
+
+    async def bulk_ban(self, users, reason=None, delete_message_seconds=0):
+        self.bulk_calls.append(len(users))
+        self.reasons.append(reason)
+        if self.bulk_fails:
+            raise discord.Forbidden(SimpleNamespace(status=403, reason='Forbidden'), 'sem permissão')
+        ids = [u.id for u in users]
+        return SimpleNamespace(banned=[discord.Object(i) for i in ids if i % 10], failed=[discord.Object(i) for i in ids if not i % 10])
+
+    async def ban(self, user, reason=None, delete_message_seconds=0):
+        self.single_bans += 1
+        self.reasons.append(reason)
+
+    async def kick(self, user, reason=None):
+        self.kicks.append((user.id, reason))
+
+
+class _FakeMember:
+    active = 0
+    peak = 0
+
+    def __init__(self, uid):
+        self.id = uid
+        self.until = None
+
+    async def timeout(self, until, reason=None):
+        _FakeMember.active += 1
+        _FakeMember.peak = max(_FakeMember.peak, _FakeMember.active)
+        await asyncio.sleep(0.01)
+        _FakeMember.active -= 1
+        self.until = until
+
+
+class TestPunishmentBatcher(unittest.TestCase):
+    def test_bulk_ban_chunks_and_single_summary(self):
+        async def go():
+            guild = _FakeGuild()
+            flushed = []
+
+            async def on_flush(batch):
+                flushed.append(batch)
+            batcher = PunishmentBatcher(window_seconds=0.05, on_flush=on_flush)
+            futs = [batcher.submit(guild, discord.Object(i), 'ban', reason='raid') for i in range(1, 451)]
+            futs.append(batcher.submit(guild, discord.Object(5), 'ban'))  # duplicado
+            results = await asyncio.gather(*futs)
+            return guild, flushed, results
+        guild, flushed, results = asyncio.run(go())
+        self.assertEqual(guild.bulk_calls, [200, 200, 50])
+        self.assertEqual(len(flushed), 1)
+        self.assertEqual(flushed[0].calls, 3)
+        self.assertEqual(len(flushed[0].ok) + len(flushed[0].failed), 450)
+        self.assertFalse(results[9])  # id 10 falhou
+        self.assertTrue(results[0])
+
+    def test_bulk_forbidden_falls_back(self):
+        async def go():
+            guild = _FakeGuild(bulk_fails=True)
+            batcher = PunishmentBatcher(window_seconds=0.01)
+            results = await asyncio.gather(*(batcher.submit(guild, discord.Object(i), 'ban') for i in range(1, 6)))
+            return guild, results
+        guild, results = asyncio.run(go())
+        self.assertEqual(guild.single_bans, 5)
+        self.assertTrue(all(results))
+
+    def test_reason_kept_per_target(self):
+        async def go():
+            guild = _FakeGuild()
+            batcher = PunishmentBatcher(window_seconds=0.01)
+            futs = [batcher.submit(guild, discord.Object(i), 'ban', reason='coorte') for i in range(1, 4)]
+            futs.append(batcher.submit(guild, discord.Object(50), 'ban', reason='Conta nova (2.0h < 24h)'))
+            futs += [batcher.submit(guild, discord.Object(7), 'kick', reason='normal'),
+                     batcher.submit(guild, discord.Object(8), 'kick', reason='Falha ban')]
+            await asyncio.gather(*futs)
+            return guild
+        guild = asyncio.run(go())
+        self.assertEqual(guild.bulk_calls, [3])
+        self.assertEqual(guild.single_bans, 1)
+        self.assertEqual(sorted(guild.reasons), ['Conta nova (2.0h < 24h)', 'coorte'])
+        self.assertEqual(sorted(guild.kicks), [(7, 'normal'), (8, 'Falha ban')])
+
+    def test_timeouts_concurrency_limited(self):
+        async def go():
+            _FakeMember.peak = 0
+            guild = _FakeGuild()
+            until = datetime.datetime.now(datetime.timezone.utc)
+            batcher = PunishmentBatcher(window_seconds=0.01, concurrency=3)
+            members = [_FakeMember(i) for i in range(20)]
+            results = await asyncio.gather(*(batcher.submit(guild, m, 'timeout', until=until) for m in members))
+            return members, results
+        members, results = asyncio.run(go())
+        self.assertTrue(all(results))
+        self.assertTrue(all(m.until is not None for m in members))
+        self.assertLessEqual(_FakeMember.peak, 3)
+
+
+class TestUserAltBatch(unittest.TestCase):
+    def test_joins_in_one_window_are_one_bulk_ban(self):
+        from cogs.protect_useralt import ProtectUserAltCog
+        now = datetime.datetime.now(datetime.timezone.utc)
+
+        async def go():
+            guild = _FakeGuild()
+            cfg = {'protect_useralt': {'min_account_age_hours': 24, 'ban': True, 'batch': {'window_seconds': 0.05}}}
+            with mock.patch('cogs.protect_useralt.config_manager') as cm:
+                cm.load_cog.return_value = cfg
+                cog = ProtectUserAltCog(SimpleNamespace(get_cog=lambda name: None))
+            logged = []
+
+            async def fake_log(guild, title, fields):
+                logged.append({n: v for n, v, _ in fields})
+            cog._log = fake_log
+            members = [SimpleNamespace(id=i, bot=False, roles=[], guild=guild,
+                                       created_at=now - datetime.timedelta(hours=i)) for i in range(1, 6)]
+            await asyncio.gather(*(cog.on_member_join(m) for m in members))
+            return guild, logged
+
+        guild, logged = asyncio.run(go())
+        self.assertEqual(guild.bulk_calls, [5])
+        self.assertEqual(guild.single_bans, 0)
+        self.assertEqual(guild.reasons, ['Conta nova (<24h)'])
+        # A idade de cada conta fica no log do lote
+        self.assertIn('<@3> (3.0h)', logged[0]['Usuários'])
+
+
+if __name__ == '__main__':
+    unittest.main()
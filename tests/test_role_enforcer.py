@@ -0,0 +1,111 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+
+import discord
+
+from cogs._role_enforcer import RoleEnforcer
+
+
+class _Member:
+    def __init__(self, mid, roles, guild):
+        self.id = mid
+        self.roles = list(roles)
+        self.guild = guild
+        self.calls = []
+        self.fail = 0
+
+    async def remove_roles(self, *roles, reason=None):
+        await asyncio.sleep(0)
+        if self.fail:
+            self.fail -= 1
+            raise discord.HTTPException(SimpleNamespace(status=500, reason='erro'), 'falhou')
+        self.calls.append(sorted(r.id for r in roles))
+        self.roles = [r for r in self.roles if r not in roles]
+
+
+class _Guild:
+    def __init__(self):
+        self.id = 1
+        self.members = {}
+
+    def get_member(self, mid):
+        return self.members.get(mid)
+
+
+ADMIN = SimpleNamespace(id=10)
+MOD = SimpleNamespace(id=11)
+OTHER = SimpleNamespace(id=12)
+
+
+def _enforcer(guild, events=None, **kw):
+    async def on_result(event, p, member, roles, error):
+        if events is not None:
+            events.append((event, member.id))
+    opts = dict(verify_delay=0.01, verify_rounds=1, max_failures=3, max_backoff=0.05, concurrency=5)
+    opts.update(kw)
+    return RoleEnforcer({1: guild}.get, on_result=on_result, **opts)
+
+
+class TestRoleEnforcer(unittest.TestCase):
+    def test_coalesces_roles_per_member(self):
+        async def go():
+            guild = _Guild()
+            for mid in range(100):
+                guild.members[mid] = _Member(mid, [ADMIN, MOD, OTHER], guild)
+            enf = _enforcer(guild)
+            enf.start()
+            # Mass-grant: um evento por cargo por membro
+            for mid in range(100):
+                enf.schedule(1, mid, {10}, 'teste')
+                enf.schedule(1, mid, {11}, 'teste')
+            self.assertEqual(len(enf), 100)
+            await asyncio.sleep(0.1)
+            enf.stop()
+            return guild, enf
+        guild, enf = asyncio.run(go())
+        self.assertEqual(enf.api_calls, 100)
+        self.assertTrue(all(m.calls == [[10, 11]] for m in guild.members.values()))
+        self.assertTrue(all(m.roles == [OTHER] for m in guild.members.values()))
+        self.assertEqual(len(enf), 0)
+
+    def test_backoff_then_success_and_reinforce(self):
+        events = []
+
+        async def go():
+            guild = _Guild()
+            m = guild.members[5] = _Member(5, [ADMIN], guild)
+            m.fail = 2
+            enf = _enforcer(guild, events)
+            enf.start()
+            enf.schedule(1, 5, {10}, 'teste')
+            await asyncio.sleep(0.12)
+            # Outro bot reconcede o cargo depois da remoção
+            m.roles.append(ADMIN)
+            enf.schedule(1, 5, {10}, 'teste')
+            await asyncio.sleep(0.05)
+            enf.stop()
+            return m
+        m = asyncio.run(go())
+        self.assertEqual([e for e, _ in events], ['failed', 'failed', 'removed', 'removed'])
+        self.assertEqual(m.calls, [[10], [10]])
+
+    def test_export_import_roundtrip(self):
+        async def go():
+            guild = _Guild()
+            guild.members[7] = _Member(7, [ADMIN], guild)
+            old = _enforcer(guild)
+            old.schedule(1, 7, {10}, 'teste', delay=0.02)
+            state = old.export()
+            new = _enforcer(guild)
+            new.import_state(state)
+            new.start()
+            await asyncio.sleep(0.06)
+            new.stop()
+            return guild.members[7]
+        m = asyncio.run(go())
+        self.assertEqual(m.calls, [[10]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from cogs.protect_roles import ProtectRolesCog, unauthorized_holders
+
+
+def _members(n, start=0, bot=False):
+    return [SimpleNamespace(id=i, bot=bot) for i in range(start, start + n)]
+
+
+class TestRoleSweep(unittest.TestCase):
+    def test_only_unlisted_holders(self):
+        holders = _members(5) + _members(2, start=100, bot=True)
+        found = unauthorized_holders(10, holders, authorized={0, 1}, allowed_users={2}, skip_bots=True)
+        self.assertEqual(found, {3: {10}, 4: {10}})
+        found = unauthorized_holders(10, holders, authorized={0, 1}, allowed_users={2}, skip_bots=False)
+        self.assertEqual(set(found), {3, 4, 100, 101})
+
+
+class _Guild:
+    def __init__(self, roles):
+        self.id = 1
+        self.chunked = True
+        self.roles = {r.id: r for r in roles}
+
+    def get_role(self, rid):
+        return self.roles.get(rid)
+
+
+def _cog(mode):
+    cfg = {'protect_roles': {
+        'protected_role_ids': [10, 20, 30],
+        'allowed_user_ids': [2],
+        'sweep': {'enabled': False, 'mode': mode,
+                  # Como vem do JSON: chaves string; o cargo 30 não tem lista e não é varrido
+                  'authorized_holders': {'10': ['0', 1], '20': [0]}},
+    }}
+    with mock.patch('cogs.protect_roles.config_manager') as cm:
+        cm.load_cog.return_value = cfg
+        cog = ProtectRolesCog(SimpleNamespace(get_guild=lambda gid: None))
+    logged = []
+
+    async def fake_log(guild, text=None, **kw):
+        logged.append({n: v for n, v, _ in kw.get('fields') or []})
+    cog._log = fake_log
+    return cog, logged
+
+
+def _guild():
+    role10 = SimpleNamespace(id=10, members=_members(5) + _members(1, start=100, bot=True))
+    role20 = SimpleNamespace(id=20, members=_members(2, start=3))  # 3 e 4 também estão no cargo 10
+    role30 = SimpleNamespace(id=30, members=_members(3, start=50))
+    return _Guild([role10, role20, role30])
+
+
+class TestSweep(unittest.TestCase):
+    def test_converts_keys_and_skips_unlisted_roles(self):
+        async def go():
+            cog, logged = _cog('report')
+            self.assertEqual(cog.authorized_holders, {10: {0, 1}, 20: {0}})
+            result = await cog.sweep(_guild())
+            return cog, logged, result
+
+        cog, logged, result = asyncio.run(go())
+        self.assertEqual(result['roles'], 2)
+        self.assertEqual(result['checked'], 8)
+        # 2 está na lista global, 100 é bot; o cargo 30 (50..52) ficou de fora
+        self.assertEqual(result['found'], {3: {10, 20}, 4: {10, 20}})
+        self.assertFalse(result['removed'])
+        self.assertEqual(len(cog.enforcer), 0)
+        self.assertEqual(logged[0]['Ação'], 'só relatório')
+        self.assertIn('2 fora da lista', cog._last_sweep[1])
+
+    def test_remove_schedules_once_per_member(self):
+        async def go():
+            cog, logged = _cog('remove')
+            guild = _guild()
+            result = await cog.sweep(guild)
+            # Segunda varredura antes da remoção: soma na mesma pendência
+            await cog.sweep(guild)
+            return cog, logged, result
+
+        cog, logged, result = asyncio.run(go())
+        self.assertTrue(result['removed'])
+        self.assertEqual(len(cog.enforcer), 2)
+        self.assertEqual({k: p.role_ids for k, p in cog.enforcer._pending.items()},
+                         {(1, 3): {10, 20}, (1, 4): {10, 20}})
+        self.assertEqual(cog.enforcer._pending[(1, 3)].reason, 'varredura: titular não autorizado')
+        self.assertEqual(logged[0]['Ação'], 'remoção agendada')
+
+    def test_explicit_mode_overrides_config(self):
+        async def go():
+            cog, _ = _cog('remove')
+            return cog, await cog.sweep(_guild(), remove=False)
+
+        cog, result = asyncio.run(go())
+        self.assertFalse(result['removed'])
+        self.assertEqual(len(cog.enforcer), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+import asyncio
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from cogs._state_journal import StateJournal
+
+
+class TestStateJournal(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / 'journal.sqlite3'
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_survives_reopen_and_keeps_first_original(self):
+        j = StateJournal(self.path)
+        j.begin('antinuke', 1, 123.0, [('slowmode', 10, 0), ('role_perms', 20, 8)])
+        # Lockdown reaplicado: o valor atual (já em lockdown) não sobrescreve o original
+        j.begin('antinuke', 1, 456.0, [('slowmode', 10, 10), ('slowmode', 11, 5)])
+        j.close()
+        j = StateJournal(self.path)
+        [sess] = j.sessions('antinuke')
+        self.assertEqual(sess.deadline, 456.0)
+        self.assertEqual(sess.entries, {'slowmode': {10: 0, 11: 5}, 'role_perms': {20: 8}})
+        self.assertEqual(j.sessions('anti_raid'), [])
+        j.end('antinuke', 1)
+        self.assertEqual(j.sessions('antinuke'), [])
+        j.close()
+
+
+class _Channel:
+    def __init__(self, cid, slow):
+        self.id = cid
+        self.rate_limit_per_user = slow
+
+    async def edit(self, rate_limit_per_user, reason=None):
+        self.rate_limit_per_user = rate_limit_per_user
+
+
+class TestAntiRaidReplay(unittest.TestCase):
+    def _replay(self, originals, revert_slowmode):
+        from cogs import anti_raid
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'journal.sqlite3'
+            # Canais ainda com o slowmode da emergência (8s)
+            channels = {i: _Channel(i, 8) for i in originals}
+            # Estado deixado por um processo que caiu no meio da emergência
+            j = StateJournal(path)
+            j.begin(anti_raid.JOURNAL_SCOPE, 99, time.time() - 5, [('slowmode', i, v) for i, v in originals.items()])
+            j.close()
+
+            guild = mock.MagicMock(id=99)
+            guild.get_channel.side_effect = channels.get
+            bot = mock.MagicMock()
+            bot.get_guild.return_value = guild
+
+            async def go():
+                with mock.patch.object(anti_raid, 'JOURNAL_FILE', path), \
+                        mock.patch.object(anti_raid.discord, 'TextChannel', _Channel):
+                    cog = anti_raid.AntiRaidCog(bot)
+                    cog.emergency_cfg = dict(cog.emergency_cfg, apply_slowmode=True,
+                                             revert_slowmode_seconds=revert_slowmode)
+                    await cog._replay_journal()
+                    await asyncio.gather(*cog._bg_tasks)
+                    self.assertFalse(cog._emergency_active)
+                    self.assertEqual(cog.journal.sessions(anti_raid.JOURNAL_SCOPE), [])
+                    cog.journal.close()
+            asyncio.run(go())
+            return {i: c.rate_limit_per_user for i, c in channels.items()}
+
+    def test_expired_emergency_restores_original_after_restart(self):
+        # revert_slowmode_seconds negativo: volta ao valor de antes da emergência, lido do journal
+        originals = {1: 3, 2: 0, 3: 15, 4: 3, 5: 120}
+        self.assertEqual(self._replay(originals, -1), originals)
+
+    def test_expired_emergency_applies_configured_revert(self):
+        self.assertEqual(self._replay({1: 3, 2: 0}, 2), {1: 2, 2: 2})
+
+    def _replay_two_guilds(self, newest_deadline):
+        from cogs import anti_raid
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'journal.sqlite3'
+            chans = {98: {1: _Channel(1, 8), 2: _Channel(2, 8)}, 99: {3: _Channel(3, 8)}}
+            j = StateJournal(path)
+            j.begin(anti_raid.JOURNAL_SCOPE, 98, time.time() + 600, [('slowmode', 1, 3), ('slowmode', 2, 0)])
+            time.sleep(0.01)
+            j.begin(anti_raid.JOURNAL_SCOPE, 99, newest_deadline, [('slowmode', 3, 15)])
+            j.close()
+
+            guilds = {}
+            for gid, by_id in chans.items():
+                guilds[gid] = mock.MagicMock(id=gid)
+                guilds[gid].get_channel.side_effect = by_id.get
+            bot = mock.MagicMock()
+            bot.get_guild.side_effect = guilds.get
+
+            async def go():
+                with mock.patch.object(anti_raid, 'JOURNAL_FILE', path), \
+                        mock.patch.object(anti_raid.discord, 'TextChannel', _Channel):
+                    cog = anti_raid.AntiRaidCog(bot)
+                    cog.emergency_cfg = dict(cog.emergency_cfg, apply_slowmode=True, revert_slowmode_seconds=-1)
+                    await cog._replay_journal()
+                    await asyncio.gather(*cog._bg_tasks)
+                    state = (cog._emergency_active, dict(cog._original_slowmodes), cog._auto_disable_task is not None,
+                             [sess.guild_id for sess in cog.journal.sessions(anti_raid.JOURNAL_SCOPE)])
+                    if cog._auto_disable_task:
+                        cog._auto_disable_task.cancel()
+                    cog.journal.close()
+                    return state
+            state = asyncio.run(go())
+            slow = {gid: {cid: c.rate_limit_per_user for cid, c in by_id.items()} for gid, by_id in chans.items()}
+            return state, slow
+
+    def test_two_guilds_newest_resumed_other_reverted(self):
+        (active, originals, scheduled, open_sessions), slow = self._replay_two_guilds(time.time() + 600)
+        # A emergência mais antiga (outra guild) é revertida com os próprios valores
+        self.assertEqual(slow[98], {1: 3, 2: 0})
+        # A mais recente continua ativa, só com os canais dela e a desativação automática agendada
+        self.assertTrue(active)
+        self.assertEqual(originals, {3: 15})
+        self.assertTrue(scheduled)
+        self.assertEqual(slow[99], {3: 8})
+        self.assertEqual(open_sessions, [99])
+
+    def test_two_guilds_expired_restores_each_with_own_values(self):
+        (active, originals, _, open_sessions), slow = self._replay_two_guilds(time.time() - 5)
+        self.assertEqual(slow, {98: {1: 3, 2: 0}, 99: {3: 15}})
+        self.assertFalse(active)
+        self.assertEqual(originals, {})
+        self.assertEqual(open_sessions, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,171 @@
+import asyncio
+import itertools
+import unittest
+from types import SimpleNamespace
+
+import discord
+
+from cogs._guild_snapshot import ChannelSnap, GuildSnapshot, RoleSnap
+from cogs._structure_restore import StructureRestorer, build_plan
+
+SEND = discord.Permissions(send_messages=True).value
+TEXT = discord.ChannelType.text.value
+CAT = discord.ChannelType.category.value
+
+
+class FakeRole:
+    def __init__(self, rid, name, position):
+        self.id, self.name, self.position = rid, name, position
+
+
+class FakeCategory(discord.CategoryChannel):
+    def __init__(self, cid, name):
+        self.id, self.name, self.category_id = cid, name, None
+
+
+class FakeChannel:
+    def __init__(self, cid, name, category=None, overwrites=None):
+        self.id, self.name = cid, name
+        self.category_id = category.id if category else None
+        self.overwrites = dict(overwrites or {})
+
+    def overwrites_for(self, target):
+        return self.overwrites.get(target, discord.PermissionOverwrite())
+
+    async def set_permissions(self, target, *, overwrite, reason=None):
+        self.overwrites[target] = overwrite
+
+    async def edit(self, *, category, reason=None):
+        self.category_id = category.id
+
+
+class FakeGuild:
+    def __init__(self):
+        self.id = 1
+        self.ids = itertools.count(1000)
+        self.roles = {}
+        self.channels = {}
+        self.calls = []
+        self.fail_names = set()
+        self.bitrate_limit = 96000
+        self.me = SimpleNamespace(top_role=SimpleNamespace(position=50))
+
+    def get_role(self, rid):
+        return self.roles.get(rid)
+
+    def get_channel(self, cid):
+        return self.channels.get(cid)
+
+    def get_member(self, mid):
+        return None
+
+    async def create_role(self, *, name, reason=None, **kw):
+        self.calls.append(('role', name))
+        role = FakeRole(next(self.ids), name, 1)
+        self.roles[role.id] = role
+        return role
+
+    async def edit_role_positions(self, positions, reason=None):
+        self.calls.append(('positions', sorted((r.name, p) for r, p in positions.items())))
+        for role, pos in positions.items():
+            role.position = pos
+
+    async def create_category(self, name, *, overwrites, position, reason=None):
+        self.calls.append(('category', name))
+        cat = FakeCategory(next(self.ids), name)
+        self.channels[cat.id] = cat
+        return cat
+
+    async def create_text_channel(self, name, *, category, overwrites, reason=None, **kw):
+        await asyncio.sleep(0)
+        if name in self.fail_names:
+            raise discord.HTTPException(SimpleNamespace(status=500, reason='erro'), 'falhou')
+        self.calls.append(('text', name))
+        ch = FakeChannel(next(self.ids), name, category, overwrites)
+        self.channels[ch.id] = ch
+        return ch
+
+
+def _tc(cid, name, category_id=0, position=0, overwrites=()):
+    return ChannelSnap(cid, TEXT, name, category_id, position, '', False, 0, 0, 0, tuple(overwrites))
+
+
+def _scenario():
+    """Nuke: cargos Mod e VIP, categoria Staff com 2 canais e o canal #regras apagados."""
+    guild = FakeGuild()
+    everyone = FakeRole(1, '@everyone', 0)
+    guild.roles[1] = everyone
+    geral = FakeChannel(20, 'geral')
+    avisos = FakeChannel(21, 'avisos')  # era filho da categoria Staff e ficou sem categoria
+    guild.channels.update({20: geral, 21: avisos})
+
+    snap = GuildSnapshot(1)
+    snap.roles[1] = RoleSnap(1, '@everyone', 0, 0, False, False, 0, False)
+    snap.roles[2] = RoleSnap(2, 'Mod', 8192, 0, True, False, 5, False)
+    snap.roles[3] = RoleSnap(3, 'VIP', 0, 0, False, False, 2, False)
+    snap.roles[4] = RoleSnap(4, 'Bot X', 0, 0, False, False, 4, True)
+    snap.channels[10] = ChannelSnap(10, CAT, 'Staff', 0, 1, '', False, 0, 0, 0, ((2, 0, SEND, 0),))
+    snap.channels[11] = _tc(11, 'mod-chat', 10, 0, [(1, 0, 0, SEND), (2, 0, SEND, 0)])
+    snap.channels[12] = _tc(12, 'mod-log', 10, 1)
+    snap.channels[13] = _tc(13, 'regras')
+    snap.channels[20] = _tc(20, 'geral', 0, 0, [(3, 0, SEND, 0)])
+    snap.channels[21] = _tc(21, 'avisos', 10, 2)
+    for rid in (2, 3, 4):
+        snap.delete_role(rid, now=100.0)
+    for cid in (11, 12, 13, 10):
+        snap.delete_channel(cid, now=100.0)
+    # O Discord tira o canal filho da categoria apagada
+    snap.upsert_channel(snap.channels[21]._replace(category_id=0))
+    return guild, snap
+
+
+class TestStructureRestore(unittest.TestCase):
+    def test_plan_order_and_selection(self):
+        _, snap = _scenario()
+        plan = build_plan(snap, since=50.0)
+        self.assertEqual([r.name for r in plan.roles], ['Mod', 'VIP'])  # gerenciado fica de fora
+        self.assertEqual([c.name for c in plan.categories], ['Staff'])
+        self.assertEqual([c.name for c in plan.channels], ['regras', 'mod-chat', 'mod-log'])
+        self.assertEqual(plan.overwrites, [(20, 3, SEND, 0)])
+        self.assertEqual(plan.reparent, [(21, 10)])
+        self.assertEqual(build_plan(snap, since=150.0).total, 0)
+
+    def test_restore_remaps_ids(self):
+        guild, snap = _scenario()
+        mapped = []
+        restorer = StructureRestorer(guild, build_plan(snap, 50.0), on_mapped=lambda *a: mapped.append(a))
+        asyncio.run(restorer.run())
+        self.assertEqual(restorer.failed, 0)
+        kinds = [c[0] for c in guild.calls]
+        # Cargos (e posições) antes de categorias, categorias antes de canais
+        self.assertEqual(kinds[:3], ['role', 'role', 'positions'])
+        self.assertLess(kinds.index('category'), kinds.index('text'))
+        self.assertEqual(guild.calls[2][1], [('Mod', 5), ('VIP', 2)])
+        new_mod = guild.get_role(restorer.id_map[2])
+        new_cat = restorer.id_map[10]
+        mod_chat = guild.get_channel(restorer.id_map[11])
+        self.assertEqual(mod_chat.category_id, new_cat)
+        self.assertEqual(mod_chat.overwrites_for(new_mod).send_messages, True)
+        self.assertEqual(mod_chat.overwrites_for(guild.get_role(1)).send_messages, False)
+        self.assertEqual(guild.get_channel(21).category_id, new_cat)
+        self.assertEqual(guild.get_channel(20).overwrites_for(guild.get_role(restorer.id_map[3])).send_messages, True)
+        self.assertEqual({m[1] for m in mapped}, {2, 3, 10, 11, 12, 13})
+
+    def test_resume_after_failure(self):
+        guild, snap = _scenario()
+        guild.fail_names.add('mod-log')
+        plan = build_plan(snap, 50.0)
+        first = StructureRestorer(guild, plan)
+        asyncio.run(first.run())
+        self.assertEqual(first.channels.failed, 1)
+        guild.fail_names.clear()
+        guild.calls.clear()
+        second = StructureRestorer(guild, plan, id_map=first.id_map)
+        asyncio.run(second.run())
+        self.assertEqual([c for c in guild.calls if c[0] != 'positions'], [('text', 'mod-log')])
+        self.assertEqual(second.roles.skipped, 2)
+        self.assertEqual(second.failed, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,153 @@
+import asyncio
+import datetime
+import gzip
+import tracemalloc
+import unittest
+from types import SimpleNamespace
+
+import discord
+
+from cogs._message_cache import CachedMessage
+from cogs._transcript import Transcript
+from cogs.tolls_clearchat import ClearChatCog
+
+
+def _msg(i, content=None, attachments=None):
+    return CachedMessage(10**17 + i, 5, 1, 1000 + i % 13, f'membro{i % 13}', 1700000000.0 + i,
+                         f'mensagem número {i} com algum texto' if content is None else content, attachments or [])
+
+
+class TestTranscript(unittest.TestCase):
+    def test_txt_roundtrip(self):
+        with Transcript('Limpeza', '#geral', fmt='txt') as t:
+            t.add(_msg(1, content='linha 1\nlinha 2', attachments=[('a.png', 4096, 'https://cdn/a.png')]))
+            t.add_missing(10**17 + 2)
+            text = gzip.decompress(t.read()).decode('utf-8')
+        self.assertTrue(text.startswith('Limpeza\n#geral\n'))
+        self.assertIn('membro1 (1001): linha 1\n    linha 2\n', text)
+        self.assertIn('📎 a.png (4 KiB) https://cdn/a.png', text)
+        self.assertIn('fora do cache', text)
+        self.assertEqual((t.count, t.missing), (2, 1))
+
+    def test_html_escapes(self):
+        with Transcript('T', fmt='html') as t:
+            t.add(_msg(1, content='<script>alert(1)</script>'))
+            text = gzip.decompress(t.read()).decode('utf-8')
+        self.assertNotIn('<script>', text)
+        self.assertIn('&lt;script&gt;', text)
+        self.assertTrue(text.rstrip().endswith('</html>'))
+
+    def test_10k_messages_fixed_memory(self):
+        tracemalloc.start()
+        try:
+            with Transcript('Limpeza', spool_bytes=64 * 1024) as t:
+                for i in range(10000):
+                    t.add(_msg(i))
+                size = t.close()
+                _, peak = tracemalloc.get_traced_memory()
+                self.assertTrue(t.on_disk)
+                data = t.read()
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(t.count, 10000)
+        self.assertEqual(len(data), size)
+        self.assertLess(size, t.raw_bytes / 3)
+        # Spool + janela do zlib; o texto inteiro (~500 KiB) nunca fica em memória
+        self.assertLess(peak, 400 * 1024)
+        self.assertEqual(gzip.decompress(data).count(b'\n'), 10000 + 2)
+
+    def test_to_file(self):
+        t = Transcript('T')
+        t.add(_msg(1))
+        f = t.to_file('limpeza-5')
+        self.assertEqual(f.filename, 'limpeza-5.txt.gz')
+        self.assertTrue(gzip.decompress(f.fp.read()).startswith(b'T\n'))
+        t.discard()
+
+
+class _Channel:
+    def __init__(self, messages):
+        self.messages = messages  # mais novas primeiro
+        self.bulk_calls = []
+
+    async def history(self, limit):
+        for m in self.messages[:limit]:
+            yield m
+
+    async def delete_messages(self, batch):
+        self.bulk_calls.append(len(batch))
+
+
+class TestClearBatches(unittest.TestCase):
+    def test_streams_in_batches_and_splits_old(self):
+        now = discord.utils.utcnow()
+        single = []
+
+        def make(i, age_days):
+            m = SimpleNamespace(id=10**17 + i, created_at=now - datetime.timedelta(days=age_days), content=f'm{i}',
+                                channel=SimpleNamespace(id=5), guild=SimpleNamespace(id=1), attachments=[],
+                                author=SimpleNamespace(id=1, bot=False))
+
+            async def delete():
+                single.append(m.id)
+            m.delete = delete
+            return m
+        messages = [make(i, 1) for i in range(250)] + [make(1000 + i, 30) for i in range(3)]
+        channel = _Channel(messages)
+        cog = ClearChatCog(SimpleNamespace())
+        with Transcript('T') as t:
+            async def run():
+                return [n async for n in cog._purge_batches(channel, 260, t)]
+            counts = asyncio.run(run())
+            self.assertEqual(t.count, 253)
+        self.assertEqual(counts, [100, 100, 53])
+        self.assertEqual(channel.bulk_calls, [100, 100, 50])
+        self.assertEqual(len(single), 3)
+
+
+class _TextChannel:
+    def __init__(self, cid):
+        self.id = cid
+        self.name = f'c{cid}'
+        self.mention = f'<#{cid}>'
+
+
+class TestPurgeSuppression(unittest.TestCase):
+    def test_only_purged_ids_are_muted(self):
+        from unittest import mock
+        from cogs import audit_user
+
+        channel = _TextChannel(5)
+        guild = SimpleNamespace(id=1, get_channel=lambda cid: channel, filesize_limit=8 * 1024 * 1024,
+                                me=SimpleNamespace(guild_permissions=SimpleNamespace(view_audit_log=False)))
+        bot = SimpleNamespace(get_guild=lambda gid: guild, get_cog=lambda name: None)
+        logged = []
+
+        async def go():
+            with mock.patch.object(audit_user.discord, 'TextChannel', _TextChannel):
+                cog = audit_user.AuditUserCog(bot)
+                cog.enabled = True
+                cog.opts = dict(cog.opts, log_bulk_delete=True, log_message_delete=True, bulk_transcript=False)
+
+                async def fake_log(guild, title, fields, **kw):
+                    logged.append((kw.get('action'), fields))
+                cog._log = fake_log
+                cog.expect_purge([101, 102, 103])
+                # Bulk do !clear com uma mensagem apagada por outro bot no mesmo evento
+                await cog.on_raw_bulk_message_delete(SimpleNamespace(
+                    message_ids={101, 102, 200}, cached_messages=[], guild_id=1, channel_id=5))
+                # Deleção avulsa do !clear (mensagem antiga) e outra de um moderador no mesmo canal
+                for mid in (103, 300):
+                    await cog.on_raw_message_delete(SimpleNamespace(
+                        message_id=mid, cached_message=None, guild_id=1, channel_id=5))
+                return cog
+
+        cog = asyncio.run(go())
+        self.assertEqual([a for a, _ in logged], ['message_bulk_delete', 'message_delete'])
+        self.assertIn('1 mensagens', logged[0][1][0][1])
+        self.assertIn('300', logged[1][1][0][1])
+        self.assertEqual(len(cog._purged_ids), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()